@@ -15,6 +15,7 @@ import time
 import salt.config
 import salt.loader
 import salt.syspaths
+import salt.utils.metrics
 from salt.ext import six
 from salt.payload import Serial
 from salt.utils.odict import OrderedDict
@@ -95,6 +96,11 @@ class Cache(object):
             self.__lazy_init()
         return self._modules
 
+    def _timer(self, op):
+        return salt.utils.metrics.timer(
+            "salt_cache_operation_duration_seconds", driver=self.driver, op=op
+        )
+
     def cache(self, bank, key, fun, loop_fun=None, **kwargs):
         """
         Check cache for the data. If it is there, check to see if it needs to
@@ -155,7 +161,8 @@ class Cache(object):
             in the cache backend (auth, permissions, etc).
         """
         fun = "{0}.store".format(self.driver)
-        return self.modules[fun](bank, key, data, **self._kwargs)
+        with self._timer("store"):
+            return self.modules[fun](bank, key, data, **self._kwargs)
 
     def fetch(self, bank, key):
         """
@@ -179,7 +186,84 @@ class Cache(object):
             in the cache backend (auth, permissions, etc).
         """
         fun = "{0}.fetch".format(self.driver)
-        return self.modules[fun](bank, key, **self._kwargs)
+        with self._timer("fetch"):
+            return self.modules[fun](bank, key, **self._kwargs)
+
+    def store_many(self, items):
+        """
+        Store several keys at once using the specified module
+
+        .. versionadded:: 3003
+
+        :param items:
+            An iterable of ``(bank, key, data)`` tuples, see :py:meth:`store`.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+
+        Drivers providing a ``store_many`` function write all the keys in one
+        batch, for the other drivers the keys are stored one after the other.
+        """
+        items = list(items)
+        fun = "{0}.store_many".format(self.driver)
+        if fun in self.modules:
+            with self._timer("store_many"):
+                return self.modules[fun](items, **self._kwargs)
+        for bank, key, data in items:
+            self.store(bank, key, data)
+
+    def fetch_many(self, bank_keys):
+        """
+        Fetch several keys at once using the specified module
+
+        .. versionadded:: 3003
+
+        :param bank_keys:
+            An iterable of ``(bank, key)`` tuples, see :py:meth:`fetch`.
+
+        :return:
+            Return a dict mapping each ``(bank, key)`` tuple to the python
+            object fetched from the cache, or an empty dict if it was not found.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+
+        Drivers providing a ``fetch_many`` function read all the keys in one
+        batch, for the other drivers the keys are fetched one after the other.
+        """
+        bank_keys = list(bank_keys)
+        fun = "{0}.fetch_many".format(self.driver)
+        if fun in self.modules:
+            with self._timer("fetch_many"):
+                ret = self.modules[fun](bank_keys, **self._kwargs)
+            return {bank_key: ret.get(bank_key, {}) for bank_key in bank_keys}
+        return {(bank, key): self.fetch(bank, key) for bank, key in bank_keys}
+
+    def list_many(self, banks):
+        """
+        Lists entries stored in several banks at once
+
+        .. versionadded:: 3003
+
+        :param banks:
+            An iterable of bank names, see :py:meth:`list`.
+
+        :return:
+            A dict mapping each bank to the list of its entries.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        """
+        banks = list(banks)
+        fun = "{0}.list_many".format(self.driver)
+        if fun in self.modules:
+            with self._timer("list_many"):
+                ret = self.modules[fun](banks, **self._kwargs)
+            return {bank: ret.get(bank, []) for bank in banks}
+        return {bank: self.list(bank) for bank in banks}
 
     def updated(self, bank, key):
         """
@@ -203,7 +287,8 @@ class Cache(object):
             in the cache backend (auth, permissions, etc).
         """
         fun = "{0}.updated".format(self.driver)
-        return self.modules[fun](bank, key, **self._kwargs)
+        with self._timer("updated"):
+            return self.modules[fun](bank, key, **self._kwargs)
 
     def flush(self, bank, key=None):
         """
@@ -224,7 +309,8 @@ class Cache(object):
             in the cache backend (auth, permissions, etc).
         """
         fun = "{0}.flush".format(self.driver)
-        return self.modules[fun](bank, key=key, **self._kwargs)
+        with self._timer("flush"):
+            return self.modules[fun](bank, key=key, **self._kwargs)
 
     def list(self, bank):
         """
@@ -243,7 +329,8 @@ class Cache(object):
             in the cache backend (auth, permissions, etc).
         """
         fun = "{0}.list".format(self.driver)
-        return self.modules[fun](bank, **self._kwargs)
+        with self._timer("list"):
+            return self.modules[fun](bank, **self._kwargs)
 
     def contains(self, bank, key=None):
         """
@@ -268,7 +355,8 @@ class Cache(object):
             in the cache backend (auth, permissions, etc).
         """
         fun = "{0}.contains".format(self.driver)
-        return self.modules[fun](bank, key, **self._kwargs)
+        with self._timer("contains"):
+            return self.modules[fun](bank, key, **self._kwargs)
 
 
 class MemCache(Cache):
@@ -347,15 +435,60 @@ class MemCache(Cache):
         self.storage[(bank, key)] = [now, data]
         return data
 
+    def fetch_many(self, bank_keys):
+        bank_keys = list(bank_keys)
+        if "{0}.fetch_many".format(self.driver) not in self.modules:
+            return {(bank, key): self.fetch(bank, key) for bank, key in bank_keys}
+        ret = {}
+        missing = []
+        for bank, key in bank_keys:
+            if self.debug:
+                self.call += 1
+            now = time.time()
+            record = self.storage.pop((bank, key), None)
+            if record is not None and record[0] + self.expire >= now:
+                if self.debug:
+                    self.hit += 1
+                record[0] = now
+                self.storage[(bank, key)] = record
+                ret[(bank, key)] = record[1]
+            else:
+                missing.append((bank, key))
+        if self.debug:
+            log.debug(
+                "MemCache stats (call/hit/rate): %s/%s/%s",
+                self.call,
+                self.hit,
+                float(self.hit) / self.call if self.call else 0,
+            )
+        if missing:
+            fetched = super(MemCache, self).fetch_many(missing)
+            for bank_key, data in six.iteritems(fetched):
+                self._set(bank_key, data)
+            ret.update(fetched)
+        return ret
+
     def store(self, bank, key, data):
         self.storage.pop((bank, key), None)
         super(MemCache, self).store(bank, key, data)
+        self._set((bank, key), data)
+
+    def store_many(self, items):
+        items = list(items)
+        for bank, key, _ in items:
+            self.storage.pop((bank, key), None)
+        super(MemCache, self).store_many(items)
+        for bank, key, data in items:
+            self.storage.pop((bank, key), None)
+            self._set((bank, key), data)
+
+    def _set(self, bank_key, data):
         if len(self.storage) >= self.max:
             if self.cleanup:
                 MemCache.__cleanup(self.expire)
             if len(self.storage) >= self.max:
                 self.storage.popitem(last=False)
-        self.storage[(bank, key)] = [time.time(), data]
+        self.storage[bank_key] = [time.time(), data]
 
     def flush(self, bank, key=None):
         self.storage.pop((bank, key), None)
@@ -48,8 +48,10 @@ value to ``consul``:
 """
 from __future__ import absolute_import, print_function, unicode_literals
 
+import base64
 import logging
 
+import salt.utils.stringutils
 from salt.exceptions import SaltCacheError
 
 try:
@@ -63,6 +65,9 @@ except ImportError:
 log = logging.getLogger(__name__)
 api = None
 
+# Maximum number of operations Consul accepts in a single transaction
+_TXN_MAX_OPERATIONS = 64
+
 
 # Define the module's virtual name
 __virtualname__ = "consul"
@@ -116,6 +121,39 @@ def store(bank, key, data):
         )
 
 
+def store_many(items):
+    """
+    Store several ``(bank, key, data)`` items using Consul transactions.
+    """
+    items = list(items)
+    if not hasattr(api, "txn"):
+        # python-consul < 1.0.0 has no support for transactions
+        for bank, key, data in items:
+            store(bank, key, data)
+        return
+    for idx in range(0, len(items), _TXN_MAX_OPERATIONS):
+        operations = []
+        for bank, key, data in items[idx : idx + _TXN_MAX_OPERATIONS]:
+            c_data = salt.utils.stringutils.to_bytes(__context__["serial"].dumps(data))
+            operations.append(
+                {
+                    "KV": {
+                        "Verb": "set",
+                        "Key": "{0}/{1}".format(bank, key),
+                        "Value": salt.utils.stringutils.to_str(
+                            base64.b64encode(c_data)
+                        ),
+                    }
+                }
+            )
+        try:
+            api.txn.put(operations)
+        except Exception as exc:  # pylint: disable=broad-except
+            raise SaltCacheError(
+                "There was an error writing {0} keys: {1}".format(len(operations), exc)
+            )
+
+
 def fetch(bank, key):
     """
     Fetch a key value.
@@ -90,16 +90,16 @@ def __virtual__():
     return bool(MySQLdb), "No python mysql client installed." if MySQLdb is None else ""
 
 
-def run_query(conn, query, retries=3):
+def run_query(conn, query, retries=3, args=None):
     """
     Get a cursor and run a query. Reconnect up to `retries` times if
-    needed.
+    needed. `args` are the parameters bound to the query, if any.
     Returns: cursor, affected rows counter
     Raises: SaltCacheError, AttributeError, OperationalError
     """
     try:
         cur = conn.cursor()
-        out = cur.execute(query)
+        out = cur.execute(query, args)
         return cur, out
     except (AttributeError, OperationalError) as e:
         if retries == 0:
@@ -112,7 +112,7 @@ def run_query(conn, query, retries=3):
             log.info("mysql_cache: recreating db connection due to: %r", e)
         global client
         client = MySQLdb.connect(**_mysql_kwargs)
-        return run_query(client, query, retries - 1)
+        return run_query(client, query, retries - 1, args=args)
     except Exception as e:  # pylint: disable=broad-except
         if len(query) > 150:
             query = query[:150] + "<...>"
@@ -195,6 +195,49 @@ def store(bank, key, data):
         raise SaltCacheError("Error storing {} {} returned {}".format(bank, key, cnt))
 
 
+def store_many(items):
+    """
+    Store several ``(bank, key, data)`` items with a single query.
+    """
+    items = list(items)
+    if not items:
+        return
+    _init_client()
+    query = "REPLACE INTO {} (bank, etcd_key, data) VALUES {}".format(
+        _table_name, ", ".join(["(%s, %s, %s)"] * len(items))
+    )
+    args = []
+    for bank, key, data in items:
+        args.extend((bank, key, __context__["serial"].dumps(data)))
+    cur, cnt = run_query(client, query, args=args)
+    cur.close()
+    if cnt < len(items):
+        raise SaltCacheError(
+            "Error storing {} keys, only {} rows affected".format(len(items), cnt)
+        )
+
+
+def fetch_many(bank_keys):
+    """
+    Fetch several ``(bank, key)`` items with a single ``IN`` query.
+    """
+    bank_keys = list(bank_keys)
+    if not bank_keys:
+        return {}
+    _init_client()
+    query = "SELECT bank, etcd_key, data FROM {} WHERE (bank, etcd_key) IN ({})".format(
+        _table_name, ", ".join(["(%s, %s)"] * len(bank_keys))
+    )
+    args = [item for bank_key in bank_keys for item in bank_key]
+    cur, _ = run_query(client, query, args=args)
+    ret = {
+        (bank, key): __context__["serial"].loads(data)
+        for bank, key, data in cur.fetchall()
+    }
+    cur.close()
+    return ret
+
+
 def fetch(bank, key):
     """
     Fetch a key value.
@@ -237,6 +280,26 @@ def ls(bank):
     return out
 
 
+def list_many(banks):
+    """
+    Return the entries stored in each of the specified banks with a single
+    ``IN`` query.
+    """
+    banks = list(banks)
+    if not banks:
+        return {}
+    _init_client()
+    query = "SELECT bank, etcd_key FROM {} WHERE bank IN ({})".format(
+        _table_name, ", ".join(["%s"] * len(banks))
+    )
+    cur, _ = run_query(client, query, args=banks)
+    ret = {bank: [] for bank in banks}
+    for bank, key in cur.fetchall():
+        ret[bank].append(key)
+    cur.close()
+    return ret
+
+
 def contains(bank, key):
     """
     Checks if the specified bank contains the specified key.
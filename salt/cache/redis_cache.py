@@ -369,6 +369,51 @@ def store(bank, key, data):
         raise SaltCacheError(mesg)
 
 
+def store_many(items):
+    """
+    Store several ``(bank, key, data)`` items using a single Redis pipeline.
+    """
+    redis_server = _get_redis_server()
+    redis_pipe = redis_server.pipeline()
+    banks = set()
+    try:
+        for bank, key, data in items:
+            if bank not in banks:
+                _build_bank_hier(bank, redis_pipe)
+                banks.add(bank)
+            redis_pipe.set(
+                _get_key_redis_key(bank, key), __context__["serial"].dumps(data)
+            )
+            redis_pipe.sadd(_get_bank_keys_redis_key(bank), key)
+        redis_pipe.execute()
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = "Cannot set the Redis cache keys: {rerr}".format(rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+
+
+def fetch_many(bank_keys):
+    """
+    Fetch several ``(bank, key)`` items from the Redis cache with one ``MGET``.
+    """
+    bank_keys = list(bank_keys)
+    if not bank_keys:
+        return {}
+    redis_server = _get_redis_server()
+    redis_keys = [_get_key_redis_key(bank, key) for bank, key in bank_keys]
+    try:
+        redis_values = redis_server.mget(redis_keys)
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = "Cannot fetch the Redis cache keys: {rerr}".format(rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+    return {
+        bank_key: __context__["serial"].loads(redis_value)
+        for bank_key, redis_value in zip(bank_keys, redis_values)
+        if redis_value is not None
+    }
+
+
 def fetch(bank, key):
     """
     Fetch data from the Redis cache.
@@ -508,6 +553,28 @@ def list_(bank):
     return list(banks)
 
 
+def list_many(banks):
+    """
+    Lists entries stored in several banks using a single Redis pipeline.
+    """
+    banks = list(banks)
+    redis_server = _get_redis_server()
+    redis_pipe = redis_server.pipeline()
+    for bank in banks:
+        redis_pipe.smembers(_get_bank_redis_key(bank))
+    try:
+        members = redis_pipe.execute()
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = "Cannot list the Redis cache banks {rbanks}: {rerr}".format(
+            rbanks=", ".join(banks), rerr=rerr
+        )
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+    return {
+        bank: list(bank_members or []) for bank, bank_members in zip(banks, members)
+    }
+
+
 def contains(bank, key):
     """
     Checks if the specified bank contains the specified key.
@@ -0,0 +1,380 @@
+"""
+Cache data in a single SQLite database file.
+
+.. versionadded:: 3003
+
+The ``localfs`` driver stores one file per cache key, which on masters with
+many minions means hundreds of thousands of small files in the cachedir. This
+driver keeps the whole cache in one SQLite database (``cache.sqlite`` in the
+cachedir) running in WAL mode, so readers never block the writer and every
+store is a single row update instead of a temporary file and a rename.
+
+Each cache key is a row indexed by its bank and key name, along with the time
+it was last updated, which is what :py:func:`updated` returns. The bank
+hierarchy is kept in a separate table indexed by the parent bank, so listing
+the sub-banks of a bank (e.g. all the minions in ``minions``) is an index
+lookup as well.
+
+To use it as the minion data cache, set the master ``cache`` config value to
+``sqlite``:
+
+.. code-block:: yaml
+
+    cache: sqlite
+
+The following values can also be set in the master config, these are the
+defaults:
+
+.. code-block:: yaml
+
+    sqlite_cache.database: cache.sqlite
+    sqlite_cache.timeout: 30
+
+``sqlite_cache.database`` is relative to the cachedir unless it is an absolute
+path, ``sqlite_cache.timeout`` is the number of seconds to wait for a lock on
+the database before giving up.
+
+An existing ``localfs`` cache can be imported with the :py:func:`cache.migrate
+<salt.runners.cache.migrate>` runner.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import salt.syspaths
+from salt.exceptions import SaltCacheError
+
+try:
+    import sqlite3
+
+    HAS_SQLITE3 = True
+except ImportError:
+    HAS_SQLITE3 = False
+
+log = logging.getLogger(__name__)
+
+__virtualname__ = "sqlite"
+__func_alias__ = {"list_": "list"}
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS cache (
+        bank TEXT NOT NULL,
+        key TEXT NOT NULL,
+        data BLOB,
+        updated INTEGER NOT NULL,
+        PRIMARY KEY (bank, key)
+    )""",
+    """CREATE TABLE IF NOT EXISTS banks (
+        bank TEXT PRIMARY KEY,
+        parent TEXT NOT NULL,
+        name TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS banks_parent ON banks (parent)",
+)
+
+# {(pid, path): sqlite3.Connection}
+_connections = {}
+_lock = threading.RLock()
+
+# Number of keys looked up per query, within SQLite's default limit of 999
+# bound parameters
+_CHUNK_SIZE = 400
+
+
+def __virtual__():
+    """
+    Only load if the sqlite3 module is available
+    """
+    if not HAS_SQLITE3:
+        return False, "The sqlite3 python module is not available"
+    return __virtualname__
+
+
+def __cachedir(kwargs=None):
+    if kwargs and "cachedir" in kwargs:
+        return kwargs["cachedir"]
+    return __opts__.get("cachedir", salt.syspaths.CACHE_DIR)
+
+
+def init_kwargs(kwargs):
+    return {"cachedir": __cachedir(kwargs)}
+
+
+def get_storage_id(kwargs):
+    return ("sqlite", __cachedir(kwargs))
+
+
+def _normalize(bank):
+    """
+    Normalize a bank name the way os.path.normpath would for localfs
+    """
+    return "/".join(part for part in bank.split("/") if part not in ("", "."))
+
+
+def _bank_range(bank):
+    """
+    Return the bounds of the names of all the sub-banks of ``bank``, which
+    lets SQLite answer prefix lookups from the primary key index.
+    """
+    return bank + "/", bank + "0"  # "0" sorts right after "/"
+
+
+def _connect(cachedir):
+    """
+    Return a connection to the cache database of ``cachedir``. Connections are
+    never shared between processes, since they do not survive a fork.
+    """
+    path = __opts__.get("sqlite_cache.database", "cache.sqlite")
+    path = os.path.join(cachedir, path)
+    conn_key = (os.getpid(), path)
+    conn = _connections.get(conn_key)
+    if conn is not None:
+        return conn
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        conn = sqlite3.connect(
+            path,
+            timeout=__opts__.get("sqlite_cache.timeout", 30),
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+    except (OSError, sqlite3.Error) as exc:
+        raise SaltCacheError(
+            "Unable to open the cache database {}: {}".format(path, exc)
+        )
+    _connections[conn_key] = conn
+    return conn
+
+
+def _add_banks(conn, bank):
+    """
+    Register ``bank`` and all of its parents in the bank hierarchy
+    """
+    parts = bank.split("/")
+    conn.executemany(
+        "INSERT OR IGNORE INTO banks (bank, parent, name) VALUES (?, ?, ?)",
+        [
+            ("/".join(parts[: idx + 1]), "/".join(parts[:idx]), parts[idx])
+            for idx in range(len(parts))
+        ],
+    )
+
+
+def store_many(items, cachedir):
+    """
+    Store several ``(bank, key, data)`` items in a single transaction.
+    """
+    now = int(time.time())
+    rows = []
+    banks = set()
+    for bank, key, data in items:
+        bank = _normalize(bank)
+        banks.add(bank)
+        rows.append(
+            (bank, key, __context__["serial"].dumps(data, use_bin_type=True), now)
+        )
+    with _lock:
+        conn = _connect(cachedir)
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for bank in banks:
+                    _add_banks(conn, bank)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cache (bank, key, data, updated) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as exc:
+            raise SaltCacheError("There was an error writing the cache: {}".format(exc))
+
+
+def store(bank, key, data, cachedir):
+    """
+    Store information in the database.
+    """
+    store_many([(bank, key, data)], cachedir)
+
+
+def fetch(bank, key, cachedir):
+    """
+    Fetch information from the database.
+    """
+    with _lock:
+        try:
+            row = (
+                _connect(cachedir)
+                .execute(
+                    "SELECT data FROM cache WHERE bank = ? AND key = ?",
+                    (_normalize(bank), key),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as exc:
+            raise SaltCacheError(
+                'There was an error reading the cache key "{}/{}": {}'.format(
+                    bank, key, exc
+                )
+            )
+    if row is None:
+        log.debug('Cache key "%s/%s" does not exist', bank, key)
+        return {}
+    return __context__["serial"].loads(row[0], encoding="utf-8")
+
+
+def fetch_many(bank_keys, cachedir):
+    """
+    Fetch several ``(bank, key)`` items from the database at once.
+    """
+    wanted = {(_normalize(bank), key): (bank, key) for bank, key in bank_keys}
+    pending = list(wanted)
+    ret = {}
+    with _lock:
+        conn = _connect(cachedir)
+        while pending:
+            chunk, pending = pending[:_CHUNK_SIZE], pending[_CHUNK_SIZE:]
+            banks = sorted({bank for bank, _ in chunk})
+            keys = sorted({key for _, key in chunk})
+            query = (
+                "SELECT bank, key, data FROM cache WHERE bank IN ({}) "
+                "AND key IN ({})".format(
+                    ", ".join("?" * len(banks)), ", ".join("?" * len(keys))
+                )
+            )
+            try:
+                rows = conn.execute(query, banks + keys).fetchall()
+            except sqlite3.Error as exc:
+                raise SaltCacheError(
+                    "There was an error reading the cache: {}".format(exc)
+                )
+            for bank, key, data in rows:
+                if (bank, key) in wanted:
+                    ret[wanted[(bank, key)]] = __context__["serial"].loads(
+                        data, encoding="utf-8"
+                    )
+    return ret
+
+
+def updated(bank, key, cachedir):
+    """
+    Return the epoch of the last update of this cache key
+    """
+    with _lock:
+        try:
+            row = (
+                _connect(cachedir)
+                .execute(
+                    "SELECT updated FROM cache WHERE bank = ? AND key = ?",
+                    (_normalize(bank), key),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as exc:
+            raise SaltCacheError(
+                'There was an error reading the update time of "{}/{}": {}'.format(
+                    bank, key, exc
+                )
+            )
+    if row is None:
+        log.warning('Cache key "%s/%s" does not exist', bank, key)
+        return None
+    return row[0]
+
+
+def flush(bank, key=None, cachedir=None):
+    """
+    Remove the key from the cache bank with all the key content.
+    """
+    if cachedir is None:
+        cachedir = __cachedir()
+    bank = _normalize(bank)
+    with _lock:
+        conn = _connect(cachedir)
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if key is not None:
+                    return (
+                        conn.execute(
+                            "DELETE FROM cache WHERE bank = ? AND key = ?", (bank, key)
+                        ).rowcount
+                        > 0
+                    )
+                if not contains(bank, None, cachedir):
+                    return False
+                if bank:
+                    low, high = _bank_range(bank)
+                    where = "bank = ? OR (bank >= ? AND bank < ?)"
+                    args = (bank, low, high)
+                else:
+                    where, args = "1", ()
+                conn.execute("DELETE FROM cache WHERE " + where, args)
+                conn.execute("DELETE FROM banks WHERE " + where, args)
+        except sqlite3.Error as exc:
+            raise SaltCacheError(
+                'There was an error removing "{}": {}'.format(bank, exc)
+            )
+    return True
+
+
+def list_(bank, cachedir):
+    """
+    Return an iterable object containing all entries stored in the specified bank.
+    """
+    bank = _normalize(bank)
+    with _lock:
+        try:
+            conn = _connect(cachedir)
+            ret = [
+                row[0]
+                for row in conn.execute("SELECT key FROM cache WHERE bank = ?", (bank,))
+            ]
+            ret.extend(
+                row[0]
+                for row in conn.execute(
+                    "SELECT name FROM banks WHERE parent = ? AND bank != ''", (bank,)
+                )
+            )
+        except sqlite3.Error as exc:
+            raise SaltCacheError(
+                'There was an error listing the bank "{}": {}'.format(bank, exc)
+            )
+    return ret
+
+
+def list_many(banks, cachedir):
+    """
+    Return the entries stored in each of the specified banks.
+    """
+    with _lock:
+        return {bank: list_(bank, cachedir) for bank in banks}
+
+
+def contains(bank, key, cachedir):
+    """
+    Checks if the specified bank contains the specified key.
+    """
+    bank = _normalize(bank)
+    with _lock:
+        try:
+            conn = _connect(cachedir)
+            if key is None:
+                row = conn.execute(
+                    "SELECT 1 FROM banks WHERE bank = ?", (bank,)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT 1 FROM cache WHERE bank = ? AND key = ?", (bank, key)
+                ).fetchone()
+        except sqlite3.Error as exc:
+            raise SaltCacheError(
+                'There was an error reading the bank "{}": {}'.format(bank, exc)
+            )
+    return row is not None
@@ -11,11 +11,116 @@ from datetime import datetime, timedelta
 import salt.client
 import salt.exceptions
 import salt.output
+import salt.utils.event
+import salt.utils.jid
+import salt.utils.metrics
 import salt.utils.stringutils
 
 log = logging.getLogger(__name__)
 
 
+class AdaptiveBatchSize:
+    """
+    Additive increase, multiplicative decrease of the number of minions a
+    batch run keeps running
+
+    The number of minions grows by one each time as many minions returned
+    quickly and successfully, and is halved when a minion returned too slowly,
+    when too many minions failed, or when the master workers have too many
+    requests in progress.
+
+    .. versionadded:: 3003
+    """
+
+    # The weight of the last return in the rate of failed returns
+    FAILURE_WEIGHT = 0.2
+    # The factor applied to the number of minions on overload
+    DECREASE = 0.5
+
+    def __init__(self, opts, initial):
+        self.min_size = max(int(opts.get("batch_adaptive_min_size", 1)), 1)
+        self.max_size = int(opts.get("batch_adaptive_max_size", 0))
+        if self.max_size > 0:
+            self.max_size = max(self.max_size, self.min_size)
+        self.latency = float(opts.get("batch_adaptive_latency", 30))
+        self.max_failure_rate = float(opts.get("batch_adaptive_max_failure_rate", 0.25))
+        self.max_requests = int(opts.get("batch_adaptive_max_requests", 100))
+        self.metrics_path = None
+        if opts.get("master_metrics") and self.max_requests > 0:
+            self.metrics_path = salt.utils.metrics.metrics_dir(opts)
+        self.size = self._bound(float(initial))
+        self.failure_rate = 0.0
+        self.requests = None
+        self.decreased_at = 0.0
+        self.requests_checked_at = 0.0
+
+    def _bound(self, size):
+        if self.max_size > 0:
+            size = min(size, self.max_size)
+        return max(size, self.min_size)
+
+    @property
+    def window(self):
+        """
+        The number of minions to keep running
+        """
+        return int(self.size)
+
+    def master_requests(self):
+        """
+        Return the number of requests in progress in the master workers, read
+        from the master metrics at most once a second, or None when it is not
+        known
+        """
+        if self.metrics_path is None:
+            return None
+        now = time.time()
+        if now - self.requests_checked_at >= 1:
+            self.requests_checked_at = now
+            gauges = salt.utils.metrics.collect(self.metrics_path)["gauges"]
+            self.requests = sum(
+                value
+                for (name, _), value in gauges.items()
+                if name == "salt_master_requests_in_progress"
+            )
+        return self.requests
+
+    def update(self, started, latency, failed):
+        """
+        Account for the return of a minion which was sent the job at the time
+        ``started`` and returned after ``latency`` seconds, successfully or
+        not. Return the reason the number of minions was decreased, if it was.
+        """
+        self.failure_rate += self.FAILURE_WEIGHT * (int(failed) - self.failure_rate)
+        requests = self.master_requests()
+        if latency > self.latency:
+            reason = "latency"
+        elif self.failure_rate > self.max_failure_rate:
+            reason = "failures"
+        elif requests is not None and requests > self.max_requests:
+            reason = "master"
+        else:
+            self.size = self._bound(self.size + 1.0 / self.size)
+            return None
+        if started < self.decreased_at:
+            # The minion was sent the job before the last decrease, it does
+            # not tell whether that decrease was enough
+            return None
+        self.size = self._bound(self.size * self.DECREASE)
+        self.decreased_at = time.time()
+        return reason
+
+
+def _failed(data):
+    """
+    Return whether the return of a minion is missing or failed
+    """
+    if "retcode" not in data and isinstance(data.get("data"), dict):
+        # Raw return
+        data = data["data"]
+    return data.get("retcode", 1) != 0
+
+
 class Batch:
     """
     Manage the execution of batch runs
@@ -102,6 +207,28 @@ class Batch:
         if i:
             del wait[:i]
 
+    def __fire_size(self, batch_jid, window, reason=None):
+        """
+        Fire an event with the number of minions an adaptive batch run keeps
+        running
+        """
+        data = {
+            "size": window.window,
+            "min_size": window.min_size,
+            "max_size": window.max_size,
+            "failure_rate": window.failure_rate,
+            "master_requests": window.requests,
+        }
+        if reason:
+            data["reason"] = reason
+        log.debug("Adaptive batch %s keeps %s minions running", batch_jid, data["size"])
+        try:
+            self.local.event.fire_event(
+                data, salt.utils.event.tagify([batch_jid, "size"], "batch")
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to fire the batch size event: %s", exc)
+
     def run(self):
         """
         Execute the batch run
@@ -117,6 +244,13 @@ class Batch:
         # No targets to run
         if not self.minions:
             return
+        # adapt the number of minions to keep running to their returns
+        window = None
+        if self.opts.get("batch_adaptive") and bnum is not None:
+            window = AdaptiveBatchSize(self.opts, bnum)
+            batch_jid = salt.utils.jid.gen_jid(self.opts)
+            self.__fire_size(batch_jid, window)
+        started = {}
         to_run = copy.deepcopy(self.minions)
         active = []
         ret = {}
@@ -153,6 +287,8 @@ class Batch:
         # Iterate while we still have things to execute
         while len(ret) < len(self.minions):
             next_ = []
+            if window is not None:
+                bnum = window.window
             if bwait and wait:
                 self.__update_wait(wait)
             if len(to_run) <= bnum - len(wait) and not active:
@@ -170,6 +306,10 @@ class Batch:
 
             active += next_
             args[0] = next_
+            if window is not None:
+                now = time.time()
+                for minion in next_:
+                    started[minion] = now
 
             if next_:
                 if not self.quiet:
@@ -277,6 +417,13 @@ class Batch:
                     if self.opts.get("failhard") and data["retcode"] > 0:
                         failhard = True
 
+                if window is not None and minion in started:
+                    sent = started.pop(minion)
+                    size = window.window
+                    reason = window.update(sent, time.time() - sent, _failed(data))
+                    if window.window != size:
+                        self.__fire_size(batch_jid, window, reason)
+
                 if self.opts.get("raw"):
                     ret[minion] = data
                     yield data
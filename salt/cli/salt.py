@@ -202,7 +202,9 @@ class SaltCMD(salt.utils.parsers.SaltCMDOptionParser):
                         ret_, out, retcode = self._format_ret(full_ret)
                         retcodes.append(retcode)
                         self._output_ret(ret_, out, retcode=retcode)
-                        ret.update(full_ret)
+                        # Only keep what the summary needs, not the returns
+                        for minion, data in full_ret.items():
+                            ret[minion] = self._summary_ret(data)
                     except KeyError:
                         errors.append(full_ret)
 
@@ -371,6 +373,19 @@ class SaltCMD(salt.utils.parsers.SaltCMDOptionParser):
                 )
         salt.utils.stringutils.print_cli("-------------------------------------------")
 
+    def _summary_ret(self, data):
+        """
+        Return the part of the return of a minion needed by the returns
+        summary
+        """
+        minion_ret = data.get("ret")
+        if not (
+            isinstance(minion_ret, str)
+            and minion_ret.startswith("Minion did not return")
+        ):
+            minion_ret = None
+        return {"ret": minion_ret, "retcode": data.get("retcode", 0)}
+
     def _progress_end(self, out):
         import salt.output
 
@@ -34,6 +34,7 @@ import salt.payload
 import salt.syspaths as syspaths
 import salt.transport.client
 import salt.utils.args
+import salt.utils.data
 import salt.utils.event
 import salt.utils.files
 import salt.utils.jid
@@ -552,6 +553,8 @@ class LocalClient:
             opts["gather_job_timeout"] = kwargs["gather_job_timeout"]
         if "batch_wait" in kwargs:
             opts["batch_wait"] = int(kwargs["batch_wait"])
+        if "batch_adaptive" in kwargs:
+            opts["batch_adaptive"] = salt.utils.data.is_true(kwargs["batch_adaptive"])
 
         eauth = {}
         if "eauth" in kwargs:
@@ -1110,15 +1113,18 @@ class LocalClient:
             )
         else:
             ret_iter = self.get_returns_no_block("salt/job/{}".format(jid))
-        # iterator for the info of this job
-        jinfo_iter = []
+        # iterators for the info of this job, find_job jid -> (iterator, timeout)
+        jinfo_iters = {}
+        # the minions waiting for the answer of a find_job, id_ -> timeout time
+        checking = {}
+        # the minions which did not answer their last find_job
+        not_running = set()
+        # do not send more than one find_job per second
+        next_check = 0
         # open event jids that need to be un-subscribed from later
         open_jids = set()
         timeout_at = time.time() + timeout
         gather_syndic_wait = time.time() + self.opts["syndic_wait"]
-        # are there still minions running the job out there
-        # start as True so that we ping at least once
-        minions_running = True
         log.debug(
             "get_iter_returns for jid %s sent to %s will timeout at %s",
             jid,
@@ -1181,110 +1187,123 @@ class LocalClient:
             # If we get here we may not have gathered the minion list yet. Keep waiting
             # for all lower-level masters to respond with their minion lists
 
+            now = time.time()
             # let start the timeouts for all remaining minions
-
             for id_ in minions - found:
                 # if we have a new minion in the list, make sure it has a timeout
                 if id_ not in minion_timeouts:
-                    minion_timeouts[id_] = time.time() + timeout
-
-            # if the jinfo has timed out and some minions are still running the job
-            # re-do the ping
-            if time.time() > timeout_at and minions_running:
-                # since this is a new ping, no one has responded yet
-                jinfo = self.gather_job_info(
-                    jid, list(minions - found), "list", **kwargs
-                )
-                minions_running = False
-                # if we weren't assigned any jid that means the master thinks
-                # we have nothing to send
-                if "jid" not in jinfo:
-                    jinfo_iter = []
-                else:
-                    jinfo_iter = self.get_returns_no_block(
-                        "salt/job/{}".format(jinfo["jid"])
-                    )
-                timeout_at = time.time() + gather_job_timeout
-                # if you are a syndic, wait a little longer
-                if self.opts["order_masters"]:
-                    timeout_at += self.opts.get("syndic_wait", 1)
+                    minion_timeouts[id_] = now + timeout
+
+            # the checks which were not answered in time mean that the minion
+            # is not running the job anymore
+            for id_, check_timeout in list(checking.items()):
+                if now > check_timeout:
+                    del checking[id_]
+                    not_running.add(id_)
+            for jinfo_jid, (_, jinfo_timeout) in list(jinfo_iters.items()):
+                if now > jinfo_timeout:
+                    del jinfo_iters[jinfo_jid]
+
+            # check whether the job is still running, only on the minions
+            # which have not returned and have not been seen running it for
+            # the last timeout seconds, all of them with one find_job
+            if now >= next_check:
+                due = [
+                    id_
+                    for id_ in minions - found
+                    if id_ not in checking
+                    and id_ not in not_running
+                    and now > minion_timeouts[id_]
+                ]
+                if due:
+                    jinfo = self.gather_job_info(jid, due, "list", **kwargs)
+                    next_check = now + 1
+                    check_timeout = now + gather_job_timeout
+                    # if you are a syndic, wait a little longer
+                    if self.opts["order_masters"]:
+                        check_timeout += self.opts.get("syndic_wait", 1)
+                    # if we weren't assigned any jid that means the master thinks
+                    # we have nothing to send
+                    if "jid" in jinfo:
+                        jinfo_iters[jinfo["jid"]] = (
+                            self.get_returns_no_block(
+                                "salt/job/{}".format(jinfo["jid"])
+                            ),
+                            check_timeout,
+                        )
+                    for id_ in due:
+                        checking[id_] = check_timeout
 
             # check for minions that are running the job still
-            for raw in jinfo_iter:
-                # if there are no more events, lets stop waiting for the jinfo
-                if raw is None:
-                    break
-                try:
-                    if raw["data"]["retcode"] > 0:
-                        log.error(
-                            "saltutil returning errors on minion %s", raw["data"]["id"]
-                        )
-                        minions.remove(raw["data"]["id"])
+            for jinfo_jid, (jinfo_iter, _) in list(jinfo_iters.items()):
+                for raw in jinfo_iter:
+                    # if there are no more events, lets stop waiting for the jinfo
+                    if raw is None:
                         break
-                except KeyError as exc:
-                    # This is a safe pass. We're just using the try/except to
-                    # avoid having to deep-check for keys.
-                    missing_key = exc.__str__().strip("'\"")
-                    if missing_key == "retcode":
-                        log.debug("retcode missing from client return")
-                    else:
-                        log.debug(
-                            "Passing on saltutil error. Key '%s' missing "
-                            "from client return. This may be an error in "
-                            "the client.",
-                            missing_key,
-                        )
-                # Keep track of the jid events to unsubscribe from later
-                open_jids.add(jinfo["jid"])
-
-                # TODO: move to a library??
-                if "minions" in raw.get("data", {}):
-                    minions.update(raw["data"]["minions"])
-                    continue
-                if "syndic" in raw.get("data", {}):
-                    minions.update(raw["syndic"])
-                    continue
-                if "return" not in raw.get("data", {}):
-                    continue
-
-                # if the job isn't running there anymore... don't count
-                if raw["data"]["return"] == {}:
-                    continue
+                    try:
+                        if raw["data"]["retcode"] > 0:
+                            log.error(
+                                "saltutil returning errors on minion %s",
+                                raw["data"]["id"],
+                            )
+                            minions.discard(raw["data"]["id"])
+                            checking.pop(raw["data"]["id"], None)
+                            break
+                    except KeyError as exc:
+                        # This is a safe pass. We're just using the try/except to
+                        # avoid having to deep-check for keys.
+                        missing_key = exc.__str__().strip("'\"")
+                        if missing_key == "retcode":
+                            log.debug("retcode missing from client return")
+                        else:
+                            log.debug(
+                                "Passing on saltutil error. Key '%s' missing "
+                                "from client return. This may be an error in "
+                                "the client.",
+                                missing_key,
+                            )
+                    # Keep track of the jid events to unsubscribe from later
+                    open_jids.add(jinfo_jid)
+
+                    # TODO: move to a library??
+                    if "minions" in raw.get("data", {}):
+                        minions.update(raw["data"]["minions"])
+                        continue
+                    if "syndic" in raw.get("data", {}):
+                        minions.update(raw["syndic"])
+                        continue
+                    if "return" not in raw.get("data", {}):
+                        continue
 
-                # if the minion throws an exception containing the word "return"
-                # the master will try to handle the string as a dict in the next
-                # step. Check if we have a string, log the issue and continue.
-                if isinstance(raw["data"]["return"], str):
-                    log.error("unexpected return from minion: %s", raw)
-                    continue
+                    # if the job isn't running there anymore... don't count
+                    if raw["data"]["return"] == {}:
+                        continue
 
-                if (
-                    "return" in raw["data"]["return"]
-                    and raw["data"]["return"]["return"] == {}
-                ):
-                    continue
+                    # if the minion throws an exception containing the word "return"
+                    # the master will try to handle the string as a dict in the next
+                    # step. Check if we have a string, log the issue and continue.
+                    if isinstance(raw["data"]["return"], str):
+                        log.error("unexpected return from minion: %s", raw)
+                        continue
 
-                # if we didn't originally target the minion, lets add it to the list
-                if raw["data"]["id"] not in minions:
-                    minions.add(raw["data"]["id"])
-                # update this minion's timeout, as long as the job is still running
-                minion_timeouts[raw["data"]["id"]] = time.time() + timeout
-                # a minion returned, so we know its running somewhere
-                minions_running = True
+                    if (
+                        "return" in raw["data"]["return"]
+                        and raw["data"]["return"]["return"] == {}
+                    ):
+                        continue
 
-            # if we have hit gather_job_timeout (after firing the job) AND
-            # if we have hit all minion timeouts, lets call it
-            now = time.time()
-            # if we have finished waiting, and no minions are running the job
-            # then we need to see if each minion has timedout
-            done = (now > timeout_at) and not minions_running
-            if done:
-                # if all minions have timeod out
-                for id_ in minions - found:
-                    if now < minion_timeouts[id_]:
-                        done = False
-                        break
-            if done:
+                    # if we didn't originally target the minion, lets add it to the list
+                    if raw["data"]["id"] not in minions:
+                        minions.add(raw["data"]["id"])
+                    # update this minion's timeout, as long as the job is still
+                    # running, it is not checked again until then
+                    minion_timeouts[raw["data"]["id"]] = time.time() + timeout
+                    checking.pop(raw["data"]["id"], None)
+                    not_running.discard(raw["data"]["id"])
+
+            # we are done once none of the minions which have not returned
+            # was seen running the job on its last check
+            if now > timeout_at and not (minions - found) - not_running:
                 break
 
             # don't spin
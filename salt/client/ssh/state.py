@@ -220,14 +220,26 @@ def prep_trans_tar(
         env_root = os.path.join(gendir, saltenv)
         if not os.path.isdir(env_root):
             os.makedirs(env_root)
+        # Fetch the files of the saltenv in batches, the names which are not
+        # files are cached as directories below
+        names = [name for ref in file_refs[saltenv] for name in ref]
+        try:
+            cached = dict(
+                zip(names, file_client.cache_files(names, saltenv, cachedir=cachedir))
+            )
+        except IOError:
+            cached = {}
         for ref in file_refs[saltenv]:
             for name in ref:
                 short = salt.utils.url.parse(name)[0].lstrip("/")
                 cache_dest = os.path.join(cache_dest_root, short)
-                try:
-                    path = file_client.cache_file(name, saltenv, cachedir=cachedir)
-                except IOError:
-                    path = ""
+                if name in cached:
+                    path = cached[name]
+                else:
+                    try:
+                        path = file_client.cache_file(name, saltenv, cachedir=cachedir)
+                    except IOError:
+                        path = ""
                 if path:
                     tgt = os.path.join(env_root, short)
                     tgt_dir = os.path.dirname(tgt)
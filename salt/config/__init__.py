@@ -163,6 +163,11 @@ VALID_OPTS = immutabletypes.freeze(
         # what commands the master is processing and what the rates are of the executions
         "master_stats": bool,
         "master_stats_event_iter": int,
+        # Record latency histograms and other metrics of the master processes, and serve them in
+        # the Prometheus text format on master_metrics_interface:master_metrics_port
+        "master_metrics": bool,
+        "master_metrics_interface": str,
+        "master_metrics_port": int,
         # The key fingerprint of the higher-level master for the syndic to verify it is talking to the
         # intended master
         "syndic_finger": str,
@@ -304,6 +309,9 @@ VALID_OPTS = immutabletypes.freeze(
         "ipv6": (type(None), bool),
         # The chunk size to use when streaming files with the file server
         "file_buffer_size": int,
+        # Only download the blocks of salt:// files which changed since they were
+        # cached
+        "file_delta_transfer": bool,
         # The TCP port on which minion events should be published if ipc_mode is TCP
         "tcp_pub_port": int,
         # The TCP port on which minion events should be pulled if ipc_mode is TCP
@@ -357,6 +365,9 @@ VALID_OPTS = immutabletypes.freeze(
         "enable_gpu_grains": bool,
         # Tell the loader to attempt to import *.zip archives
         "enable_zip_modules": bool,
+        # Keep an index of the module files and of their __virtual__ results in the cachedir to
+        # speed up the creation of loaders
+        "loader_index": bool,
         # Tell the client to show minions that have timed out
         "show_timeout": bool,
         # Tell the client to display the jid when a job is published
@@ -376,6 +387,12 @@ VALID_OPTS = immutabletypes.freeze(
         "state_output_profile": bool,
         # When true, states run in the order defined in an SLS file, unless requisites re-order them
         "state_auto_order": bool,
+        # The number of worker processes used to run independent state chunks concurrently, 0
+        # runs them one after the other
+        "state_parallel_workers": int,
+        # Reuse the high data rendered from the SLS files as long as they, the pillar and the
+        # grains do not change
+        "state_compile_cache": bool,
         # Fire events as state chunks are processed by the state compiler
         "state_events": bool,
         # The number of seconds a minion should wait before retry when attempting authentication
@@ -435,6 +452,14 @@ VALID_OPTS = immutabletypes.freeze(
         # The goal here is to ensure that if the bus is not busy enough to reach a total
         # `event_return_queue` events won't get stale.
         "event_return_queue_max_seconds": int,
+        # The maximum number of events waiting in memory to be sent to each event returner
+        "event_return_queue_max_size": int,
+        # The maximum number of seconds to wait before retrying a failed event returner
+        "event_return_retry_max_wait": int,
+        # The number of times to try to send a batch of events to an event returner
+        "event_return_retry_max_attempts": int,
+        # The maximum number of bytes of events to spill to the disk for each failed event returner
+        "event_return_spill_max_size": int,
         # Only forward events to an event returner if it matches one of the tags in this list
         "event_return_whitelist": list,
         # Events matching a tag in this list should never be sent to an event returner.
@@ -482,6 +507,10 @@ VALID_OPTS = immutabletypes.freeze(
         # The number of MWorker processes for a master to startup. This number needs to scale up as
         # the number of connected minions increases.
         "worker_threads": int,
+        # The number of threads of each MWorker which run the requests that
+        # can take a while, such as pillar compilation. 0 handles one request
+        # at a time in each MWorker.
+        "worker_pool_threads": int,
         # The port for the master to listen to returns on. The minion needs to connect to this port
         # to send returns.
         "ret_port": int,
@@ -520,6 +549,11 @@ VALID_OPTS = immutabletypes.freeze(
         "proxy_keep_alive": bool,
         # Frequency of the proxy_keep_alive, in minutes
         "proxy_keep_alive_interval": int,
+        # Serve the file lists of the roots fileserver backend from an index kept up to date by
+        # the FileserverUpdate process
+        "roots_index": bool,
+        # Interval at which the roots index is rescanned when pyinotify is not available
+        "roots_index_interval": int,
         # Update intervals
         "roots_update_interval": int,
         "azurefs_update_interval": int,
@@ -583,6 +617,12 @@ VALID_OPTS = immutabletypes.freeze(
         "minionfs_blacklist": list,
         # Specify a list of external pillar systems to use
         "ext_pillar": list,
+        # The number of ext_pillar sources to call at the same time, 0 to call
+        # them one after the other
+        "ext_pillar_pool_size": int,
+        # The number of seconds after which an ext_pillar source called on the
+        # ext_pillar pool is given up, 0 to wait for it
+        "ext_pillar_timeout": float,
         # Reserved for future use to version the pillar structure
         "pillar_version": int,
         # Whether or not a copy of the master opts dict should be rendered into minion pillars
@@ -593,6 +633,12 @@ VALID_OPTS = immutabletypes.freeze(
         "pillar_cache_ttl": int,
         # Pillar cache backend. Defaults to `disk` which stores caches in the master cache
         "pillar_cache_backend": str,
+        # Check that the files, grains, configuration and ext_pillar revisions a
+        # cached pillar was compiled from did not change before using it
+        "pillar_cache_dependencies": bool,
+        # The globs of the grains the pillar SLS files and ext_pillar sources
+        # read, None for all of them
+        "pillar_cache_grains": (type(None), list),
         # Cache the GPG data to avoid having to pass through the gpg renderer
         "gpg_cache": bool,
         # GPG data cache TTL, in seconds. Has no effect unless `gpg_cache` is True
@@ -642,6 +688,10 @@ VALID_OPTS = immutabletypes.freeze(
         "fileserver_ignoresymlinks": bool,
         "fileserver_limit_traversal": bool,
         "fileserver_verify_config": bool,
+        # Keep the hashes of the files served by all of the fileserver backends in one database
+        "fileserver_hash_cache": bool,
+        # Serve the changes of a file to the minions which ask for a delta transfer
+        "fileserver_delta_transfer": bool,
         # Optionally apply '*' permissioins to any user. By default '*' is a fallback case that is
         # applied only if the user didn't matched by other matchers.
         "permissive_acl": bool,
@@ -678,11 +728,20 @@ VALID_OPTS = immutabletypes.freeze(
         "master_job_cache": str,
         # Specify whether the master should store end times for jobs as returns come in
         "job_cache_store_endtime": bool,
+        # Keep an index of the jobs of the local job cache, partitioned by hour, to list and
+        # expire the jobs without walking the whole job cache
+        "job_cache_index": bool,
+        # Store the jobs of the local job cache in a directory per hour they started, so that
+        # they are expired an hour at a time
+        "job_cache_buckets": bool,
         # The minion data cache is a cache of information about the minions stored on the master.
         # This information is primarily the pillar and grains data. The data is cached in the master
         # cachedir under the name of the minion and used to predetermine what minions are expected to
         # reply from executions.
         "minion_data_cache": bool,
+        # Keep an inverted index of the grains and pillar in the minion data cache to answer grain
+        # and pillar targeting without fetching the cached data of every minion.
+        "minion_data_cache_index": bool,
         # The number of seconds between AES key rotations on the master
         "publish_session": int,
         # Defines a salt reactor. See http://docs.saltstack.com/en/latest/topics/reactor/
@@ -745,6 +804,18 @@ VALID_OPTS = immutabletypes.freeze(
         "grains_blacklist": list,
         # The number of minutes between the minion refreshing its cache of grains
         "grains_refresh_every": int,
+        # The number of grains functions to run at the same time, 0 to run them
+        # one after the other
+        "grains_pool_size": int,
+        # The number of seconds after which a grains function run on the grains
+        # pool is given up, 0 to wait for it
+        "grains_timeout": float,
+        # The number of seconds the cached grains of each grains function are
+        # reused for, by grains function name or glob
+        "grains_ttl": dict,
+        # Only send the master the grains which changed since the last pillar
+        # request
+        "grains_push_changes": bool,
         # Use lspci to gather system data for grains on a minion
         "enable_lspci": bool,
         # The number of seconds for the salt client to wait for additional syndics to
@@ -773,6 +844,22 @@ VALID_OPTS = immutabletypes.freeze(
         "transport": str,
         # The number of seconds to wait when the client is requesting information about running jobs
         "gather_job_timeout": int,
+        # Adapt the number of minions a batch run keeps running to the latency
+        # and failures of their returns and to the load of the master
+        "batch_adaptive": bool,
+        # The bounds of the number of minions an adaptive batch run keeps running,
+        # 0 meaning no upper bound
+        "batch_adaptive_min_size": int,
+        "batch_adaptive_max_size": int,
+        # The number of seconds above which the return of a minion shrinks the
+        # number of minions an adaptive batch run keeps running
+        "batch_adaptive_latency": float,
+        # The rate of failed returns above which an adaptive batch run shrinks
+        # the number of minions it keeps running
+        "batch_adaptive_max_failure_rate": float,
+        # The number of requests in progress in the master workers above which an
+        # adaptive batch run shrinks the number of minions it keeps running
+        "batch_adaptive_max_requests": int,
         # The number of seconds to wait before timing out an authentication request
         "auth_timeout": int,
         # The number of attempts to authenticate to a master before giving up
@@ -988,7 +1075,11 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "grains_blacklist": [],
         "grains_cache": False,
         "grains_cache_expiration": 300,
+        "grains_ttl": {},
+        "grains_push_changes": False,
         "grains_deep_merge": False,
+        "grains_pool_size": 0,
+        "grains_timeout": 0,
         "conf_file": os.path.join(salt.syspaths.CONFIG_DIR, "minion"),
         "sock_dir": os.path.join(salt.syspaths.SOCK_DIR, "minion"),
         "sock_pool_size": 1,
@@ -1008,11 +1099,14 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "pillar_merge_lists": False,
         "pillar_includes_override_sls": False,
         # ``pillar_cache``, ``pillar_cache_ttl``, ``pillar_cache_backend``,
+        # ``pillar_cache_dependencies``, ``pillar_cache_grains``,
         # ``gpg_cache``, ``gpg_cache_ttl`` and ``gpg_cache_backend``
         # are not used on the minion but are unavoidably in the code path
         "pillar_cache": False,
         "pillar_cache_ttl": 3600,
         "pillar_cache_backend": "disk",
+        "pillar_cache_dependencies": False,
+        "pillar_cache_grains": None,
         "gpg_cache": False,
         "gpg_cache_ttl": 86400,
         "gpg_cache_backend": "disk",
@@ -1124,6 +1218,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "ipc_write_buffer": _DFLT_IPC_WBUFFER,
         "ipv6": None,
         "file_buffer_size": 262144,
+        "file_delta_transfer": False,
         "tcp_pub_port": 4510,
         "tcp_pull_port": 4511,
         "tcp_authentication_retries": 5,
@@ -1147,6 +1242,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "enable_fqdns_grains": _DFLT_FQDNS_GRAINS,
         "enable_gpu_grains": True,
         "enable_zip_modules": False,
+        "loader_index": False,
         "state_verbose": True,
         "state_output": "full",
         "state_output_diff": False,
@@ -1154,6 +1250,8 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "state_auto_order": True,
         "state_events": False,
         "state_aggregate": False,
+        "state_parallel_workers": 0,
+        "state_compile_cache": False,
         "snapper_states": False,
         "snapper_states_config": "root",
         "acceptance_wait_time": 10,
@@ -1266,6 +1364,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "auth_mode": 1,
         "user": _MASTER_USER,
         "worker_threads": 5,
+        "worker_pool_threads": 0,
         "sock_dir": os.path.join(salt.syspaths.SOCK_DIR, "master"),
         "sock_pool_size": 1,
         "ret_port": 4506,
@@ -1300,6 +1399,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "default_top": "base",
         "file_client": "local",
         "local": True,
+        "roots_index": False,
+        "roots_index_interval": 60,
         # Update intervals
         "roots_update_interval": DEFAULT_INTERVAL,
         "azurefs_update_interval": DEFAULT_INTERVAL,
@@ -1365,11 +1466,16 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "max_event_size": 1048576,
         "master_stats": False,
         "master_stats_event_iter": 60,
+        "master_metrics": False,
+        "master_metrics_interface": "127.0.0.1",
+        "master_metrics_port": 4517,
         "minionfs_env": "base",
         "minionfs_mountpoint": "",
         "minionfs_whitelist": [],
         "minionfs_blacklist": [],
         "ext_pillar": [],
+        "ext_pillar_pool_size": 0,
+        "ext_pillar_timeout": 0,
         "pillar_version": 2,
         "pillar_opts": False,
         "pillar_safe_render_error": True,
@@ -1379,6 +1485,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "pillar_cache": False,
         "pillar_cache_ttl": 3600,
         "pillar_cache_backend": "disk",
+        "pillar_cache_dependencies": False,
+        "pillar_cache_grains": None,
         "gpg_cache": False,
         "gpg_cache_ttl": 86400,
         "gpg_cache_backend": "disk",
@@ -1416,6 +1524,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "fileserver_ignoresymlinks": False,
         "fileserver_limit_traversal": False,
         "fileserver_verify_config": True,
+        "fileserver_hash_cache": False,
+        "fileserver_delta_transfer": False,
         "max_open_files": 100000,
         "hash_type": "sha256",
         "optimization_order": [0, 1, 2],
@@ -1435,7 +1545,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "ext_job_cache": "",
         "master_job_cache": "local_cache",
         "job_cache_store_endtime": False,
+        "job_cache_index": False,
+        "job_cache_buckets": False,
         "minion_data_cache": True,
+        "minion_data_cache_index": False,
         "enforce_mine_cache": False,
         "ipc_mode": _DFLT_IPC_MODE,
         "ipc_write_buffer": _DFLT_IPC_WBUFFER,
@@ -1475,6 +1588,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "engines": [],
         "event_return": "",
         "event_return_queue": 0,
+        "event_return_queue_max_size": 10000,
+        "event_return_retry_max_wait": 60,
+        "event_return_retry_max_attempts": 10,
+        "event_return_spill_max_size": 104857600,
         "event_return_whitelist": [],
         "event_return_blacklist": [],
         "event_match_type": "startswith",
@@ -1495,6 +1612,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "ssh_use_home_key": False,
         "cython_enable": False,
         "enable_gpu_grains": False,
+        "loader_index": False,
         # XXX: Remove 'key_logfile' support in 2014.1.0
         "key_logfile": os.path.join(salt.syspaths.LOGS_DIR, "key"),
         "verify_env": True,
@@ -1532,6 +1650,12 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "keysize": 2048,
         "transport": "zeromq",
         "gather_job_timeout": 10,
+        "batch_adaptive": False,
+        "batch_adaptive_min_size": 1,
+        "batch_adaptive_max_size": 0,
+        "batch_adaptive_latency": 30.0,
+        "batch_adaptive_max_failure_rate": 0.25,
+        "batch_adaptive_max_requests": 100,
         "syndic_event_forward_timeout": 0.5,
         "syndic_jid_forward_cache_hwm": 100,
         "regen_thin": False,
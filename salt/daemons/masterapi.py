@@ -418,8 +418,10 @@ class RemoteFuncs:
         """
         fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = fs_.serve_file
+        self._serve_files = fs_.serve_files
         self._file_find = fs_._find_file
         self._file_hash = fs_.file_hash
+        self._file_hash_many = fs_.file_hash_many
         self._file_list = fs_.file_list
         self._file_list_emptydirs = fs_.file_list_emptydirs
         self._dir_list = fs_.dir_list
@@ -585,8 +587,11 @@ class RemoteFuncs:
         _res = checker.check_minions(load["tgt"], match_type, greedy=False)
         minions = _res["minions"]
         minion_side_acl = {}  # Cache minion-side ACL
+        cached = self.cache.fetch_many(
+            ("minions/{}".format(minion), "mine") for minion in minions
+        )
         for minion in minions:
-            mine_data = self.cache.fetch("minions/{}".format(minion), "mine")
+            mine_data = cached[("minions/{}".format(minion), "mine")]
             if not isinstance(mine_data, dict):
                 continue
             for function in functions_allowed:
@@ -756,6 +761,9 @@ class RemoteFuncs:
                 "data",
                 {"grains": load["grains"], "pillar": data},
             )
+            self.ckminions.update_minion_data_index(
+                load["id"], {"grains": load["grains"], "pillar": data}
+            )
             if self.opts.get("minion_data_cache_events") is True:
                 self.event.fire_event(
                     {"comment": "Minion data cache refresh"},
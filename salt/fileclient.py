@@ -4,11 +4,13 @@ Classes that manage file clients
 import contextlib
 import errno
 import ftplib  # nosec
+import hashlib
 import http.server
 import logging
 import os
 import shutil
 import string
+import threading
 import urllib.error
 import urllib.parse
 
@@ -20,6 +22,7 @@ import salt.payload
 import salt.transport.client
 import salt.utils.atomicfile
 import salt.utils.data
+import salt.utils.delta
 import salt.utils.files
 import salt.utils.gzip_util
 import salt.utils.hashutils
@@ -199,16 +202,22 @@ class Client:
             ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
         return ret
 
+    def hash_files(self, paths, saltenv="base"):
+        """
+        Return a list of the hashes of several files, in the same order as
+        ``paths``
+        """
+        return [self.hash_file(path, saltenv) for path in paths]
+
     def cache_master(self, saltenv="base", cachedir=None):
         """
         Download and cache all files on a master in a specified environment
         """
-        ret = []
-        for path in self.file_list(saltenv):
-            ret.append(
-                self.cache_file(salt.utils.url.create(path), saltenv, cachedir=cachedir)
-            )
-        return ret
+        return self.cache_files(
+            [salt.utils.url.create(path) for path in self.file_list(saltenv)],
+            saltenv,
+            cachedir=cachedir,
+        )
 
     def cache_dir(
         self,
@@ -234,17 +243,15 @@ class Client:
         log.info("Caching directory '%s' for environment '%s'", path, saltenv)
         # go through the list of all files finding ones that are in
         # the target directory and caching them
+        urls = []
         for fn_ in self.file_list(saltenv):
             fn_ = salt.utils.data.decode(fn_)
             if fn_.strip() and fn_.startswith(path):
                 if salt.utils.stringutils.check_include_exclude(
                     fn_, include_pat, exclude_pat
                 ):
-                    fn_ = self.cache_file(
-                        salt.utils.url.create(fn_), saltenv, cachedir=cachedir
-                    )
-                    if fn_:
-                        ret.append(fn_)
+                    urls.append(salt.utils.url.create(fn_))
+        ret.extend(fn_ for fn_ in self.cache_files(urls, saltenv, cachedir) if fn_)
 
         if include_empty:
             # Break up the path into a list containing the bottom-level
@@ -863,6 +870,58 @@ class PillarClient(Client):
     Used by pillar to handle fileclient requests
     """
 
+    # The lookups recorded by record_lookups in each thread
+    _recording = threading.local()
+
+    @classmethod
+    def _recorders(cls):
+        return cls._recording.__dict__.setdefault("recorders", [])
+
+    @classmethod
+    @contextlib.contextmanager
+    def record_lookups(cls):
+        """
+        Record the lookups of the pillar clients in the block, made by the
+        current thread. Yield a dict with the ``files`` set of the
+        ``(roots, path)`` tuples of the files looked up in the tuple of pillar
+        roots ``roots``, and the ``dirs`` set of the directories listed.
+
+        .. versionadded:: 3003
+        """
+        lookups = {"files": set(), "dirs": set()}
+        recorders = cls._recorders()
+        recorders.append(lookups)
+        try:
+            yield lookups
+        finally:
+            recorders[:] = [rec for rec in recorders if rec is not lookups]
+
+    @classmethod
+    def add_lookups(cls, lookups):
+        """
+        Add the ``lookups`` recorded by :py:meth:`record_lookups` in another
+        thread to the ones recorded by the current thread
+
+        .. versionadded:: 3003
+        """
+        for rec in cls._recorders():
+            rec["files"].update(lookups["files"])
+            rec["dirs"].update(lookups["dirs"])
+
+    def _walk(self, saltenv, prefix):
+        for path in self.opts["pillar_roots"].get(saltenv, []):
+            top = os.path.join(path, prefix)
+            for lookups in self._recorders():
+                lookups["dirs"].add(top)
+            for root, dirs, files in salt.utils.path.os_walk(top, followlinks=True):
+                # Don't walk any directories that match file_ignore_regex or glob
+                dirs[:] = [
+                    d for d in dirs if not salt.fileserver.is_file_ignored(self.opts, d)
+                ]
+                for lookups in self._recorders():
+                    lookups["dirs"].add(root)
+                yield path, root, dirs, files
+
     def _find_file(self, path, saltenv="base"):
         """
         Locate the file path
@@ -872,6 +931,10 @@ class PillarClient(Client):
         if salt.utils.url.is_escaped(path):
             # The path arguments are escaped
             path = salt.utils.url.unescape(path)
+        for lookups in self._recorders():
+            lookups["files"].add(
+                (tuple(self.opts["pillar_roots"].get(saltenv, [])), path)
+            )
         for root in self.opts["pillar_roots"].get(saltenv, []):
             full = os.path.join(root, path)
             if os.path.isfile(full):
@@ -902,17 +965,10 @@ class PillarClient(Client):
         """
         ret = []
         prefix = prefix.strip("/")
-        for path in self.opts["pillar_roots"].get(saltenv, []):
-            for root, dirs, files in salt.utils.path.os_walk(
-                os.path.join(path, prefix), followlinks=True
-            ):
-                # Don't walk any directories that match file_ignore_regex or glob
-                dirs[:] = [
-                    d for d in dirs if not salt.fileserver.is_file_ignored(self.opts, d)
-                ]
-                for fname in files:
-                    relpath = os.path.relpath(os.path.join(root, fname), path)
-                    ret.append(salt.utils.data.decode(relpath))
+        for path, root, dirs, files in self._walk(saltenv, prefix):
+            for fname in files:
+                relpath = os.path.relpath(os.path.join(root, fname), path)
+                ret.append(salt.utils.data.decode(relpath))
         return ret
 
     def file_list_emptydirs(self, saltenv="base", prefix=""):
@@ -922,16 +978,9 @@ class PillarClient(Client):
         """
         ret = []
         prefix = prefix.strip("/")
-        for path in self.opts["pillar_roots"].get(saltenv, []):
-            for root, dirs, files in salt.utils.path.os_walk(
-                os.path.join(path, prefix), followlinks=True
-            ):
-                # Don't walk any directories that match file_ignore_regex or glob
-                dirs[:] = [
-                    d for d in dirs if not salt.fileserver.is_file_ignored(self.opts, d)
-                ]
-                if not dirs and not files:
-                    ret.append(salt.utils.data.decode(os.path.relpath(root, path)))
+        for path, root, dirs, files in self._walk(saltenv, prefix):
+            if not dirs and not files:
+                ret.append(salt.utils.data.decode(os.path.relpath(root, path)))
         return ret
 
     def dir_list(self, saltenv="base", prefix=""):
@@ -1174,6 +1223,14 @@ class RemoteClient(Client):
             if hash_local == hash_server:
                 return dest2check
 
+            if self.opts.get("file_delta_transfer") and os.path.getsize(
+                dest2check
+            ) > self.opts.get("file_buffer_size", 0):
+                if self._get_file_delta(
+                    self._check_proto(path), saltenv, dest2check, hash_server
+                ):
+                    return dest2check
+
         log.debug(
             "Fetching file from saltenv '%s', ** attempting ** '%s'", saltenv, path
         )
@@ -1298,6 +1355,202 @@ class RemoteClient(Client):
 
         return dest
 
+    def _get_file_delta(self, path, saltenv, dest, hash_server):
+        """
+        Update the cached copy ``dest`` of ``path`` by only downloading the
+        blocks of the file which changed, return whether it worked. Masters
+        which do not know about delta transfers send the whole file instead,
+        in which case the caller downloads the file as usual.
+        """
+        sig = salt.utils.delta.signature(dest)
+        sig_size = len(salt.utils.delta.dump_signature(sig))
+        load = {
+            "path": path,
+            "saltenv": saltenv,
+            "delta": sig,
+            "loc": 0,
+            "cmd": "_serve_file",
+        }
+        hash_type = hash_server.get("hash_type", "md5")
+        hsum = hashlib.new(hash_type)
+        received = copied = sent = parts = 0
+
+        def _write(data):
+            hsum.update(data)
+            fn_.write(data)
+
+        try:
+            # The cached copy is closed before the patched file replaces it
+            with salt.utils.atomicfile.atomic_open(
+                dest, "wb+"
+            ) as fn_, salt.utils.files.fopen(dest, "rb") as old:
+                while True:
+                    if "delta" in load:
+                        sent += sig_size
+                    data = decode_dict_keys_to_str(self.channel.send(load, raw=True))
+                    if isinstance(data, dict) and data.get("signature_expired"):
+                        if "delta" in load:
+                            raise ValueError("the master did not keep the signature")
+                        load["delta"] = sig
+                        load.pop("delta_id")
+                        continue
+                    if not isinstance(data, dict) or "delta" not in data:
+                        raise ValueError("the master did not send a delta")
+                    parts += 1
+                    # The literals of the delta are bytes, leave them as is
+                    ops = data["delta"]
+                    received += sum(len(op) for op in ops if isinstance(op, bytes))
+                    copied += salt.utils.delta.patch(
+                        ops, old, sig["block_size"], _write
+                    )
+                    if data["eof"]:
+                        break
+                    if data["loc"] <= load["loc"]:
+                        raise ValueError("the delta made no progress")
+                    load["loc"] = data["loc"]
+                    if data.get("delta_id"):
+                        # The master keeps the signature for the next parts
+                        load.pop("delta", None)
+                        load["delta_id"] = salt.utils.stringutils.to_str(
+                            data["delta_id"]
+                        )
+                if hsum.hexdigest() != hash_server.get("hsum"):
+                    raise ValueError("the patched file does not match its hash")
+        except (OSError, TypeError, ValueError, KeyError) as exc:
+            log.debug("Delta transfer of '%s' failed: %s", path, exc)
+            return False
+        log.info(
+            "Fetched the changes of '%s' in saltenv '%s' in %d parts: sent %d "
+            "bytes of signature, received %d bytes, reused %d bytes of the "
+            "cached copy",
+            path,
+            saltenv,
+            parts,
+            sent,
+            received,
+            copied,
+        )
+        return True
+
+    def cache_files(self, paths, saltenv="base", cachedir=None):
+        """
+        Download a list of files stored on the master and put them in the
+        minion file cache. The salt:// files are requested in batches.
+        """
+        if isinstance(paths, str):
+            paths = paths.split(",")
+        ret = [None] * len(paths)
+        remote = []
+        for idx, path in enumerate(paths):
+            if path.startswith("salt://"):
+                remote.append(idx)
+            else:
+                ret[idx] = self.cache_file(path, saltenv, cachedir=cachedir)
+        for idx, dest in zip(
+            remote, self.get_files([paths[idx] for idx in remote], saltenv, cachedir)
+        ):
+            ret[idx] = dest
+        return ret
+
+    def get_files(self, paths, saltenv="base", cachedir=None):
+        """
+        Cache several salt:// files from the salt-master, requesting as many
+        of them as fit in ``file_buffer_size`` at once instead of one file
+        after another. Returns the list of the paths the files were cached
+        to, with ``False`` for the files which were not found.
+        """
+        ret = [False] * len(paths)
+        by_saltenv = {}
+        for idx, path in enumerate(paths):
+            rel_path, senv = salt.utils.url.parse(path)
+            by_saltenv.setdefault(senv or saltenv, []).append((idx, rel_path))
+
+        for senv, files in by_saltenv.items():
+            pending = []
+            for idx, rel_path in files:
+                with self._cache_loc(rel_path, senv, cachedir=cachedir) as dest:
+                    entry = {"path": rel_path}
+                    if os.path.isfile(dest):
+                        entry["hsum"] = self.hash_file(dest, senv)
+                    pending.append((idx, dest, entry))
+
+            while pending:
+                load = {
+                    "files": [entry for _, _, entry in pending],
+                    "saltenv": senv,
+                    "cmd": "_serve_files",
+                }
+                served = self.channel.send(load, raw=True)
+                if not isinstance(served, list) or len(served) != len(pending):
+                    # The master does not know about _serve_files
+                    log.debug("Falling back to fetching the files one by one")
+                    served = [{}] * len(pending)
+
+                deferred = []
+                for (idx, dest, entry), item in zip(pending, served):
+                    item = salt.utils.data.decode(
+                        decode_dict_keys_to_str(item), keep=True
+                    )
+                    status = item.get("status")
+                    if status == "missing":
+                        log.debug(
+                            "Could not find file '%s' in saltenv '%s'",
+                            entry["path"],
+                            senv,
+                        )
+                    elif status == "unchanged":
+                        ret[idx] = dest
+                    elif status == "deferred":
+                        deferred.append((idx, dest, entry))
+                    elif status == "served" and self._write_served(dest, item):
+                        ret[idx] = dest
+                    else:
+                        ret[idx] = self.get_file(
+                            salt.utils.url.create(entry["path"]),
+                            "",
+                            True,
+                            senv,
+                            cachedir=cachedir,
+                        )
+                if len(deferred) == len(pending):
+                    # The master made no progress, do not loop forever
+                    for idx, dest, entry in deferred:
+                        ret[idx] = self.get_file(
+                            salt.utils.url.create(entry["path"]),
+                            "",
+                            True,
+                            senv,
+                            cachedir=cachedir,
+                        )
+                    deferred = []
+                pending = deferred
+        return ret
+
+    def _write_served(self, dest, item):
+        """
+        Write a file returned by _serve_files to ``dest``, return whether its
+        hash matches the one the master sent
+        """
+        data = item.get("data", b"")
+        if item.get("gzip"):
+            data = salt.utils.gzip_util.uncompress(data)
+        if isinstance(data, str):
+            data = data.encode()
+        # If a directory was formerly cached at this path, then remove it to
+        # avoid a traceback trying to write the file
+        if os.path.isdir(dest):
+            salt.utils.files.rm_rf(dest)
+        with salt.utils.atomicfile.atomic_open(dest, "wb+") as fn_:
+            fn_.write(data)
+        hsum = item.get("hsum") or {}
+        if salt.utils.hashutils.get_hash(
+            dest, hsum.get("hash_type", "md5")
+        ) != hsum.get("hsum"):
+            log.warning("Bad download of file %s, fetching it again", dest)
+            return False
+        log.info("Fetching file ** done ** '%s'", dest)
+        return True
+
     def file_list(self, saltenv="base", prefix=""):
         """
         List the files on the master
@@ -1355,6 +1608,33 @@ class RemoteClient(Client):
         """
         return self.__hash_and_stat_file(path, saltenv)
 
+    def hash_files(self, paths, saltenv="base"):
+        """
+        Return a list of the hashes of several files, in the same order as
+        ``paths``. The hashes of the files on the salt master are requested at
+        once.
+        """
+        ret = [None] * len(paths)
+        remote = []
+        for idx, path in enumerate(paths):
+            try:
+                remote.append((idx, self._check_proto(path)))
+            except MinionError:
+                ret[idx] = self.hash_file(path, saltenv)
+        if remote:
+            load = {
+                "paths": [path for _, path in remote],
+                "saltenv": saltenv,
+                "cmd": "_file_hash_many",
+            }
+            hashes = self.channel.send(load)
+            if not isinstance(hashes, list) or len(hashes) != len(remote):
+                # The master does not know about _file_hash_many
+                hashes = [self.hash_file(paths[idx], saltenv) for idx, _ in remote]
+            for (idx, _), hsum in zip(remote, hashes):
+                ret[idx] = hsum
+        return ret
+
     def hash_and_stat_file(self, path, saltenv="base"):
         """
         The same as hash_file, but also return the file's mode, or None if no
@@ -13,7 +13,10 @@ from collections.abc import Sequence
 
 import salt.loader
 import salt.utils.data
+import salt.utils.delta
 import salt.utils.files
+import salt.utils.gzip_util
+import salt.utils.hashcache
 import salt.utils.path
 import salt.utils.url
 import salt.utils.versions
@@ -340,6 +343,9 @@ class Fileserver:
     def __init__(self, opts):
         self.opts = opts
         self.servers = salt.loader.fileserver(opts, opts["fileserver_backend"])
+        self.hash_cache = None
+        if opts.get("fileserver_hash_cache", False):
+            self.hash_cache = salt.utils.hashcache.HashCache(opts)
 
     def backends(self, back=None):
         """
@@ -421,6 +427,8 @@ class Fileserver:
                     cleared.append(
                         "The {} fileserver cache was successfully cleared".format(fsb)
                     )
+        if self.hash_cache is not None:
+            self.hash_cache.clear(back)
         return cleared, errors
 
     def lock(self, back=None, remote=None):
@@ -626,11 +634,163 @@ class Fileserver:
         fnd = self.find_file(load["path"], load["saltenv"])
         if not fnd.get("back"):
             return ret
+        if (
+            self.opts.get("fileserver_delta_transfer", False)
+            and (load.get("delta") or load.get("delta_id"))
+            and os.path.isfile(fnd.get("path", ""))
+        ):
+            delta = self.__serve_delta(load, fnd)
+            if delta is not None:
+                return delta
         fstr = "{}.serve_file".format(fnd["back"])
         if fstr in self.servers:
             return self.servers[fstr](load, fnd)
         return ret
 
+    def __serve_delta(self, load, fnd):
+        """
+        Serve a part of the delta between a file and the copy of the client,
+        whose signature is the ``delta`` of the load. The signature is kept
+        until the last part is served, the client then only sends the
+        ``delta_id`` returned with the first part. Return None to serve the
+        file as usual instead, when the first part is mostly made of changed
+        bytes.
+        """
+        ret = {"dest": fnd.get("rel", load["path"])}
+        cachedir = self.opts["cachedir"]
+        sig = load.get("delta")
+        sig_id = load.get("delta_id")
+        if not sig:
+            sig = salt.utils.delta.load_signature(cachedir, sig_id)
+            if sig is None:
+                # The client sends the signature again
+                ret["signature_expired"] = True
+                return ret
+        loc = load["loc"]
+        if (
+            not salt.utils.delta.valid_signature(sig)
+            or not isinstance(loc, int)
+            or isinstance(loc, bool)
+            or loc < 0
+        ):
+            log.error("Invalid delta request for %s", load["path"])
+            return {"data": "", "dest": ""}
+        if not sig_id and (
+            len(salt.utils.delta.dump_signature(sig))
+            > salt.utils.delta.MAX_SIGNATURE_SIZE
+        ):
+            log.error("The delta signature sent for %s is too large", load["path"])
+            return {"data": "", "dest": ""}
+        try:
+            ret["delta"], ret["loc"], ret["eof"] = salt.utils.delta.delta(
+                fnd["path"], sig, loc=loc, max_literal=self.opts["file_buffer_size"],
+            )
+        except (IndexError, KeyError, OSError, TypeError, ValueError) as exc:
+            log.error("Invalid delta request for %s: %s", load["path"], exc)
+            return {"data": "", "dest": ""}
+        if loc == 0 and not sig_id:
+            # Looking for the blocks of the copy in a file which shares few
+            # of them with it costs more than serving the file
+            literal = sum(len(op) for op in ret["delta"] if isinstance(op, bytes))
+            if literal * 2 > ret["loc"]:
+                log.debug(
+                    "Serving %s as a whole, its delta is mostly changed bytes",
+                    load["path"],
+                )
+                return None
+        if ret["eof"]:
+            if sig_id:
+                salt.utils.delta.remove_signature(cachedir, sig_id)
+            return ret
+        if not sig_id:
+            try:
+                sig_id = salt.utils.delta.store_signature(cachedir, sig)
+            except OSError as exc:
+                log.warning("Unable to store the signature of a delta: %s", exc)
+                return ret
+        ret["delta_id"] = sig_id
+        return ret
+
+    def serve_files(self, load):
+        """
+        Serve several whole files in a single response. ``files`` in the load
+        is a list of dicts with the ``path`` of each file and, if the client
+        already has a copy of it, the ``hsum`` of that copy. For each file, the
+        returned list holds a dict with its ``status``:
+
+        missing
+            The file is not on the fileserver
+
+        unchanged
+            The copy of the client is up to date
+
+        served
+            The contents of the file are in ``data``
+
+        deferred
+            The file did not fit in this response and must be requested again
+
+        large
+            The file is larger than ``file_buffer_size`` and must be fetched in
+            chunks with serve_file
+
+        along with its ``hsum`` and ``dest``. At most ``file_buffer_size``
+        bytes of file contents are returned.
+        """
+        if "env" in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop("env")
+
+        if "files" not in load or "saltenv" not in load:
+            return []
+        if not isinstance(load["saltenv"], str):
+            load["saltenv"] = str(load["saltenv"])
+        files = load.pop("files")
+        if not isinstance(files, list):
+            return []
+        files = [entry if isinstance(entry, dict) else {} for entry in files]
+        gzip = load.pop("gzip", None)
+        paths = [str(entry.get("path", "")) for entry in files]
+
+        ret = []
+        buffer_size = self.opts["file_buffer_size"]
+        budget = buffer_size
+        for entry, path, (hsum, stat_result) in zip(
+            files, paths, self.__hash_and_stat_files(load, paths)
+        ):
+            if not isinstance(hsum, dict) or not hsum.get("hsum"):
+                ret.append({"status": "missing"})
+                continue
+            item = {"hsum": hsum, "dest": path}
+            ret.append(item)
+            if entry.get("hsum") == hsum:
+                item["status"] = "unchanged"
+                continue
+            try:
+                size = stat_result[6]
+            except (IndexError, TypeError):
+                # Not all of the backends return the size of the files
+                size = None
+            if size is not None and size >= buffer_size:
+                item["status"] = "large"
+                continue
+            if size is not None and size > budget:
+                item["status"] = "deferred"
+                continue
+            data = self.serve_file(dict(load, path=path, loc=0)).get("data", b"")
+            if len(data) >= buffer_size:
+                item["status"] = "large"
+            elif len(data) > budget:
+                item["status"] = "deferred"
+            else:
+                budget -= len(data)
+                item["status"] = "served"
+                if gzip and data:
+                    data = salt.utils.gzip_util.compress(data, gzip)
+                    item["gzip"] = gzip
+                item["data"] = data
+        return ret
+
     def __file_hash_and_stat(self, load):
         """
         Common code for hashing and stating files
@@ -644,16 +804,47 @@ class Fileserver:
         if not isinstance(load["saltenv"], str):
             load["saltenv"] = str(load["saltenv"])
 
-        fnd = self.find_file(
-            salt.utils.stringutils.to_unicode(load["path"]), load["saltenv"]
-        )
-        if not fnd.get("back"):
-            return "", None
-        stat_result = fnd.get("stat", None)
-        fstr = "{}.file_hash".format(fnd["back"])
-        if fstr in self.servers:
-            return self.servers[fstr](load, fnd), stat_result
-        return "", None
+        return self.__hash_and_stat_files(load, [load["path"]])[0]
+
+    def __hash_and_stat_files(self, load, paths):
+        """
+        Return a list of the hash and stat result of each of the paths, using
+        the hash cache if it is enabled
+        """
+        ret = [("", None)] * len(paths)
+        found = []
+        for idx, path in enumerate(paths):
+            fnd = self.find_file(
+                salt.utils.stringutils.to_unicode(path), load["saltenv"]
+            )
+            if fnd.get("back") and "{}.file_hash".format(fnd["back"]) in self.servers:
+                found.append((idx, path, fnd))
+
+        keys = {}
+        cached = {}
+        if self.hash_cache is not None:
+            for idx, _, fnd in found:
+                local_path = fnd.get("local_path", fnd.get("path"))
+                if isinstance(local_path, str) and os.path.isabs(local_path):
+                    key = salt.utils.hashcache.file_key(fnd["back"], local_path)
+                    if key is not None:
+                        keys[idx] = key
+            cached = self.hash_cache.get_many(set(keys.values()))
+
+        new = {}
+        for idx, path, fnd in found:
+            key = keys.get(idx)
+            if key in cached:
+                ret[idx] = (cached[key], fnd.get("stat", None))
+                continue
+            file_load = dict(load, path=path)
+            hsum = self.servers["{}.file_hash".format(fnd["back"])](file_load, fnd)
+            ret[idx] = (hsum, fnd.get("stat", None))
+            if key is not None and isinstance(hsum, dict) and hsum.get("hsum"):
+                new[key] = hsum
+        if new:
+            self.hash_cache.set_many(new)
+        return ret
 
     def file_hash(self, load):
         """
@@ -673,6 +864,27 @@ class Fileserver:
         except (IndexError, TypeError):
             return "", None
 
+    def file_hash_many(self, load):
+        """
+        Return a list of the hashes of the given files, in the same order as
+        the ``paths`` in the load
+        """
+        if "env" in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop("env")
+
+        if "paths" not in load or "saltenv" not in load:
+            return []
+        if not isinstance(load["saltenv"], str):
+            load["saltenv"] = str(load["saltenv"])
+        paths = load.pop("paths")
+        if not isinstance(paths, list):
+            return []
+        try:
+            return [hsum for hsum, _ in self.__hash_and_stat_files(load, paths)]
+        except (IndexError, TypeError):
+            return [""] * len(paths)
+
     def clear_file_list_cache(self, load):
         """
         Deletes the file_lists cache files
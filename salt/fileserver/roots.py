@@ -18,8 +18,12 @@ configuration option.
 import errno
 import logging
 import os
+import time
 
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.data
 import salt.utils.event
 import salt.utils.files
 import salt.utils.gzip_util
@@ -29,8 +33,19 @@ import salt.utils.platform
 import salt.utils.stringutils
 import salt.utils.versions
 
+try:
+    import pyinotify
+
+    HAS_PYINOTIFY = True
+except ImportError:
+    HAS_PYINOTIFY = False
+
 log = logging.getLogger(__name__)
 
+# Index data loaded by the MWorkers, keyed by the path of the index file. Each
+# value is a tuple of the stat signature of the file and the decoded data.
+_INDEX_DATA = {}
+
 
 def find_file(path, saltenv="base", **kwargs):
     """
@@ -211,6 +226,284 @@ def update():
     return data
 
 
+def _index_path(saltenv):
+    """
+    Return the path of the index file of a saltenv
+    """
+    return os.path.join(
+        __opts__["cachedir"],
+        "file_lists",
+        "roots",
+        "{}.idx".format(salt.utils.files.safe_filename_leaf(saltenv)),
+    )
+
+
+def _heartbeat_path():
+    """
+    Return the path of the file touched by the watcher while it is running
+    """
+    return os.path.join(__opts__["cachedir"], "file_lists", "roots", ".index")
+
+
+def _load_index(saltenv):
+    """
+    Return the data of the live index for a saltenv, or ``None`` if the
+    watcher is not running or has not indexed the saltenv yet. The data is
+    only read again from disk when the index file changes.
+    """
+    max_age = 3 * __opts__.get("roots_index_interval", 60)
+    try:
+        if time.time() - os.stat(_heartbeat_path()).st_mtime > max_age:
+            log.debug("roots: the file_roots index is stale, not using it")
+            return None
+        index_path = _index_path(saltenv)
+        index_stat = os.stat(index_path)
+    except OSError:
+        return None
+    signature = (index_stat.st_mtime, index_stat.st_size, index_stat.st_ino)
+    cached = _INDEX_DATA.get(index_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        with salt.utils.files.fopen(index_path, "rb") as fp_:
+            data = salt.utils.data.decode(salt.payload.Serial(__opts__).load(fp_))
+    except Exception as exc:  # pylint: disable=broad-except
+        log.debug("roots: unable to read the index %s: %s", index_path, exc)
+        return None
+    _INDEX_DATA[index_path] = (signature, data)
+    return data
+
+
+class _RootsIndex:
+    """
+    The files, directories and symlinks of each of the file_roots. The index
+    is updated one path at a time from filesystem events, and each saltenv is
+    written out as an index file from which the MWorkers serve the file lists.
+    """
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.roots = {}
+        for saltenv, paths in opts["file_roots"].items():
+            for path in paths:
+                self.roots.setdefault(os.path.normpath(path), set()).add(saltenv)
+        self.entries = {}
+        self.dirty = set()
+
+    @staticmethod
+    def _empty():
+        return {"files": set(), "dirs": set(), "empty_dirs": set(), "links": {}}
+
+    def scan(self, root=None):
+        """
+        Walk one root, or all of them, and replace their entries. Returns the
+        list of the roots whose entries changed.
+        """
+        changed = []
+        for path in [root] if root is not None else list(self.roots):
+            entries = self._empty()
+            self._walk(path, path, entries)
+            if entries != self.entries.get(path):
+                self.entries[path] = entries
+                self.dirty.update(self.roots[path])
+                changed.append(path)
+        return changed
+
+    def _walk(self, root, top, entries):
+        """
+        Add the items below ``top`` to the entries of ``root``
+        """
+        for parent, dirs, files in salt.utils.path.os_walk(
+            top, followlinks=self.opts["fileserver_followsymlinks"]
+        ):
+            for item in dirs:
+                self._add(root, os.path.join(parent, item), entries, True)
+            for item in files:
+                self._add(root, os.path.join(parent, item), entries, False)
+
+    @staticmethod
+    def _add(root, abs_path, entries, is_dir):
+        """
+        Add a single file or directory to the entries of ``root``
+        """
+        listed = _list_item(root, abs_path)
+        if listed is None:
+            return
+        rel_path, is_empty, link_dest = listed
+        if is_dir:
+            entries["dirs"].add(rel_path)
+        else:
+            entries["files"].add(rel_path)
+        if is_empty:
+            entries["empty_dirs"].add(rel_path)
+        if link_dest is not None:
+            entries["links"][rel_path] = link_dest
+
+    @staticmethod
+    def _discard(entries, rel_path):
+        """
+        Remove a path, and if it is a directory everything below it, from the
+        entries of a root
+        """
+        was_dir = rel_path in entries["dirs"]
+        entries["files"].discard(rel_path)
+        entries["links"].pop(rel_path, None)
+        entries["dirs"].discard(rel_path)
+        entries["empty_dirs"].discard(rel_path)
+        if not was_dir:
+            return
+        prefix = rel_path + "/"
+        for item in [x for x in entries["links"] if x.startswith(prefix)]:
+            del entries["links"][item]
+        for key in ("files", "dirs", "empty_dirs"):
+            entries[key].difference_update(
+                [x for x in entries[key] if x.startswith(prefix)]
+            )
+
+    def refresh(self, abs_path):
+        """
+        Update the entries of an individual path which was created, modified,
+        moved or removed, along with its parent directory.
+        """
+        abs_path = os.path.normpath(abs_path)
+        for root in self.roots:
+            if abs_path == root:
+                self.scan(root)
+                continue
+            if root not in self.entries or not abs_path.startswith(
+                os.path.join(root, "")
+            ):
+                continue
+            entries = self.entries[root]
+            self._discard(entries, _translate_sep(os.path.relpath(abs_path, root)))
+            if os.path.isdir(abs_path):
+                self._add(root, abs_path, entries, True)
+                followlinks = self.opts["fileserver_followsymlinks"]
+                if followlinks or not salt.utils.path.islink(abs_path):
+                    self._walk(root, abs_path, entries)
+            elif os.path.lexists(abs_path):
+                self._add(root, abs_path, entries, False)
+            parent = os.path.dirname(abs_path)
+            if parent != root and os.path.isdir(parent):
+                # The directory may have become empty, or no longer be
+                entries["empty_dirs"].discard(
+                    _translate_sep(os.path.relpath(parent, root))
+                )
+                self._add(root, parent, entries, True)
+            self.dirty.update(self.roots[root])
+
+    def lists(self, saltenv):
+        """
+        Return the file lists of a saltenv, in the format of the file list
+        cache
+        """
+        ret = {"files": set(), "dirs": set(), "empty_dirs": set(), "links": {}}
+        for path in self.opts["file_roots"][saltenv]:
+            entries = self.entries.get(os.path.normpath(path))
+            if entries is None:
+                continue
+            ret["files"].update(entries["files"])
+            ret["dirs"].update(entries["dirs"])
+            ret["empty_dirs"].update(entries["empty_dirs"])
+            ret["links"].update(entries["links"])
+        ret["files"] = sorted(ret["files"])
+        ret["dirs"] = sorted(ret["dirs"])
+        ret["empty_dirs"] = sorted(ret["empty_dirs"])
+        return ret
+
+    def write(self):
+        """
+        Write the index files of the saltenvs which changed and touch the
+        heartbeat file
+        """
+        heartbeat = _heartbeat_path()
+        index_dir = os.path.dirname(heartbeat)
+        if not os.path.isdir(index_dir):
+            os.makedirs(index_dir)
+        for saltenv in sorted(self.dirty):
+            with salt.utils.atomicfile.atomic_open(_index_path(saltenv), "wb") as fp_:
+                fp_.write(self.serial.dumps(self.lists(saltenv)))
+            log.trace("roots: wrote the index of saltenv '%s'", saltenv)
+        self.dirty.clear()
+        with salt.utils.files.fopen(heartbeat, "a"):
+            pass
+        os.utime(heartbeat, None)
+
+
+def _watch_inotify(index, interval):
+    """
+    Update the index from inotify events
+    """
+    mask = (
+        pyinotify.IN_ATTRIB
+        | pyinotify.IN_CLOSE_WRITE
+        | pyinotify.IN_CREATE
+        | pyinotify.IN_DELETE
+        | pyinotify.IN_DELETE_SELF
+        | pyinotify.IN_MODIFY
+        | pyinotify.IN_MOVED_FROM
+        | pyinotify.IN_MOVED_TO
+    )
+    events = []
+    watch_manager = pyinotify.WatchManager()
+    notifier = pyinotify.Notifier(watch_manager, default_proc_fun=events.append)
+    for root in index.roots:
+        if os.path.isdir(root):
+            watch_manager.add_watch(root, mask, rec=True, auto_add=True)
+    while True:
+        if notifier.check_events(timeout=interval * 1000):
+            notifier.read_events()
+            notifier.process_events()
+        if any(event.mask & pyinotify.IN_Q_OVERFLOW for event in events):
+            log.warning("roots: inotify queue overflow, rescanning the file_roots")
+            index.scan()
+        else:
+            for path in {event.pathname for event in events}:
+                index.refresh(path)
+        del events[:]
+        index.write()
+
+
+def _watch_poll(index, interval):
+    """
+    Update the index by rescanning the file_roots at a regular interval
+    """
+    while True:
+        time.sleep(interval)
+        changed = index.scan()
+        if changed:
+            log.debug("roots: file_roots changed: %s", ", ".join(changed))
+        index.write()
+
+
+def watch():
+    """
+    Keep the index of the file_roots, from which the file lists are served
+    when :conf_master:`roots_index` is enabled, up to date. The index is
+    updated from inotify events if pyinotify is installed, and by rescanning
+    the file_roots every :conf_master:`roots_index_interval` seconds
+    otherwise. This function does not return, it is run in a thread of the
+    FileserverUpdate process.
+    """
+    if not __opts__.get("roots_index", False):
+        return
+    interval = __opts__.get("roots_index_interval", 60)
+    index = _RootsIndex(__opts__)
+    index.scan()
+    index.write()
+    if HAS_PYINOTIFY:
+        log.debug("roots: updating the file_roots index from inotify events")
+        _watch_inotify(index, interval)
+    else:
+        log.debug(
+            "roots: pyinotify is not available, rescanning the file_roots "
+            "every %s seconds",
+            interval,
+        )
+        _watch_poll(index, interval)
+
+
 def file_hash(load, fnd):
     """
     Return a file hash, the hash type is set in the master config file
@@ -234,6 +527,10 @@ def file_hash(load, fnd):
     # set the hash_type as it is determined by config-- so mechanism won't change that
     ret["hash_type"] = __opts__["hash_type"]
 
+    # the cached hash is checked against the current mtime of the file, the
+    # mtimes of the roots_index may lag behind it
+    mtime = os.path.getmtime(path)
+
     # check if the hash is cached
     # cache file's contents should be "hash:mtime"
     cache_path = os.path.join(
@@ -248,7 +545,7 @@ def file_hash(load, fnd):
         try:
             with salt.utils.files.fopen(cache_path, encoding="utf-8") as fp_:
                 try:
-                    hsum, mtime = fp_.read().split(":")
+                    hsum, cached_mtime = fp_.read().split(":")
                 except ValueError:
                     log.debug(
                         "Fileserver attempted to read incomplete cache file. Retrying."
@@ -259,7 +556,7 @@ def file_hash(load, fnd):
                     except OSError:
                         pass
                     return file_hash(load, fnd)
-                if str(os.path.getmtime(path)) == mtime:
+                if str(mtime) == cached_mtime:
                     # check if mtime changed
                     ret["hsum"] = hsum
                     return ret
@@ -290,12 +587,72 @@ def file_hash(load, fnd):
             else:
                 raise
     # save the cache object "hash:mtime"
-    cache_object = "{}:{}".format(ret["hsum"], os.path.getmtime(path))
+    cache_object = "{}:{}".format(ret["hsum"], mtime)
     with salt.utils.files.flopen(cache_path, "w") as fp_:
         fp_.write(cache_object)
     return ret
 
 
+def _translate_sep(path):
+    """
+    Translate path separators for Windows masterless minions
+    """
+    return path.replace("\\", "/") if os.path.sep == "\\" else path
+
+
+def _list_item(fs_root, abs_path):
+    """
+    Return a tuple of the path of a file or directory relative to ``fs_root``,
+    whether or not it is an empty directory and, for symlinks which do not
+    point outside of ``fs_root``, the symlink destination. ``None`` is returned
+    for items which must not be listed.
+    """
+    log.trace("roots: Processing %s", abs_path)
+    is_link = salt.utils.path.islink(abs_path)
+    log.trace("roots: %s is %sa link", abs_path, "not " if not is_link else "")
+    if is_link and __opts__["fileserver_ignoresymlinks"]:
+        return None
+    rel_path = _translate_sep(os.path.relpath(abs_path, fs_root))
+    log.trace("roots: %s relative path is %s", abs_path, rel_path)
+    if salt.fileserver.is_file_ignored(__opts__, rel_path):
+        return None
+    is_empty = False
+    try:
+        is_empty = not os.listdir(abs_path)
+    except Exception:  # pylint: disable=broad-except
+        # Generic exception because running os.listdir() on a
+        # non-directory path raises an OSError on *NIX and a
+        # WindowsError on Windows.
+        pass
+    link_dest = None
+    if is_link:
+        link_dest = salt.utils.path.readlink(abs_path)
+        log.trace("roots: %s symlink destination is %s", abs_path, link_dest)
+        if salt.utils.platform.is_windows() and link_dest.startswith("\\\\"):
+            # Symlink points to a network path. Since you can't
+            # join UNC and non-UNC paths, just assume the original
+            # path.
+            log.trace(
+                "roots: %s is a UNC path, using %s instead", link_dest, abs_path,
+            )
+            link_dest = abs_path
+        if link_dest.startswith(".."):
+            joined = os.path.join(abs_path, link_dest)
+        else:
+            joined = os.path.join(os.path.dirname(abs_path), link_dest)
+        rel_dest = _translate_sep(
+            os.path.relpath(
+                os.path.realpath(os.path.normpath(joined)), os.path.realpath(fs_root),
+            )
+        )
+        log.trace("roots: %s relative path is %s", abs_path, rel_dest)
+        if rel_dest.startswith(".."):
+            # Only count the link if it does not point outside of the root
+            # dir of the fileserver (i.e. the "path" variable)
+            link_dest = None
+    return rel_path, is_empty, link_dest
+
+
 def _file_lists(load, form):
     """
     Return a dict containing the file lists for files, dirs, emtydirs and symlinks
@@ -324,6 +681,10 @@ def _file_lists(load, form):
     list_cache = os.path.join(
         list_cachedir, "{}.p".format(salt.utils.files.safe_filename_leaf(saltenv))
     )
+    if __opts__.get("roots_index", False):
+        index = _load_index(saltenv)
+        if index is not None:
+            return index.get(form, [])
     w_lock = os.path.join(
         list_cachedir, ".{}.w".format(salt.utils.files.safe_filename_leaf(saltenv))
     )
@@ -339,68 +700,16 @@ def _file_lists(load, form):
             """
             Add the files to the target set
             """
-
-            def _translate_sep(path):
-                """
-                Translate path separators for Windows masterless minions
-                """
-                return path.replace("\\", "/") if os.path.sep == "\\" else path
-
             for item in items:
-                abs_path = os.path.join(parent_dir, item)
-                log.trace("roots: Processing %s", abs_path)
-                is_link = salt.utils.path.islink(abs_path)
-                log.trace(
-                    "roots: %s is %sa link", abs_path, "not " if not is_link else ""
-                )
-                if is_link and __opts__["fileserver_ignoresymlinks"]:
-                    continue
-                rel_path = _translate_sep(os.path.relpath(abs_path, fs_root))
-                log.trace("roots: %s relative path is %s", abs_path, rel_path)
-                if salt.fileserver.is_file_ignored(__opts__, rel_path):
+                listed = _list_item(fs_root, os.path.join(parent_dir, item))
+                if listed is None:
                     continue
+                rel_path, is_empty, link_dest = listed
                 tgt.add(rel_path)
-                try:
-                    if not os.listdir(abs_path):
-                        ret["empty_dirs"].add(rel_path)
-                except Exception:  # pylint: disable=broad-except
-                    # Generic exception because running os.listdir() on a
-                    # non-directory path raises an OSError on *NIX and a
-                    # WindowsError on Windows.
-                    pass
-                if is_link:
-                    link_dest = salt.utils.path.readlink(abs_path)
-                    log.trace(
-                        "roots: %s symlink destination is %s", abs_path, link_dest
-                    )
-                    if salt.utils.platform.is_windows() and link_dest.startswith(
-                        "\\\\"
-                    ):
-                        # Symlink points to a network path. Since you can't
-                        # join UNC and non-UNC paths, just assume the original
-                        # path.
-                        log.trace(
-                            "roots: %s is a UNC path, using %s instead",
-                            link_dest,
-                            abs_path,
-                        )
-                        link_dest = abs_path
-                    if link_dest.startswith(".."):
-                        joined = os.path.join(abs_path, link_dest)
-                    else:
-                        joined = os.path.join(os.path.dirname(abs_path), link_dest)
-                    rel_dest = _translate_sep(
-                        os.path.relpath(
-                            os.path.realpath(os.path.normpath(joined)),
-                            os.path.realpath(fs_root),
-                        )
-                    )
-                    log.trace("roots: %s relative path is %s", abs_path, rel_dest)
-                    if not rel_dest.startswith(".."):
-                        # Only count the link if it does not point
-                        # outside of the root dir of the fileserver
-                        # (i.e. the "path" variable)
-                        ret["links"][rel_path] = link_dest
+                if is_empty:
+                    ret["empty_dirs"].add(rel_path)
+                if link_dest is not None:
+                    ret["links"][rel_path] = link_dest
 
         for path in __opts__["file_roots"][saltenv]:
             for root, dirs, files in salt.utils.path.os_walk(
@@ -182,6 +182,9 @@ def find_file(path, saltenv="base", **kwargs):
     # jit load the file from S3 if it's not in the cache or it's old
     _get_file_from_s3(metadata, saltenv, fnd["bucket"], path, cached_file_path)
 
+    # the hash cache of the fileserver uses the local copy of the file
+    fnd["local_path"] = cached_file_path
+
     return fnd
 
 
@@ -24,6 +24,7 @@ import salt.utils.files
 import salt.utils.json
 import salt.utils.kinds
 import salt.utils.master
+import salt.utils.minions
 import salt.utils.sdb
 import salt.utils.stringutils
 import salt.utils.user
@@ -464,11 +465,13 @@ class Key:
                             )
                             continue
             cache = salt.cache.factory(self.opts)
+            ckminions = salt.utils.minions.CkMinions(self.opts)
             clist = cache.list(self.ACC)
             if clist:
                 for minion in clist:
                     if minion not in minions and minion not in preserve_minions:
                         cache.flush("{}/{}".format(self.ACC, minion))
+                        ckminions.update_minion_data_index(minion, None)
 
     def check_master(self):
         """
@@ -6,6 +6,7 @@ plugin interfaces used by Salt.
 
 import contextvars
 import copy
+import fnmatch
 import functools
 import importlib
 import importlib.machinery  # pylint: disable=no-name-in-module,import-error
@@ -28,8 +29,10 @@ import salt.config
 import salt.defaults.events
 import salt.defaults.exitcodes
 import salt.loader_context
+import salt.loader_index
 import salt.syspaths
 import salt.utils.args
+import salt.utils.boundedcall
 import salt.utils.context
 import salt.utils.data
 import salt.utils.dictupdate
@@ -769,6 +772,116 @@ def _format_cached_grains(cached_grains):
     return cached_grains
 
 
+class _GrainsCall(salt.utils.boundedcall.BoundedCall):
+    """
+    A call of a grains function, run on a thread of the grains pool when
+    ``slots``, the semaphore bounding the number of grains functions running
+    at the same time, is given
+    """
+
+    def __init__(self, key, func, kwargs, slots=None):
+        super().__init__(func, **kwargs)
+        self.key = key
+        self.pool = slots
+        self.cached = False
+
+    def start(self):  # pylint: disable=arguments-differ
+        if self.launched:
+            return
+        log.trace("Loading %s grain", self.key)
+        super().start(self.pool, "grains-{}".format(self.key))
+
+    def reuse(self, ret, start_time):
+        """
+        Use the grains the function returned when it was run at
+        ``start_time`` instead of running it
+        """
+        self.launched = True
+        self.cached = True
+        self.start_time = start_time
+        self.duration = 0.0
+        self.ret = ret
+        self.started.set()
+        self.done.set()
+
+
+def _write_grains_timings(opts, timings):
+    """
+    Store the time each grains function took for grains_timings
+    """
+    if "cachedir" not in opts:
+        return
+    path = os.path.join(opts["cachedir"], "grains.timings.p")
+    try:
+        with salt.utils.files.set_umask(0o077):
+            with salt.utils.files.fopen(path, "w+b") as fp_:
+                salt.payload.Serial(opts).dump(timings, fp_)
+    except OSError as exc:
+        log.debug("Unable to write the grains timings to %s: %s", path, exc)
+
+
+def grains_timings(opts):
+    """
+    Return the time in seconds each grains function took the last time the
+    grains were loaded, a timed out function is flagged with ``timeout``
+
+    .. versionadded:: 3003
+    """
+    path = os.path.join(opts["cachedir"], "grains.timings.p")
+    try:
+        with salt.utils.files.fopen(path, "rb") as fp_:
+            return salt.payload.Serial(opts).load(fp_)
+    except (OSError, ValueError):
+        return {}
+
+
+def _grains_ttl(opts, key, func):
+    """
+    Return the number of seconds the grains returned by the grains function
+    ``key`` are reused for when grains_cache is enabled
+    """
+    ttls = opts.get("grains_ttl") or {}
+    if key in ttls:
+        return ttls[key]
+    for pattern, ttl in ttls.items():
+        if fnmatch.fnmatch(key, pattern):
+            return ttl
+    ttl = getattr(func, "grains_ttl", None)
+    if ttl is not None:
+        return ttl
+    return opts.get("grains_cache_expiration", 300)
+
+
+def _load_cached_grains_functions(opts):
+    """
+    Return the grains each grains function returned the last time it was run,
+    with the time it was run, and the time the first of them expires
+    """
+    path = os.path.join(opts["cachedir"], "grains.functions.p")
+    try:
+        with salt.utils.files.fopen(path, "rb") as fp_:
+            return salt.payload.Serial(opts).load(fp_)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cached_grains_functions(opts, functions, expires):
+    """
+    Store the grains returned by each grains function
+    """
+    path = os.path.join(opts["cachedir"], "grains.functions.p")
+    try:
+        with salt.utils.files.set_umask(0o077):
+            with salt.utils.files.fopen(path, "w+b") as fp_:
+                salt.payload.Serial(opts).dump(
+                    {"expires": expires, "functions": functions}, fp_
+                )
+    except (OSError, TypeError) as exc:
+        log.error("Unable to write the grains functions cache %s: %s", path, exc)
+        if os.path.isfile(path):
+            os.unlink(path)
+
+
 def _load_cached_grains(opts, cfn):
     """
     Returns the grains cached in cfn, or None if the cache is too old or is
@@ -793,6 +906,11 @@ def _load_cached_grains(opts, cfn):
         log.debug("refresh_grains_cache requested, Refreshing.")
         return None
 
+    expires = _load_cached_grains_functions(opts).get("expires")
+    if expires is not None and expires <= time.time():
+        log.debug("Some cached grains expired. Refreshing them.")
+        return None
+
     log.debug("Retrieving grains from cache")
     try:
         serial = salt.payload.Serial(opts)
@@ -874,14 +992,10 @@ def grains(opts, force_refresh=False, proxy=None, context=None):
     funcs = grain_funcs(opts, proxy=proxy, context=context or {})
     if force_refresh:  # if we refresh, lets reload grain modules
         funcs.clear()
-    # Run core grains
-    for key in funcs:
-        if not key.startswith("core."):
-            continue
-        log.trace("Loading %s grain", key)
-        ret = funcs[key]()
+
+    def _merge(ret):
         if not isinstance(ret, dict):
-            continue
+            return
         if blist:
             for key in list(ret):
                 for block in blist:
@@ -889,36 +1003,38 @@ def grains(opts, force_refresh=False, proxy=None, context=None):
                         del ret[key]
                         log.trace("Filtering %s grain", key)
             if not ret:
-                continue
+                return
         if grains_deep_merge:
             salt.utils.dictupdate.update(grains_data, ret)
         else:
             grains_data.update(ret)
 
-    # Run the rest of the grains
+    # Run the grains functions on the grains pool if enabled, the grains
+    # functions which take the grains are only started once the grains of
+    # the functions before them are merged
+    slots = None
+    timeout = None
+    if opts.get("grains_pool_size", 0) > 0:
+        slots = threading.Semaphore(opts["grains_pool_size"])
+        timeout = opts.get("grains_timeout") or None
+    timings = {}
+    core_calls = []
+    calls = []
     for key in funcs:
-        if key.startswith("core.") or key == "_errors":
+        if key.startswith("core."):
+            core_calls.append(_GrainsCall(key, funcs[key], {}, slots))
             continue
+        if key == "_errors":
+            continue
+        # Grains are loaded too early to take advantage of the injected
+        # __proxy__ variable.  Pass an instance of that LazyLoader
+        # here instead to grains functions if the grains functions take
+        # one parameter.  Then the grains can have access to the
+        # proxymodule for retrieving information from the connected
+        # device.
         try:
-            # Grains are loaded too early to take advantage of the injected
-            # __proxy__ variable.  Pass an instance of that LazyLoader
-            # here instead to grains functions if the grains functions take
-            # one parameter.  Then the grains can have access to the
-            # proxymodule for retrieving information from the connected
-            # device.
-            log.trace("Loading %s grain", key)
             parameters = salt.utils.args.get_function_argspec(funcs[key]).args
-            kwargs = {}
-            if "proxy" in parameters:
-                kwargs["proxy"] = proxy
-            if "grains" in parameters:
-                kwargs["grains"] = grains_data
-            ret = funcs[key](**kwargs)
         except Exception:  # pylint: disable=broad-except
-            if salt.utils.platform.is_proxy():
-                log.info(
-                    "The following CRITICAL message may not be an error; the proxy may not be completely established yet."
-                )
             log.critical(
                 "Failed to load grains defined in grain file %s in "
                 "function %s, error:\n",
@@ -927,20 +1043,110 @@ def grains(opts, force_refresh=False, proxy=None, context=None):
                 exc_info=True,
             )
             continue
-        if not isinstance(ret, dict):
-            continue
-        if blist:
-            for key in list(ret):
-                for block in blist:
-                    if salt.utils.stringutils.expr_match(key, block):
-                        del ret[key]
-                        log.trace("Filtering %s grain", key)
-            if not ret:
-                continue
-        if grains_deep_merge:
-            salt.utils.dictupdate.update(grains_data, ret)
+        kwargs = {}
+        if "proxy" in parameters:
+            kwargs["proxy"] = proxy
+        if "grains" in parameters:
+            kwargs["grains"] = grains_data
+        calls.append(_GrainsCall(key, funcs[key], kwargs, slots))
+    # With grains_cache enabled, the grains returned by a grains function are
+    # reused until its time to live expires. The grains functions taking the
+    # grains are run again as soon as the grains before them changed.
+    grains_cache = opts.get("grains_cache", False)
+    cached = {}
+    if (
+        grains_cache
+        and not force_refresh
+        and not opts.get("refresh_grains_cache", False)
+    ):
+        cached = _load_cached_grains_functions(opts).get("functions", {})
+    last_timings = grains_timings(opts) if cached else {}
+    results = {}
+    expires = []
+    changed = False
+    now = time.time()
+    serial = salt.payload.Serial(opts)
+
+    def _reuse(call):
+        entry = cached.get(call.key)
+        if entry is None:
+            return False
+        if now - entry["time"] >= _grains_ttl(opts, call.key, call.func):
+            return False
+        call.reuse(entry["ret"], entry["time"])
+        return True
+
+    def _record(call):
+        nonlocal changed
+        if call.cached:
+            timings[call.key] = dict(
+                last_timings.get(call.key, {"duration": 0.0}), cached=True
+            )
         else:
-            grains_data.update(ret)
+            timings[call.key] = {"duration": call.duration}
+        if not grains_cache or not isinstance(call.ret, dict):
+            return
+        if not call.cached:
+            entry = cached.get(call.key)
+            if entry is None or serial.dumps(entry["ret"]) != serial.dumps(call.ret):
+                changed = True
+        results[call.key] = {"time": call.start_time, "ret": copy.deepcopy(call.ret)}
+        expires.append(call.start_time + _grains_ttl(opts, call.key, call.func))
+
+    for call in core_calls + calls:
+        if "grains" not in call.kwargs and not _reuse(call) and slots is not None:
+            call.start()
+
+    # Run core grains
+    for call in core_calls:
+        call.start()
+        if not call.wait(timeout):
+            log.error(
+                "Gave up the %s grains function after %s seconds", call.key, timeout
+            )
+            timings[call.key] = {"duration": timeout, "timeout": True}
+            changed = True
+            continue
+        if call.exc_info:
+            raise call.exc_info[1].with_traceback(call.exc_info[2])
+        _record(call)
+        _merge(call.ret)
+
+    # Run the rest of the grains
+    for call in calls:
+        if "grains" in call.kwargs and not changed:
+            _reuse(call)
+        call.start()
+        if not call.wait(timeout):
+            log.error(
+                "Gave up the %s grains function after %s seconds", call.key, timeout
+            )
+            timings[call.key] = {"duration": timeout, "timeout": True}
+            changed = True
+            continue
+        if call.exc_info:
+            timings[call.key] = {"duration": call.duration}
+            changed = True
+            if salt.utils.platform.is_proxy():
+                log.info(
+                    "The following CRITICAL message may not be an error; the proxy may not be completely established yet."
+                )
+            log.critical(
+                "Failed to load grains defined in grain file %s in "
+                "function %s, error:\n",
+                call.key,
+                call.func,
+                exc_info=call.exc_info,
+            )
+            continue
+        _record(call)
+        _merge(call.ret)
+    _write_grains_timings(opts, timings)
+    if grains_cache:
+        _write_cached_grains_functions(opts, results, min(expires, default=None))
+    if cached:
+        # Tuples are stored as lists
+        _format_cached_grains(grains_data)
 
     if opts.get("proxy_merge_grains_in_module", True) and proxy:
         try:
@@ -1370,6 +1576,23 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             self.suffix_map[suffix] = (suffix, mode, kind)
             self.suffix_order.append(suffix)
 
+        self.module_index = None
+        if self.opts.get("loader_index") and self.opts.get("cachedir"):
+            self.module_index = salt.loader_index.LoaderIndex(
+                self.opts,
+                (
+                    self.tag,
+                    self.module_dirs,
+                    self.static_modules,
+                    self.virtual_enable,
+                    self.virtual_funcs,
+                    sorted(self.disabled),
+                    self.opts.get("optimization_order"),
+                    self.opts.get("cython_enable", True),
+                    self.opts.get("enable_zip_modules", True),
+                ),
+            )
+
         self._lock = threading.RLock()
         with self._lock:
             self._refresh_file_mapping()
@@ -1414,11 +1637,12 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         # otherwise we assume its jinja template access
         if mod_name not in self.loaded_modules and not self.loaded:
             for name in self._iter_files(mod_name):
-                if name in self.loaded_files:
+                if name in self.loaded_files or self._skip_indexed(name, mod_name):
                     continue
                 # if we got what we wanted, we are done
                 if self._load_module(name) and mod_name in self.loaded_modules:
                     break
+            self._flush_index()
         if mod_name in self.loaded_modules:
             return LoadedMod(self.loaded_modules[mod_name], self)
         else:
@@ -1483,6 +1707,13 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         # The files are added in order of priority, so order *must* be retained.
         self.file_mapping = salt.utils.odict.OrderedDict()
 
+        if self.module_index is not None:
+            indexed = self.module_index.file_mapping()
+            if indexed is not None:
+                self.file_mapping.update(indexed)
+                return
+            scanned = time.time()
+
         opt_match = []
 
         def _replace_pre_ext(obj):
@@ -1604,6 +1835,22 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             f_noext = smod.split(".")[-1]
             self.file_mapping[f_noext] = (smod, ".o", 0)
 
+        if self.module_index is not None:
+            # Adding or removing a module changes the mtime of its directory,
+            # and adding or removing the __init__ of a package the mtime of
+            # the package directory
+            paths = []
+            for mod_dir in self.module_dirs:
+                paths.append(mod_dir)
+                paths.append(os.path.join(mod_dir, "__pycache__"))
+            paths.extend(
+                fpath for fpath, ext, _ in self.file_mapping.values() if ext == ""
+            )
+            self.module_index.set_file_mapping(
+                paths, self.file_mapping.items(), scanned
+            )
+            self.module_index.flush()
+
     def clear(self):
         """
         Clear the dict
@@ -1613,6 +1860,13 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             self.loaded_files = set()
             self.missing_modules = {}
             self.loaded_modules = {}
+            if self.module_index is not None:
+                self.module_index.reload()
+                self.module_index.fingerprint = salt.loader_index.fingerprint(
+                    self.context_dict.get("grains"),
+                    self.context_dict.get("pillar"),
+                    self.opts,
+                )
             # if we have been loaded before, lets clear the file mapping since
             # we obviously want a re-do
             if hasattr(self, "opts"):
@@ -1666,6 +1920,40 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             if mod_name not in k:
                 yield k
 
+    def _skip_indexed(self, name, mod_name=None):
+        """
+        Check the module index to tell whether importing the file ``name``
+        can be skipped, either because its ``__virtual__`` function refuses
+        to load it or because it is not loaded under ``mod_name``
+        """
+        if self.module_index is None:
+            return False
+        indexed = self.module_index.virtual(name, self.file_mapping[name][0])
+        if indexed is None:
+            return False
+        names, reason = indexed
+        if names is None:
+            self.loaded_files.add(name)
+            self.missing_modules[name] = reason
+            return True
+        return mod_name is not None and mod_name not in names
+
+    def _index_module(self, name, names, reason=None):
+        """
+        Record the outcome of loading the file ``name`` in the module index
+        """
+        if self.module_index is None:
+            return
+        fpath, suffix = self.file_mapping[name][:2]
+        if suffix in ("", ".o"):
+            # Packages and static modules have no single file to check
+            return
+        self.module_index.set_virtual(name, fpath, names, reason)
+
+    def _flush_index(self):
+        if self.module_index is not None:
+            self.module_index.flush()
+
     def _reload_submodules(self, mod):
         submodules = (
             getattr(mod, sname)
@@ -1972,6 +2260,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     # If a module has information about why it could not be loaded, record it
                     self.missing_modules[module_name] = virtual_err
                     self.missing_modules[name] = virtual_err
+                    self._index_module(name, None, virtual_err)
                     return False
         else:
             virtual_aliases = ()
@@ -2047,6 +2336,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
         for tgt_mod in mod_names:
             self.loaded_modules[tgt_mod] = mod_dict[tgt_mod]
+        self._index_module(name, mod_names)
         return True
 
     def _load(self, key):
@@ -2077,7 +2367,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
             def _inner_load(mod_name):
                 for name in self._iter_files(mod_name):
-                    if name in self.loaded_files:
+                    if name in self.loaded_files or self._skip_indexed(name, mod_name):
                         continue
                     # if we got what we wanted, we are done
                     if self._load_module(name) and key in self._dict:
@@ -2102,6 +2392,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                         self._refresh_file_mapping()
                         reloaded = True
                     continue
+            self._flush_index()
 
         return ret
 
@@ -2113,7 +2404,10 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             for name in self.file_mapping:
                 if name in self.loaded_files or name in self.missing_modules:
                     continue
+                if self._skip_indexed(name):
+                    continue
                 self._load_module(name)
+            self._flush_index()
 
             self.loaded = True
 
@@ -0,0 +1,241 @@
+"""
+Persistent index of the modules found by Salt's loader
+
+.. versionadded:: 3003
+
+Building a :py:class:`salt.loader.LazyLoader` means listing every module
+directory, and finding a function means importing modules until one of them
+provides it, running the ``__virtual__`` function of each module on the way.
+When :conf_minion:`loader_index` is enabled the loader keeps what it learned
+in the cachedir instead:
+
+- the file mapping of the module directories, which is reused for as long as
+  the modification times of the directories do not change
+- for each module file, the names it was loaded under or the reason its
+  ``__virtual__`` function refused to load it, which is reused for as long as
+  the file does not change and the grains, pillar and options are the same
+
+so that later loaders skip the directory walk and only import the modules
+they actually need. The index is dropped by ``saltutil.sync_*``, on module
+refreshes and when the minion starts, since installing packages can change the
+outcome of ``__virtual__``.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import sys
+
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.json
+import salt.utils.msgpack
+import salt.version
+
+log = logging.getLogger(__name__)
+
+# Modification times this close to the directory scan may hide a change made
+# right after it, the file mapping is not stored until they are older.
+_RACY_WINDOW = 2
+
+# Number of distinct grains fingerprints to keep __virtual__ results for
+_MAX_FINGERPRINTS = 4
+
+# Grains which change with every process and are left out of the fingerprint
+_VOLATILE_GRAINS = ("pid",)
+
+# Options left out of the fingerprint, the grains and pillar are fingerprinted
+# on their own, and the jid changes with every job
+_VOLATILE_OPTS = ("grains", "pillar", "jid")
+
+
+def index_dir(opts):
+    """
+    Return the directory holding the loader indexes
+    """
+    return os.path.join(opts["cachedir"], "loader_index")
+
+
+def clear(opts):
+    """
+    Drop all of the loader indexes, the next loaders will walk the module
+    directories and import the modules again.
+    """
+    if not opts.get("cachedir"):
+        return
+    path = index_dir(opts)
+    if os.path.isdir(path):
+        log.debug("Clearing the loader index in %s", path)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _stamps(paths):
+    return [[path, _mtime(path)] for path in paths]
+
+
+def fingerprint(grains, pillar=None, opts=None):
+    """
+    Return a digest of the grains, pillar and options which the ``__virtual__``
+    functions may read, or ``None`` if they cannot be serialized
+    """
+    grains = {
+        key: val for key, val in (grains or {}).items() if key not in _VOLATILE_GRAINS
+    }
+    opts = {key: val for key, val in (opts or {}).items() if key not in _VOLATILE_OPTS}
+    try:
+        data = salt.utils.json.dumps(
+            [grains, pillar or {}, opts], sort_keys=True, default=repr
+        )
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class LoaderIndex:
+    """
+    The index of a single loader, identified by ``key`` which must hold
+    everything the file mapping depends on other than the files.
+    """
+
+    def __init__(self, opts, key):
+        key = repr(
+            (salt.version.__version__, sys.version, sys.implementation.cache_tag)
+            + tuple(key)
+        )
+        self.path = os.path.join(
+            index_dir(opts),
+            "{}.p".format(hashlib.sha1(key.encode("utf-8")).hexdigest()),
+        )
+        self.fingerprint = None
+        self.reload()
+
+    def reload(self):
+        """
+        Forget everything and read the index from disk on next use
+        """
+        self._data = None
+        self._stamp = None
+        self._pending_mapping = None
+        self._pending_virtual = {}
+
+    def _read(self):
+        stamp = _mtime(self.path)
+        data = None
+        if stamp is not None:
+            try:
+                with salt.utils.files.fopen(self.path, "rb") as fp_:
+                    data = salt.utils.msgpack.unpack(fp_, raw=False)
+            except Exception as exc:  # pylint: disable=broad-except
+                log.debug("Unable to read the loader index %s: %s", self.path, exc)
+                data = None
+        if not isinstance(data, dict):
+            data = {}
+        data.setdefault("virtual", {})
+        return stamp, data
+
+    def _load(self):
+        if self._data is None:
+            self._stamp, self._data = self._read()
+        return self._data
+
+    def file_mapping(self):
+        """
+        Return the stored file mapping as a list of ``(name, entry)`` pairs,
+        or ``None`` if a module directory changed since it was stored.
+        """
+        data = self._load()
+        if "file_mapping" not in data:
+            return None
+        for path, mtime in data["stamps"]:
+            if _mtime(path) != mtime:
+                log.trace("Loader index %s is out of date: %s", self.path, path)
+                return None
+        return [(name, tuple(entry)) for name, entry in data["file_mapping"]]
+
+    def set_file_mapping(self, paths, file_mapping, scanned):
+        """
+        Store the file mapping found by walking ``paths``, starting at the
+        ``scanned`` timestamp
+        """
+        stamps = _stamps(paths)
+        if any(mtime and mtime > scanned - _RACY_WINDOW for _, mtime in stamps):
+            return
+        self._pending_mapping = {
+            "stamps": stamps,
+            "file_mapping": [[name, list(entry)] for name, entry in file_mapping],
+        }
+        self._load().update(self._pending_mapping)
+
+    def virtual(self, name, fpath):
+        """
+        Return the stored outcome of loading the module ``name`` from
+        ``fpath``: ``(names, None)`` if it was loaded under ``names``,
+        ``(None, reason)`` if its ``__virtual__`` function refused to load it,
+        or ``None`` if it is unknown.
+        """
+        if self.fingerprint is None:
+            return None
+        entry = self._load()["virtual"].get(self.fingerprint, {}).get(name)
+        if entry is None or entry[0] != fpath or entry[1] != _mtime(fpath):
+            return None
+        return entry[2], entry[3]
+
+    def set_virtual(self, name, fpath, names, reason=None):
+        """
+        Store the outcome of loading the module ``name`` from ``fpath``
+        """
+        if self.fingerprint is None:
+            return
+        mtime = _mtime(fpath)
+        if mtime is None:
+            return
+        if reason is not None:
+            reason = str(reason)
+        entry = [fpath, mtime, list(names) if names is not None else None, reason]
+        virtual = self._load()["virtual"].setdefault(self.fingerprint, {})
+        if virtual.get(name) != entry:
+            self._pending_virtual[name] = entry
+            virtual[name] = entry
+
+    def flush(self):
+        """
+        Write the new entries to disk, merged with the ones written by other
+        processes in the meantime
+        """
+        if self._pending_mapping is None and not self._pending_virtual:
+            return
+        stamp, data = self._read()
+        if self._stamp is not None and stamp is None:
+            # The index was cleared since it was read, the new entries may
+            # already be out of date.
+            log.trace("Loader index %s was cleared, not writing it", self.path)
+            self.reload()
+            return
+        if self._pending_mapping is not None:
+            data.update(self._pending_mapping)
+        if self._pending_virtual:
+            virtual = data["virtual"].pop(self.fingerprint, {})
+            virtual.update(self._pending_virtual)
+            while len(data["virtual"]) >= _MAX_FINGERPRINTS:
+                data["virtual"].pop(next(iter(data["virtual"])))
+            data["virtual"][self.fingerprint] = virtual
+        try:
+            if not os.path.isdir(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+            with salt.utils.atomicfile.atomic_open(self.path, "wb") as fp_:
+                salt.utils.msgpack.pack(data, fp_, use_bin_type=True)
+        except OSError as exc:
+            log.debug("Unable to write the loader index %s: %s", self.path, exc)
+            return
+        self._pending_mapping = None
+        self._pending_virtual = {}
+        self._stamp = _mtime(self.path)
+        self._data = data
@@ -4,6 +4,7 @@ involves preparing the three listeners and the workers needed by the master.
 """
 
 import collections
+import concurrent.futures
 import copy
 import ctypes
 import functools
@@ -46,6 +47,7 @@ import salt.utils.gzip_util
 import salt.utils.jid
 import salt.utils.job
 import salt.utils.master
+import salt.utils.metrics
 import salt.utils.minions
 import salt.utils.platform
 import salt.utils.process
@@ -216,6 +218,7 @@ class Maintenance(salt.utils.process.SignalHandlingProcess):
         master is maintained.
         """
         salt.utils.process.appendproctitle(self.__class__.__name__)
+        salt.utils.metrics.init(self.opts, self.__class__.__name__)
 
         # init things that need to be done after the process is forked
         self._post_fork_init()
@@ -242,7 +245,16 @@ class Maintenance(salt.utils.process.SignalHandlingProcess):
             self.handle_key_rotate(now)
             salt.utils.verify.check_max_open_files(self.opts)
             last = now
-            time.sleep(self.loop_interval)
+            # Run the scheduled jobs which are due before the next loop when
+            # they are due
+            deadline = time.time() + self.loop_interval
+            while True:
+                next_eval = self.schedule.time_to_next_eval()
+                if next_eval is None or time.time() + next_eval >= deadline:
+                    break
+                time.sleep(max(next_eval, 1))
+                self.handle_schedule()
+            time.sleep(max(deadline - time.time(), 0))
 
     def handle_key_cache(self):
         """
@@ -365,6 +377,7 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
         super().__init__(**kwargs)
         self.opts = opts
         self.update_threads = {}
+        self.watch_threads = {}
         # Avoid circular import
         import salt.fileserver
 
@@ -510,6 +523,19 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
             )
             self.update_threads[interval].start()
 
+        # Start the backends which keep their caches up to date from
+        # filesystem events
+        for backend in self.fileserver.backends():
+            fstr = "{}.watch".format(backend)
+            if fstr not in self.fileserver.servers:
+                continue
+            log.debug("Starting the watcher of the %s fileserver backend", backend)
+            self.watch_threads[backend] = threading.Thread(
+                target=self.fileserver.servers[fstr]
+            )
+            self.watch_threads[backend].daemon = True
+            self.watch_threads[backend].start()
+
         # Keep the process alive
         while True:
             time.sleep(60)
@@ -701,6 +727,16 @@ class Master(SMaster):
             log.info("Creating master process manager")
             # Since there are children having their own ProcessManager we should wait for kill more time.
             self.process_manager = salt.utils.process.ProcessManager(wait_for_kill=5)
+            if self.opts["master_metrics"]:
+                log.info("Creating master metrics process")
+                metrics_dir = salt.utils.metrics.metrics_dir(self.opts)
+                # Drop the metrics of the previous run of the master
+                salt.utils.files.rm_rf(metrics_dir)
+                os.makedirs(metrics_dir, 0o700)
+                self.process_manager.add_process(
+                    salt.utils.metrics.MetricsServer, args=(self.opts,)
+                )
+
             pub_channels = []
             log.info("Creating master publisher process")
             log_queue = salt.log.setup.get_multiprocessing_logging_queue()
@@ -958,6 +994,24 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
     salt master.
     """
 
+    # The AES commands which can keep the worker busy for a while, they run in
+    # a thread pool when worker_pool_threads is set so that the worker keeps
+    # serving the other requests in the meantime
+    pool_methods = (
+        "_pillar",
+        "_master_tops",
+        "_ext_nodes",
+        "_file_recv",
+        "_mine",
+        "_mine_get",
+        "_mine_delete",
+        "_mine_flush",
+        "minion_runner",
+        "minion_pub",
+        "minion_publish",
+        "pub_ret",
+    )
+
     def __init__(self, opts, mkey, key, req_channels, name, **kwargs):
         """
         Create a salt master worker process
@@ -980,6 +1034,9 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         self.k_mtime = 0
         self.stats = collections.defaultdict(lambda: {"mean": 0, "runs": 0})
         self.stat_clock = time.time()
+        self.executor = None
+        self._pool_funcs = []
+        self._pool_local = threading.local()
 
     # We need __setstate__ and __getstate__ to also pickle 'SMaster.secrets'.
     # Otherwise, 'SMaster.secrets' won't be copied over to the spawned process
@@ -996,6 +1053,9 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         self.key = state["key"]
         self.k_mtime = state["k_mtime"]
         SMaster.secrets = state["secrets"]
+        self.executor = None
+        self._pool_funcs = []
+        self._pool_local = threading.local()
 
     def __getstate__(self):
         return {
@@ -1013,6 +1073,10 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         for channel in getattr(self, "req_channels", ()):
             channel.close()
         self.clear_funcs.destroy()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            for aes_funcs in self._pool_funcs:
+                aes_funcs.destroy()
         super()._handle_signals(signum, sigframe)
 
     def __bind(self):
@@ -1023,6 +1087,10 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         install_zmq()
         self.io_loop = ZMQDefaultLoop()
         self.io_loop.make_current()
+        if self.opts["worker_pool_threads"] > 0:
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.opts["worker_pool_threads"]
+            )
         for req_channel in self.req_channels:
             req_channel.post_fork(
                 self._handle_payload, io_loop=self.io_loop
@@ -1057,7 +1125,26 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         """
         key = payload["enc"]
         load = payload["load"]
-        ret = {"aes": self._handle_aes, "clear": self._handle_clear}[key](load)
+        start = time.time()
+        salt.utils.metrics.add_gauge("salt_master_requests_in_progress", 1)
+        try:
+            if key == "aes":
+                ret = yield self._handle_aes(load)
+            else:
+                ret = self._handle_clear(load)
+        finally:
+            salt.utils.metrics.add_gauge("salt_master_requests_in_progress", -1)
+        cmd = load.get("cmd")
+        funcs = self.aes_funcs if key == "aes" else self.clear_funcs
+        if cmd not in funcs.expose_methods:
+            # Do not make a label of whatever a minion sent
+            cmd = "unknown"
+        salt.utils.metrics.observe(
+            "salt_master_request_duration_seconds",
+            time.time() - start,
+            cmd=cmd,
+            enc=key,
+        )
         raise salt.ext.tornado.gen.Return(ret)
 
     def _post_stats(self, start, cmd):
@@ -1103,6 +1190,36 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
             self._post_stats(start, cmd)
         return ret
 
+    def _runs_in_pool(self, cmd):
+        """
+        Return whether the AES command ``cmd`` runs in the thread pool of the
+        worker instead of on its IOLoop
+        """
+        if self.executor is None:
+            return False
+        if cmd in ("_return", "_syndic_return"):
+            # Returns are cheap to store in the local job cache, but can take
+            # a while to write to an external job cache
+            return bool(
+                self.opts["ext_job_cache"]
+                or self.opts["master_job_cache"] != "local_cache"
+            )
+        return cmd in self.pool_methods
+
+    def _run_pooled(self, data):
+        """
+        Run an AES command in a thread of the pool. Each thread has its own
+        AESFuncs, so that the commands running at the same time do not share
+        their event bus connection or loaders.
+        """
+        aes_funcs = getattr(self._pool_local, "aes_funcs", None)
+        if aes_funcs is None:
+            aes_funcs = self._pool_local.aes_funcs = AESFuncs(self.opts)
+            self._pool_funcs.append(aes_funcs)
+        with RequestContext({"data": data, "opts": self.opts}):
+            return aes_funcs.run_func(data["cmd"], data)
+
+    @salt.ext.tornado.gen.coroutine
     def _handle_aes(self, data):
         """
         Process a command sent via an AES key
@@ -1113,27 +1230,27 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         """
         if "cmd" not in data:
             log.error("Received malformed command %s", data)
-            return {}
+            raise salt.ext.tornado.gen.Return({})
         cmd = data["cmd"]
         log.trace("AES payload received with command %s", data["cmd"])
         method = self.aes_funcs.get_method(cmd)
         if not method:
-            return {}, {"fun": "send"}
+            raise salt.ext.tornado.gen.Return(({}, {"fun": "send"}))
         if self.opts["master_stats"]:
             start = time.time()
             self.stats[cmd]["runs"] += 1
 
-        def run_func(data):
-            return self.aes_funcs.run_func(data["cmd"], data)
-
-        with StackContext(
-            functools.partial(RequestContext, {"data": data, "opts": self.opts})
-        ):
-            ret = run_func(data)
+        if self._runs_in_pool(cmd):
+            ret = yield self.executor.submit(self._run_pooled, data)
+        else:
+            with StackContext(
+                functools.partial(RequestContext, {"data": data, "opts": self.opts})
+            ):
+                ret = self.aes_funcs.run_func(cmd, data)
 
         if self.opts["master_stats"]:
             self._post_stats(start, cmd)
-        return ret
+        raise salt.ext.tornado.gen.Return(ret)
 
     def run(self):
         """
@@ -1170,6 +1287,7 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         self.clear_funcs = ClearFuncs(self.opts, self.key,)
         self.aes_funcs = AESFuncs(self.opts)
         salt.utils.crypt.reinit_crypto()
+        salt.utils.metrics.init(self.opts, self.name)
         self.__bind()
 
 
@@ -1222,9 +1340,11 @@ class AESFuncs(TransportMethods):
         "minion_publish",
         "revoke_auth",
         "_serve_file",
+        "_serve_files",
         "_file_find",
         "_file_hash",
         "_file_hash_and_stat",
+        "_file_hash_many",
         "_file_list",
         "_file_list_emptydirs",
         "_dir_list",
@@ -1265,9 +1385,11 @@ class AESFuncs(TransportMethods):
 
         self.fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = self.fs_.serve_file
+        self._serve_files = self.fs_.serve_files
         self._file_find = self.fs_._find_file
         self._file_hash = self.fs_.file_hash
         self._file_hash_and_stat = self.fs_.file_hash_and_stat
+        self._file_hash_many = self.fs_.file_hash_many
         self._file_list = self.fs_.file_list
         self._file_list_emptydirs = self.fs_.file_list_emptydirs
         self._dir_list = self.fs_.dir_list
@@ -1617,10 +1739,27 @@ class AESFuncs(TransportMethods):
         :rtype: dict
         :return: The pillar data for the minion
         """
-        if any(key not in load for key in ("id", "grains")):
+        if "id" not in load:
             return False
         if not salt.utils.verify.valid_id(self.opts, load["id"]):
             return False
+        if "grains" not in load and "grains_changes" in load:
+            # The minion only sent the grains which changed since its last
+            # pillar request, a False return makes it send all of them
+            if not self.opts.get("minion_data_cache", False):
+                return False
+            data = self.masterapi.cache.fetch("minions/{}".format(load["id"]), "data")
+            grains = salt.pillar.apply_grains_changes(
+                load["id"], (data or {}).get("grains"), load["grains_changes"]
+            )
+            if grains is None:
+                log.debug(
+                    "Could not rebuild the grains of %s from their changes", load["id"]
+                )
+                return False
+            load["grains"] = grains
+        if "grains" not in load:
+            return False
         load["grains"]["id"] = load["id"]
 
         pillar = salt.pillar.get_pillar(
@@ -1641,6 +1780,9 @@ class AESFuncs(TransportMethods):
                 "data",
                 {"grains": load["grains"], "pillar": data},
             )
+            self.ckminions.update_minion_data_index(
+                load["id"], {"grains": load["grains"], "pillar": data}
+            )
             if self.opts.get("minion_data_cache_events") is True:
                 self.event.fire_event(
                     {"Minion data cache refresh": load["id"]},
@@ -31,6 +31,7 @@ import salt.ext.tornado
 import salt.ext.tornado.gen
 import salt.ext.tornado.ioloop
 import salt.loader
+import salt.loader_index
 import salt.log.setup
 import salt.payload
 import salt.pillar
@@ -1026,6 +1027,9 @@ class MinionManager(MinionBase):
         self.max_auth_wait = self.opts["acceptance_wait_time_max"]
         self.minions = []
         self.jid_queue = []
+        # The __virtual__ results of the loader index may be outdated by the
+        # software installed since the minion last ran
+        salt.loader_index.clear(self.opts)
 
         install_zmq()
         self.io_loop = ZMQDefaultLoop.current()
@@ -2658,6 +2662,7 @@ class Minion(MinionBase):
 
         log.debug("Minion of '%s' is handling event tag '%s'", self.opts["master"], tag)
         if tag.startswith("module_refresh"):
+            salt.loader_index.clear(_minion.opts)
             _minion.module_refresh(
                 force_refresh=data.get("force_refresh", False),
                 notify=data.get("notify", False),
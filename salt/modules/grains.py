@@ -19,6 +19,7 @@ import random
 from collections.abc import Mapping
 from functools import reduce  # pylint: disable=redefined-builtin
 
+import salt.loader
 import salt.utils.compat
 import salt.utils.data
 import salt.utils.files
@@ -800,5 +801,25 @@ def equals(key, value):
     return str(value) == str(get(key))
 
 
+def timings():
+    """
+    Return the time in seconds each grains function took the last time the
+    grains were loaded, slowest first. The grains functions given up after
+    :conf_minion:`grains_timeout` are flagged with ``timeout``.
+
+    .. versionadded:: 3003
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' grains.timings
+    """
+    ret = salt.loader.grains_timings(__opts__)
+    return collections.OrderedDict(
+        sorted(ret.items(), key=lambda item: item[1]["duration"], reverse=True)
+    )
+
+
 # Provide a jinja function call compatible get aliased as fetch
 fetch = get
@@ -21,6 +21,7 @@ import salt.client
 import salt.client.ssh.client
 import salt.config
 import salt.defaults.events
+import salt.loader_index
 import salt.payload
 import salt.runner
 import salt.state
@@ -111,15 +112,15 @@ def _sync(form, saltenv=None, extmod_whitelist=None, extmod_blacklist=None):
         mod_file = os.path.join(__opts__["cachedir"], "module_refresh")
         with salt.utils.files.fopen(mod_file, "a"):
             pass
-    if (
-        form == "grains"
-        and __opts__.get("grains_cache")
-        and os.path.isfile(os.path.join(__opts__["cachedir"], "grains.cache.p"))
-    ):
-        try:
-            os.remove(os.path.join(__opts__["cachedir"], "grains.cache.p"))
-        except OSError:
-            log.error("Could not remove grains cache!")
+    if form == "grains" and __opts__.get("grains_cache"):
+        for cache_file in ("grains.cache.p", "grains.functions.p"):
+            cache_path = os.path.join(__opts__["cachedir"], cache_file)
+            if not os.path.isfile(cache_path):
+                continue
+            try:
+                os.remove(cache_path)
+            except OSError:
+                log.error("Could not remove grains cache!")
     return ret
 
 
@@ -1179,6 +1180,7 @@ def refresh_modules(**kwargs):
         salt '*' saltutil.refresh_modules
     """
     asynchronous = bool(kwargs.get("async", True))
+    salt.loader_index.clear(__opts__)
     try:
         if asynchronous:
             ret = __salt__["event.fire"]({}, "module_refresh")
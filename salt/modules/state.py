@@ -23,6 +23,7 @@ import salt.defaults.exitcodes
 import salt.payload
 import salt.state
 import salt.utils.args
+import salt.utils.compile_cache
 import salt.utils.data
 import salt.utils.event
 import salt.utils.files
@@ -2204,6 +2205,30 @@ def clear_cache():
                 continue
             os.remove(path)
             ret.append(fn_)
+    if salt.utils.compile_cache.clear(__opts__):
+        ret.append(os.path.basename(salt.utils.compile_cache.cache_dir(__opts__)))
+    return ret
+
+
+def show_compile_cache_stats():
+    """
+    .. versionadded:: 3003
+
+    Return how often the states compiled from the SLS files could be reused
+    from the cache enabled by :conf_minion:`state_compile_cache`: the number
+    of ``hits``, the number of ``misses`` when the states had never been
+    compiled for the current pillar and grains, the number of ``stale``
+    entries for which some of the files changed, the ``hit_rate`` as a
+    percentage, and the number of compiled highstates in the cache.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' state.show_compile_cache_stats
+    """
+    ret = salt.utils.compile_cache.CompileCache(__opts__).stats()
+    ret["enabled"] = bool(__opts__.get("state_compile_cache"))
     return ret
 
 
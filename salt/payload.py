@@ -59,6 +59,46 @@ def format_payload(enc, **kwargs):
     return package(payload)
 
 
+# Messages at least this large are unpacked with the garbage collector disabled
+_GC_THRESHOLD = 65536
+
+# msgpack decodes the strings itself starting in 0.5.2
+_FAST_DECODE = salt.utils.msgpack.version >= (0, 5, 2)
+
+
+def _ext_type_decoder(code, data):
+    if code == 78:
+        data = salt.utils.stringutils.to_unicode(data)
+        return datetime.datetime.strptime(data, "%Y%m%dT%H:%M:%S.%f")
+    return data
+
+
+def _decoded_ext_type_decoder(code, data):
+    data = _ext_type_decoder(code, data)
+    if isinstance(data, bytes):
+        try:
+            return data.decode()
+        except UnicodeError:
+            pass
+    return data
+
+
+def _loads_decoded(msg):
+    """
+    Unpack ``msg`` letting msgpack decode the strings, which gives the same
+    result as unpacking it as raw bytes and passing the result to
+    :py:func:`salt.transport.frame.decode_embedded_strs` without walking the
+    unpacked data again. Raises ``UnicodeDecodeError`` if some of the strings
+    are not valid UTF-8.
+
+    Salt does not use the msgpack bin type on the wire, values of that type
+    are left as bytes like when unpacking with ``encoding="utf-8"``.
+    """
+    return salt.utils.msgpack.unpackb(
+        msg, use_list=True, ext_hook=_decoded_ext_type_decoder, raw=False
+    )
+
+
 class Serial:
     """
     Create a serialization object, this object manages all message
@@ -90,16 +130,20 @@ class Serial:
                          set as. In this case, it will fail if any of
                          the contents cannot be converted.
         """
+        # Unpacking large messages allocates many objects, do not let the
+        # garbage collector walk them over and over again
+        disable_gc = len(msg) >= _GC_THRESHOLD and gc.isenabled()
         try:
-
-            def ext_type_decoder(code, data):
-                if code == 78:
-                    data = salt.utils.stringutils.to_unicode(data)
-                    return datetime.datetime.strptime(data, "%Y%m%dT%H:%M:%S.%f")
-                return data
-
-            gc.disable()  # performance optimization for msgpack
-            loads_kwargs = {"use_list": True, "ext_hook": ext_type_decoder}
+            if disable_gc:
+                gc.disable()  # performance optimization for msgpack
+            if encoding is None and not raw and _FAST_DECODE:
+                try:
+                    return _loads_decoded(msg)
+                except UnicodeDecodeError:
+                    # Some of the strings are binary data, which the walk
+                    # below keeps as bytes
+                    pass
+            loads_kwargs = {"use_list": True, "ext_hook": _ext_type_decoder}
             if salt.utils.msgpack.version >= (0, 4, 0):
                 # msgpack only supports 'encoding' starting in 0.4.0.
                 # Due to this, if we don't need it, don't pass it at all so
@@ -140,7 +184,8 @@ class Serial:
                 exc,
             )
         finally:
-            gc.enable()
+            if disable_gc:
+                gc.enable()
         return ret
 
     def load(self, fn_):
@@ -4,12 +4,14 @@ Render the pillar data
 
 
 import collections
+import contextlib
 import copy
 import fnmatch
 import inspect
 import logging
 import os
-import sys
+import threading
+import time
 import traceback
 
 import salt.ext.tornado.gen
@@ -18,11 +20,16 @@ import salt.loader
 import salt.minion
 import salt.transport.client
 import salt.utils.args
+import salt.utils.boundedcall
 import salt.utils.cache
 import salt.utils.crypt
 import salt.utils.data
 import salt.utils.dictupdate
+import salt.utils.hashutils
+import salt.utils.json
+import salt.utils.metrics
 import salt.utils.url
+from salt.defaults import DEFAULT_TARGET_DELIM
 from salt.exceptions import SaltClientError
 from salt.ext import six
 from salt.template import compile_template
@@ -36,6 +43,48 @@ from salt.version import __version__
 
 log = logging.getLogger(__name__)
 
+# The grains last sent to each master in a pillar request, and the masters
+# which could not rebuild the grains from their changes, when
+# grains_push_changes is enabled
+_SENT_GRAINS = {}
+_FULL_GRAINS = set()
+
+
+def grains_hash(minion_id, grains):
+    """
+    Return a digest of the grains of a minion, as the master stores them, or
+    None if they cannot be hashed
+
+    .. versionadded:: 3003
+    """
+    try:
+        data = salt.utils.json.dumps(
+            dict(grains, id=minion_id), sort_keys=True, default=str
+        )
+    except (TypeError, ValueError):
+        return None
+    return salt.utils.hashutils.sha256_digest(data)
+
+
+def apply_grains_changes(minion_id, grains, changes):
+    """
+    Return the grains of a minion rebuilt from the grains the master stored
+    for it and the changes sent by the minion in a pillar request, or None if
+    they do not match the grains of the minion
+
+    .. versionadded:: 3003
+    """
+    if not isinstance(grains, dict) or not isinstance(changes, dict):
+        return None
+    ret = dict(grains)
+    for key in changes.get("removed", []):
+        ret.pop(key, None)
+    ret.update(changes.get("changed", {}))
+    ret["id"] = minion_id
+    if grains_hash(minion_id, ret) != changes.get("hash"):
+        return None
+    return ret
+
 
 def get_pillar(
     opts,
@@ -179,6 +228,53 @@ class RemotePillarMixin:
         log.trace("ext_pillar_extra_data = %s", extra_data)
         return extra_data
 
+    def _grains_key(self):
+        return (self.opts.get("master_uri"), self.minion_id)
+
+    def _send_grains_changes(self, load):
+        """
+        Replace the grains in the load of a pillar request with the grains
+        which changed since the last request sent to the master, when
+        grains_push_changes is enabled
+        """
+        if not self.opts.get("grains_push_changes", False):
+            return
+        key = self._grains_key()
+        last = _SENT_GRAINS.get(key)
+        if last is None or key in _FULL_GRAINS:
+            return
+        digest = grains_hash(self.minion_id, self.grains)
+        if digest is None:
+            return
+        del load["grains"]
+        load["grains_changes"] = {
+            "changed": {
+                name: value
+                for name, value in self.grains.items()
+                if name not in last or last[name] != value
+            },
+            "removed": [name for name in last if name not in self.grains],
+            "hash": digest,
+        }
+
+    def _send_full_grains(self, load):
+        """
+        Put back the grains in the load of a pillar request the master could
+        not rebuild the grains of the minion for, it is sent all the grains
+        from now on
+        """
+        log.debug(
+            "The master could not rebuild the grains from their changes, "
+            "sending all the grains"
+        )
+        _FULL_GRAINS.add(self._grains_key())
+        del load["grains_changes"]
+        load["grains"] = self.grains
+
+    def _grains_sent(self, ret_pillar):
+        if self.opts.get("grains_push_changes", False) and isinstance(ret_pillar, dict):
+            _SENT_GRAINS[self._grains_key()] = copy.deepcopy(self.grains)
+
 
 class AsyncRemotePillar(RemotePillarMixin):
     """
@@ -238,13 +334,20 @@ class AsyncRemotePillar(RemotePillarMixin):
         }
         if self.ext:
             load["ext"] = self.ext
+        self._send_grains_changes(load)
         try:
             ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
                 load, dictkey="pillar",
             )
+            if ret_pillar is False and "grains_changes" in load:
+                self._send_full_grains(load)
+                ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
+                    load, dictkey="pillar",
+                )
         except Exception:  # pylint: disable=broad-except
             log.exception("Exception getting pillar:")
             raise SaltClientError("Exception getting pillar.")
+        self._grains_sent(ret_pillar)
 
         if not isinstance(ret_pillar, dict):
             msg = (
@@ -326,9 +429,16 @@ class RemotePillar(RemotePillarMixin):
         }
         if self.ext:
             load["ext"] = self.ext
+        self._send_grains_changes(load)
         ret_pillar = self.channel.crypted_transfer_decode_dictentry(
             load, dictkey="pillar",
         )
+        if ret_pillar is False and "grains_changes" in load:
+            self._send_full_grains(load)
+            ret_pillar = self.channel.crypted_transfer_decode_dictentry(
+                load, dictkey="pillar",
+            )
+        self._grains_sent(ret_pillar)
 
         if not isinstance(ret_pillar, dict):
             log.error(
@@ -353,6 +463,190 @@ class RemotePillar(RemotePillarMixin):
     # pylint: enable=W1701
 
 
+# The tops recorded by _record_dependencies in each thread
+_TOP_RECORDING = threading.local()
+
+# The options a compiled pillar depends on
+_PILLAR_CACHE_OPTS = (
+    "pillar_roots",
+    "ext_pillar",
+    "ext_pillar_first",
+    "exclude_ext_pillar",
+    "on_demand_ext_pillar",
+    "pillar_source_merging_strategy",
+    "pillar_merge_lists",
+    "pillar_includes_override_sls",
+    "pillar_opts",
+    "renderer",
+    "decrypt_pillar",
+    "nodegroups",
+    "state_top",
+    "top_file_merging_strategy",
+    "env_order",
+    "default_top",
+)
+
+# The grains the ipcidr matcher matches on
+_IPCIDR_GRAINS = ("ipv4", "ipv6")
+
+
+def _top_recorders():
+    return _TOP_RECORDING.__dict__.setdefault("recorders", [])
+
+
+@contextlib.contextmanager
+def _record_dependencies():
+    """
+    Record the tops matched by the pillars and the pillar files looked up in
+    the block by the current thread
+    """
+    tops = []
+    recorders = _top_recorders()
+    recorders.append(tops)
+    try:
+        with salt.fileclient.PillarClient.record_lookups() as lookups:
+            yield tops, lookups
+    finally:
+        recorders[:] = [rec for rec in recorders if rec is not tops]
+
+
+def _hash_data(data):
+    try:
+        return salt.utils.hashutils.sha256_digest(
+            salt.utils.json.dumps(data, sort_keys=True, default=str)
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def _target_grains(opts, tgt, match, names, depth=0):
+    """
+    Add the names of the grains the target ``tgt`` of a top file matches on
+    with the ``match`` matcher to ``names``. Return False if they cannot be
+    told.
+    """
+    if depth > 10:
+        return False
+    if match in ("glob", "pcre", "list", "range") or match.startswith("pillar"):
+        return True
+    if match in ("grain", "grain_pcre"):
+        names.add(str(tgt).split(DEFAULT_TARGET_DELIM)[0])
+        return True
+    if match == "ipcidr":
+        names.update(_IPCIDR_GRAINS)
+        return True
+    if match == "nodegroup":
+        nodegroup = opts.get("nodegroups", {}).get(tgt)
+        if nodegroup is None:
+            return True
+        if isinstance(nodegroup, list):
+            nodegroup = " ".join(str(word) for word in nodegroup)
+        return _target_grains(opts, nodegroup, "compound", names, depth + 1)
+    if match != "compound":
+        return False
+    for word in str(tgt).split():
+        word = word.strip("()")
+        if len(word) < 2 or word[1] != "@":
+            # Boolean operators and globs on the minion id
+            continue
+        engine, value = word[0], word[2:]
+        if engine in ("G", "P"):
+            names.add(value.split(DEFAULT_TARGET_DELIM)[0])
+        elif engine == "S":
+            names.update(_IPCIDR_GRAINS)
+        elif engine == "N":
+            if not _target_grains(opts, value, "nodegroup", names, depth + 1):
+                return False
+        elif engine not in ("I", "J", "L", "E", "R"):
+            return False
+    return True
+
+
+def _top_grains(opts, tops):
+    """
+    Return the names of the grains the targets of the pillar top files match
+    on, or None if they cannot be told
+    """
+    names = set()
+    for top in tops:
+        for body in top.values():
+            for tgt, data in body.items():
+                match = "compound"
+                for item in data:
+                    if isinstance(item, dict) and "match" in item:
+                        match = item["match"]
+                if not _target_grains(opts, tgt, match, names):
+                    return None
+    return names
+
+
+def _find_pillar_file(roots, path):
+    for root in roots:
+        full = os.path.join(root, path)
+        if os.path.isfile(full):
+            return full
+    return ""
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class _ExtPillarCall(salt.utils.boundedcall.BoundedCall):
+    """
+    A call of an ext_pillar source, run on a thread of the ext_pillar pool
+    when started with a semaphore
+    """
+
+    def __init__(self, func, key, val):
+        super().__init__(func)
+        self.key = key
+        self.val = val
+        self.recording = False
+        self.tops = []
+        self.lookups = {"files": set(), "dirs": set()}
+
+    def start(self, pillar, slots=None):  # pylint: disable=arguments-differ
+        self.args = (pillar, self.val, self.key)
+        # The dependencies of the pillar are recorded per thread, a call run
+        # on a thread of the pool records its own, see record()
+        self.recording = slots is not None and bool(_top_recorders())
+        super().start(slots, "ext_pillar-{}".format(self.key))
+
+    def run(self):
+        if not self.recording:
+            super().run()
+            return
+        with _record_dependencies() as (tops, lookups):
+            self.tops, self.lookups = tops, lookups
+            super().run()
+
+    def record(self):
+        """
+        Add the dependencies recorded by the thread of the call to the ones
+        recorded by the current thread, once the call returned
+        """
+        if not self.recording:
+            return
+        for tops in _top_recorders():
+            tops.extend(self.tops)
+        salt.fileclient.PillarClient.add_lookups(self.lookups)
+
+    def finished(self):
+        salt.utils.metrics.observe(
+            "salt_ext_pillar_duration_seconds", self.duration, ext_pillar=self.key
+        )
+
+    def wait(self, timeout=None):
+        if super().wait(timeout):
+            return True
+        salt.utils.metrics.inc("salt_ext_pillar_timeouts_total", ext_pillar=self.key)
+        return False
+
+
 class PillarCache:
     """
     Return a cached pillar if it exists, otherwise cache it.
@@ -392,6 +686,8 @@ class PillarCache:
         self.functions = functions
         self.pillar_override = pillar_override
         self.pillarenv = pillarenv
+        # What the pillar compiled by fetch_pillar depends on
+        self.dependencies = None
 
         if saltenv is None:
             self.saltenv = "base"
@@ -419,17 +715,191 @@ class PillarCache:
         a new pillar.
         """
         log.debug("Pillar cache getting external pillar with ext: %s", self.ext)
-        fresh_pillar = Pillar(
-            self.opts,
-            self.grains,
-            self.minion_id,
-            self.saltenv,
-            ext=self.ext,
-            functions=self.functions,
-            pillar_override=self.pillar_override,
-            pillarenv=self.pillarenv,
+        if not self.opts.get("pillar_cache_dependencies", False):
+            fresh_pillar = Pillar(
+                self.opts,
+                self.grains,
+                self.minion_id,
+                self.saltenv,
+                ext=self.ext,
+                functions=self.functions,
+                pillar_override=self.pillar_override,
+                pillarenv=self.pillarenv,
+            )
+            return fresh_pillar.compile_pillar()
+        start = time.time()
+        revisions = self._ext_pillar_revisions()
+        with _record_dependencies() as (tops, lookups):
+            fresh_pillar = Pillar(
+                self.opts,
+                self.grains,
+                self.minion_id,
+                self.saltenv,
+                ext=self.ext,
+                functions=self.functions,
+                pillar_override=self.pillar_override,
+                pillarenv=self.pillarenv,
+            )
+            ret = fresh_pillar.compile_pillar()
+        self.dependencies = self._dependencies(start, revisions, tops, lookups)
+        return ret
+
+    def _dependencies_key(self):
+        # Minion IDs cannot hold a slash
+        return "{}/dependencies".format(self.minion_id)
+
+    def _request_hash(self):
+        return _hash_data(
+            [self.saltenv, self.pillarenv, self.pillar_override or {}, self.ext]
         )
-        return fresh_pillar.compile_pillar()
+
+    def _config_hash(self):
+        return _hash_data([self.opts.get(key) for key in _PILLAR_CACHE_OPTS])
+
+    def _grains_hash(self, names):
+        """
+        Return a digest of the grains a pillar depends on, the grains in
+        ``names`` and the ones matching pillar_cache_grains, all of them when
+        either is None
+        """
+        patterns = self.opts.get("pillar_cache_grains")
+        grains = self.grains or {}
+        if names is not None and patterns is not None:
+            grains = {
+                name: value
+                for name, value in grains.items()
+                if name in names
+                or any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+            }
+        return _hash_data(grains)
+
+    def _ext_pillar_revisions(self):
+        """
+        Return the revision of the data of each ext_pillar source, as returned
+        by the ``revision`` function of its module, or None when one of them
+        cannot tell
+        """
+        ext_pillar = self.opts.get("ext_pillar") or []
+        if not ext_pillar:
+            return []
+        if self.ext or not isinstance(ext_pillar, list):
+            return None
+        opts = dict(self.opts, saltenv=self.saltenv, pillarenv=self.pillarenv)
+        loader = salt.loader.pillars(opts, self.functions or {})._dict
+        revisions = []
+        for run in ext_pillar:
+            if not isinstance(run, dict):
+                return None
+            if next(iter(run.keys())) in self.opts.get("exclude_ext_pillar", []):
+                continue
+            for key, val in run.items():
+                func = "{}.revision".format(key)
+                if func not in loader:
+                    return None
+                try:
+                    if isinstance(val, dict):
+                        revision = loader[func](self.minion_id, **val)
+                    elif isinstance(val, list):
+                        revision = loader[func](self.minion_id, *val)
+                    else:
+                        revision = loader[func](self.minion_id, val)
+                except Exception as exc:  # pylint: disable=broad-except
+                    log.error(
+                        "Unable to get the revision of ext_pillar %s: %s", key, exc
+                    )
+                    return None
+                if revision is None:
+                    return None
+                revisions.append([key, revision])
+        return revisions
+
+    def _dependencies(self, start, revisions, tops, lookups):
+        """
+        Return what a pillar compiled from ``start`` on depended on, or None
+        if one of its pillar files changed since then
+        """
+        files = []
+        for roots, path in lookups["files"]:
+            found = _find_pillar_file(roots, path)
+            if not found:
+                files.append([list(roots), path, "", None, None, None])
+                continue
+            try:
+                stat = os.stat(found)
+                digest = salt.utils.hashutils.get_hash(found)
+            except OSError:
+                return None
+            if stat.st_mtime_ns >= start * 1e9:
+                return None
+            files.append(
+                [list(roots), path, found, stat.st_mtime_ns, stat.st_size, digest]
+            )
+        dirs = []
+        for path in lookups["dirs"]:
+            mtime = _mtime(path)
+            if mtime is not None and mtime >= start * 1e9:
+                return None
+            dirs.append([path, mtime])
+        names = _top_grains(self.opts, tops)
+        return {
+            "request": self._request_hash(),
+            "config": self._config_hash(),
+            "ext_pillar": None if revisions is None else _hash_data(revisions),
+            "grains": {
+                "names": None if names is None else sorted(names),
+                "hash": self._grains_hash(names),
+            },
+            "files": files,
+            "dirs": dirs,
+        }
+
+    def _changed(self):
+        """
+        Return why the pillar cached for the minion is outdated, or None if it
+        is not. The pillar of an ext_pillar source which cannot tell the
+        revision of its data only expires after pillar_cache_ttl.
+        """
+        if not self.opts.get("pillar_cache_dependencies", False):
+            return None
+        key = self._dependencies_key()
+        deps = (self.cache[key] if key in self.cache else {}).get(self.pillarenv)
+        if deps is None:
+            return "unknown dependencies"
+        if deps["request"] != self._request_hash():
+            return "request"
+        if deps["config"] != self._config_hash():
+            return "configuration"
+        names = deps["grains"]["names"]
+        if deps["grains"]["hash"] != self._grains_hash(names):
+            return "grains"
+        for path, mtime in deps["dirs"]:
+            if _mtime(path) != mtime:
+                return "pillar directory {}".format(path)
+        for roots, path, found, mtime, size, digest in deps["files"]:
+            if _find_pillar_file(roots, path) != found:
+                return "pillar file {}".format(path)
+            if not found:
+                continue
+            try:
+                stat = os.stat(found)
+                if (stat.st_mtime_ns, stat.st_size) != (mtime, size):
+                    if salt.utils.hashutils.get_hash(found) != digest:
+                        return "pillar file {}".format(found)
+            except OSError:
+                return "pillar file {}".format(found)
+        if deps["ext_pillar"] is not None:
+            revisions = self._ext_pillar_revisions()
+            if revisions is None or _hash_data(revisions) != deps["ext_pillar"]:
+                return "ext_pillar revision"
+        return None
+
+    def _store_dependencies(self):
+        if self.dependencies is None:
+            return
+        key = self._dependencies_key()
+        deps = self.cache[key] if key in self.cache else {}
+        deps[self.pillarenv] = self.dependencies
+        self.cache[key] = deps
 
     def clear_pillar(self):
         """
@@ -453,8 +923,18 @@ class PillarCache:
         log.debug("Scanning cache: %s", cache_dict)
         # Check the cache!
         if self.minion_id in self.cache:  # Keyed by minion_id
-            # TODO Compare grains, etc?
+            changed = None
             if self.pillarenv in self.cache[self.minion_id]:
+                changed = self._changed()
+                if changed is not None:
+                    log.debug(
+                        "Pillar cache for minion %s and pillarenv %s is outdated: "
+                        "its %s changed",
+                        self.minion_id,
+                        self.pillarenv,
+                        changed,
+                    )
+            if self.pillarenv in self.cache[self.minion_id] and changed is None:
                 # We have a cache hit! Send it back.
                 log.debug(
                     "Pillar cache hit for minion %s and pillarenv %s",
@@ -469,6 +949,7 @@ class PillarCache:
                 minion_cache = self.cache[self.minion_id]
                 minion_cache[self.pillarenv] = fresh_pillar
                 self.cache[self.minion_id] = minion_cache
+                self._store_dependencies()
 
                 log.debug(
                     "Pillar cache miss for pillarenv %s for minion %s",
@@ -480,6 +961,7 @@ class PillarCache:
             # We haven't seen this minion yet in the cache. Store it.
             fresh_pillar = self.fetch_pillar()
             self.cache[self.minion_id] = {self.pillarenv: fresh_pillar}
+            self._store_dependencies()
             log.debug("Pillar cache miss for minion %s", self.minion_id)
             log.debug("Current pillar cache: %s", cache_dict)  # FIXME hack!
             return fresh_pillar
@@ -813,6 +1295,8 @@ class Pillar:
         matches = {}
         if reload:
             self.matchers = salt.loader.matchers(self.opts)
+        for tops in _top_recorders():
+            tops.append(top)
         for saltenv, body in top.items():
             if self.opts["pillarenv"]:
                 if saltenv != self.opts["pillarenv"]:
@@ -1134,6 +1618,7 @@ class Pillar:
                 self.opts.get("pillar_merge_lists", False),
             )
 
+        runs = []
         for run in self.opts["ext_pillar"]:
             if not isinstance(run, dict):
                 errors.append('The "ext_pillar" option is malformed')
@@ -1141,23 +1626,54 @@ class Pillar:
                 return {}, errors
             if next(iter(run.keys())) in self.opts.get("exclude_ext_pillar", []):
                 continue
+            calls = []
             for key, val in run.items():
                 if key not in self.ext_pillars:
                     log.critical(
                         "Specified ext_pillar interface %s is unavailable", key
                     )
                     continue
-                try:
-                    ext = self._external_pillar_data(pillar, val, key)
-                except Exception as exc:  # pylint: disable=broad-except
+                calls.append(_ExtPillarCall(self._external_pillar_data, key, val))
+            runs.append(calls)
+
+        # Call the ext_pillar sources on threads if enabled, each of them then
+        # gets the pillar as it was before the ext_pillar sources were called
+        # instead of the data of the ones before it. Their data is merged in
+        # the same order either way.
+        timeout = None
+        if self.opts.get("ext_pillar_pool_size", 0) > 0:
+            slots = threading.Semaphore(self.opts["ext_pillar_pool_size"])
+            timeout = self.opts.get("ext_pillar_timeout") or None
+            for calls in runs:
+                for call in calls:
+                    call.start(copy.deepcopy(pillar), slots)
+
+        for calls in runs:
+            for call in calls:
+                if not call.launched:
+                    call.start(pillar)
+                if not call.wait(timeout):
                     errors.append(
-                        "Failed to load ext_pillar {}: {}".format(key, exc.__str__(),)
+                        "ext_pillar {} timed out after {} seconds".format(
+                            call.key, timeout
+                        )
+                    )
+                    log.error(errors[-1])
+                    continue
+                call.record()
+                if call.exc_info is not None:
+                    errors.append(
+                        "Failed to load ext_pillar {}: {}".format(
+                            call.key, call.exc_info[1].__str__(),
+                        )
                     )
                     log.error(
                         "Exception caught loading ext_pillar '%s':\n%s",
-                        key,
-                        "".join(traceback.format_tb(sys.exc_info()[2])),
+                        call.key,
+                        "".join(traceback.format_tb(call.exc_info[2])),
                     )
+                    continue
+                ext = call.ret
             if ext:
                 pillar = merge(
                     pillar,
@@ -428,9 +428,10 @@ def __virtual__():
         return False
 
 
-def ext_pillar(minion_id, pillar, *repos):  # pylint: disable=unused-argument
+def _checkout(repos):
     """
-    Checkout the ext_pillar sources and compile the resulting pillar SLS
+    Checkout the ext_pillar sources, return the opts to compile them with and
+    the GitPillar object
     """
     opts = copy.deepcopy(__opts__)
     opts["pillar_roots"] = {}
@@ -447,6 +448,29 @@ def ext_pillar(minion_id, pillar, *repos):  # pylint: disable=unused-argument
         # we make the minion daemon able to run standalone.
         git_pillar.fetch_remotes()
     git_pillar.checkout()
+    return opts, git_pillar
+
+
+def revision(minion_id, *repos):  # pylint: disable=unused-argument
+    """
+    Checkout the ext_pillar sources and return the commit each of them is at,
+    used by the :conf_master:`pillar_cache` to tell whether the pillar it
+    holds is outdated. Return None if one of them is unknown.
+
+    .. versionadded:: 3003
+    """
+    git_pillar = _checkout(repos)[1]
+    ret = {repo.id: repo.get_head_sha() for repo in git_pillar.remotes}
+    if None in ret.values():
+        return None
+    return ret
+
+
+def ext_pillar(minion_id, pillar, *repos):  # pylint: disable=unused-argument
+    """
+    Checkout the ext_pillar sources and compile the resulting pillar SLS
+    """
+    opts, git_pillar = _checkout(repos)
     ret = {}
     merge_strategy = __opts__.get("pillar_source_merging_strategy", "smart")
     merge_lists = __opts__.get("pillar_merge_lists", False)
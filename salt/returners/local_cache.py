@@ -6,6 +6,7 @@ Return data to local job cache
 from __future__ import absolute_import, print_function, unicode_literals
 
 import bisect
+import datetime
 
 # Import python libs
 import errno
@@ -22,6 +23,7 @@ import salt.payload
 import salt.utils.atomicfile
 import salt.utils.files
 import salt.utils.jid
+import salt.utils.jid_index
 import salt.utils.minions
 import salt.utils.msgpack
 import salt.utils.stringutils
@@ -55,6 +57,74 @@ def _job_dir():
     return os.path.join(__opts__["cachedir"], "jobs")
 
 
+def _jid_dir(jid):
+    """
+    Return the directory of a job, in the directory of the hour it started
+    when :conf_master:`job_cache_buckets` is enabled, unless it was stored
+    before in the hashed layout
+    """
+    job_dir = _job_dir()
+    hash_type = __opts__["hash_type"]
+    if __opts__.get("job_cache_buckets"):
+        path = salt.utils.jid.jid_dir(jid, job_dir, hash_type, bucket=True)
+        if not os.path.isdir(path):
+            legacy = salt.utils.jid.jid_dir(jid, job_dir, hash_type)
+            if os.path.isdir(legacy):
+                return legacy
+        return path
+    return salt.utils.jid.jid_dir(jid, job_dir, hash_type)
+
+
+def _index():
+    """
+    Return the job cache index when :conf_master:`job_cache_index` is enabled
+    """
+    if not __opts__.get("job_cache_index"):
+        return None
+    return salt.utils.jid_index.JidIndex(__opts__)
+
+
+def _read_index():
+    """
+    Return the job cache index to list the jobs from, once the jobs already
+    in the cache were imported into it by :py:func:`clean_old_jobs`
+    """
+    index = _index()
+    if index is None or not index.imported():
+        return None
+    return index
+
+
+def _import_jobs():
+    """
+    Yield the jobs of the job cache to add to the index
+    """
+    job_dir = _job_dir()
+    if not os.path.isdir(job_dir):
+        return
+    for jid, job, t_path, final in _walk_through(job_dir):
+        yield jid, job, _read_minions(os.path.join(t_path, final))
+
+
+def _read_minions(jid_dir):
+    """
+    Return the set of minions targeted by the job of ``jid_dir``, including
+    the ones forwarded by syndic masters
+    """
+    serial = salt.payload.Serial(__opts__)
+    minions_cache = [os.path.join(jid_dir, MINIONS_P)]
+    minions_cache.extend(glob.glob(os.path.join(jid_dir, SYNDIC_MINIONS_P.format("*"))))
+    all_minions = set()
+    for minions_path in minions_cache:
+        log.debug("Reading minion list from %s", minions_path)
+        try:
+            with salt.utils.files.fopen(minions_path, "rb") as rfh:
+                all_minions.update(serial.load(rfh))
+        except IOError as exc:
+            salt.utils.files.process_read_exception(exc, minions_path)
+    return all_minions
+
+
 def _walk_through(job_dir):
     """
     Walk though the jid dir and look for jobs
@@ -107,7 +177,7 @@ def prep_jid(nocache=False, passed_jid=None, recurse_count=0):
     else:
         jid = passed_jid
 
-    jid_dir = salt.utils.jid.jid_dir(jid, _job_dir(), __opts__["hash_type"])
+    jid_dir = _jid_dir(jid)
 
     # Make sure we create the jid dir, otherwise someone else is using it,
     # meaning we need a new jid.
@@ -132,6 +202,14 @@ def prep_jid(nocache=False, passed_jid=None, recurse_count=0):
             passed_jid=jid, nocache=nocache, recurse_count=recurse_count + 1
         )
 
+    index = _index()
+    if index is not None:
+        # So that the job is expired with its partition even if it has no load
+        index.add(jid)
+    else:
+        # So that the index is rebuilt with this job when it is enabled again
+        salt.utils.jid_index.reset(__opts__)
+
     return jid
 
 
@@ -145,7 +223,7 @@ def returner(load):
     if load["jid"] == "req":
         load["jid"] = prep_jid(nocache=load.get("nocache", False))
 
-    jid_dir = salt.utils.jid.jid_dir(load["jid"], _job_dir(), __opts__["hash_type"])
+    jid_dir = _jid_dir(load["jid"])
     if os.path.exists(os.path.join(jid_dir, "nocache")):
         return
 
@@ -204,7 +282,7 @@ def save_load(jid, clear_load, minions=None, recurse_count=0):
         log.error(err)
         raise salt.exceptions.SaltCacheError(err)
 
-    jid_dir = salt.utils.jid.jid_dir(jid, _job_dir(), __opts__["hash_type"])
+    jid_dir = _jid_dir(jid)
 
     serial = salt.payload.Serial(__opts__)
 
@@ -241,6 +319,10 @@ def save_load(jid, clear_load, minions=None, recurse_count=0):
         # save the minions to a cache so we can see in the UI
         save_minions(jid, minions)
 
+    index = _index()
+    if index is not None:
+        index.add(jid, clear_load, minions)
+
 
 def save_minions(jid, minions, syndic_id=None):
     """
@@ -257,7 +339,7 @@ def save_minions(jid, minions, syndic_id=None):
     )
     serial = salt.payload.Serial(__opts__)
 
-    jid_dir = salt.utils.jid.jid_dir(jid, _job_dir(), __opts__["hash_type"])
+    jid_dir = _jid_dir(jid)
 
     try:
         if not os.path.exists(jid_dir):
@@ -296,7 +378,7 @@ def get_load(jid):
     """
     Return the load data that marks a specified jid
     """
-    jid_dir = salt.utils.jid.jid_dir(jid, _job_dir(), __opts__["hash_type"])
+    jid_dir = _jid_dir(jid)
     load_fn = os.path.join(jid_dir, LOAD_P)
     if not os.path.exists(jid_dir) or not os.path.exists(load_fn):
         return {}
@@ -317,16 +399,7 @@ def get_load(jid):
         raise exc
     if ret is None:
         ret = {}
-    minions_cache = [os.path.join(jid_dir, MINIONS_P)]
-    minions_cache.extend(glob.glob(os.path.join(jid_dir, SYNDIC_MINIONS_P.format("*"))))
-    all_minions = set()
-    for minions_path in minions_cache:
-        log.debug("Reading minion list from %s", minions_path)
-        try:
-            with salt.utils.files.fopen(minions_path, "rb") as rfh:
-                all_minions.update(serial.load(rfh))
-        except IOError as exc:
-            salt.utils.files.process_read_exception(exc, minions_path)
+    all_minions = _read_minions(jid_dir)
 
     if all_minions:
         ret["Minions"] = sorted(all_minions)
@@ -338,7 +411,7 @@ def get_jid(jid):
     """
     Return the information returned when the specified job id was executed
     """
-    jid_dir = salt.utils.jid.jid_dir(jid, _job_dir(), __opts__["hash_type"])
+    jid_dir = _jid_dir(jid)
     serial = salt.payload.Serial(__opts__)
 
     ret = {}
@@ -372,12 +445,67 @@ def get_jid(jid):
     return ret
 
 
+def _jobs():
+    """
+    Yield the jid and load of the jobs, from the index if it is enabled
+    """
+    index = _read_index()
+    if index is not None:
+        for jid, job in index.jobs().items():
+            yield jid, job["load"]
+        return
+    for jid, job, _, _ in _walk_through(_job_dir()):
+        yield jid, job
+
+
 def get_jids():
     """
     Return a dict mapping all job ids to job information
     """
     ret = {}
-    for jid, job, _, _ in _walk_through(_job_dir()):
+    for jid, job in _jobs():
+        ret[jid] = salt.utils.jid.format_jid_instance(jid, job)
+
+        if __opts__.get("job_cache_store_endtime"):
+            endtime = get_endtime(jid)
+            if endtime:
+                ret[jid]["EndTime"] = endtime
+
+    return ret
+
+
+def get_jids_range(start_time=None, end_time=None):
+    """
+    Return a dict mapping the job ids of the jobs started between the
+    datetimes ``start_time`` and ``end_time`` to job information. Only the
+    partitions of the job cache index holding these jobs are read when
+    :conf_master:`job_cache_index` is enabled.
+
+    .. versionadded:: 3003
+    """
+    start_time, end_time = [
+        when.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        if when is not None and when.tzinfo is not None
+        else when
+        for when in (start_time, end_time)
+    ]
+    index = _read_index()
+    if index is None:
+        jobs = _jobs()
+    else:
+        jobs = (
+            (jid, job["load"]) for jid, job in index.jobs(start_time, end_time).items()
+        )
+    ret = {}
+    for jid, job in jobs:
+        if start_time is not None or end_time is not None:
+            if not salt.utils.jid.is_jid(jid):
+                continue
+            started = datetime.datetime.strptime(jid[:20], "%Y%m%d%H%M%S%f")
+            if start_time is not None and started < start_time:
+                continue
+            if end_time is not None and started > end_time:
+                continue
         ret[jid] = salt.utils.jid.format_jid_instance(jid, job)
 
         if __opts__.get("job_cache_store_endtime"):
@@ -394,6 +522,16 @@ def get_jids_filter(count, filter_find_job=True):
     :param int count: show not more than the count of most recent jobs
     :param bool filter_find_jobs: filter out 'saltutil.find_job' jobs
     """
+    index = _read_index()
+    if index is not None:
+        return [
+            salt.utils.jid.format_jid_instance_ext(jid, job["load"])
+            for jid, job in index.latest(
+                count,
+                lambda jid, job: not filter_find_job
+                or job["load"].get("fun") != "saltutil.find_job",
+            )
+        ]
     keys = []
     ret = []
     for jid, job, _, _ in _walk_through(_job_dir()):
@@ -415,16 +553,60 @@ def clean_old_jobs():
     """
     Clean out the old jobs from the job cache
     """
+    index = _index()
+    if index is not None and not index.imported():
+        # Imported here, by the maintenance process of the master, so that no
+        # publication waits for the walk of the whole job cache
+        try:
+            index.import_jobs(_import_jobs())
+        except OSError as exc:
+            log.error("Could not import the jobs into the job cache index: %s", exc)
+
     if __opts__["keep_jobs"] != 0:
         jid_root = _job_dir()
 
         if not os.path.exists(jid_root):
             return
 
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(
+            hours=__opts__["keep_jobs"]
+        )
+        buckets = __opts__.get("job_cache_buckets")
+        if buckets:
+            # The jobs stored in the directory of the hour they started are
+            # removed an hour at a time
+            for top in os.listdir(jid_root):
+                if salt.utils.jid.is_jid_bucket(top) and top < "{:%Y%m%d%H}".format(
+                    cutoff
+                ):
+                    t_path = os.path.join(jid_root, top)
+                    try:
+                        shutil.rmtree(t_path)
+                    except OSError as err:
+                        log.error("Unable to remove %s: %s", t_path, err)
+
+        index = _read_index()
+        if index is not None:
+            # Drop the whole partitions of the index older than keep_jobs, with
+            # their jobs, instead of walking the job cache
+            def _remove_job(jid):
+                jid_dir = _jid_dir(jid)
+                try:
+                    shutil.rmtree(jid_dir)
+                except OSError as err:
+                    if err.errno != errno.ENOENT:
+                        log.error("Unable to remove %s: %s", jid_dir, err)
+
+            index.expire(cutoff, _remove_job)
+            return
+
         # Keep track of any empty t_path dirs that need to be removed later
         dirs_to_remove = set()
 
         for top in os.listdir(jid_root):
+            if buckets and salt.utils.jid.is_jid_bucket(top):
+                # Already expired above
+                continue
             t_path = os.path.join(jid_root, top)
 
             if not os.path.exists(t_path):
@@ -475,7 +657,7 @@ def update_endtime(jid, time):
 
     Endtime is stored as a plain text string
     """
-    jid_dir = salt.utils.jid.jid_dir(jid, _job_dir(), __opts__["hash_type"])
+    jid_dir = _jid_dir(jid)
     try:
         if not os.path.exists(jid_dir):
             os.makedirs(jid_dir)
@@ -491,7 +673,7 @@ def get_endtime(jid):
 
     Returns False if no endtime is present
     """
-    jid_dir = salt.utils.jid.jid_dir(jid, _job_dir(), __opts__["hash_type"])
+    jid_dir = _jid_dir(jid)
     etpath = os.path.join(jid_dir, ENDTIME)
     if not os.path.exists(etpath):
         return False
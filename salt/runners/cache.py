@@ -14,8 +14,10 @@ import salt.payload
 import salt.pillar.git_pillar
 import salt.runners.winrepo
 import salt.utils.args
+import salt.utils.files
 import salt.utils.gitfs
 import salt.utils.master
+import salt.utils.path
 from salt.exceptions import SaltInvocationError
 from salt.fileserver import clear_lock as _clear_lock
 
@@ -467,3 +469,67 @@ def flush(bank, key=None, cachedir=None):
     except TypeError:
         cache = salt.cache.Cache(__opts__)
     return cache.flush(bank, key)
+
+
+def migrate(bank="minions", source=None, batch_size=500):
+    """
+    .. versionadded:: 3003
+
+    Import a bank, with all of its keys and sub-banks, from a ``localfs``
+    cache tree into the cache driver configured with the :conf_master:`cache`
+    option, for instance when moving the minion data cache to the
+    :py:mod:`sqlite <salt.cache.sqlite_cache>` driver. Returns the number of
+    keys imported.
+
+    bank : minions
+        The bank to import.
+
+    source
+        The cachedir holding the ``localfs`` tree, defaults to the master
+        cachedir.
+
+    batch_size : 500
+        The number of keys written at once, when the cache driver supports
+        batched writes.
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-run cache.migrate
+        salt-run cache.migrate bank=cloud source=/var/cache/salt/master
+    """
+    if source is None:
+        source = __opts__["cachedir"]
+    if __opts__.get("cache", "localfs") == "localfs" and os.path.normpath(
+        source
+    ) == os.path.normpath(__opts__["cachedir"]):
+        raise SaltInvocationError(
+            "The configured cache driver is already the localfs tree in {}".format(
+                source
+            )
+        )
+
+    cache = salt.cache.Cache(__opts__)
+    serial = salt.payload.Serial(__opts__)
+    root = os.path.join(source, os.path.normpath(bank))
+    items = []
+    count = 0
+
+    def _flush():
+        cache.store_many(items)
+        del items[:]
+
+    for dirpath, _, filenames in salt.utils.path.os_walk(root):
+        sub_bank = os.path.relpath(dirpath, source).replace(os.sep, "/")
+        for filename in filenames:
+            if not filename.endswith(".p"):
+                continue
+            with salt.utils.files.fopen(os.path.join(dirpath, filename), "rb") as fh_:
+                items.append((sub_bank, filename[:-2], serial.load(fh_)))
+            count += 1
+            if len(items) >= batch_size:
+                _flush()
+    _flush()
+    log.info("Imported %d keys of the %s bank from %s", count, bank, source)
+    return count
@@ -310,7 +310,16 @@ def list_jobs(
         )
     mminion = salt.minion.MasterMinion(__opts__)
 
-    ret = mminion.returners["{}.get_jids".format(returner)]()
+    fstr = "{}.get_jids_range".format(returner)
+    if (start_time or end_time) and DATEUTIL_SUPPORT and fstr in mminion.returners:
+        # Let the returner skip the jobs out of the time range, they are
+        # filtered below anyway
+        ret = mminion.returners[fstr](
+            start_time=dateutil_parser.parse(start_time) if start_time else None,
+            end_time=dateutil_parser.parse(end_time) if end_time else None,
+        )
+    else:
+        ret = mminion.returners["{}.get_jids".format(returner)]()
 
     mret = {}
     for item in ret:
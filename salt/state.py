@@ -26,11 +26,13 @@ import traceback
 
 import salt.fileclient
 import salt.loader
+import salt.loader_index
 import salt.minion
 import salt.pillar
 import salt.syspaths as syspaths
 import salt.transport.client
 import salt.utils.args
+import salt.utils.compile_cache
 import salt.utils.crypt
 import salt.utils.data
 import salt.utils.decorators.state
@@ -127,6 +129,45 @@ STATE_INTERNAL_KEYWORDS = STATE_REQUISITE_KEYWORDS.union(
     STATE_REQUISITE_IN_KEYWORDS
 ).union(STATE_RUNTIME_KEYWORDS)
 
+# Keywords which need the return of a state as soon as the state function
+# returns, chunks using them are never run in a separate process by the
+# parallel scheduler
+STATE_SEQUENTIAL_KEYWORDS = frozenset(
+    [
+        "watch",
+        "watch_any",
+        "prereq",
+        "prerequired",
+        "check_cmd",
+        "retry",
+        "provider",
+        "reload_modules",
+        "force_reload_modules",
+        "reload_grains",
+        "reload_pillar",
+        "__prereq__",
+        "__prerequired__",
+    ]
+)
+
+# State modules whose chunks the parallel scheduler always runs in the main
+# process. The modules synced by saltutil in a separate process would not be
+# seen by the main one, and package managers fail on the lock of their
+# database instead of waiting for it when run concurrently.
+STATE_SEQUENTIAL_MODULES = frozenset(
+    [
+        "saltutil",
+        "pkg",
+        "pkgrepo",
+        "pkgng",
+        "debconf",
+        "chocolatey",
+        "pip",
+        "gem",
+        "npm",
+    ]
+)
+
 
 def _odict_hashable(self):
     return id(self)
@@ -773,6 +814,8 @@ class State:
         self.active = set()
         self.mod_init = set()
         self.pre = {}
+        # tag -> chunks started in a separate process by the parallel scheduler
+        self.scheduled = {}
         self.__run_num = 0
         self.jid = jid
         self.instance_id = str(id(self))
@@ -1210,6 +1253,7 @@ class State:
                 log.error(
                     "Error encountered during module reload. Modules were not reloaded."
                 )
+        salt.loader_index.clear(self.opts)
         self.load_modules()
         if not self.opts.get("local", False) and self.opts.get("multiprocessing", True):
             self.functions["saltutil.refresh_modules"]()
@@ -2074,6 +2118,16 @@ class State:
         else:
             ret = {"result": False, "name": low["name"], "changes": {}}
 
+        schedule = (
+            not low.get("__prereq__")
+            and not low.get("parallel")
+            and self._schedule_parallel(low, running)
+        )
+        if schedule:
+            # Wait for a free worker before the state is prepared, finishing
+            # the other chunks may refresh the modules
+            self._wait_for_workers(self._parallel_workers() - 1)
+
         self.state_con["runas"] = low.get("runas", None)
 
         if low["state"] == "cmd" and "password" in low:
@@ -2166,6 +2220,14 @@ class State:
                     if not low.get("__prereq__") and low.get("parallel"):
                         # run the state call in parallel, but only if not in a prereq
                         ret = self.call_parallel(cdata, low)
+                    elif schedule:
+                        ret = self.call_parallel(cdata, low)
+                        self.scheduled[_gen_tag(low)] = {
+                            "low": low,
+                            "ret": ret,
+                            "running": running,
+                            "length": len(chunks or ()),
+                        }
                     else:
                         self.format_slots(cdata)
                         ret = self.states[cdata["full"]](
@@ -2226,7 +2288,9 @@ class State:
         ret["__run_num__"] = self.__run_num
         self.__run_num += 1
         format_log(ret)
-        self.check_refresh(low, ret)
+        if _gen_tag(low) not in self.scheduled:
+            # Scheduled chunks are checked once their process returns
+            self.check_refresh(low, ret)
         utc_finish_time = datetime.datetime.utcnow()
         timezone_delta = datetime.datetime.utcnow() - datetime.datetime.now()
         local_finish_time = utc_finish_time - timezone_delta
@@ -2482,10 +2546,17 @@ class State:
                         chunks.remove(low)
                         break
         running = {}
+        band = None
         for low in chunks:
             if "__FAILHARD__" in running:
                 running.pop("__FAILHARD__")
+                self._wait_for_workers()
                 return running
+            if self._order_band(low) != band:
+                # Chunks of a given order run once all of the chunks of the
+                # previous orders are done
+                band = self._order_band(low)
+                self._wait_for_workers()
             tag = _gen_tag(low)
             if tag not in running:
                 # Check if this low chunk is paused
@@ -2494,6 +2565,7 @@ class State:
                     break
                 running = self.call_chunk(low, running, chunks)
                 if self.check_failhard(low, running):
+                    self._wait_for_workers()
                     return running
             self.active = set()
         while True:
@@ -2516,6 +2588,59 @@ class State:
             return not running[tag]["result"]
         return False
 
+    def _parallel_workers(self):
+        """
+        Return the number of worker processes of the parallel scheduler
+        """
+        try:
+            return int(self.opts.get("state_parallel_workers") or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def _schedule_parallel(self, low, running):
+        """
+        Check if the parallel scheduler should run the low data chunk in a
+        separate process. The chunks which use failhard or need the return of
+        the state right away stay in the main process, as do the chunks of the
+        modules in ``STATE_SEQUENTIAL_MODULES`` and the chunks explicitly set
+        to ``parallel: False``.
+        """
+        if not self.jid or running is None or self._parallel_workers() < 1:
+            return False
+        if "parallel" in low:
+            return False
+        if low.get("failhard", self.opts["failhard"]):
+            return False
+        if low.get("state") in STATE_SEQUENTIAL_MODULES:
+            return False
+        return STATE_SEQUENTIAL_KEYWORDS.isdisjoint(low)
+
+    @staticmethod
+    def _order_band(low):
+        """
+        Return the ordering band of a low data chunk for the parallel
+        scheduler. The orders assigned by state_auto_order, which start at
+        10000, share a single band, the orders set explicitly (including
+        ``first`` and ``last``) each have their own.
+        """
+        order = low.get("order")
+        if not isinstance(order, (int, float)):
+            return None
+        if 10000 <= order < 1000000:
+            return 10000
+        return int(order)
+
+    def _wait_for_workers(self, limit=0):
+        """
+        Wait until no more than ``limit`` chunks started by the parallel
+        scheduler are still running
+        """
+        while len(self.scheduled) > limit:
+            for tag, scheduled in list(self.scheduled.items()):
+                self.reconcile_procs({tag: scheduled["ret"]})
+            if len(self.scheduled) > limit:
+                time.sleep(0.01)
+
     def check_pause(self, low):
         """
         Check to see if this low chunk has been paused
@@ -2568,7 +2693,7 @@ class State:
         Check the running dict for processes and resolve them
         """
         retset = set()
-        for tag in running:
+        for tag in list(running):
             proc = running[tag].get("proc")
             if proc:
                 if not proc.is_alive():
@@ -2596,6 +2721,16 @@ class State:
                         }
                     running[tag].update(ret)
                     running[tag].pop("proc")
+                    scheduled = self.scheduled.get(tag)
+                    if scheduled is not None and scheduled["ret"] is running[tag]:
+                        del self.scheduled[tag]
+                        self.check_refresh(scheduled["low"], running[tag])
+                        self._finish_chunk(
+                            scheduled["low"],
+                            tag,
+                            scheduled["running"],
+                            scheduled["length"],
+                        )
                 else:
                     retset.add(False)
         return False not in retset
@@ -3095,27 +3230,34 @@ class State:
                 self.pre[tag] = self.call(low, chunks, running)
             else:
                 running[tag] = self.call(low, chunks, running)
-        if tag in running:
-            self.event(running[tag], len(chunks), fire_event=low.get("fire_event"))
-
-            for sub_state_data in running[tag].pop("sub_state_run", ()):
-                start_time, duration = _calculate_fake_duration()
-                self.__run_num += 1
-                sub_tag = _gen_tag(sub_state_data["low"])
-                running[sub_tag] = {
-                    "name": sub_state_data["low"]["name"],
-                    "changes": sub_state_data["changes"],
-                    "result": sub_state_data["result"],
-                    "duration": sub_state_data.get("duration", duration),
-                    "start_time": sub_state_data.get("start_time", start_time),
-                    "comment": sub_state_data.get("comment", ""),
-                    "__state_ran__": True,
-                    "__run_num__": self.__run_num,
-                    "__sls__": low["__sls__"],
-                }
+        if tag in running and tag not in self.scheduled:
+            self._finish_chunk(low, tag, running, len(chunks))
 
         return running
 
+    def _finish_chunk(self, low, tag, running, length):
+        """
+        Fire the event for a chunk which is done and add the returns of its
+        sub states to the running dict
+        """
+        self.event(running[tag], length, fire_event=low.get("fire_event"))
+
+        for sub_state_data in running[tag].pop("sub_state_run", ()):
+            start_time, duration = _calculate_fake_duration()
+            self.__run_num += 1
+            sub_tag = _gen_tag(sub_state_data["low"])
+            running[sub_tag] = {
+                "name": sub_state_data["low"]["name"],
+                "changes": sub_state_data["changes"],
+                "result": sub_state_data["result"],
+                "duration": sub_state_data.get("duration", duration),
+                "start_time": sub_state_data.get("start_time", start_time),
+                "comment": sub_state_data.get("comment", ""),
+                "__state_ran__": True,
+                "__run_num__": self.__run_num,
+                "__sls__": low["__sls__"],
+            }
+
     def call_beacons(self, chunks, running):
         """
         Find all of the beacon routines and call the associated mod_beacon runs
@@ -3996,6 +4138,8 @@ class BaseHighState:
         if not local:
             state_data = self.client.get_state(sls, saltenv)
             fn_ = state_data.get("dest", False)
+            if fn_:
+                salt.utils.compile_cache.record(saltenv, state_data["source"])
         else:
             fn_ = sls
             if not os.path.isfile(fn_):
@@ -4326,16 +4470,51 @@ class BaseHighState:
         Gather the state files and render them into a single unified salt
         high data structure.
         """
+        if (
+            self.opts.get("state_compile_cache")
+            and context is None
+            and not self.building_highstate
+        ):
+            compile_cache = salt.utils.compile_cache.CompileCache(self.opts)
+            key = compile_cache.key(
+                matches,
+                {saltenv: self._avail_states(saltenv) for saltenv in matches},
+                self.state.opts["pillar"],
+                self.opts["grains"],
+            )
+            if key is not None:
+                high = compile_cache.fetch(key, self.client)
+                if high is not None:
+                    self.building_highstate.update(high)
+                    return self.building_highstate, []
+                with salt.utils.compile_cache.track() as files:
+                    high, errors = self._render_highstate(matches)
+                if not errors:
+                    compile_cache.store(key, high, files, self.client)
+                return high, errors
+        return self._render_highstate(matches, context=context)
+
+    def _avail_states(self, saltenv):
+        """
+        Return the states available to match in saltenv, or ``None`` if there
+        is no such saltenv
+        """
+        if saltenv in self.avail:
+            return self.avail[saltenv]
+        elif "__env__" in self.avail:
+            return self.avail["__env__"]
+        return None
+
+    def _render_highstate(self, matches, context=None):
         highstate = self.building_highstate
         all_errors = []
         mods = set()
         statefiles = []
         for saltenv, states in matches.items():
+            avail = self._avail_states(saltenv)
             for sls_match in states:
-                if saltenv in self.avail:
-                    statefiles = fnmatch.filter(self.avail[saltenv], sls_match)
-                elif "__env__" in self.avail:
-                    statefiles = fnmatch.filter(self.avail["__env__"], sls_match)
+                if avail is not None:
+                    statefiles = fnmatch.filter(avail, sls_match)
                 else:
                     all_errors.append(
                         "No matching salt environment for environment "
@@ -4,6 +4,7 @@ IPC transport classes
 
 
 import errno
+import fnmatch
 import logging
 import socket
 import time
@@ -33,6 +34,29 @@ def future_with_timeout_callback(future):
         future._future_with_timeout._done_callback(future)
 
 
+def _compile_tag_filter(tag_filter):
+    """
+    Return the tag prefixes and globs of a tag filter sent by a subscriber, a
+    list of ``[tag, match_type]`` pairs, or None when the filter has a match
+    type which the publisher cannot evaluate
+    """
+    prefixes = []
+    globs = []
+    for tag, match_type in tag_filter:
+        if match_type == "startswith":
+            prefixes.append(tag)
+        elif match_type == "fnmatch":
+            globs.append(tag)
+        else:
+            return None
+    return tuple(prefixes), globs
+
+
+def _match_tag_filter(tag_filter, tag):
+    prefixes, globs = tag_filter
+    return tag.startswith(prefixes) or any(fnmatch.fnmatch(tag, glob) for glob in globs)
+
+
 class FutureWithTimeout(salt.ext.tornado.concurrent.Future):
     def __init__(self, io_loop, future, timeout):
         super().__init__()
@@ -511,6 +535,8 @@ class IPCMessagePublisher:
         self.io_loop = io_loop or IOLoop.current()
         self._closing = False
         self.streams = set()
+        # The compiled tag filters of the subscribers which sent one
+        self.tag_filters = {}
 
     def start(self):
         """
@@ -549,17 +575,56 @@ class IPCMessagePublisher:
                 stream.close()
             self.streams.discard(stream)
 
-    def publish(self, msg):
+    def publish(self, msg, tag=None):
         """
         Send message to all connected sockets
+
+        When the ``tag`` of the message is given, the subscribers which sent a
+        tag filter only receive it if it matches their filter.
         """
         if not self.streams:
             return
 
         pack = salt.transport.frame.frame_msg_ipc(msg, raw_body=True)
         for stream in self.streams:
+            if tag is not None:
+                tag_filter = self.tag_filters.get(stream)
+                if tag_filter is not None and not _match_tag_filter(tag_filter, tag):
+                    continue
             self.io_loop.spawn_callback(self._write, stream, pack)
 
+    @salt.ext.tornado.gen.coroutine
+    def _read_tag_filters(self, stream):
+        """
+        Read the tag filters sent by a subscriber, see
+        :py:meth:`IPCMessageSubscriber.set_tag_filter`
+        """
+        # msgpack deprecated `encoding` starting with version 0.5.2
+        if salt.utils.msgpack.version >= (0, 5, 2):
+            msgpack_kwargs = {"raw": False}
+        else:
+            msgpack_kwargs = {"encoding": "utf-8"}
+        unpacker = salt.utils.msgpack.Unpacker(**msgpack_kwargs)
+        try:
+            while True:
+                wire_bytes = yield stream.read_bytes(4096, partial=True)
+                unpacker.feed(wire_bytes)
+                for framed_msg in unpacker:
+                    tag_filter = framed_msg["body"].get("tag_filter")
+                    if tag_filter is not None:
+                        tag_filter = _compile_tag_filter(tag_filter)
+                    if tag_filter is None:
+                        self.tag_filters.pop(stream, None)
+                    else:
+                        self.tag_filters[stream] = tag_filter
+        except Exception as exc:  # pylint: disable=broad-except
+            # Not an 'except StreamClosedError' clause, the reads still
+            # pending when the interpreter exits are interrupted once the
+            # globals of this module are gone
+            if not isinstance(exc, StreamClosedError):
+                log.error("Exception occurred while reading a tag filter: %s", exc)
+        self.tag_filters.pop(stream, None)
+
     def handle_connection(self, connection, address):
         log.trace("IPCServer: Handling connection to address: %s", address)
         try:
@@ -578,6 +643,7 @@ class IPCMessagePublisher:
                 self.streams.discard(stream)
 
             stream.set_close_callback(discard_after_closed)
+            self.io_loop.spawn_callback(self._read_tag_filters, stream)
         except Exception as exc:  # pylint: disable=broad-except
             log.error("IPC streaming error: %s", exc)
 
@@ -649,6 +715,34 @@ class IPCMessageSubscriber(IPCClient):
         self._read_stream_future = None
         self._saved_data = []
         self._read_in_progress = Lock()
+        self._tag_filter = None
+
+    def set_tag_filter(self, tag_filter):
+        """
+        Ask the publisher to only send the messages whose tag matches
+        ``tag_filter``, a list of ``[tag, match_type]`` pairs where the match
+        type is ``startswith`` or ``fnmatch``. Pass None to receive all the
+        messages again.
+
+        The filter is sent again when the subscriber reconnects.
+        """
+        self._tag_filter = tag_filter
+        if self.connected():
+            self._send_tag_filter()
+
+    def _send_tag_filter(self):
+        try:
+            self.stream.write(
+                salt.transport.frame.frame_msg_ipc({"tag_filter": self._tag_filter})
+            )
+        except StreamClosedError:
+            log.trace("Subscriber disconnected from IPC %s", self.socket_path)
+
+    @salt.ext.tornado.gen.coroutine
+    def _connect(self, timeout=None):
+        yield super()._connect(timeout=timeout)
+        if self._tag_filter is not None and self.connected():
+            self._send_tag_filter()
 
     @salt.ext.tornado.gen.coroutine
     def _read(self, timeout, callback=None):
@@ -33,6 +33,7 @@ import salt.transport.server
 import salt.utils.asynchronous
 import salt.utils.event
 import salt.utils.files
+import salt.utils.metrics
 import salt.utils.msgpack
 import salt.utils.platform
 import salt.utils.process
@@ -388,7 +389,6 @@ class AsyncTCPReqChannel(salt.transport.client.ReqChannel):
             aes = cipher.decrypt(ret["key"])
         pcrypt = salt.crypt.Crypticle(self.opts, aes)
         data = pcrypt.loads(ret[dictkey])
-        data = salt.transport.frame.decode_embedded_strs(data)
         raise salt.ext.tornado.gen.Return(data)
 
     @salt.ext.tornado.gen.coroutine
@@ -413,7 +413,6 @@ class AsyncTCPReqChannel(salt.transport.client.ReqChannel):
             # upload the results to the master
             if data:
                 data = self.auth.crypticle.loads(data)
-                data = salt.transport.frame.decode_embedded_strs(data)
             raise salt.ext.tornado.gen.Return(data)
 
         if not self.auth.authenticated:
@@ -1579,7 +1578,6 @@ class PubServer(salt.ext.tornado.tcpserver.TCPServer):
                         self.opts, salt.master.SMaster.secrets["aes"]["secret"].value
                     )
                     load = crypticle.loads(body["load"])
-                    load = salt.transport.frame.decode_embedded_strs(load)
                     if not self.aes_funcs.verify_minion(load["id"], load["tok"]):
                         continue
                     client.id_ = load["id"]
@@ -1602,11 +1600,37 @@ class PubServer(salt.ext.tornado.tcpserver.TCPServer):
         self.clients.add(client)
         self.io_loop.spawn_callback(self._stream_read, client)
 
+    @staticmethod
+    def _write_shared(stream, data):
+        """
+        Write the ``data`` shared by all the clients to ``stream``. When
+        nothing is waiting to be written to the stream, as much of it as the
+        socket accepts is sent straight from ``data``, so that only what is
+        left is copied into the write buffer of the stream.
+        """
+        if (
+            not stream.closed()
+            and not stream.writing()
+            and not isinstance(stream, salt.ext.tornado.iostream.SSLIOStream)
+        ):
+            try:
+                sent = stream.write_to_fd(data)
+            except OSError:
+                # Let the stream handle the error, or the full socket buffer
+                sent = 0
+            if sent == len(data):
+                return
+            data = data[sent:]
+        # Errors are logged by the stream, the future is not waited for
+        stream.write(data)
+
     # TODO: ACK the publish through IPC
     @salt.ext.tornado.gen.coroutine
     def publish_payload(self, package, _):
         log.debug("TCP PubServer sending payload: %s", package)
-        payload = salt.transport.frame.frame_msg(package["payload"])
+        start = time.time()
+        # The payload is framed once and shared by all the clients
+        payload = memoryview(salt.transport.frame.frame_msg(package["payload"]))
 
         to_remove = []
         if "topic_lst" in package:
@@ -1621,8 +1645,7 @@ class PubServer(salt.ext.tornado.tcpserver.TCPServer):
                     for client in self.present[topic]:
                         try:
                             # Write the packed str
-                            f = client.stream.write(payload)
-                            self.io_loop.add_future(f, lambda f: True)
+                            self._write_shared(client.stream, payload)
                         except salt.ext.tornado.iostream.StreamClosedError:
                             to_remove.append(client)
                 else:
@@ -1631,8 +1654,7 @@ class PubServer(salt.ext.tornado.tcpserver.TCPServer):
             for client in self.clients:
                 try:
                     # Write the packed str
-                    f = client.stream.write(payload)
-                    self.io_loop.add_future(f, lambda f: True)
+                    self._write_shared(client.stream, payload)
                 except salt.ext.tornado.iostream.StreamClosedError:
                     to_remove.append(client)
         for client in to_remove:
@@ -1642,6 +1664,9 @@ class PubServer(salt.ext.tornado.tcpserver.TCPServer):
             client.close()
             self._remove_client_present(client)
             self.clients.discard(client)
+        salt.utils.metrics.observe(
+            "salt_master_publish_duration_seconds", time.time() - start, transport="tcp"
+        )
         log.trace("TCP PubServer finished publishing payload")
 
 
@@ -1668,6 +1693,7 @@ class TCPPubServerChannel(salt.transport.server.PubServerChannel):
         Bind to the interface specified in the configuration file
         """
         salt.utils.process.appendproctitle(self.__class__.__name__)
+        salt.utils.metrics.init(self.opts, self.__class__.__name__)
 
         log_queue = kwargs.get("log_queue")
         if log_queue is not None:
@@ -3,12 +3,14 @@ Zeromq transport classes
 """
 import copy
 import errno
+import functools
 import hashlib
 import logging
 import os
 import signal
 import sys
 import threading
+import time
 import weakref
 from random import randint
 
@@ -25,6 +27,7 @@ import salt.transport.mixins.auth
 import salt.transport.server
 import salt.utils.event
 import salt.utils.files
+import salt.utils.metrics
 import salt.utils.minions
 import salt.utils.process
 import salt.utils.stringutils
@@ -368,7 +371,6 @@ class AsyncZeroMQReqChannel(salt.transport.client.ReqChannel):
             aes = cipher.decrypt(ret["key"])
         pcrypt = salt.crypt.Crypticle(self.opts, aes)
         data = pcrypt.loads(ret[dictkey])
-        data = salt.transport.frame.decode_embedded_strs(data)
         raise salt.ext.tornado.gen.Return(data)
 
     @salt.ext.tornado.gen.coroutine
@@ -400,8 +402,9 @@ class AsyncZeroMQReqChannel(salt.transport.client.ReqChannel):
             # communication, we do not subscribe to return events, we just
             # upload the results to the master
             if data:
+                # The strings are already decoded unless raw is set
                 data = self.auth.crypticle.loads(data, raw)
-            if not raw:
+            elif not raw:
                 data = salt.transport.frame.decode_embedded_strs(data)
             raise salt.ext.tornado.gen.Return(data)
 
@@ -668,14 +671,34 @@ class AsyncZeroMQPubChannel(
         return self.stream.on_recv(wrap_callback)
 
 
+class _EnvelopeStream:
+    """
+    Send the reply to a request received on a DEALER socket, wrapped in the
+    envelope of the request
+    """
+
+    def __init__(self, stream, envelope):
+        self.stream = stream
+        self.envelope = envelope
+
+    def send(self, msg):
+        self.stream.send_multipart(self.envelope + [msg])
+
+
 class ZeroMQReqServerChannel(
     salt.transport.mixins.auth.AESReqServerMixin, salt.transport.server.ReqServerChannel
 ):
+    # The number of requests a worker with a thread pool holds for each of its
+    # threads before it leaves the next ones queued on the request device
+    pool_requests_per_thread = 2
+
     def __init__(self, opts):
         salt.transport.server.ReqServerChannel.__init__(self, opts)
         self._closing = False
         self._monitor = None
         self._w_monitor = None
+        self._in_flight = 0
+        self._max_in_flight = 0
 
     def zmq_device(self):
         """
@@ -789,7 +812,13 @@ class ZeroMQReqServerChannel(
         self.io_loop = io_loop
 
         self.context = zmq.Context(1)
-        self._socket = self.context.socket(zmq.REP)
+        if self.opts.get("worker_pool_threads", 0) > 0:
+            # A REP socket only receives the next request once the reply to
+            # the previous one was sent, a DEALER socket lets the worker
+            # handle several requests at the same time
+            self._socket = self.context.socket(zmq.DEALER)
+        else:
+            self._socket = self.context.socket(zmq.REP)
         self._start_zmq_monitor()
 
         if self.opts.get("ipc_mode", "") == "tcp":
@@ -810,7 +839,51 @@ class ZeroMQReqServerChannel(
         self.stream = zmq.eventloop.zmqstream.ZMQStream(
             self._socket, io_loop=self.io_loop
         )
-        self.stream.on_recv_stream(self.handle_message)
+        if self._socket.socket_type == zmq.DEALER:
+            self._max_in_flight = (
+                self.opts["worker_pool_threads"] * self.pool_requests_per_thread
+            )
+            self.stream.on_recv(self._handle_dealer_message)
+        else:
+            self.stream.on_recv_stream(self.handle_message)
+
+    def _handle_dealer_message(self, frames):
+        """
+        Handle a request received on a DEALER socket, the frames start with
+        the envelope which routes the reply back to the minion
+        """
+        try:
+            idx = frames.index(b"")
+        except ValueError:
+            log.error("Dropping a request without an envelope")
+            return
+        future = self.handle_message(
+            _EnvelopeStream(self.stream, frames[: idx + 1]), frames[idx + 1 :]
+        )
+        self._in_flight += 1
+        if self._in_flight >= self._max_in_flight:
+            # Stop taking requests off the device until one of them is done,
+            # the next ones wait in the queue of the device and then in the
+            # ZeroMQ high water marks, which push back on the minions instead
+            # of piling up in the memory of the worker
+            log.trace(
+                "%d requests in progress, pausing the request stream", self._in_flight,
+            )
+            self.stream.stop_on_recv()
+        self.io_loop.add_future(future, self._dealer_message_done)
+
+    def _dealer_message_done(self, future):
+        """
+        Resume receiving the requests once a request is done
+        """
+        self._in_flight -= 1
+        if self._closing or self.stream.closed() or self.stream.receiving():
+            return
+        if self._in_flight < self._max_in_flight:
+            log.trace(
+                "%d requests in progress, resuming the request stream", self._in_flight,
+            )
+            self.stream.on_recv(self._handle_dealer_message)
 
     @salt.ext.tornado.gen.coroutine
     def handle_message(self, stream, payload):
@@ -936,6 +1009,16 @@ def _set_tcp_keepalive(zmq_socket, opts):
             zmq_socket.setsockopt(zmq.TCP_KEEPALIVE_INTVL, opts["tcp_keepalive_intvl"])
 
 
+@functools.lru_cache(maxsize=65536)
+def _hash_topic(topic):
+    """
+    zmq filters are substring match, hash the topic to avoid collisions
+    """
+    return salt.utils.stringutils.to_bytes(
+        hashlib.sha1(salt.utils.stringutils.to_bytes(topic)).hexdigest()
+    )
+
+
 class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
     """
     Encapsulate synchronous operations for a publisher channel
@@ -956,6 +1039,7 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         Bind to the interface specified in the configuration file
         """
         salt.utils.process.appendproctitle(self.__class__.__name__)
+        salt.utils.metrics.init(self.opts, self.__class__.__name__)
 
         if self.opts["pub_server_niceness"] and not salt.utils.platform.is_windows():
             log.info(
@@ -1020,35 +1104,32 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
                     package = pull_sock.recv()
                     log.debug("Publish daemon received payload. size=%d", len(package))
 
-                    unpacked_package = salt.payload.unpackage(package)
-                    unpacked_package = salt.transport.frame.decode_embedded_strs(
-                        unpacked_package
+                    unpacked_package = self.serial.loads(package)
+                    # The payload is encrypted once, every send below shares
+                    # the same frame instead of copying it
+                    payload = zmq.Frame(
+                        salt.utils.stringutils.to_bytes(unpacked_package["payload"])
                     )
-                    payload = unpacked_package["payload"]
                     log.trace("Accepted unpacked package from puller")
+                    start = time.time()
                     if self.opts["zmq_filtering"]:
                         # if you have a specific topic list, use that
                         if "topic_lst" in unpacked_package:
+                            log.trace(
+                                "Sending filtered data over publisher %s to %d topics",
+                                pub_uri,
+                                len(unpacked_package["topic_lst"]),
+                            )
                             for topic in unpacked_package["topic_lst"]:
-                                log.trace(
-                                    "Sending filtered data over publisher %s", pub_uri
-                                )
-                                # zmq filters are substring match, hash the topic
-                                # to avoid collisions
-                                htopic = salt.utils.stringutils.to_bytes(
-                                    hashlib.sha1(
-                                        salt.utils.stringutils.to_bytes(topic)
-                                    ).hexdigest()
-                                )
-                                pub_sock.send(htopic, flags=zmq.SNDMORE)
-                                pub_sock.send(payload)
-                                log.trace("Filtered data has been sent")
+                                pub_sock.send(_hash_topic(topic), flags=zmq.SNDMORE)
+                                pub_sock.send(payload, copy=False)
+                            log.trace("Filtered data has been sent")
 
                             # Syndic broadcast
                             if self.opts.get("order_masters"):
                                 log.trace("Sending filtered data to syndic")
                                 pub_sock.send(b"syndic", flags=zmq.SNDMORE)
-                                pub_sock.send(payload)
+                                pub_sock.send(payload, copy=False)
                                 log.trace("Filtered data has been sent to syndic")
                         # otherwise its a broadcast
                         else:
@@ -1057,14 +1138,19 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
                                 "Sending broadcasted data over publisher %s", pub_uri
                             )
                             pub_sock.send(b"broadcast", flags=zmq.SNDMORE)
-                            pub_sock.send(payload)
+                            pub_sock.send(payload, copy=False)
                             log.trace("Broadcasted data has been sent")
                     else:
                         log.trace(
                             "Sending ZMQ-unfiltered data over publisher %s", pub_uri
                         )
-                        pub_sock.send(payload)
+                        pub_sock.send(payload, copy=False)
                         log.trace("Unfiltered data has been sent")
+                    salt.utils.metrics.observe(
+                        "salt_master_publish_duration_seconds",
+                        time.time() - start,
+                        transport="zeromq",
+                    )
                 except zmq.ZMQError as exc:
                     if exc.errno == errno.EINTR:
                         continue
@@ -1166,7 +1252,9 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
             log.debug("Publish Side Match: %s", match_ids)
             # Send list of miions thru so zmq can target them
             int_payload["topic_lst"] = match_ids
-        payload = self.serial.dumps(int_payload)
+        # The publish daemon runs the same code, use the bin type so that it
+        # does not need to decode the payload and the topics
+        payload = self.serial.dumps(int_payload, use_bin_type=True)
         log.debug(
             "Sending payload to publish daemon. jid=%s size=%d",
             load.get("jid", None),
@@ -0,0 +1,100 @@
+"""
+Calls run on threads, bounded in number and in time
+
+.. versionadded:: 3003
+
+A :py:class:`BoundedCall` is run on a thread of its own once one of the slots
+of the semaphore it is started with is free, so that at most as many calls as
+the semaphore has slots run at the same time. Waiting for a call can be given
+up after a timeout, counted from the time the call started running.
+
+A call which timed out gives its slot back, so that the next calls are not
+blocked by a call which hangs, but its thread is left running until the
+function it calls returns. Each timeout can therefore let one more call than
+the number of slots run at the same time.
+"""
+
+import sys
+import threading
+import time
+
+
+class BoundedCall:
+    """
+    A call of ``func`` with ``args`` and ``kwargs``
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.slots = None
+        self.launched = False
+        self.started = threading.Event()
+        self.done = threading.Event()
+        self.start_time = None
+        self.duration = None
+        self.ret = None
+        self.exc_info = None
+        self._released = False
+        self._lock = threading.Lock()
+
+    def start(self, slots=None, name=None):
+        """
+        Run the call on a thread named ``name`` once one of the ``slots`` of
+        the semaphore is free, or right away in the current thread if no
+        semaphore is given
+        """
+        self.launched = True
+        self.slots = slots
+        if slots is None:
+            self.run()
+            return
+        thread = threading.Thread(target=self.run, name=name)
+        thread.daemon = True
+        thread.start()
+
+    def run(self):
+        if self.slots is not None:
+            self.slots.acquire()
+        self.start_time = time.time()
+        self.started.set()
+        try:
+            self.ret = self.func(*self.args, **self.kwargs)
+        except Exception:  # pylint: disable=broad-except
+            self.exc_info = sys.exc_info()
+        finally:
+            self.duration = time.time() - self.start_time
+            self.finished()
+            self.release()
+            self.done.set()
+
+    def finished(self):
+        """
+        Called in the thread of the call once the function returned
+        """
+
+    def release(self):
+        """
+        Give the slot of the call back, once
+        """
+        if self.slots is None:
+            return
+        with self._lock:
+            if not self._released:
+                self._released = True
+                self.slots.release()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the call to return, for at most ``timeout`` seconds after it
+        started. Return False when it did not, its slot is then given to the
+        next call.
+        """
+        self.started.wait()
+        if timeout is None:
+            return self.done.wait()
+        if self.done.wait(max(self.start_time + timeout - time.time(), 0)):
+            return True
+        self.release()
+        return False
@@ -0,0 +1,295 @@
+"""
+Cache of the high data compiled from SLS files
+
+.. versionadded:: 3003
+
+Rendering the SLS files of a highstate through Jinja and YAML is usually the
+most expensive part of compiling it, and most of the time it yields the same
+high data as the previous run. When :conf_minion:`state_compile_cache` is
+enabled, the high data rendered for a set of top file matches is stored in the
+``state_compile`` directory of the minion cachedir, along with the fileserver
+hashes of every SLS file and Jinja template loaded to render it. It is reused
+as long as:
+
+- the top file matches and the SLS files available in their saltenvs are the
+  same
+- the pillar and grains are the same
+- none of the files loaded to render it changed on the fileserver
+
+so that a repeat ``state.apply`` only asks the fileserver for the hashes of the
+files instead of rendering them again.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import threading
+
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.json
+import salt.version
+
+log = logging.getLogger(__name__)
+
+# Number of compiled highstates kept in the cache
+_MAX_ENTRIES = 8
+
+# Grains which change with every process and are left out of the key
+_VOLATILE_GRAINS = ("pid",)
+
+# Options which change the outcome of rendering the SLS files
+_KEY_OPTS = (
+    "id",
+    "saltenv",
+    "pillarenv",
+    "renderer",
+    "renderer_blacklist",
+    "renderer_whitelist",
+    "state_auto_order",
+    "jinja_env",
+    "jinja_sls_env",
+    "jinja_lstrip_blocks",
+    "jinja_trim_blocks",
+)
+
+_STATS = ("hits", "misses", "stale")
+
+_tracking = threading.local()
+
+
+@contextlib.contextmanager
+def track():
+    """
+    Collect the fileserver files passed to :py:func:`record` in the current
+    thread, the context manager yields the set they are added to as
+    ``(saltenv, path)`` pairs.
+    """
+    previous = getattr(_tracking, "files", None)
+    _tracking.files = set()
+    try:
+        yield _tracking.files
+    finally:
+        _tracking.files = previous
+
+
+def record(saltenv, path):
+    """
+    Record that ``path`` was loaded from ``saltenv`` while rendering SLS files
+    """
+    files = getattr(_tracking, "files", None)
+    if files is not None:
+        files.add((saltenv, path))
+
+
+def _digest(data):
+    """
+    Return a digest of data, or ``None`` if it cannot be serialized
+    """
+    try:
+        data = salt.utils.json.dumps(data, sort_keys=True, default=repr)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def _hashes(client, files):
+    """
+    Return a dict mapping the ``(saltenv, path)`` ``files`` to their hash on
+    the fileserver, asking for the hashes of each saltenv at once
+    """
+    by_saltenv = {}
+    for saltenv, path in files:
+        by_saltenv.setdefault(saltenv, []).append(path)
+    ret = {}
+    for saltenv, paths in by_saltenv.items():
+        for path, hsum in zip(paths, client.hash_files(paths, saltenv)):
+            ret[(saltenv, path)] = (hsum or {}).get("hsum")
+    return ret
+
+
+def cache_dir(opts):
+    """
+    Return the directory holding the compiled highstates
+    """
+    return os.path.join(opts["cachedir"], "state_compile")
+
+
+def clear(opts):
+    """
+    Drop all of the compiled highstates, return whether there were any
+    """
+    path = cache_dir(opts)
+    if not os.path.isdir(path):
+        return False
+    shutil.rmtree(path, ignore_errors=True)
+    return True
+
+
+class CompileCache:
+    """
+    Store and retrieve the high data compiled for a set of top file matches
+    """
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.path = cache_dir(opts)
+        self.serial = salt.payload.Serial(opts)
+
+    def key(self, matches, avail, pillar, grains):
+        """
+        Return the cache key of the high data rendered for ``matches``, given
+        the SLS files ``avail``-able in each saltenv, or ``None`` if it cannot
+        be cached.
+        """
+        grains = {
+            name: val
+            for name, val in (grains or {}).items()
+            if name not in _VOLATILE_GRAINS
+        }
+        return _digest(
+            [
+                salt.version.__version__,
+                [[saltenv, list(states)] for saltenv, states in matches.items()],
+                {saltenv: sorted(avail[saltenv] or []) for saltenv in avail},
+                [self.opts.get(opt) for opt in _KEY_OPTS],
+                pillar,
+                grains,
+            ]
+        )
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, "{}.p".format(key))
+
+    def _read(self, path):
+        try:
+            with salt.utils.files.fopen(path, "rb") as fp_:
+                return self.serial.load(fp_)
+        except Exception as exc:  # pylint: disable=broad-except
+            if os.path.exists(path):
+                log.debug("Unable to read the state compile cache %s: %s", path, exc)
+            return None
+
+    def _write(self, path, data):
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+                self.serial.dump(data, fp_)
+        except (OSError, TypeError) as exc:
+            # TypeError: the high data of pydsl states cannot be serialized
+            log.debug("Unable to write the state compile cache %s: %s", path, exc)
+            return False
+        return True
+
+    def _loads(self, data):
+        """
+        Return the counters serialized in ``data``
+        """
+        try:
+            stats = self.serial.loads(data) if data else None
+        except Exception:  # pylint: disable=broad-except
+            stats = None
+        return stats if isinstance(stats, dict) else {}
+
+    def _count(self, stat):
+        """
+        Add one to the counter of ``stat``, under a lock so that the counts of
+        the state runs happening at the same time are not lost
+        """
+        stats_path = os.path.join(self.path, "stats.p")
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with salt.utils.files.flopen(stats_path, "a+b") as fp_:
+                # Serial.load and Serial.dump would close the file and drop
+                # the lock, which flopen releases before the file is closed so
+                # the counters are flushed here
+                fp_.seek(0)
+                stats = self._loads(fp_.read())
+                stats[stat] = stats.get(stat, 0) + 1
+                fp_.truncate(0)
+                fp_.write(self.serial.dumps(stats, use_bin_type=True))
+                fp_.flush()
+        except OSError as exc:
+            log.debug("Unable to count the state compile cache %s: %s", stat, exc)
+
+    def fetch(self, key, client):
+        """
+        Return the high data stored under ``key``, or ``None`` if there is
+        none or one of the files it was rendered from changed. ``client`` is
+        the file client used to get the hashes of the files.
+        """
+        entry = self._read(self._entry_path(key))
+        if not isinstance(entry, dict):
+            self._count("misses")
+            return None
+        current = _hashes(
+            client, [(saltenv, path) for saltenv, path, _ in entry["files"]]
+        )
+        for saltenv, path, hsum in entry["files"]:
+            if current[(saltenv, path)] != hsum:
+                log.debug(
+                    "State compile cache is out of date: %s changed in saltenv %s",
+                    path,
+                    saltenv,
+                )
+                self._count("stale")
+                return None
+        log.debug("Using the compiled highstate %s from the cache", key)
+        self._count("hits")
+        # Mark the entry as the most recently used one
+        try:
+            os.utime(self._entry_path(key), None)
+        except OSError:
+            pass
+        return entry["high"]
+
+    def store(self, key, high, files, client):
+        """
+        Store the high data rendered from the ``(saltenv, path)`` ``files``
+        under ``key``
+        """
+        hashes = _hashes(client, files)
+        entry = {
+            "files": [
+                [saltenv, path, hashes[(saltenv, path)]]
+                for saltenv, path in sorted(files)
+            ],
+            "high": high,
+        }
+        if not self._write(self._entry_path(key), entry):
+            return
+        entries = sorted(
+            (os.path.join(self.path, fn_) for fn_ in os.listdir(self.path)),
+            key=os.path.getmtime,
+        )
+        entries = [path for path in entries if not path.endswith("stats.p")]
+        for path in entries[:-_MAX_ENTRIES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Return the number of hits, misses and stale entries of the cache
+        """
+        stats_path = os.path.join(self.path, "stats.p")
+        try:
+            with salt.utils.files.flopen(stats_path, "rb") as fp_:
+                stats = self._loads(fp_.read())
+        except OSError:
+            stats = {}
+        ret = {stat: stats.get(stat, 0) for stat in _STATS}
+        lookups = sum(ret.values())
+        ret["hit_rate"] = round(100.0 * ret["hits"] / lookups, 2) if lookups else 0.0
+        try:
+            ret["entries"] = len(
+                [fn_ for fn_ in os.listdir(self.path) if fn_ != "stats.p"]
+            )
+        except OSError:
+            ret["entries"] = 0
+        return ret
@@ -775,6 +775,26 @@ def ignores_kwargs(*kwarg_names):
     return _ignores_kwargs
 
 
+def grains_ttl(seconds):
+    """
+    Decorator setting the number of seconds the grains returned by a grains
+    function are reused for when ``grains_cache`` is enabled, instead of
+    ``grains_cache_expiration``. The ``grains_ttl`` minion option takes
+    precedence over it.
+
+    .. versionadded:: 3003
+
+    seconds:
+        Time to live of the grains returned by the function
+    """
+
+    def _grains_ttl(fn):
+        fn.grains_ttl = seconds
+        return fn
+
+    return _grains_ttl
+
+
 def ensure_unicode_args(function):
     """
     Decodes all arguments passed to the wrapped function
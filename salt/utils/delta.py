@@ -0,0 +1,288 @@
+"""
+Rolling checksum delta transfer of files
+
+.. versionadded:: 3003
+
+This implements the algorithm used by rsync to update a copy of a file which
+only differs from the original in a few places without sending all of it
+again:
+
+1. The side which has the old copy splits it in blocks of ``block_size`` bytes
+   and computes the :py:func:`signature` of the copy, the weak (Adler-32) and
+   strong (BLAKE2b) checksums of each block.
+2. The side which has the new version of the file slides a window of
+   ``block_size`` bytes over it, one byte at a time, and looks the weak
+   checksum of the window up in the signature. The weak checksum of the next
+   window is computed from the previous one in constant time, and the strong
+   checksum is only computed when the weak one matches. :py:func:`delta`
+   returns the blocks of the old copy which were found in the new file, and
+   the bytes in between them.
+3. The side which has the old copy rebuilds the new file from the blocks of
+   its old copy and the bytes it received, see :py:func:`patch`.
+
+A delta is a list of operations, either a ``bytes`` literal, or a
+``[first_block, count]`` list to copy ``count`` blocks of the old copy
+starting at block ``first_block``.
+
+A delta sent in several parts only needs the signature once, the side which
+has the new version keeps it with :py:func:`store_signature` until the last
+part is sent.
+"""
+
+import hashlib
+import os
+import re
+import time
+import zlib
+
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.msgpack
+
+_ADLER_MOD = 65521
+
+# The number of seconds a stored signature is kept for when the transfer it
+# belongs to is not completed
+SIGNATURE_TTL = 3600
+
+# Bounds of the block size picked for a file
+MIN_BLOCK_SIZE = 2048
+MAX_BLOCK_SIZE = 131072
+
+# The largest serialized signature accepted from the other side
+MAX_SIGNATURE_SIZE = 8388608
+
+
+def block_size(size):
+    """
+    Return the block size to use for a file of ``size`` bytes, about the
+    square root of the size like rsync does, which balances the size of the
+    signature against the size of the blocks sent again when they changed.
+    """
+    ret = int(size ** 0.5) // 1024 * 1024
+    return max(MIN_BLOCK_SIZE, min(MAX_BLOCK_SIZE, ret))
+
+
+def _strong(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def signature(path, size=None):
+    """
+    Return the signature of the file at ``path``, a dict with the
+    ``block_size`` and the ``weak`` and ``strong`` checksums of each full
+    block of the file.
+    """
+    if size is None:
+        with salt.utils.files.fopen(path, "rb") as fp_:
+            fp_.seek(0, 2)
+            size = fp_.tell()
+    bsize = block_size(size)
+    weak = []
+    strong = []
+    with salt.utils.files.fopen(path, "rb") as fp_:
+        while True:
+            block = fp_.read(bsize)
+            if len(block) < bsize:
+                break
+            weak.append(zlib.adler32(block))
+            strong.append(_strong(block))
+    return {"block_size": bsize, "weak": weak, "strong": strong}
+
+
+def valid_signature(sig):
+    """
+    Return whether ``sig`` is a signature :py:func:`delta` can be computed
+    against, the signatures sent by the other side must be checked with it
+    """
+    if not isinstance(sig, dict):
+        return False
+    bsize = sig.get("block_size")
+    if (
+        not isinstance(bsize, int)
+        or isinstance(bsize, bool)
+        or not MIN_BLOCK_SIZE <= bsize <= MAX_BLOCK_SIZE
+    ):
+        return False
+    weak = sig.get("weak")
+    strong = sig.get("strong")
+    return (
+        isinstance(weak, list) and isinstance(strong, list) and len(weak) == len(strong)
+    )
+
+
+def delta(path, sig, loc=0, max_literal=1048576, read_size=None):
+    """
+    Return the delta turning the file whose signature is ``sig`` into the
+    file at ``path``, starting at offset ``loc`` of ``path``.
+
+    The delta stops once it holds ``max_literal`` bytes of literal data, so
+    that it can be sent in several parts, the unchanged parts of the file do
+    not count. The file is read ``read_size`` bytes at a time. Returns a tuple
+    with the delta, the offset to start the next part from, and whether the
+    end of the file was reached.
+    """
+    bsize = sig["block_size"]
+    strong = sig["strong"]
+    table = {}
+    for idx, weak in enumerate(sig["weak"]):
+        table.setdefault(weak, []).append(idx)
+    if read_size is None:
+        read_size = max(max_literal, 16 * bsize)
+
+    ops = []
+    literal = 0
+
+    def _add_literal(start, end):
+        if start < end:
+            ops.append(data[start:end])
+        return end - start
+
+    def _add_block(idx):
+        if ops and not isinstance(ops[-1], bytes) and sum(ops[-1]) == idx:
+            ops[-1][1] += 1
+        else:
+            ops.append([idx, 1])
+
+    with salt.utils.files.fopen(path, "rb") as fp_:
+        fp_.seek(loc)
+        data = fp_.read(read_size + bsize)
+        eof = len(data) < read_size + bsize
+        pos = lit_start = 0
+        weak = None
+        while True:
+            if pos + bsize > len(data):
+                if eof:
+                    # The tail of the file is shorter than a block
+                    pos = len(data)
+                    break
+                # Only keep the literal data not added yet and the window
+                chunk = fp_.read(read_size)
+                eof = len(chunk) < read_size
+                data = data[lit_start:] + chunk
+                loc += lit_start
+                pos -= lit_start
+                lit_start = 0
+                continue
+            if weak is None:
+                weak = zlib.adler32(data[pos : pos + bsize])
+                low, high = weak & 0xFFFF, weak >> 16
+            if weak in table:
+                digest = _strong(data[pos : pos + bsize])
+                match = next(
+                    (idx for idx in table[weak] if strong[idx] == digest), None
+                )
+                if match is not None:
+                    literal += _add_literal(lit_start, pos)
+                    _add_block(match)
+                    pos = lit_start = pos + bsize
+                    weak = None
+                    if literal >= max_literal:
+                        break
+                    continue
+            if pos - lit_start + 1 >= max_literal:
+                # Too much literal data for this part
+                pos += 1
+                break
+            if pos + bsize < len(data):
+                # Roll the window one byte forward
+                old, new = data[pos], data[pos + bsize]
+                low = (low - old + new) % _ADLER_MOD
+                high = (high - bsize * old + low - 1) % _ADLER_MOD
+                weak = (high << 16) | low
+            else:
+                # The next byte is not read yet
+                weak = None
+            pos += 1
+
+    _add_literal(lit_start, pos)
+    return ops, loc + pos, eof and pos == len(data)
+
+
+def patch(ops, old, block_size, write):
+    """
+    Apply the delta ``ops`` to the file object ``old``, with the given
+    ``block_size``, passing the result to the ``write`` callable. Returns the
+    number of bytes copied from ``old``.
+    """
+    copied = 0
+    for op in ops:
+        if isinstance(op, bytes):
+            write(op)
+            continue
+        first, count = op
+        old.seek(first * block_size)
+        remaining = count * block_size
+        while remaining:
+            chunk = old.read(min(remaining, 1048576))
+            if not chunk:
+                raise ValueError("Block {} is out of range".format(first))
+            write(chunk)
+            remaining -= len(chunk)
+        copied += count * block_size
+    return copied
+
+
+def dump_signature(sig):
+    """
+    Return the signature ``sig`` serialized
+    """
+    return salt.utils.msgpack.dumps(sig, use_bin_type=True)
+
+
+def _signature_path(cachedir, sig_id):
+    if not isinstance(sig_id, str) or not re.match(r"^[0-9a-f]{64}$", sig_id):
+        return None
+    return os.path.join(cachedir, "file_delta", "{}.p".format(sig_id))
+
+
+def store_signature(cachedir, sig):
+    """
+    Keep the signature ``sig`` in ``cachedir`` for the next parts of a delta,
+    and return the id to load it with. The signatures of the transfers which
+    were not completed are removed after ``SIGNATURE_TTL`` seconds.
+    """
+    data = dump_signature(sig)
+    sig_id = hashlib.sha256(data).hexdigest()
+    path = _signature_path(cachedir, sig_id)
+    sig_dir = os.path.dirname(path)
+    if not os.path.isdir(sig_dir):
+        os.makedirs(sig_dir)
+    now = time.time()
+    for fn_ in os.listdir(sig_dir):
+        try:
+            if now - os.path.getmtime(os.path.join(sig_dir, fn_)) > SIGNATURE_TTL:
+                os.remove(os.path.join(sig_dir, fn_))
+        except OSError:
+            pass
+    with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+        fp_.write(data)
+    return sig_id
+
+
+def load_signature(cachedir, sig_id):
+    """
+    Return the signature stored with the id ``sig_id``, or None if it is not
+    stored anymore
+    """
+    path = _signature_path(cachedir, sig_id)
+    if path is None:
+        return None
+    try:
+        with salt.utils.files.fopen(path, "rb") as fp_:
+            return salt.utils.msgpack.loads(fp_.read(), raw=False)
+    except (OSError, ValueError):
+        return None
+
+
+def remove_signature(cachedir, sig_id):
+    """
+    Remove the signature stored with the id ``sig_id``
+    """
+    path = _signature_path(cachedir, sig_id)
+    if path is None:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -56,6 +56,8 @@ import fnmatch
 import hashlib
 import logging
 import os
+import queue
+import threading
 import time
 from collections.abc import MutableMapping
 
@@ -68,9 +70,12 @@ import salt.payload
 import salt.transport.client
 import salt.transport.ipc
 import salt.utils.asynchronous
+import salt.utils.atomicfile
 import salt.utils.cache
 import salt.utils.dicttrim
 import salt.utils.files
+import salt.utils.metrics
+import salt.utils.msgpack
 import salt.utils.platform
 import salt.utils.process
 import salt.utils.stringutils
@@ -99,9 +104,29 @@ TAGS = {
     "cloud": "cloud",  # prefix for all salt/cloud events
     "fileserver": "fileserver",  # prefix for all salt/fileserver events
     "queue": "queue",  # prefix for all salt/queue events
+    "batch": "batch",  # prefix for all salt/batch events
 }
 
 
+def _packed_tag(package):
+    """
+    Return the tag of the packed event ``package`` without unpacking its
+    data, or None if it is not an event
+    """
+    if isinstance(package, bytes):
+        mtag, sep, _ = package.partition(salt.utils.stringutils.to_bytes(TAGEND))
+    elif isinstance(package, str):
+        mtag, sep, _ = package.partition(TAGEND)
+    else:
+        return None
+    if not sep:
+        return None
+    try:
+        return salt.utils.stringutils.to_str(mtag)
+    except UnicodeDecodeError:
+        return None
+
+
 def get_event(
     node,
     sock_dir=None,
@@ -256,6 +281,7 @@ class SaltEvent:
         if salt.utils.platform.is_windows() and "ipc_mode" not in opts:
             self.opts["ipc_mode"] = "tcp"
         self.puburi, self.pulluri = self.__load_uri(sock_dir, node)
+        self.tag_filter = None
         self.pending_tags = []
         self.pending_events = []
         self.__load_cache_regex()
@@ -348,6 +374,34 @@ class SaltEvent:
             ):
                 self.pending_events.append(evt)
 
+    def set_tag_filter(self, tags=None, match_type=None):
+        """
+        Only receive the events whose tag matches one of ``tags``. The
+        publisher drops the other events instead of sending them to this
+        subscriber, so that it does not have to read and discard them.
+
+        match_type
+            ``startswith`` or ``fnmatch``, defaults to
+            opts['event_match_type']
+
+        Pass ``None`` to receive all the events again.
+
+        .. versionadded:: 3003
+        """
+        if match_type is None:
+            match_type = self.opts["event_match_type"]
+        if tags is None:
+            self.tag_filter = None
+        elif match_type in ("startswith", "fnmatch"):
+            self.tag_filter = [[tag, match_type] for tag in tags]
+        else:
+            raise ValueError(
+                "The publisher cannot filter events with the {} match "
+                "type".format(match_type)
+            )
+        if self.subscriber is not None:
+            self.subscriber.set_tag_filter(self.tag_filter)
+
     def connect_pub(self, timeout=None):
         """
         Establish the publish connection
@@ -364,6 +418,7 @@ class SaltEvent:
                         kwargs={"io_loop": self.io_loop},
                         loop_kwarg="io_loop",
                     )
+                    self.subscriber.set_tag_filter(self.tag_filter)
                 try:
                     self.subscriber.connect(timeout=timeout)
                     self.cpub = True
@@ -374,6 +429,7 @@ class SaltEvent:
                 self.subscriber = salt.transport.ipc.IPCMessageSubscriber(
                     self.puburi, io_loop=self.io_loop
                 )
+                self.subscriber.set_tag_filter(self.tag_filter)
 
             # For the asynchronous case, the connect will be defered to when
             # set_event_handler() is invoked.
@@ -1112,7 +1168,7 @@ class AsyncEventPublisher:
         Get something from epull, publish it out epub, and return the package (or None)
         """
         try:
-            self.publisher.publish(package)
+            self.publisher.publish(package, tag=_packed_tag(package))
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:  # pylint: disable=broad-except
@@ -1166,6 +1222,7 @@ class EventPublisher(salt.utils.process.SignalHandlingProcess):
         Bind the pub and pull sockets for events
         """
         salt.utils.process.appendproctitle(self.__class__.__name__)
+        salt.utils.metrics.init(self.opts, self.__class__.__name__)
 
         if (
             self.opts["event_publisher_niceness"]
@@ -1219,7 +1276,10 @@ class EventPublisher(salt.utils.process.SignalHandlingProcess):
         Get something from epull, publish it out epub, and return the package (or None)
         """
         try:
-            self.publisher.publish(package)
+            self.publisher.publish(package, tag=_packed_tag(package))
+            salt.utils.metrics.inc("salt_master_events_total")
+            if isinstance(package, (bytes, str)):
+                salt.utils.metrics.inc("salt_master_event_bytes_total", len(package))
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:  # pylint: disable=broad-except
@@ -1246,10 +1306,295 @@ class EventPublisher(salt.utils.process.SignalHandlingProcess):
         super()._handle_signals(signum, sigframe)
 
 
+class EventReturnDispatcher:
+    """
+    Forward the events queued by :py:class:`EventReturn` to one event
+    returner, from a dedicated thread, so that a slow returner does not hold
+    the other ones back.
+
+    .. versionadded:: 3003
+
+    The events are sent in batches of :conf_master:`event_return_queue`
+    events, or of the events queued for
+    :conf_master:`event_return_queue_max_seconds` seconds. At most
+    :conf_master:`event_return_queue_max_size` events wait in memory, the
+    newer ones are dropped while the queue is full.
+
+    When the returner fails, it is retried with an exponential backoff, up to
+    :conf_master:`event_return_retry_max_wait` seconds between two attempts.
+    Until then the batches are spilled to the disk, up to
+    :conf_master:`event_return_spill_max_size` bytes, and they are sent to the
+    returner again before any newer event once it is back.
+    """
+
+    def __init__(self, opts, name, returner, poll_interval=0.5):
+        self.opts = opts
+        self.name = name
+        self.returner = returner
+        self.poll_interval = poll_interval
+        self.batch_size = max(opts["event_return_queue"], 1)
+        self.max_seconds = opts.get("event_return_queue_max_seconds", 0)
+        self.queue = queue.Queue(opts["event_return_queue_max_size"])
+        self.retry_max_wait = opts["event_return_retry_max_wait"]
+        self.retry_max_attempts = opts["event_return_retry_max_attempts"]
+        self.retry_wait = 0
+        self.retry_at = 0
+        self.spill_dir = os.path.join(opts["cachedir"], "event_return", name)
+        self.spill_max_size = opts["event_return_spill_max_size"]
+        self.spill_size = 0
+        self.last_spill_id = 0
+        self.full = False
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        for path in self._spilled():
+            try:
+                self.spill_size += os.path.getsize(path)
+            except OSError:
+                pass
+        salt.utils.metrics.add_gauge(
+            "salt_event_return_spilled_bytes", self.spill_size, returner=self.name
+        )
+        self.thread = threading.Thread(
+            target=self._run, name="event_return-{}".format(self.name)
+        )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Send the queued events and stop the thread, wait for it at most
+        ``timeout`` seconds
+        """
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def put(self, event):
+        """
+        Queue an event, return False if it was dropped because the queue is
+        full
+        """
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            if not self.full:
+                log.warning(
+                    "The queue of the event returner '%s' is full, dropping events",
+                    self.name,
+                )
+                self.full = True
+            self._drop(1, "queue_full")
+            return False
+        self.full = False
+        salt.utils.metrics.add_gauge(
+            "salt_event_return_queued_events", 1, returner=self.name
+        )
+        return True
+
+    def _down(self):
+        return self.retry_at and time.time() < self.retry_at
+
+    def _collect(self):
+        """
+        Return the next batch of events, it is empty when the queue is empty
+        and it is time to retry the returner, or to stop
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if self.stopping.is_set():
+                try:
+                    event = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                now = time.time()
+                if deadline is not None and now >= deadline:
+                    break
+                if not batch and self.retry_at and now >= self.retry_at:
+                    if self.spill_size:
+                        # Time to send the spilled events again
+                        break
+                    # Nothing to retry, wait for the next event
+                    self.retry_at = 0
+                try:
+                    event = self.queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    continue
+            batch.append(event)
+            if deadline is None and self.max_seconds > 0:
+                deadline = time.time() + self.max_seconds
+        if batch:
+            salt.utils.metrics.add_gauge(
+                "salt_event_return_queued_events", -len(batch), returner=self.name
+            )
+        return batch
+
+    def _run(self):
+        while True:
+            if not self.spill_max_size and self._down():
+                # Nowhere to put the events but the queue until the retry
+                self.stopping.wait(self.retry_at - time.time())
+            batch = self._collect()
+            stopping = self.stopping.is_set()
+            if self._down() and not stopping:
+                self._spill(batch)
+            elif not self._replay():
+                self._spill(batch)
+            elif batch and not self._send(batch):
+                self._spill(batch, attempts=1)
+            if stopping and self.queue.empty():
+                break
+
+    def _send(self, batch):
+        try:
+            with salt.utils.metrics.timer(
+                "salt_event_return_duration_seconds", returner=self.name
+            ):
+                self.returner(batch)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.retry_wait = min(max(self.retry_wait * 2, 1), self.retry_max_wait)
+            self.retry_at = time.time() + self.retry_wait
+            log.error(
+                "Could not store events - returner '%s' raised exception: %s, "
+                "retrying in %s seconds",
+                self.name,
+                exc,
+                self.retry_wait,
+            )
+            # don't waste processing power unnecessarily on converting a
+            # potentially huge dataset to a string
+            if log.level <= logging.DEBUG:
+                log.debug("Event data that caused an exception: %s", batch)
+            salt.utils.metrics.inc(
+                "salt_event_return_failures_total", returner=self.name
+            )
+            return False
+        self.retry_wait = self.retry_at = 0
+        salt.utils.metrics.inc(
+            "salt_event_return_events_total", len(batch), returner=self.name
+        )
+        return True
+
+    def _drop(self, count, reason):
+        salt.utils.metrics.inc(
+            "salt_event_return_dropped_events_total",
+            count,
+            returner=self.name,
+            reason=reason,
+        )
+
+    def _spilled(self):
+        """
+        Return the paths of the spilled batches, oldest first
+        """
+        try:
+            names = sorted(os.listdir(self.spill_dir))
+        except OSError:
+            return []
+        return [
+            os.path.join(self.spill_dir, fn_) for fn_ in names if fn_.endswith(".p")
+        ]
+
+    def _write_spill(self, path, batch, attempts):
+        data = salt.utils.msgpack.dumps({"attempts": attempts, "events": batch})
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        if self.spill_size - old_size + len(data) > self.spill_max_size:
+            return False
+        try:
+            if not os.path.isdir(self.spill_dir):
+                os.makedirs(self.spill_dir)
+            with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+                fp_.write(data)
+        except OSError as exc:
+            log.error("Unable to spill events to %s: %s", path, exc)
+            return False
+        self._add_spill_size(len(data) - old_size)
+        return True
+
+    def _add_spill_size(self, size):
+        self.spill_size += size
+        salt.utils.metrics.add_gauge(
+            "salt_event_return_spilled_bytes", size, returner=self.name
+        )
+
+    def _remove_spill(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError as exc:
+            log.error("Unable to remove the spilled events %s: %s", path, exc)
+            return
+        self._add_spill_size(-size)
+
+    def _spill(self, batch, attempts=0):
+        """
+        Store a batch which can not be sent now to the disk, or drop it if
+        the spill buffer is disabled or full
+        """
+        if not batch:
+            return
+        if self.spill_max_size:
+            # Time based names, so that the oldest batches are sent first
+            self.last_spill_id = max(int(time.time() * 1000000), self.last_spill_id + 1)
+            path = os.path.join(self.spill_dir, "{:020d}.p".format(self.last_spill_id))
+            if self._write_spill(path, batch, attempts):
+                return
+            reason = "spill_full"
+        else:
+            reason = "returner_down"
+        log.warning(
+            "Dropping %s events which could not be sent to the event returner '%s'",
+            len(batch),
+            self.name,
+        )
+        self._drop(len(batch), reason)
+
+    def _replay(self):
+        """
+        Send the spilled batches, oldest first, return whether all of them
+        were sent
+        """
+        for path in self._spilled():
+            try:
+                with salt.utils.files.fopen(path, "rb") as fp_:
+                    data = salt.utils.msgpack.load(fp_, raw=False)
+            except (OSError, ValueError) as exc:
+                log.error("Unable to read the spilled events %s: %s", path, exc)
+                self._remove_spill(path)
+                continue
+            batch = data["events"]
+            if self._send(batch):
+                self._remove_spill(path)
+                continue
+            attempts = data["attempts"] + 1
+            if self.retry_max_attempts and attempts >= self.retry_max_attempts:
+                log.error(
+                    "Dropping %s events which the event returner '%s' failed to "
+                    "store %s times",
+                    len(batch),
+                    self.name,
+                    attempts,
+                )
+                self._remove_spill(path)
+                self._drop(len(batch), "retries")
+            elif not self._write_spill(path, batch, attempts):
+                self._remove_spill(path)
+                self._drop(len(batch), "spill_full")
+            return False
+        return True
+
+
 class EventReturn(salt.utils.process.SignalHandlingProcess):
     """
     A dedicated process which listens to the master event bus and queues
-    and forwards events to the specified returner.
+    and forwards events to the specified returners, see
+    :py:class:`EventReturnDispatcher`.
     """
 
     def __init__(self, opts, **kwargs):
@@ -1265,14 +1610,10 @@ class EventReturn(salt.utils.process.SignalHandlingProcess):
         super().__init__(**kwargs)
 
         self.opts = opts
-        self.event_return_queue = self.opts["event_return_queue"]
-        self.event_return_queue_max_seconds = self.opts.get(
-            "event_return_queue_max_seconds", 0
-        )
         local_minion_opts = self.opts.copy()
         local_minion_opts["file_client"] = "local"
         self.minion = salt.minion.MasterMinion(local_minion_opts)
-        self.event_queue = []
+        self.dispatchers = []
         self.stop = False
 
     # __setstate__ and __getstate__ are only used on Windows.
@@ -1294,49 +1635,42 @@ class EventReturn(salt.utils.process.SignalHandlingProcess):
 
     def _handle_signals(self, signum, sigframe):
         # Flush and terminate
-        if self.event_queue:
-            self.flush_events()
+        self.stop_dispatchers()
         self.stop = True
         super()._handle_signals(signum, sigframe)
 
-    def flush_events(self):
-        if isinstance(self.opts["event_return"], list):
-            # Multiple event returners
-            for r in self.opts["event_return"]:
-                log.debug("Calling event returner %s, one of many.", r)
-                event_return = "{}.event_return".format(r)
-                self._flush_event_single(event_return)
-        else:
-            # Only a single event returner
-            log.debug(
-                "Calling event returner %s, only one configured.",
-                self.opts["event_return"],
-            )
-            event_return = "{}.event_return".format(self.opts["event_return"])
-            self._flush_event_single(event_return)
-        del self.event_queue[:]
-
-    def _flush_event_single(self, event_return):
-        if event_return in self.minion.returners:
-            try:
-                self.minion.returners[event_return](self.event_queue)
-            except Exception as exc:  # pylint: disable=broad-except
+    def start_dispatchers(self):
+        """
+        Start a dispatcher for each configured event returner
+        """
+        returners = self.opts["event_return"]
+        if not isinstance(returners, list):
+            returners = [returners]
+        for name in returners:
+            event_return = "{}.event_return".format(name)
+            if event_return not in self.minion.returners:
                 log.error(
-                    "Could not store events - returner '%s' raised " "exception: %s",
+                    "Could not store return for event(s) - returner '%s' not found.",
                     event_return,
-                    exc,
                 )
-                # don't waste processing power unnecessarily on converting a
-                # potentially huge dataset to a string
-                if log.level <= logging.DEBUG:
-                    log.debug(
-                        "Event data that caused an exception: %s", self.event_queue
-                    )
-        else:
-            log.error(
-                "Could not store return for event(s) - returner " "'%s' not found.",
-                event_return,
+                continue
+            log.debug("Starting the dispatcher of event returner %s", name)
+            dispatcher = EventReturnDispatcher(
+                self.opts, name, self.minion.returners[event_return]
             )
+            dispatcher.start()
+            self.dispatchers.append(dispatcher)
+
+    def stop_dispatchers(self, timeout=10):
+        """
+        Send the queued events to the returners and stop the dispatchers
+        """
+        dispatchers, self.dispatchers = self.dispatchers, []
+        for dispatcher in dispatchers:
+            dispatcher.stopping.set()
+        deadline = time.time() + timeout
+        for dispatcher in dispatchers:
+            dispatcher.stop(max(deadline - time.time(), 0))
 
     def run(self):
         """
@@ -1350,64 +1684,29 @@ class EventReturn(salt.utils.process.SignalHandlingProcess):
             )
             os.nice(self.opts["event_return_niceness"])
 
+        salt.utils.metrics.init(self.opts, self.__class__.__name__)
+        self.start_dispatchers()
         self.event = get_event("master", opts=self.opts, listen=True)
         events = self.event.iter_events(full=True)
         self.event.fire_event({}, "salt/event_listen/start")
         try:
             # events below is a generator, we will iterate until we get the salt/event/exit tag
-            oldestevent = None
             for event in events:
 
                 if event["tag"] == "salt/event/exit":
                     # We're done eventing
                     self.stop = True
                 if self._filter(event):
-                    # This event passed the filter, add it to the queue
-                    self.event_queue.append(event)
-                too_long_in_queue = False
-
-                # if max_seconds is >0, then we want to make sure we flush the queue
-                # every event_return_queue_max_seconds seconds,  If it's 0, don't
-                # apply any of this logic
-                if self.event_return_queue_max_seconds > 0:
-                    rightnow = datetime.datetime.now()
-                    if not oldestevent:
-                        oldestevent = rightnow
-                    age_in_seconds = (rightnow - oldestevent).seconds
-                    if age_in_seconds > 0:
-                        log.debug(
-                            "Oldest event in queue is %s seconds old.", age_in_seconds
-                        )
-                    if age_in_seconds >= self.event_return_queue_max_seconds:
-                        too_long_in_queue = True
-                        oldestevent = None
-                    else:
-                        too_long_in_queue = False
-
-                    if too_long_in_queue:
-                        log.debug(
-                            "Oldest event has been in queue too long, will flush queue"
-                        )
-
-                # If we are over the max queue size or the oldest item in the queue has been there too long
-                # then flush the queue
-                if (
-                    len(self.event_queue) >= self.event_return_queue
-                    or too_long_in_queue
-                ):
-                    log.debug("Flushing %s events.", len(self.event_queue))
-                    self.flush_events()
-                    oldestevent = None
+                    # This event passed the filter, queue it for each returner
+                    for dispatcher in self.dispatchers:
+                        dispatcher.put(event)
                 if self.stop:
                     # We saw the salt/event/exit tag, we can stop eventing
                     break
-        finally:  # flush all we have at this moment
-            # No matter what, make sure we flush the queue even when we are exiting
-            # and there will be no more events.
-            if self.event_queue:
-                log.debug("Flushing %s events.", len(self.event_queue))
-
-                self.flush_events()
+        finally:
+            # No matter what, make sure we send the queued events even when we
+            # are exiting and there will be no more events.
+            self.stop_dispatchers()
 
     def _filter(self, event):
         """
@@ -11,6 +11,7 @@ import shutil
 
 # Import salt libs
 import salt.fileclient
+import salt.loader_index
 import salt.utils.files
 import salt.utils.hashutils
 import salt.utils.path
@@ -154,4 +155,6 @@ def sync(opts, form, saltenv=None, extmod_whitelist=None, extmod_blacklist=None)
                         shutil.rmtree(emptydir, ignore_errors=True)
         except Exception as exc:  # pylint: disable=broad-except
             log.error("Failed to sync %s module: %s", form, exc)
+    if touched:
+        salt.loader_index.clear(opts)
     return ret, touched
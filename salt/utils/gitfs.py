@@ -1040,6 +1040,13 @@ class GitProvider:
         """
         raise NotImplementedError()
 
+    def get_head_sha(self):
+        """
+        Return the SHA of the commit checked out, or None if unknown. This
+        function must be overridden in a sub-class.
+        """
+        raise NotImplementedError()
+
     def get_checkout_target(self):
         """
         Resolve dynamically-set branch
@@ -1449,6 +1456,15 @@ class GitPython(GitProvider):
             return blob, blob.hexsha, blob.mode
         return None, None, None
 
+    def get_head_sha(self):
+        """
+        Return the SHA of the commit checked out, or None if unknown
+        """
+        try:
+            return self.repo.rev_parse("HEAD").hexsha
+        except Exception:  # pylint: disable=broad-except
+            return None
+
     def get_tree_from_branch(self, ref):
         """
         Return a git.Tree object matching a head ref fetched into
@@ -2015,6 +2031,15 @@ class Pygit2(GitProvider):
             return blob, blob.hex, mode
         return None, None, None
 
+    def get_head_sha(self):
+        """
+        Return the SHA of the commit checked out, or None if unknown
+        """
+        try:
+            return self.peel(self.repo.lookup_reference("HEAD")).hex
+        except (AttributeError, KeyError):
+            return None
+
     def get_tree_from_branch(self, ref):
         """
         Return a pygit2.Tree object matching a head ref fetched into
@@ -0,0 +1,192 @@
+"""
+Cache of the hashes of the files served by the fileserver
+
+.. versionadded:: 3003
+
+Each fileserver backend keeps hashes of the files it serves in its own way,
+usually as one ``.hash.<hash_type>`` file per served file, which is read (and
+for ``roots`` compared against the mtime of the file) every time a minion asks
+for the hash of a file. When :conf_master:`fileserver_hash_cache` is enabled,
+:py:class:`salt.fileserver.Fileserver` looks the hashes up in this cache first.
+
+The hashes of all backends are kept in a single SQLite database
+(``fileserver/hashes.sqlite`` in the cachedir), keyed by backend and path, and
+are only valid for the mtime and size the file had when it was hashed. Each
+process also keeps the hashes it looked up in memory, since they are checked
+against the mtime and size of the file anyway.
+"""
+
+import logging
+import os
+import threading
+
+try:
+    import sqlite3
+
+    HAS_SQLITE3 = True
+except ImportError:
+    HAS_SQLITE3 = False
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """CREATE TABLE IF NOT EXISTS hashes (
+    backend TEXT NOT NULL,
+    path TEXT NOT NULL,
+    hash_type TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hsum TEXT NOT NULL,
+    hsum_type TEXT NOT NULL,
+    PRIMARY KEY (backend, path, hash_type)
+)"""
+
+# Number of paths looked up per query, within SQLite's default limit of 999
+# bound parameters
+_CHUNK_SIZE = 400
+
+# Number of hashes kept in memory by each process
+_MAX_MEMORY_ENTRIES = 20000
+
+
+def file_key(backend, path):
+    """
+    Return the cache key of a local file served by ``backend``, made of the
+    backend, the path and the mtime and size of the file, or ``None`` if the
+    file cannot be stat'ed.
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return backend, path, stat.st_mtime_ns, stat.st_size
+
+
+class HashCache:
+    """
+    Look up and store the hashes of fileserver files by
+    ``(backend, path, mtime, size)`` key
+    """
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.path = os.path.join(opts["cachedir"], "fileserver", "hashes.sqlite")
+        self._conn = None
+        self._pid = None
+        self._memory = {}
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        """
+        Return the connection to the database of this process, connections do
+        not survive a fork.
+        """
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        if not os.path.isdir(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+        conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_SCHEMA)
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def get_many(self, keys):
+        """
+        Return a dict mapping the keys, as returned by :py:func:`file_key`,
+        for which a hash is cached to a dict with the ``hsum`` and
+        ``hash_type`` of the file
+        """
+        hash_type = self.opts["hash_type"]
+        ret = {}
+        missing = []
+        for key in keys:
+            cached = self._memory.get((key[0], key[1], hash_type))
+            if cached is not None and cached[:2] == key[2:]:
+                ret[key] = {"hsum": cached[2], "hash_type": cached[3]}
+            else:
+                missing.append(key)
+        if not missing or not HAS_SQLITE3:
+            return ret
+        with self._lock:
+            try:
+                conn = self._connect()
+                while missing:
+                    chunk, missing = missing[:_CHUNK_SIZE], missing[_CHUNK_SIZE:]
+                    wanted = {(key[0], key[1]): key for key in chunk}
+                    paths = sorted({key[1] for key in chunk})
+                    rows = conn.execute(
+                        "SELECT backend, path, mtime, size, hsum, hsum_type "
+                        "FROM hashes WHERE hash_type = ? AND path IN ({})".format(
+                            ", ".join("?" * len(paths))
+                        ),
+                        [hash_type] + paths,
+                    ).fetchall()
+                    for backend, path, mtime, size, hsum, hsum_type in rows:
+                        key = wanted.get((backend, path))
+                        if key is None or key[2:] != (mtime, size):
+                            continue
+                        self._remember(key, hash_type, hsum, hsum_type)
+                        ret[key] = {"hsum": hsum, "hash_type": hsum_type}
+            except (OSError, sqlite3.Error) as exc:
+                log.warning("Unable to read the fileserver hash cache: %s", exc)
+        return ret
+
+    def set_many(self, items):
+        """
+        Store the hashes of several files, ``items`` is a dict mapping keys as
+        returned by :py:func:`file_key` to dicts with the ``hsum`` and
+        ``hash_type`` of the files
+        """
+        hash_type = self.opts["hash_type"]
+        rows = []
+        for key, hsum in items.items():
+            self._remember(key, hash_type, hsum["hsum"], hsum["hash_type"])
+            backend, path, mtime, size = key
+            rows.append(
+                (backend, path, hash_type, mtime, size, hsum["hsum"], hsum["hash_type"])
+            )
+        if not rows or not HAS_SQLITE3:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO hashes (backend, path, hash_type, "
+                        "mtime, size, hsum, hsum_type) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            except (OSError, sqlite3.Error) as exc:
+                log.warning("Unable to write the fileserver hash cache: %s", exc)
+
+    def _remember(self, key, hash_type, hsum, hsum_type):
+        if len(self._memory) >= _MAX_MEMORY_ENTRIES:
+            self._memory.clear()
+        self._memory[(key[0], key[1], hash_type)] = (key[2], key[3], hsum, hsum_type)
+
+    def clear(self, backends=None):
+        """
+        Drop the hashes of the given backends, or of all of them
+        """
+        self._memory = {}
+        if not HAS_SQLITE3 or not os.path.exists(self.path):
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    if backends is None:
+                        conn.execute("DELETE FROM hashes")
+                    else:
+                        conn.executemany(
+                            "DELETE FROM hashes WHERE backend = ?",
+                            [(backend,) for backend in backends],
+                        )
+            except (OSError, sqlite3.Error) as exc:
+                log.warning("Unable to clear the fileserver hash cache: %s", exc)
@@ -110,9 +110,36 @@ def format_jid_instance_ext(jid, job):
     return ret
 
 
-def jid_dir(jid, job_dir=None, hash_type="sha256"):
+def jid_bucket(jid):
+    """
+    Return the hour a job id was generated at, formatted as ``YYYYMMDDHH``, or
+    None if the job id does not hold a time
+
+    .. versionadded:: 3003
+    """
+    if not is_jid(jid):
+        return None
+    return jid[:10]
+
+
+def is_jid_bucket(name):
+    """
+    Returns True if the passed in value is an hour returned by
+    :py:func:`jid_bucket`
+
+    .. versionadded:: 3003
+    """
+    return len(name) == 10 and name.isdigit()
+
+
+def jid_dir(jid, job_dir=None, hash_type="sha256", bucket=False):
     """
     Return the jid_dir for the given job id
+
+    .. versionchanged:: 3003
+        With ``bucket``, the jid_dir of a job id holding a time is in a
+        directory named after the hour it was generated at, see
+        :py:func:`jid_bucket`
     """
     if not isinstance(jid, str):
         jid = str(jid)
@@ -123,5 +150,9 @@ def jid_dir(jid, job_dir=None, hash_type="sha256"):
     parts = []
     if job_dir is not None:
         parts.append(job_dir)
-    parts.extend([jhash[:2], jhash[2:]])
+    hour = jid_bucket(jid) if bucket else None
+    if hour:
+        parts.extend([hour, jhash])
+    else:
+        parts.extend([jhash[:2], jhash[2:]])
     return os.path.join(*parts)
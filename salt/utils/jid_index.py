@@ -0,0 +1,256 @@
+"""
+Index of the jobs stored in the local job cache
+
+.. versionadded:: 3003
+
+The :py:mod:`local_cache <salt.returners.local_cache>` returner stores each
+job in a directory named after the hash of its jid, so listing the jobs means
+reading the load of every job in the cache. When
+:conf_master:`job_cache_index` is enabled, the job cache also appends a short
+record of each job (its jid, function, arguments, target, user and number of
+targeted minions) to an index partitioned by the hour the job started.
+Listing the jobs only reads the index, listing the jobs started in a time
+range only reads the partitions of that range, and expiring the old jobs
+drops whole partitions.
+
+Each partition is an append-only file of length prefixed msgpack records, a
+job may have several records which are merged in order. The jobs already in
+the job cache are imported into the index by the maintenance process of the
+master, the jobs are listed and expired without the index until then. A job
+stored while the index is disabled marks the index as not imported, so that
+the index is rebuilt once it is enabled again.
+"""
+
+import contextlib
+import datetime
+import logging
+import os
+import struct
+
+import salt.payload
+import salt.utils.files
+import salt.utils.jid
+
+log = logging.getLogger(__name__)
+
+_FRAME = struct.Struct(">I")
+
+# The keys of the load of a job which are kept in the index, they are the ones
+# read by salt.utils.jid.format_job_instance
+LOAD_KEYS = ("fun", "arg", "tgt", "tgt_type", "user", "metadata")
+
+
+def partition(jid):
+    """
+    Return the partition of the index holding the records of ``jid``, the UTC
+    hour it was generated at, or the current one for jids which do not hold a
+    time
+    """
+    return salt.utils.jid.jid_bucket(jid) or "{:%Y%m%d%H}".format(
+        datetime.datetime.utcnow()
+    )
+
+
+def _jid_time(when):
+    return "{:%Y%m%d%H%M%S%f}".format(when)
+
+
+def _imported_path(opts):
+    return os.path.join(opts["cachedir"], "job_index", ".imported")
+
+
+def reset(opts):
+    """
+    Mark the jobs of the job cache as not imported into the index, for the
+    jobs stored while :conf_master:`job_cache_index` is disabled
+    """
+    path = _imported_path(opts)
+    if not os.path.isfile(path):
+        return
+    log.debug("Marking the job cache index as not imported")
+    try:
+        os.remove(path)
+    except OSError as exc:
+        if os.path.isfile(path):
+            log.error("Could not reset the job cache index: %s", exc)
+
+
+class JidIndex:
+    """
+    The index of the jobs of the local job cache
+    """
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.index_dir = os.path.join(opts["cachedir"], "job_index")
+        self.lock_path = os.path.join(self.index_dir, ".lock")
+        self.imported_path = _imported_path(opts)
+
+    @contextlib.contextmanager
+    def _lock(self):
+        if not os.path.isdir(self.index_dir):
+            os.makedirs(self.index_dir)
+        with salt.utils.files.flopen(self.lock_path, "a"):
+            yield
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, "{}.p".format(name))
+
+    def add(self, jid, load=None, minions=None):
+        """
+        Append a record of the job ``jid`` to the index, ``load`` is the load
+        of the job and ``minions`` the list of minions it targets, either of
+        them may be omitted when it is not known yet
+        """
+        record = {"jid": jid}
+        if load is not None:
+            record["load"] = {key: load[key] for key in LOAD_KEYS if key in load}
+            if "metadata" not in load and "metadata" in load.get("kwargs", {}):
+                record["load"]["metadata"] = load["kwargs"]["metadata"]
+        if minions is not None:
+            record["minions"] = len(minions)
+        data = self.serial.dumps(record, use_bin_type=True)
+        try:
+            if not os.path.isdir(self.index_dir):
+                os.makedirs(self.index_dir)
+            # One write of a file opened for appending, so that the records of
+            # concurrent writers do not interleave
+            with salt.utils.files.fopen(self._path(partition(jid)), "ab") as fp_:
+                fp_.write(_FRAME.pack(len(data)) + data)
+        except OSError as exc:
+            log.error("Could not add job %s to the job cache index: %s", jid, exc)
+
+    def _read(self, name):
+        """
+        Return the records of a partition, merged by jid, in the order the jobs
+        were added
+        """
+        jobs = {}
+        try:
+            with salt.utils.files.fopen(self._path(name), "rb") as fp_:
+                while True:
+                    frame = fp_.read(_FRAME.size)
+                    if len(frame) < _FRAME.size:
+                        break
+                    size = _FRAME.unpack(frame)[0]
+                    data = fp_.read(size)
+                    if len(data) < size:
+                        # Partially written record
+                        break
+                    record = self.serial.loads(data, encoding="utf-8")
+                    jobs.setdefault(record.pop("jid"), {}).update(record)
+        except OSError as exc:
+            log.debug("Could not read the job cache index %s: %s", name, exc)
+        return jobs
+
+    def partitions(self, start=None, end=None):
+        """
+        Return the names of the partitions holding the jobs started between
+        the datetimes ``start`` and ``end``, oldest first
+        """
+        try:
+            names = os.listdir(self.index_dir)
+        except OSError:
+            return []
+        ret = []
+        for fn_ in names:
+            if not fn_.endswith(".p"):
+                continue
+            name = fn_[:-2]
+            if start is not None and name < "{:%Y%m%d%H}".format(start):
+                continue
+            if end is not None and name > "{:%Y%m%d%H}".format(end):
+                continue
+            ret.append(name)
+        return sorted(ret)
+
+    def jobs(self, start=None, end=None):
+        """
+        Return a dict of the indexed jobs started between the datetimes
+        ``start`` and ``end``, mapping their jid to the ``load`` kept in the
+        index and the number of targeted ``minions``
+        """
+        ret = {}
+        for name in self.partitions(start, end):
+            for jid, job in self._read(name).items():
+                if "load" not in job:
+                    continue
+                if start is not None or end is not None:
+                    if not salt.utils.jid.is_jid(jid):
+                        continue
+                    if start is not None and jid[:20] < _jid_time(start):
+                        continue
+                    if end is not None and jid[:20] > _jid_time(end):
+                        continue
+                ret[jid] = job
+        return ret
+
+    def latest(self, count, select=None):
+        """
+        Return the ``count`` most recent jobs of the index, as a sorted list of
+        ``(jid, job)`` tuples, skipping the jobs for which ``select(jid, job)``
+        returns False
+        """
+        ret = []
+        for name in reversed(self.partitions()):
+            for jid, job in self._read(name).items():
+                if "load" not in job:
+                    continue
+                if select is not None and not select(jid, job):
+                    continue
+                ret.append((jid, job))
+            if len(ret) >= count:
+                # The older partitions only hold smaller jids
+                break
+        ret.sort(key=lambda item: item[0])
+        return ret[-count:] if count > 0 else []
+
+    def expire(self, before, remove_job):
+        """
+        Drop the partitions of the jobs started before the datetime
+        ``before``, calling ``remove_job(jid)`` for each of their jobs first
+        """
+        for name in self.partitions():
+            if name >= "{:%Y%m%d%H}".format(before):
+                break
+            for jid in self._read(name):
+                remove_job(jid)
+            try:
+                os.remove(self._path(name))
+            except OSError as exc:
+                log.error("Could not remove the job cache index %s: %s", name, exc)
+
+    def imported(self):
+        """
+        Return whether the jobs cached while the index was disabled were added
+        to it
+        """
+        return os.path.isfile(self.imported_path)
+
+    def import_jobs(self, jobs):
+        """
+        Rebuild the index from the jobs of the iterable of
+        ``(jid, load, minions)`` tuples, unless another process did it already.
+        The jobs are listed without the index until it is done.
+        """
+        with self._lock():
+            if self.imported():
+                return
+            log.info("Importing the jobs of the job cache into the job cache index")
+            # The records of the jobs removed while the index was disabled
+            # are dropped. A record added from now on is for a job the
+            # iterable reads from the job cache anyway.
+            for name in self.partitions():
+                try:
+                    os.remove(self._path(name))
+                except OSError as exc:
+                    log.error("Could not remove the job cache index %s: %s", name, exc)
+                    return
+            count = 0
+            for jid, load, minions in jobs:
+                self.add(jid, load, minions)
+                count += 1
+            with salt.utils.files.fopen(self.imported_path, "w"):
+                pass
+            log.info("Imported %d jobs into the job cache index", count)
@@ -19,6 +19,7 @@ from xml.etree.ElementTree import Element, SubElement, tostring
 
 import jinja2
 import salt.fileclient
+import salt.utils.compile_cache
 import salt.utils.data
 import salt.utils.files
 import salt.utils.json
@@ -118,6 +119,10 @@ class SaltCacheLoader(BaseLoader):
         """
         Cache a file only once
         """
+        if not self.pillar_rend:
+            salt.utils.compile_cache.record(
+                self.saltenv, salt.utils.url.create(template)
+            )
         if template not in self.cached:
             self.cache_file(template)
             self.cached.append(template)
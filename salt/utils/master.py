@@ -203,10 +203,16 @@ class MasterPillarUtil:
             return mine_data
         if not minion_ids:
             minion_ids = self.cache.list("minions")
+        minion_ids = [
+            minion_id
+            for minion_id in minion_ids
+            if salt.utils.verify.valid_id(self.opts, minion_id)
+        ]
+        cached = self.cache.fetch_many(
+            ("minions/{}".format(minion_id), "mine") for minion_id in minion_ids
+        )
         for minion_id in minion_ids:
-            if not salt.utils.verify.valid_id(self.opts, minion_id):
-                continue
-            mdata = self.cache.fetch("minions/{}".format(minion_id), "mine")
+            mdata = cached[("minions/{}".format(minion_id), "mine")]
             if isinstance(mdata, dict):
                 mine_data[minion_id] = mdata
         return mine_data
@@ -223,10 +229,16 @@ class MasterPillarUtil:
             return grains, pillars
         if not minion_ids:
             minion_ids = self.cache.list("minions")
+        minion_ids = [
+            minion_id
+            for minion_id in minion_ids
+            if salt.utils.verify.valid_id(self.opts, minion_id)
+        ]
+        cached = self.cache.fetch_many(
+            ("minions/{}".format(minion_id), "data") for minion_id in minion_ids
+        )
         for minion_id in minion_ids:
-            if not salt.utils.verify.valid_id(self.opts, minion_id):
-                continue
-            mdata = self.cache.fetch("minions/{}".format(minion_id), "data")
+            mdata = cached[("minions/{}".format(minion_id), "data")]
             if not isinstance(mdata, dict):
                 log.warning(
                     "cache.fetch should always return a dict. ReturnedType: %s, MinionId: %s",
@@ -511,6 +523,7 @@ class MasterPillarUtil:
             # to read in the pillar/grains data since they are both stored
             # in the same file, 'data.p'
             grains, pillars = self._get_cached_minion_data(*minion_ids)
+        ckminions = salt.utils.minions.CkMinions(self.opts)
         try:
             c_minions = self.cache.list("minions")
             for minion_id in minion_ids:
@@ -530,10 +543,17 @@ class MasterPillarUtil:
                 ):
                     # Not saving pillar or grains, so just delete the cache file
                     self.cache.flush(bank, "data")
+                    ckminions.update_minion_data_index(minion_id, None)
                 elif clear_pillar and minion_grains:
                     self.cache.store(bank, "data", {"grains": minion_grains})
+                    ckminions.update_minion_data_index(
+                        minion_id, {"grains": minion_grains}
+                    )
                 elif clear_grains and minion_pillar:
                     self.cache.store(bank, "data", {"pillar": minion_pillar})
+                    ckminions.update_minion_data_index(
+                        minion_id, {"pillar": minion_pillar}
+                    )
                 if clear_mine:
                     # Delete the whole mine file
                     self.cache.flush(bank, "mine")
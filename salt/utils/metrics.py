@@ -0,0 +1,400 @@
+"""
+Metrics of the salt master processes
+
+.. versionadded:: 3003
+
+Each process of the master which calls :py:func:`init` records its metrics in
+memory, and writes a snapshot of them to a file of the ``metrics`` directory
+of the ``sock_dir`` once a second, when they changed. The ``sock_dir`` usually
+lives on a tmpfs, so that these files are shared memory between the processes.
+The :py:class:`MetricsServer` process merges the snapshots of all the
+processes and serves them over HTTP in the Prometheus text format.
+
+When :conf_master:`master_metrics` is not set, :py:func:`init` is never called
+and recording a metric does nothing.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import salt.ext.tornado.httpserver
+import salt.ext.tornado.ioloop
+import salt.ext.tornado.web
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.msgpack
+import salt.utils.process
+
+log = logging.getLogger(__name__)
+
+# The upper bounds of the buckets of the latency histograms, in seconds
+BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# The help text of the metrics recorded by salt
+DESCRIPTIONS = {
+    "salt_master_request_duration_seconds": (
+        "Time the master workers took to handle a request"
+    ),
+    "salt_master_requests_in_progress": (
+        "Requests received by the master workers and not answered yet"
+    ),
+    "salt_master_publish_duration_seconds": (
+        "Time the publisher took to send a job to the minions"
+    ),
+    "salt_master_events_total": "Events published on the master event bus",
+    "salt_master_event_bytes_total": (
+        "Bytes of the events published on the master event bus"
+    ),
+    "salt_cache_operation_duration_seconds": "Time a cache operation took",
+    "salt_event_return_queued_events": (
+        "Events waiting in memory to be sent to an event returner"
+    ),
+    "salt_event_return_spilled_bytes": (
+        "Size of the events spilled to the disk while an event returner is down"
+    ),
+    "salt_event_return_events_total": "Events sent to an event returner",
+    "salt_event_return_dropped_events_total": (
+        "Events which were never sent to an event returner"
+    ),
+    "salt_event_return_failures_total": "Failed calls to an event returner",
+    "salt_event_return_duration_seconds": "Time an event returner took to store events",
+    "salt_ext_pillar_duration_seconds": "Time an ext_pillar source took to return",
+    "salt_ext_pillar_timeouts_total": "Calls to an ext_pillar source which timed out",
+}
+
+_REGISTRY = None
+
+
+def metrics_dir(opts):
+    """
+    Return the directory holding the snapshots of the metrics
+    """
+    return os.path.join(opts["sock_dir"], "metrics")
+
+
+class Registry:
+    """
+    The metrics recorded by one process
+    """
+
+    def __init__(self, path, interval=1.0):
+        self.path = path
+        self.interval = interval
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.changed = False
+
+    def observe(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                # The count of each bucket, the sum and the count of the values
+                hist = self.histograms[key] = [0] * (len(BUCKETS) + 2)
+            for idx, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    hist[idx] += 1
+                    break
+            hist[-2] += value
+            hist[-1] += 1
+            self.changed = True
+
+    def inc(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.changed = True
+
+    def add_gauge(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+            self.changed = True
+
+    def snapshot(self):
+        """
+        Return the metrics in a form which msgpack can serialize
+        """
+        with self.lock:
+            self.changed = False
+            return {
+                "histograms": [
+                    [name, dict(labels), list(value)]
+                    for (name, labels), value in self.histograms.items()
+                ],
+                "counters": [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                "gauges": [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.gauges.items()
+                ],
+            }
+
+    def flush(self):
+        """
+        Write the snapshot of the metrics if they changed
+        """
+        if not self.changed:
+            return
+        data = salt.utils.msgpack.dumps(self.snapshot())
+        with salt.utils.atomicfile.atomic_open(self.path, "wb") as fp_:
+            fp_.write(data)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except OSError as exc:
+                log.debug("Unable to write the metrics to %s: %s", self.path, exc)
+
+    def start(self):
+        thread = threading.Thread(target=self._flush_loop, name="metrics")
+        thread.daemon = True
+        thread.start()
+
+
+def init(opts, name):
+    """
+    Start recording the metrics of the current process, under ``name`` which
+    must be unique among the processes of the master
+    """
+    global _REGISTRY
+    if not opts.get("master_metrics"):
+        return
+    path = os.path.join(metrics_dir(opts), "{}.p".format(name))
+    _REGISTRY = Registry(path)
+    _REGISTRY.start()
+
+
+def observe(name, value, **labels):
+    """
+    Add ``value`` to the histogram ``name``
+    """
+    if _REGISTRY is not None:
+        _REGISTRY.observe(name, value, labels)
+
+
+def inc(name, value=1, **labels):
+    """
+    Add ``value`` to the counter ``name``
+    """
+    if _REGISTRY is not None:
+        _REGISTRY.inc(name, value, labels)
+
+
+def add_gauge(name, value, **labels):
+    """
+    Add ``value``, which can be negative, to the gauge ``name``
+    """
+    if _REGISTRY is not None:
+        _REGISTRY.add_gauge(name, value, labels)
+
+
+class _Timer:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.time()
+
+    def __exit__(self, *exc):
+        observe(self.name, time.time() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """
+    Return a context manager adding the time spent in its block to the
+    histogram ``name``
+    """
+    if _REGISTRY is None:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+def collect(path):
+    """
+    Merge the snapshots of the metrics found in the directory ``path``, the
+    values recorded by each process are summed
+    """
+    ret = {"histograms": {}, "counters": {}, "gauges": {}}
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return ret
+    for fn_ in names:
+        if not fn_.endswith(".p"):
+            continue
+        try:
+            with salt.utils.files.fopen(os.path.join(path, fn_), "rb") as fp_:
+                snapshot = salt.utils.msgpack.load(fp_, raw=False)
+        except (OSError, ValueError) as exc:
+            log.debug("Unable to read the metrics in %s: %s", fn_, exc)
+            continue
+        for kind, merged in ret.items():
+            for name, labels, value in snapshot.get(kind, []):
+                key = (name, tuple(sorted(labels.items())))
+                if kind == "histograms":
+                    if key in merged:
+                        value = [a + b for a, b in zip(merged[key], value)]
+                elif key in merged:
+                    value += merged[key]
+                merged[key] = value
+    return ret
+
+
+def _format_labels(labels, extra=()):
+    labels = list(labels) + list(extra)
+    if not labels:
+        return ""
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(
+                key,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
+            )
+            for key, value in labels
+        )
+    )
+
+
+def render(metrics):
+    """
+    Return the metrics returned by :py:func:`collect` in the Prometheus text
+    exposition format
+    """
+    lines = []
+    for kind, mtype in (
+        ("counters", "counter"),
+        ("gauges", "gauge"),
+        ("histograms", "histogram"),
+    ):
+        by_name = {}
+        for (name, labels), value in metrics[kind].items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name in sorted(by_name):
+            if name in DESCRIPTIONS:
+                lines.append("# HELP {} {}".format(name, DESCRIPTIONS[name]))
+            lines.append("# TYPE {} {}".format(name, mtype))
+            for labels, value in sorted(by_name[name]):
+                if kind != "histograms":
+                    lines.append("{}{} {}".format(name, _format_labels(labels), value))
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS, value):
+                    cumulative += count
+                    lines.append(
+                        "{}_bucket{} {}".format(
+                            name, _format_labels(labels, [("le", bound)]), cumulative
+                        )
+                    )
+                lines.append(
+                    "{}_bucket{} {}".format(
+                        name, _format_labels(labels, [("le", "+Inf")]), value[-1]
+                    )
+                )
+                lines.append(
+                    "{}_sum{} {}".format(name, _format_labels(labels), value[-2])
+                )
+                lines.append(
+                    "{}_count{} {}".format(name, _format_labels(labels), value[-1])
+                )
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(
+    salt.ext.tornado.web.RequestHandler
+):  # pylint: disable=abstract-method
+    def initialize(self, path):  # pylint: disable=arguments-differ
+        self.path = path
+
+    def get(self):  # pylint: disable=arguments-differ
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(render(collect(self.path)))
+
+
+class MetricsServer(salt.utils.process.SignalHandlingProcess):
+    """
+    Serve the metrics of the master processes on
+    :conf_master:`master_metrics_interface` and
+    :conf_master:`master_metrics_port`
+    """
+
+    def __init__(self, opts, **kwargs):
+        super().__init__(**kwargs)
+        self.opts = opts
+
+    # __setstate__ and __getstate__ are only used on Windows.
+    def __setstate__(self, state):
+        self.__init__(
+            state["opts"],
+            log_queue=state["log_queue"],
+            log_queue_level=state["log_queue_level"],
+        )
+
+    def __getstate__(self):
+        return {
+            "opts": self.opts,
+            "log_queue": self.log_queue,
+            "log_queue_level": self.log_queue_level,
+        }
+
+    def run(self):
+        salt.utils.process.appendproctitle(self.__class__.__name__)
+        io_loop = salt.ext.tornado.ioloop.IOLoop(make_current=False)
+        io_loop.make_current()
+        application = salt.ext.tornado.web.Application(
+            [(r"/metrics", MetricsHandler, {"path": metrics_dir(self.opts)})]
+        )
+        http_server = salt.ext.tornado.httpserver.HTTPServer(application)
+        http_server.listen(
+            self.opts["master_metrics_port"],
+            address=self.opts["master_metrics_interface"],
+        )
+        log.info(
+            "Serving the master metrics on http://%s:%s/metrics",
+            self.opts["master_metrics_interface"],
+            self.opts["master_metrics_port"],
+        )
+        try:
+            io_loop.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
@@ -0,0 +1,477 @@
+"""
+Inverted index of the grains and pillar data held in the minion data cache
+
+.. versionadded:: 3003
+
+Grain and pillar targeting (``-G``, ``-P``, ``-I``, ``-J`` and the matching
+compound engines) normally fetches ``minions/<id>/data`` from the cache for
+every known minion and runs :py:func:`salt.utils.data.subdict_match` against
+it. When :conf_master:`minion_data_cache_index` is enabled the master keeps
+the key paths and leaf values of that data in an inverted index instead, so
+that a glob, PCRE or exact match only has to look at the distinct values
+stored below a key path.
+
+The index is persisted in the master cachedir as a snapshot plus an
+append-only journal. Processes writing minion data append a record to the
+journal and processes reading the index replay the records they have not seen
+yet, so all MWorkers share one view of the index without rescanning the cache.
+The journal is folded back into the snapshot once it grows larger than the
+number of indexed minions.
+
+The index does not keep a copy of the data of the minions, only the entries it
+was built from, and each process shares a single index between its
+:py:class:`~salt.utils.minions.CkMinions` instances, see :py:func:`get_index`.
+The minions whose data cannot be matched from the index alone, for instance
+because it holds a list of dicts below the matched key path, are fetched from
+the minion data cache.
+"""
+
+import contextlib
+import fnmatch
+import logging
+import os
+import re
+import struct
+import sys
+import threading
+
+import salt.cache
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.data
+import salt.utils.files
+from salt.defaults import DEFAULT_TARGET_DELIM
+
+log = logging.getLogger(__name__)
+
+SEARCH_TYPES = ("grains", "pillar")
+
+_HEADER = struct.Struct(">Q")
+_FRAME = struct.Struct(">I")
+
+# Version of the layout of the snapshot, older snapshots are rebuilt
+_SNAPSHOT_VERSION = 2
+
+# Minimum number of journal records before the journal is compacted
+_COMPACT_SLACK = 256
+
+# Number of minions whose cached data is fetched at once
+_FETCH_CHUNK_SIZE = 500
+
+# The index shared by the CkMinions of this process, per cachedir and cache
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def _value_matcher(pattern, regex_match=False, exact_match=False):
+    """
+    Return a function which compares a normalized leaf value to ``pattern``,
+    following the rules of :py:func:`salt.utils.data.subdict_match`.
+    """
+    pattern = str(pattern).lower()
+    if regex_match:
+        try:
+            regex = re.compile(pattern)
+        except re.error:
+            log.error("Invalid regex '%s' in match", pattern)
+            return lambda value: False
+        return lambda value: regex.match(value) is not None
+    if exact_match:
+        return lambda value: value == pattern
+    return lambda value: fnmatch.fnmatch(value, pattern)
+
+
+def _entries(data, path=()):
+    """
+    Flatten a grains or pillar dict into ``(kind, path, value)`` index entries
+
+    ``kind`` is one of:
+
+    key
+        ``value`` is a key of the (non-empty) dict found at ``path``
+    scalar
+        ``value`` is the normalized scalar found at ``path``
+    member
+        ``value`` is a normalized scalar member of the list found at ``path``
+    list
+        a list is found at ``path``, lookups below it go through list indexes
+    opaque
+        the data at ``path`` cannot be indexed and has to be matched directly
+    """
+    if isinstance(data, dict):
+        for key, val in data.items():
+            if not isinstance(key, str):
+                yield "opaque", path, None
+                continue
+            yield "key", path, key
+            child = path + (key,)
+            if isinstance(val, dict):
+                if val:
+                    yield from _entries(val, child)
+            elif isinstance(val, (list, tuple)):
+                yield "list", child, None
+                for member in val:
+                    if isinstance(member, (dict, list, tuple)):
+                        yield "opaque", child, None
+                    else:
+                        yield "member", child, str(member).lower()
+            else:
+                yield "scalar", child, str(val).lower()
+    elif isinstance(data, (list, tuple)):
+        yield "opaque", path, None
+
+
+def _intern(value):
+    return None if value is None else sys.intern(value)
+
+
+def _index_entries(data):
+    """
+    Return the distinct index entries of the data of a minion, keyed by
+    search type. The strings of the entries are interned, so that the entries
+    of the minions share them with each other and with the tables.
+    """
+    return {
+        search_type: tuple(
+            {
+                (kind, tuple(_intern(key) for key in path), _intern(value)): None
+                for kind, path, value in _entries(data.get(search_type))
+            }
+        )
+        for search_type in SEARCH_TYPES
+    }
+
+
+def _load_entries(raw):
+    """
+    Return the index entries read back from the snapshot or the journal
+    """
+    return {
+        search_type: tuple(
+            (kind, tuple(_intern(key) for key in path), _intern(value))
+            for kind, path, value in raw.get(search_type) or ()
+        )
+        for search_type in SEARCH_TYPES
+    }
+
+
+def get_index(opts):
+    """
+    Return the index of the minion data cache shared by the current process
+    """
+    key = (opts["cachedir"], opts.get("cache", "localfs"))
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = MinionDataIndex(opts)
+        return index
+
+
+class _Table:
+    """
+    The inverted index for a single search type (grains or pillar)
+    """
+
+    def __init__(self):
+        # kind -> path -> value -> set of minion ids
+        self.values = {"key": {}, "scalar": {}, "member": {}}
+        # kind -> path -> set of minion ids
+        self.paths = {"list": {}, "opaque": {}}
+
+    def add(self, minion_id, entries):
+        for kind, path, value in entries:
+            if kind in self.paths:
+                self.paths[kind].setdefault(path, set()).add(minion_id)
+            else:
+                self.values[kind].setdefault(path, {}).setdefault(value, set()).add(
+                    minion_id
+                )
+
+    def remove(self, minion_id, entries):
+        for kind, path, value in entries:
+            if kind in self.paths:
+                table = self.paths[kind]
+                minions = table.get(path)
+                if minions is not None:
+                    minions.discard(minion_id)
+                    if not minions:
+                        del table[path]
+            else:
+                table = self.values[kind]
+                values = table.get(path)
+                if values is None:
+                    continue
+                minions = values.get(value)
+                if minions is not None:
+                    minions.discard(minion_id)
+                    if not minions:
+                        del values[value]
+                if not values:
+                    del table[path]
+
+    def match(self, expr, delimiter, regex_match=False, exact_match=False):
+        """
+        Return a tuple of the minions matching ``expr`` and of the minions
+        whose data could not be resolved from the index alone, or ``None`` if
+        the expression cannot be answered from the index at all.
+        """
+        splits = expr.split(delimiter)
+        if len(splits) == 1:
+            return set(), set()
+        if "*" in splits[:-1]:
+            # Wildcard key lookups search through the whole data structure
+            return None
+
+        matched = set()
+        unresolved = set()
+        for idx in range(len(splits) - 1, 0, -1):
+            path = tuple(splits[:idx])
+            matchstr = delimiter.join(splits[idx:])
+            for depth in range(len(path) + 1):
+                prefix = path[:depth]
+                unresolved.update(self.paths["opaque"].get(prefix, ()))
+                if depth < len(path):
+                    unresolved.update(self.paths["list"].get(prefix, ()))
+
+            matcher = _value_matcher(matchstr, regex_match, exact_match)
+            for kind in ("scalar", "member"):
+                for value, minions in self.values[kind].get(path, {}).items():
+                    if matcher(value):
+                        matched.update(minions)
+
+            keys = self.values["key"].get(path, {})
+            if matchstr == "*":
+                for minions in keys.values():
+                    matched.update(minions)
+            elif matchstr in keys:
+                matched.update(keys[matchstr])
+        return matched, unresolved - matched
+
+
+class MinionDataIndex:
+    """
+    Keep an index of the grains and pillar stored in the minion data cache
+    """
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.cache = salt.cache.factory(opts)
+        self.index_dir = os.path.join(opts["cachedir"], "minion_data_index")
+        self.snapshot_path = os.path.join(self.index_dir, "snapshot.p")
+        self.journal_path = os.path.join(self.index_dir, "journal.p")
+        self.lock_path = os.path.join(self.index_dir, ".lock")
+        # Serializes the threads of this process, the file lock only
+        # serializes the processes
+        self._thread_lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, generation):
+        self._generation = generation
+        self._offset = _HEADER.size
+        self._records = 0
+        self._minions = {}
+        self._tables = {search_type: _Table() for search_type in SEARCH_TYPES}
+
+    @contextlib.contextmanager
+    def _lock(self):
+        if not os.path.isdir(self.index_dir):
+            os.makedirs(self.index_dir)
+        with salt.utils.files.flopen(self.lock_path, "a"):
+            yield
+
+    def _apply(self, minion_id, entries):
+        """
+        Replace the index entries of a minion, ``None`` removes the minion
+        """
+        old = self._minions.pop(minion_id, None)
+        if old is not None:
+            for search_type, table in self._tables.items():
+                table.remove(minion_id, old[search_type])
+        if entries is None:
+            return
+        self._minions[minion_id] = entries
+        for search_type, table in self._tables.items():
+            table.add(minion_id, entries[search_type])
+
+    def _fetch(self, minion_ids):
+        """
+        Yield the ``(minion_id, data)`` pairs of the cached data of the given
+        minions, ``_FETCH_CHUNK_SIZE`` minions at a time
+        """
+        minion_ids = list(minion_ids)
+        for idx in range(0, len(minion_ids), _FETCH_CHUNK_SIZE):
+            chunk = minion_ids[idx : idx + _FETCH_CHUNK_SIZE]
+            cached = self.cache.fetch_many(
+                [("minions/{}".format(id_), "data") for id_ in chunk]
+            )
+            for id_ in chunk:
+                yield id_, cached.get(("minions/{}".format(id_), "data"))
+
+    def _read_generation(self):
+        try:
+            with salt.utils.files.fopen(self.journal_path, "rb") as fp_:
+                header = fp_.read(_HEADER.size)
+        except OSError:
+            return None
+        if len(header) != _HEADER.size:
+            return None
+        return _HEADER.unpack(header)[0]
+
+    def _write(self, generation):
+        """
+        Write the in-memory index out as a new snapshot and empty journal
+        """
+        with salt.utils.atomicfile.atomic_open(self.snapshot_path, "wb") as fp_:
+            fp_.write(
+                self.serial.dumps(
+                    {
+                        "version": _SNAPSHOT_VERSION,
+                        "generation": generation,
+                        "minions": self._minions,
+                    },
+                    use_bin_type=True,
+                )
+            )
+        with salt.utils.atomicfile.atomic_open(self.journal_path, "wb") as fp_:
+            fp_.write(_HEADER.pack(generation))
+        self._generation = generation
+        self._offset = _HEADER.size
+        self._records = 0
+
+    def _load_snapshot(self):
+        """
+        Load the snapshot, return False if it has to be rebuilt
+        """
+        with salt.utils.files.fopen(self.snapshot_path, "rb") as fp_:
+            snapshot = self.serial.loads(fp_.read(), encoding="utf-8")
+        if snapshot.get("version") != _SNAPSHOT_VERSION:
+            return False
+        self._reset(snapshot["generation"])
+        for minion_id, entries in snapshot["minions"].items():
+            self._apply(minion_id, _load_entries(entries))
+        return True
+
+    def _replay(self):
+        """
+        Apply the journal records appended since the last replay
+        """
+        with salt.utils.files.fopen(self.journal_path, "rb") as fp_:
+            fp_.seek(self._offset)
+            while True:
+                frame = fp_.read(_FRAME.size)
+                if len(frame) < _FRAME.size:
+                    break
+                size = _FRAME.unpack(frame)[0]
+                record = fp_.read(size)
+                if len(record) < size:
+                    # Partially written record, left to the next compaction
+                    break
+                minion_id, entries = self.serial.loads(record, encoding="utf-8")
+                if entries is not None:
+                    entries = _load_entries(entries)
+                self._apply(minion_id, entries)
+                self._offset += _FRAME.size + len(record)
+                self._records += 1
+
+    def _rebuild(self):
+        """
+        Build the index from scratch by reading the minion data cache
+        """
+        log.debug("Building the minion data index from the minion data cache")
+        self._reset(None)
+        for minion_id, data in self._fetch(self.cache.list("minions") or []):
+            if data:
+                self._apply(minion_id, _index_entries(data))
+        self._write((self._read_generation() or 0) + 1)
+
+    def _sync(self):
+        if not os.path.isfile(self.snapshot_path):
+            self._rebuild()
+            return
+        generation = self._read_generation()
+        if generation is None:
+            self._rebuild()
+            return
+        if generation != self._generation and not self._load_snapshot():
+            self._rebuild()
+            return
+        self._replay()
+
+    def refresh(self):
+        """
+        Bring the in-memory index up to date with the persisted one, building
+        it from the minion data cache if it does not exist yet
+        """
+        with self._thread_lock, self._lock():
+            self._sync()
+
+    def update(self, minion_id, data):
+        """
+        Record that the cached data of a minion has been replaced by ``data``.
+        Passing ``None`` drops the minion from the index.
+        """
+        entries = None if data is None else _index_entries(data)
+        with self._thread_lock, self._lock():
+            if not os.path.isfile(self.snapshot_path):
+                # The index is built from the cache on first use, which will
+                # already contain this data.
+                return
+            self._sync()
+            if os.path.getsize(self.journal_path) != self._offset:
+                self._write(self._generation + 1)
+            record = self.serial.dumps([minion_id, entries], use_bin_type=True)
+            with salt.utils.files.fopen(self.journal_path, "ab") as fp_:
+                fp_.write(_FRAME.pack(len(record)) + record)
+            self._apply(minion_id, entries)
+            self._offset += _FRAME.size + len(record)
+            self._records += 1
+            if self._records > len(self._minions) + _COMPACT_SLACK:
+                self._write(self._generation + 1)
+
+    def remove(self, minion_id):
+        """
+        Drop a minion from the index
+        """
+        self.update(minion_id, None)
+
+    def minions(self):
+        """
+        Return the set of minions which have data in the index
+        """
+        with self._thread_lock:
+            return set(self._minions)
+
+    def match(
+        self,
+        search_type,
+        expr,
+        delimiter=DEFAULT_TARGET_DELIM,
+        regex_match=False,
+        exact_match=False,
+    ):
+        """
+        Return the set of indexed minions whose ``search_type`` data matches
+        ``expr``, with the same semantics as
+        :py:func:`salt.utils.data.subdict_match`. The cached data of the
+        minions which cannot be matched from the index alone is fetched from
+        the minion data cache.
+        """
+        with self._thread_lock:
+            result = self._tables[search_type].match(
+                expr, delimiter, regex_match=regex_match, exact_match=exact_match
+            )
+            if result is None:
+                matched, unresolved = set(), set(self._minions)
+            else:
+                matched, unresolved = result
+        for minion_id, data in self._fetch(unresolved):
+            if data and salt.utils.data.subdict_match(
+                data.get(search_type),
+                expr,
+                delimiter=delimiter,
+                regex_match=regex_match,
+                exact_match=exact_match,
+            ):
+                matched.add(minion_id)
+        return matched
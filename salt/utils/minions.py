@@ -15,6 +15,7 @@ import salt.payload
 import salt.roster
 import salt.utils.data
 import salt.utils.files
+import salt.utils.minion_index
 import salt.utils.network
 import salt.utils.stringutils
 import salt.utils.versions
@@ -32,6 +33,9 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# Number of minions whose cached data is fetched at once
+_FETCH_CHUNK_SIZE = 500
+
 TARGET_REX = re.compile(
     r"""(?x)
         (
@@ -211,6 +215,12 @@ class CkMinions:
         self.opts = opts
         self.serial = salt.payload.Serial(opts)
         self.cache = salt.cache.factory(opts)
+        if self.opts.get("minion_data_cache", False) and self.opts.get(
+            "minion_data_cache_index", False
+        ):
+            self.index = salt.utils.minion_index.get_index(opts)
+        else:
+            self.index = None
         # TODO: this is actually an *auth* check
         if self.opts.get("transport", "zeromq") in ("zeromq", "tcp"):
             self.acc = "minions"
@@ -286,6 +296,38 @@ class CkMinions:
             )
             return minions
 
+    def _fetch_minion_data(self, minion_ids, skip_errors=False):
+        """
+        Yield the ``(minion_id, data)`` pairs of the cached data of the given
+        minions, fetched ``_FETCH_CHUNK_SIZE`` minions at a time so that only
+        one chunk of data is held in memory.
+
+        With ``skip_errors``, the minions whose data cannot be read are left
+        out instead of raising ``SaltCacheError``.
+        """
+        minion_ids = list(minion_ids)
+        for idx in range(0, len(minion_ids), _FETCH_CHUNK_SIZE):
+            chunk = minion_ids[idx : idx + _FETCH_CHUNK_SIZE]
+            try:
+                cached = self.cache.fetch_many(
+                    ("minions/{}".format(id_), "data") for id_ in chunk
+                )
+            except SaltCacheError:
+                if not skip_errors:
+                    raise
+                # Retry one minion at a time, to skip only the minions whose
+                # data cannot be read.
+                cached = None
+            for id_ in chunk:
+                if cached is not None:
+                    yield id_, cached.get(("minions/{}".format(id_), "data"))
+                    continue
+                try:
+                    mdata = self.cache.fetch("minions/{}".format(id_), "data")
+                except SaltCacheError:
+                    continue
+                yield id_, mdata
+
     def _check_cache_minions(
         self, expr, delimiter, greedy, search_type, regex_match=False, exact_match=False
     ):
@@ -321,11 +363,28 @@ class CkMinions:
                 cminions = minions
             if not cminions:
                 return {"minions": minions, "missing": []}
+            if self.index is not None:
+                self.index.refresh()
+                matched = self.index.match(
+                    search_type,
+                    expr,
+                    delimiter=delimiter,
+                    regex_match=regex_match,
+                    exact_match=exact_match,
+                )
+                if greedy:
+                    # Minions without cached data are kept, like below
+                    indexed = self.index.minions().intersection(cminions)
+                    minions = [
+                        id_ for id_ in minions if id_ in matched or id_ not in indexed
+                    ]
+                else:
+                    minions = [id_ for id_ in minions if id_ in matched]
+                return {"minions": minions, "missing": []}
             minions = set(minions)
-            for id_ in cminions:
-                if greedy and id_ not in minions:
-                    continue
-                mdata = self.cache.fetch("minions/{}".format(id_), "data")
+            if greedy:
+                cminions = [id_ for id_ in cminions if id_ in minions]
+            for id_, mdata in self._fetch_minion_data(cminions):
                 if mdata is None:
                     if not greedy:
                         minions.remove(id_)
@@ -413,8 +472,7 @@ class CkMinions:
             proto = "ipv{}".format(tgt.version)
 
             minions = set(minions)
-            for id_ in cminions:
-                mdata = self.cache.fetch("minions/{}".format(id_), "data")
+            for id_, mdata in self._fetch_minion_data(cminions):
                 if mdata is None:
                     if not greedy:
                         minions.remove(id_)
@@ -625,6 +683,15 @@ class CkMinions:
 
         return {"minions": list(minions), "missing": []}
 
+    def update_minion_data_index(self, minion_id, data):
+        """
+        Update the minion data index after the cached data of a minion has
+        been replaced, passing ``None`` drops the minion from the index.
+        This is a no-op when :conf_master:`minion_data_cache_index` is disabled.
+        """
+        if self.index is not None:
+            self.index.update(minion_id, data)
+
     def connected_ids(self, subset=None, show_ip=False):
         """
         Return a set of all connected minion ids, optionally within a subset
@@ -645,15 +712,11 @@ class CkMinions:
                 addrs.update(set(salt.utils.network.ip_addrs6(include_loopback=False)))
             if subset:
                 search = subset
-            for id_ in search:
-                try:
-                    mdata = self.cache.fetch("minions/{}".format(id_), "data")
-                except SaltCacheError:
-                    # If a SaltCacheError is explicitly raised during the fetch operation,
-                    # permission was denied to open the cached data.p file. Continue on as
-                    # in the releases <= 2016.3. (An explicit error raise was added in PR
-                    # #35388. See issue #36867 for more information.
-                    continue
+            # If a SaltCacheError is explicitly raised during the fetch operation,
+            # permission was denied to open the cached data.p file. Continue on as
+            # in the releases <= 2016.3. (An explicit error raise was added in PR
+            # #35388. See issue #36867 for more information.
+            for id_, mdata in self._fetch_minion_data(search, skip_errors=True):
                 if mdata is None:
                     continue
                 grains = mdata.get("grains", {})
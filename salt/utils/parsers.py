@@ -2184,6 +2184,17 @@ class SaltCMDOptionParser(
                 "before freeing the slot in the batch for the next one."
             ),
         )
+        self.add_option(
+            "--batch-adaptive",
+            default=False,
+            dest="batch_adaptive",
+            action="store_true",
+            help=(
+                "Adapt the number of minions running the job in batch mode to "
+                "the latency and the failures of their returns and to the load "
+                "of the master, starting from the batch size."
+            ),
+        )
         self.add_option(
             "--batch-safe-limit",
             default=0,
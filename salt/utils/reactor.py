@@ -178,6 +178,22 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
 
         return {"status": False, "comment": "Reactor does not exists."}
 
+    def set_tag_filter(self, event):
+        """
+        Only receive the events which the reactors or the management of the
+        reactor handle from the event bus. This is only possible when the
+        reactors are not read from a file on each event.
+        """
+        if not isinstance(self.opts["reactor"], list):
+            return
+        tags = ["*salt/reactors/manage*"]
+        for ropt in self.opts["reactor"]:
+            if isinstance(ropt, dict) and len(ropt) == 1:
+                tag = next(iter(ropt))
+                if isinstance(tag, str):
+                    tags.append(tag)
+        event.set_tag_filter(tags, match_type="fnmatch")
+
     def resolve_aliases(self, chunks):
         """
         Preserve backward compatibility by rewriting the 'state' key in the low
@@ -242,6 +258,7 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
             listen=True,
         ) as event:
             self.wrap = ReactWrap(self.opts)
+            self.set_tag_filter(event)
 
             for data in event.iter_events(full=True):
                 # skip all events fired by ourselves
@@ -271,6 +288,7 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
                 if data["tag"].endswith("salt/reactors/manage/add"):
                     _data = data["data"]
                     res = self.add_reactor(_data["event"], _data["reactors"])
+                    self.set_tag_filter(event)
                     event.fire_event(
                         {"reactors": self.list_all(), "result": res},
                         "salt/reactors/manage/add-complete",
@@ -278,6 +296,7 @@ class Reactor(salt.utils.process.SignalHandlingProcess, salt.state.Compiler):
                 elif data["tag"].endswith("salt/reactors/manage/delete"):
                     _data = data["data"]
                     res = self.delete_reactor(_data["event"])
+                    self.set_tag_filter(event)
                     event.fire_event(
                         {"reactors": self.list_all(), "result": res},
                         "salt/reactors/manage/delete-complete",
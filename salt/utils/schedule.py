@@ -12,6 +12,7 @@ Detailed tutorial about scheduling jobs can be found :ref:`here
 import copy
 import datetime
 import errno
+import heapq
 import itertools
 import logging
 import os
@@ -177,6 +178,7 @@ class Schedule:
         self.loop_interval = six.MAXSIZE
         if not self.standalone:
             clean_proc_dir(opts)
+        self._reset_eval_index()
         if cleanup:
             for prefix in cleanup:
                 self.delete_job_prefix(prefix)
@@ -196,6 +198,73 @@ class Schedule:
             return self.functions["config.merge"](opt, {}, omit_master=True)
         return self.opts.get(opt, {})
 
+    def _reset_eval_index(self):
+        """
+        Forget when the jobs need to be evaluated next, so that the next call
+        to eval evaluates all of them
+        """
+        # A heap of the (time, name) the jobs need to be evaluated at, and a
+        # dict of the (time, data) of each job in it
+        self._eval_heap = []
+        self._eval_at = {}
+        # The number of jobs which need to be evaluated on every call to eval
+        self._eval_always = 0
+        self._eval_state = None
+
+    def _next_eval_time(self, data, now, loop_interval):
+        """
+        Return the time the job ``data`` evaluated at ``now`` needs to be
+        evaluated again, or None when it needs to be evaluated on every call
+        to eval. Until then evaluating the job would neither run it nor change
+        its data.
+        """
+        if not self.enabled or not data.get("enabled", True):
+            # Disabled interval jobs are postponed on each evaluation
+            return None
+        if data.get("_error") or data.get("_run_on_start"):
+            return None
+        if "run_explicit" in data or "skip_explicit" in data:
+            return None
+        next_fire_time = data.get("_next_fire_time")
+        if data.get("_splay"):
+            when = data["_splay"]
+        elif not isinstance(next_fire_time, datetime.datetime):
+            return None
+        elif "_seconds" in data or "cron" in data:
+            # Their time is compared to now without the microseconds
+            when = next_fire_time - datetime.timedelta(
+                microseconds=next_fire_time.microsecond
+            )
+        elif "once" in data:
+            if next_fire_time < now - loop_interval:
+                # Missed, it will never run
+                return datetime.datetime.max
+            when = next_fire_time
+        elif "when" in data and data.get("_run"):
+            when = next_fire_time
+        else:
+            return None
+        if when <= now:
+            return None
+        return when
+
+    def time_to_next_eval(self, now=None):
+        """
+        Return the number of seconds until a job of the schedule needs to be
+        evaluated, or None when some job needs to be evaluated on every call
+        to eval, or when the schedule was not evaluated yet
+        """
+        if self._eval_state is None or self._eval_always:
+            return None
+        if not self._eval_heap:
+            return None
+        if now is None:
+            now = datetime.datetime.now()
+        when = self._eval_heap[0][0]
+        if when == datetime.datetime.max:
+            return None
+        return max((when - now).total_seconds(), 0)
+
     def _get_schedule(
         self, include_opts=True, include_pillar=True, remove_hidden=False
     ):
@@ -317,6 +386,7 @@ class Schedule:
         """
         Deletes a job from the scheduler. Ignore jobs from pillar
         """
+        self._reset_eval_index()
         # ensure job exists, then delete it
         if name in self.opts["schedule"]:
             del self.opts["schedule"][name]
@@ -341,6 +411,7 @@ class Schedule:
         """
         Reset the scheduler to defaults
         """
+        self._reset_eval_index()
         self.skip_function = None
         self.skip_during_range = None
         self.enabled = True
@@ -351,6 +422,7 @@ class Schedule:
         """
         Deletes a job from the scheduler. Ignores jobs from pillar
         """
+        self._reset_eval_index()
         # ensure job exists, then delete it
         for job in list(self.opts["schedule"].keys()):
             if job.startswith(name):
@@ -380,6 +452,7 @@ class Schedule:
         the configuration file. See the docs on how YAML is interpreted into
         python data-structures to make sure, you pass correct dictionaries.
         """
+        self._reset_eval_index()
 
         # we don't do any checking here besides making sure its a dict.
         # eval() already does for us and raises errors accordingly
@@ -421,6 +494,7 @@ class Schedule:
         """
         Enable a job in the scheduler. Ignores jobs from pillar
         """
+        self._reset_eval_index()
         # ensure job exists, then enable it
         if name in self.opts["schedule"]:
             self.opts["schedule"][name]["enabled"] = True
@@ -442,6 +516,7 @@ class Schedule:
         """
         Disable a job in the scheduler. Ignores jobs from pillar
         """
+        self._reset_eval_index()
         # ensure job exists, then disable it
         if name in self.opts["schedule"]:
             self.opts["schedule"][name]["enabled"] = False
@@ -463,6 +538,7 @@ class Schedule:
         """
         Modify a job in the scheduler. Ignores jobs from pillar
         """
+        self._reset_eval_index()
         # ensure job exists, then replace it
         if name in self.opts["schedule"]:
             self.delete_job(name, persist)
@@ -513,6 +589,7 @@ class Schedule:
         """
         Enable the scheduler.
         """
+        self._reset_eval_index()
         self.opts["schedule"]["enabled"] = True
 
         # Fire the complete event back along with updated list of schedule
@@ -529,6 +606,7 @@ class Schedule:
         """
         Disable the scheduler.
         """
+        self._reset_eval_index()
         self.opts["schedule"]["enabled"] = False
 
         # Fire the complete event back along with updated list of schedule
@@ -545,6 +623,7 @@ class Schedule:
         """
         Reload the schedule from saved schedule file.
         """
+        self._reset_eval_index()
         # Remove all jobs from self.intervals
         self.intervals = {}
 
@@ -585,6 +664,7 @@ class Schedule:
         Postpone a job in the scheduler.
         Ignores jobs from pillar
         """
+        self._reset_eval_index()
         time = data["time"]
         new_time = data["new_time"]
         time_fmt = data.get("time_fmt", "%Y-%m-%dT%H:%M:%S")
@@ -618,6 +698,7 @@ class Schedule:
         Skip a job at a specific time in the scheduler.
         Ignores jobs from pillar
         """
+        self._reset_eval_index()
         time = data["time"]
         time_fmt = data.get("time_fmt", "%Y-%m-%dT%H:%M:%S")
 
@@ -1450,6 +1531,29 @@ class Schedule:
         if "splay" in schedule:
             self.splay = schedule["splay"]
 
+        if not now:
+            now = datetime.datetime.now()
+
+        # The jobs which are not due are not evaluated, unless something they
+        # depend on changed since they were evaluated
+        eval_state = (
+            self.enabled,
+            self.splay,
+            self.skip_during_range,
+            self.skip_function,
+            loop_interval,
+            id(self.opts.get("pillar")),
+            id(self.opts.get("grains")),
+        )
+        if eval_state != self._eval_state:
+            self._reset_eval_index()
+            self._eval_state = eval_state
+        while self._eval_heap and self._eval_heap[0][0] <= now:
+            when, job = heapq.heappop(self._eval_heap)
+            if self._eval_at.get(job, (None,))[0] == when:
+                del self._eval_at[job]
+        evaluated = []
+
         _hidden = ["enabled", "skip_function", "skip_during_range", "splay"]
         for job, data in schedule.items():
 
@@ -1457,6 +1561,11 @@ class Schedule:
             if job in _hidden:
                 continue
 
+            scheduled = self._eval_at.get(job)
+            if scheduled is not None and scheduled[1] is data and now < scheduled[0]:
+                continue
+            evaluated.append((job, data))
+
             # Clear these out between runs
             for item in [
                 "_continue",
@@ -1508,9 +1617,6 @@ class Schedule:
             ):
                 data["_run_on_start"] = True
 
-            if not now:
-                now = datetime.datetime.now()
-
             # Used for quick lookups when detecting invalid option
             # combinations.
             schedule_keys = set(data.keys())
@@ -1772,6 +1878,19 @@ class Schedule:
                         data["_next_fire_time"] = now + datetime.timedelta(
                             seconds=data["_seconds"]
                         )
+
+        eval_always = 0
+        for job, data in evaluated:
+            when = None
+            if isinstance(data, dict):
+                when = self._next_eval_time(data, now, loop_interval)
+            if when is None:
+                self._eval_at.pop(job, None)
+                eval_always += 1
+            else:
+                self._eval_at[job] = (when, data)
+                heapq.heappush(self._eval_heap, (when, job))
+        self._eval_always = eval_always
         return jids
 
     def _run_job(self, func, data, jid=None):
@@ -225,6 +225,9 @@ def get_sls_opts(opts, **kwargs):
                 )
             opts["saltenv"] = kwargs["saltenv"]
 
+    if "state_parallel_workers" in kwargs:
+        opts["state_parallel_workers"] = kwargs["state_parallel_workers"]
+
     if "pillarenv" in kwargs or opts.get("pillarenv_from_saltenv", False):
         pillarenv = kwargs.get("pillarenv") or kwargs.get("saltenv")
         if pillarenv is not None and not isinstance(pillarenv, str):
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Microbenchmarks of the deserialization of salt payloads
+
+Compares ``salt.payload.Serial.loads`` with unpacking the payloads as raw
+bytes and walking them with ``salt.transport.frame.decode_embedded_strs``,
+which is what ``loads`` used to do, over payloads shaped like the ones the
+master and the event bus handle.
+"""
+# pylint: disable=resource-leakage
+
+import argparse
+import os
+import timeit
+
+import salt.payload
+import salt.transport.frame
+import salt.utils.msgpack
+
+
+def _pkg_list_return(minions):
+    return {
+        "minion{}".format(idx): {
+            "pkg{}".format(pkg): "1.{}.0-1.el8".format(pkg) for pkg in range(300)
+        }
+        for idx in range(minions)
+    }
+
+
+def _highstate_return(states):
+    return {
+        "file_|-state{0}_|-/etc/state{0}.conf_|-managed".format(idx): {
+            "name": "/etc/state{}.conf".format(idx),
+            "changes": {"diff": "--- \n+++ \n@@ -1 +1 @@\n-old\n+new\n"},
+            "result": True,
+            "comment": "File /etc/state{}.conf updated".format(idx),
+            "__sls__": "common.files",
+            "__run_num__": idx,
+            "start_time": "10:00:00.000000",
+            "duration": 1.5,
+            "__id__": "state{}".format(idx),
+        }
+        for idx in range(states)
+    }
+
+
+def _file_chunk(size):
+    return {"data": os.urandom(size), "dest": "files/archive.tar.gz"}
+
+
+PAYLOADS = {
+    "small_load": {"cmd": "_minion_event", "id": "minion1", "tok": b"x" * 64},
+    "pkg_list_200": _pkg_list_return(200),
+    "highstate_2000": _highstate_return(2000),
+    "file_chunk_1m": _file_chunk(1048576),
+}
+
+
+def _legacy_loads(msg):
+    return salt.transport.frame.decode_embedded_strs(
+        salt.utils.msgpack.loads(msg, use_list=True, raw=True)
+    )
+
+
+def run(number, repeat):
+    serial = salt.payload.Serial("msgpack")
+    print(
+        "{:<16} {:>10} {:>12} {:>12} {:>8}".format(
+            "payload", "bytes", "legacy (ms)", "loads (ms)", "speedup"
+        )
+    )
+    for name, payload in PAYLOADS.items():
+        msg = serial.dumps(payload)
+        assert serial.loads(msg) == _legacy_loads(msg)
+        legacy = min(
+            timeit.repeat(lambda: _legacy_loads(msg), number=number, repeat=repeat)
+        )
+        loads = min(
+            timeit.repeat(lambda: serial.loads(msg), number=number, repeat=repeat)
+        )
+        print(
+            "{:<16} {:>10} {:>12.3f} {:>12.3f} {:>7.2f}x".format(
+                name,
+                len(msg),
+                1000 * legacy / number,
+                1000 * loads / number,
+                legacy / loads,
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.number, args.repeat)
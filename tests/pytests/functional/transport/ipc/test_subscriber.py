@@ -113,3 +113,28 @@ async def test_basic_send(channel):
     await channel.publish(msg)
     ret = await channel.read()
     assert ret == msg
+
+
+async def test_tag_filter(channel):
+    channel.subscriber.set_tag_filter(
+        [["salt/job/", "startswith"], ["*/reactors/*", "fnmatch"]]
+    )
+    while not channel.subscriber._connecting_future.done():
+        await salt.ext.tornado.gen.sleep(0.01)
+    # Wait for the publisher to receive the filter
+    while not channel.publisher.tag_filters:
+        await salt.ext.tornado.gen.sleep(0.01)
+    for tag in ("salt/auth", "salt/job/123/ret/minion", "salt/reactors/manage/list"):
+        channel.publisher.publish({"tag": tag}, tag=tag)
+    # Messages without a tag are sent to every subscriber
+    channel.publisher.publish({"tag": None})
+    assert await channel.read() == {"tag": "salt/job/123/ret/minion"}
+    assert await channel.read() == {"tag": "salt/reactors/manage/list"}
+    assert await channel.read() == {"tag": None}
+
+    # Clear the filter
+    channel.subscriber.set_tag_filter(None)
+    while channel.publisher.tag_filters:
+        await salt.ext.tornado.gen.sleep(0.01)
+    channel.publisher.publish({"tag": "salt/auth"}, tag="salt/auth")
+    assert await channel.read() == {"tag": "salt/auth"}
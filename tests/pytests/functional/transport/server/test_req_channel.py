@@ -6,12 +6,15 @@ import pytest
 import salt.config
 import salt.exceptions
 import salt.ext.tornado.gen
+import salt.ext.tornado.locks
 import salt.log.setup
+import salt.payload
 import salt.transport.client
 import salt.transport.server
 import salt.utils.platform
 import salt.utils.process
 import salt.utils.stringutils
+import zmq
 from saltfactories.utils.processes import terminate_process
 
 log = logging.getLogger(__name__)
@@ -157,3 +160,57 @@ def test_badload(req_channel, req_channel_crypt):
         for msg in msgs:
             with pytest.raises(salt.exceptions.AuthenticationError):
                 req_channel.send(msg, timeout=5, tries=1)
+
+
+class PoolReqServerChannelProcess(ReqServerChannelProcess):
+    """
+    Hold the replies to the requests with ``wait`` in their load until a
+    request without it is received
+    """
+
+    def __init__(self, config, req_channel_crypt):
+        config["worker_pool_threads"] = 2
+        super().__init__(config, req_channel_crypt)
+
+    def run(self):
+        self.released = salt.ext.tornado.locks.Event()
+        super().run()
+
+    @salt.ext.tornado.gen.coroutine
+    def _handle_payload(self, payload):
+        if payload["load"].get("wait"):
+            yield self.released.wait()
+        else:
+            self.released.set()
+        raise salt.ext.tornado.gen.Return((payload, {"fun": "send_clear"}))
+
+
+@pytest.mark.parametrize("transport", ["zeromq"])
+def test_zeromq_concurrent_requests(salt_master):
+    """
+    With worker_pool_threads set, a worker receives the next request before it
+    replied to the previous one
+    """
+    serial = salt.payload.Serial(salt_master.config)
+    process = PoolReqServerChannelProcess(salt_master.config.copy(), "clear")
+    context = zmq.Context()
+    sockets = []
+    try:
+        with process:
+            for load in ({"wait": True}, {"wait": False}):
+                sock = context.socket(zmq.REQ)
+                sock.setsockopt(zmq.LINGER, 0)
+                sock.setsockopt(zmq.RCVTIMEO, 10000)
+                sock.connect(
+                    "tcp://127.0.0.1:{}".format(salt_master.config["ret_port"])
+                )
+                sock.send(serial.dumps({"enc": "clear", "load": load}))
+                sockets.append(sock)
+            for sock, wait in zip(sockets, (True, False)):
+                ret = serial.loads(sock.recv())
+                assert ret["load"] == {"wait": wait}
+    finally:
+        for sock in sockets:
+            sock.close()
+        context.term()
+        terminate_process(pid=process.pid, kill_children=True, slow_stop=False)
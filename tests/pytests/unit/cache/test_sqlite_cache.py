@@ -0,0 +1,109 @@
+"""
+unit tests for the sqlite cache
+"""
+
+import pytest
+import salt.cache.sqlite_cache as sqlite_cache
+import salt.payload
+from tests.support.mock import patch
+
+
+@pytest.fixture
+def cachedir(tmp_path):
+    return str(tmp_path)
+
+
+@pytest.fixture
+def configure_loader_modules(cachedir):
+    return {
+        sqlite_cache: {
+            "__opts__": {"cachedir": cachedir},
+            "__context__": {"serial": salt.payload.Serial("msgpack")},
+        }
+    }
+
+
+def test_store_fetch(cachedir):
+    sqlite_cache.store("minions/web1", "data", {"grains": {"os": "Ubuntu"}}, cachedir)
+    assert sqlite_cache.fetch("minions/web1", "data", cachedir) == {
+        "grains": {"os": "Ubuntu"}
+    }
+    sqlite_cache.store("minions/web1", "data", {"grains": {}}, cachedir)
+    assert sqlite_cache.fetch("minions/web1", "data", cachedir) == {"grains": {}}
+    assert sqlite_cache.fetch("minions/web1", "missing", cachedir) == {}
+
+
+def test_updated(cachedir):
+    assert sqlite_cache.updated("bank", "key", cachedir) is None
+    sqlite_cache.store("bank", "key", "payload data", cachedir)
+    assert isinstance(sqlite_cache.updated("bank", "key", cachedir), int)
+
+
+def test_list_and_contains(cachedir):
+    sqlite_cache.store_many(
+        [
+            ("minions/web1", "data", {}),
+            ("minions/web1", "mine", {}),
+            ("minions/web2", "data", {}),
+            ("minions", "key", "value"),
+            ("minionsx/other", "data", {}),
+        ],
+        cachedir,
+    )
+    assert sorted(sqlite_cache.list_("minions", cachedir)) == ["key", "web1", "web2"]
+    assert sorted(sqlite_cache.list_("minions/web1/", cachedir)) == ["data", "mine"]
+    assert sorted(sqlite_cache.list_("", cachedir)) == ["minions", "minionsx"]
+    assert sqlite_cache.list_("nonexistent", cachedir) == []
+    assert sqlite_cache.contains("minions/web1", "data", cachedir)
+    assert not sqlite_cache.contains("minions/web1", "pillar", cachedir)
+    assert sqlite_cache.contains("minions", None, cachedir)
+    assert not sqlite_cache.contains("minions/web3", None, cachedir)
+
+
+def test_flush(cachedir):
+    sqlite_cache.store_many(
+        [
+            ("minions/web1", "data", {}),
+            ("minions/web1", "mine", {}),
+            ("minions/web2", "data", {}),
+            ("minionsx/other", "data", {}),
+        ],
+        cachedir,
+    )
+    assert sqlite_cache.flush("minions/web1", "mine", cachedir=cachedir) is True
+    assert sqlite_cache.flush("minions/web1", "mine", cachedir=cachedir) is False
+    assert sqlite_cache.list_("minions/web1", cachedir) == ["data"]
+
+    assert sqlite_cache.flush("minions", cachedir=cachedir) is True
+    assert sqlite_cache.flush("minions", cachedir=cachedir) is False
+    assert sqlite_cache.list_("minions", cachedir) == []
+    assert not sqlite_cache.contains("minions/web2", "data", cachedir)
+    assert sqlite_cache.list_("minionsx", cachedir) == ["other"]
+
+
+def test_fetch_many(cachedir):
+    sqlite_cache.store_many(
+        [("minions/web1", "data", 1), ("minions/web2", "data", 2), ("other", "x", 3)],
+        cachedir,
+    )
+    with patch.object(sqlite_cache, "_CHUNK_SIZE", 2):
+        ret = sqlite_cache.fetch_many(
+            [
+                ("minions/web1", "data"),
+                ("minions/web2/", "data"),
+                ("minions/web1", "x"),
+                ("minions/web3", "data"),
+            ],
+            cachedir,
+        )
+    assert ret == {("minions/web1", "data"): 1, ("minions/web2/", "data"): 2}
+
+
+def test_list_many(cachedir):
+    sqlite_cache.store_many(
+        [("minions/web1", "data", 1), ("minions/web2", "data", 2)], cachedir
+    )
+    ret = sqlite_cache.list_many(["minions", "minions/web1", "missing"], cachedir)
+    assert sorted(ret["minions"]) == ["web1", "web2"]
+    assert ret["minions/web1"] == ["data"]
+    assert ret["missing"] == []
@@ -0,0 +1,44 @@
+"""
+unit tests for the cache runner
+"""
+
+import pytest
+import salt.cache
+import salt.config
+import salt.runners.cache as cache_runner
+from salt.exceptions import SaltInvocationError
+
+
+@pytest.fixture
+def opts(tmp_path):
+    opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+    opts["cachedir"] = str(tmp_path / "cache")
+    return opts
+
+
+@pytest.fixture
+def configure_loader_modules(opts):
+    return {cache_runner: {"__opts__": opts}}
+
+
+def test_migrate(opts):
+    localfs = salt.cache.Cache(dict(opts, cache="localfs"))
+    localfs.store("minions/web1", "data", {"grains": {"os": "Ubuntu"}})
+    localfs.store("minions/web1", "mine", {"test.ping": True})
+    localfs.store("minions/web2", "data", {"pillar": {"role": "web"}})
+    localfs.store("cloud", "data", {"ignored": True})
+
+    opts["cache"] = "sqlite"
+    assert cache_runner.migrate(batch_size=2) == 3
+
+    cache = salt.cache.Cache(opts)
+    assert sorted(cache.list("minions")) == ["web1", "web2"]
+    assert cache.fetch("minions/web1", "data") == {"grains": {"os": "Ubuntu"}}
+    assert cache.fetch("minions/web1", "mine") == {"test.ping": True}
+    assert cache.fetch("minions/web2", "data") == {"pillar": {"role": "web"}}
+    assert cache.list("cloud") == []
+
+
+def test_migrate_into_itself(opts):
+    with pytest.raises(SaltInvocationError):
+        cache_runner.migrate()
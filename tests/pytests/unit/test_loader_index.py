@@ -0,0 +1,164 @@
+"""
+Tests for salt.loader_index
+"""
+import os
+import time
+
+import pytest
+import salt.loader
+import salt.loader_index
+import salt.utils.files
+from tests.support.helpers import dedent
+from tests.support.mock import patch
+
+MODULES = {
+    "aptpkg": """
+    __virtualname__ = "pkg"
+
+    def __virtual__():
+        return (False, "not a Debian system")
+
+    def install():
+        return "apt"
+    """,
+    "yumpkg": """
+    __virtualname__ = "pkg"
+
+    def __virtual__():
+        return __virtualname__
+
+    def install():
+        return "yum"
+    """,
+    "other": """
+    def func():
+        return "other"
+    """,
+}
+
+
+def _age(*paths):
+    """
+    Move the mtime of paths out of the window in which the index does not
+    trust them
+    """
+    stamp = time.time() - 60
+    for path in paths:
+        if os.path.exists(path):
+            os.utime(path, (stamp, stamp))
+
+
+@pytest.fixture
+def module_dir(tmp_path):
+    module_dir = tmp_path / "modules"
+    module_dir.mkdir()
+    for name, content in MODULES.items():
+        with salt.utils.files.fopen(str(module_dir / (name + ".py")), "w") as fp_:
+            fp_.write(dedent(content))
+    _age(str(module_dir))
+    return str(module_dir)
+
+
+@pytest.fixture
+def opts(tmp_path):
+    return {
+        "cachedir": str(tmp_path / "cache"),
+        "loader_index": True,
+        "optimization_order": [0, 1, 2],
+        "grains": {"os_family": "RedHat"},
+    }
+
+
+def _loader(module_dir, opts):
+    return salt.loader.LazyLoader([module_dir], opts, tag="index_test")
+
+
+def _loaded(module_dir, opts, *keys):
+    """
+    Return the names of the module files imported to find ``keys``
+    """
+    loader = _loader(module_dir, opts)
+    with patch.object(
+        salt.loader.LazyLoader,
+        "_load_module",
+        autospec=True,
+        side_effect=salt.loader.LazyLoader._load_module,
+    ) as load_module:
+        for key in keys:
+            if key is None:
+                loader._load_all()
+            else:
+                loader[key]
+    return loader, sorted(call[0][1] for call in load_module.call_args_list)
+
+
+def test_file_mapping(module_dir, opts):
+    loader = _loader(module_dir, opts)
+    _age(module_dir, os.path.join(module_dir, "__pycache__"))
+    loader = _loader(module_dir, opts)
+    with patch("os.listdir", side_effect=os.listdir) as listdir:
+        indexed = _loader(module_dir, opts)
+    assert listdir.call_count == 0
+    assert indexed.file_mapping == loader.file_mapping
+
+    # Adding a module changes the mtime of the directory
+    with salt.utils.files.fopen(os.path.join(module_dir, "new.py"), "w") as fp_:
+        fp_.write("def func():\n    return 'new'\n")
+    loader = _loader(module_dir, opts)
+    assert "new" in loader.file_mapping
+
+
+def test_virtual_results(module_dir, opts):
+    _, loaded = _loaded(module_dir, opts, None)
+    assert loaded == ["aptpkg", "other", "yumpkg"]
+
+    loader, loaded = _loaded(module_dir, opts, "pkg.install")
+    assert loaded == ["yumpkg"]
+    assert loader["pkg.install"]() == "yum"
+    assert loader.missing_modules["aptpkg"] == "not a Debian system"
+
+    _, loaded = _loaded(module_dir, opts, "other.func", None)
+    assert loaded == ["other", "yumpkg"]
+
+
+def test_virtual_results_invalidation(module_dir, opts):
+    _loaded(module_dir, opts, None)
+
+    # A module file changed
+    stamp = time.time() - 30
+    os.utime(os.path.join(module_dir, "aptpkg.py"), (stamp, stamp))
+    _, loaded = _loaded(module_dir, opts, "pkg.install")
+    assert loaded == ["aptpkg", "yumpkg"]
+    _, loaded = _loaded(module_dir, opts, "pkg.install")
+    assert loaded == ["yumpkg"]
+
+    # The grains changed
+    opts["grains"] = {"os_family": "Debian"}
+    _, loaded = _loaded(module_dir, opts, "pkg.install")
+    assert loaded == ["aptpkg", "yumpkg"]
+
+    # The options changed
+    opts["docker.url"] = "unix://var/run/docker.sock"
+    _, loaded = _loaded(module_dir, opts, "pkg.install")
+    assert loaded == ["aptpkg", "yumpkg"]
+    _, loaded = _loaded(module_dir, opts, "pkg.install")
+    assert loaded == ["yumpkg"]
+
+    # The pillar changed
+    opts["pillar"] = {"docker": True}
+    _, loaded = _loaded(module_dir, opts, "pkg.install")
+    assert loaded == ["aptpkg", "yumpkg"]
+
+    # The index was cleared
+    salt.loader_index.clear(opts)
+    assert not os.path.exists(salt.loader_index.index_dir(opts))
+    _, loaded = _loaded(module_dir, opts, "pkg.install")
+    assert loaded == ["aptpkg", "yumpkg"]
+
+
+def test_disabled(module_dir, opts):
+    opts["loader_index"] = False
+    _loaded(module_dir, opts, None)
+    _, loaded = _loaded(module_dir, opts, "pkg.install")
+    assert loaded == ["aptpkg", "yumpkg"]
+    assert not os.path.exists(salt.loader_index.index_dir(opts))
@@ -4,6 +4,8 @@ import socket
 import attr
 import pytest
 import salt.exceptions
+import salt.ext.tornado.iostream
+import salt.transport.frame
 import salt.transport.tcp
 from salt.ext.tornado import concurrent, gen, ioloop
 from saltfactories.utils.ports import get_unused_localhost_port
@@ -400,3 +402,60 @@ def test_client_reconnect_backoff(client_socket):
             client.io_loop.run_sync(client._connect)
     finally:
         client.close()
+
+
+def test_pub_server_write_shared():
+    """
+    The payload shared by all the clients is sent straight to the sockets, and
+    only what the socket does not accept is buffered by the stream
+    """
+    io_loop = ioloop.IOLoop()
+    server_sock, client_sock = socket.socketpair()
+    server_sock.setblocking(False)
+    client_sock.settimeout(5)
+    stream = salt.ext.tornado.iostream.IOStream(server_sock, io_loop=io_loop)
+    try:
+        payload = memoryview(b"payload")
+        with patch.object(stream, "write", MagicMock()) as write:
+            salt.transport.tcp.PubServer._write_shared(stream, payload)
+        write.assert_not_called()
+        assert client_sock.recv(1024) == b"payload"
+
+        # The socket only accepts part of the data
+        with patch.object(
+            stream, "write_to_fd", MagicMock(return_value=3)
+        ), patch.object(stream, "write", MagicMock()) as write:
+            salt.transport.tcp.PubServer._write_shared(stream, payload)
+        assert bytes(write.call_args[0][0]) == b"load"
+    finally:
+        stream.close()
+        client_sock.close()
+        io_loop.close()
+
+
+def test_pub_server_publish_payload():
+    """
+    publish_payload sends the framed payload to the connected subscribers
+    """
+    io_loop = ioloop.IOLoop()
+    server_sock, client_sock = socket.socketpair()
+    server_sock.setblocking(False)
+    client_sock.settimeout(5)
+    stream = salt.ext.tornado.iostream.IOStream(server_sock, io_loop=io_loop)
+    with patch("salt.master.AESFuncs", MagicMock()):
+        pub_server = salt.transport.tcp.PubServer({}, io_loop=io_loop)
+    pub_server.clients.add(salt.transport.tcp.Subscriber(stream, "address"))
+    try:
+        io_loop.run_sync(
+            lambda: pub_server.publish_payload({"payload": {"foo": "bar"}}, None)
+        )
+        expected = salt.transport.frame.frame_msg({"foo": "bar"})
+        received = b""
+        while len(received) < len(expected):
+            received += client_sock.recv(1024)
+        assert received == expected
+        assert len(pub_server.clients) == 1
+    finally:
+        stream.close()
+        client_sock.close()
+        io_loop.close()
@@ -6,6 +6,7 @@ import hashlib
 
 import salt.config
 import salt.exceptions
+import salt.ext.tornado.concurrent
 import salt.ext.tornado.gen
 import salt.ext.tornado.ioloop
 import salt.log.setup
@@ -251,3 +252,56 @@ def test_zeromq_async_pub_channel_filtering_decode_message(
             res = channel._decode_messages(message)
 
     assert res.result()["enc"] == "aes"
+
+
+class FakeStream:
+    def __init__(self):
+        self.callback = None
+
+    def on_recv(self, callback):
+        self.callback = callback
+
+    def stop_on_recv(self):
+        self.callback = None
+
+    def receiving(self):
+        return self.callback is not None
+
+    def closed(self):
+        return False
+
+
+def test_req_server_dealer_in_flight_limit():
+    """
+    test a worker with a thread pool stops taking requests off the device
+    while it holds as many as its pool allows, and resumes once one is done
+    """
+    io_loop = salt.ext.tornado.ioloop.IOLoop()
+    channel = salt.transport.zeromq.ZeroMQReqServerChannel({"worker_pool_threads": 1})
+    channel.io_loop = io_loop
+    channel.stream = FakeStream()
+    channel._max_in_flight = 2
+    channel.stream.on_recv(channel._handle_dealer_message)
+    futures = []
+
+    def handle_message(stream, payload):
+        futures.append(salt.ext.tornado.concurrent.Future())
+        return futures[-1]
+
+    try:
+        with patch.object(channel, "handle_message", handle_message):
+            channel._handle_dealer_message([b"id", b"", b"first"])
+            assert channel.stream.receiving()
+            channel._handle_dealer_message([b"id", b"", b"second"])
+            assert not channel.stream.receiving()
+
+            futures[0].set_result(None)
+            io_loop.run_sync(lambda: salt.ext.tornado.gen.moment)
+            assert channel._in_flight == 1
+            assert channel.stream.callback == channel._handle_dealer_message
+
+            channel._handle_dealer_message([b"id", b"", b"third"])
+            assert not channel.stream.receiving()
+            assert len(futures) == 3
+    finally:
+        io_loop.close()
@@ -0,0 +1,66 @@
+"""
+Tests for salt.utils.boundedcall
+"""
+
+import threading
+import time
+
+import salt.utils.boundedcall
+
+
+def test_bounded_call():
+    call = salt.utils.boundedcall.BoundedCall(lambda a, b=0: a + b, 1, b=2)
+    call.start()
+    assert call.wait() is True
+    assert call.ret == 3
+    assert call.exc_info is None
+
+
+def test_bounded_call_exception():
+    def _fail():
+        raise ValueError("failed")
+
+    call = salt.utils.boundedcall.BoundedCall(_fail)
+    call.start(threading.Semaphore(1))
+    assert call.wait() is True
+    assert isinstance(call.exc_info[1], ValueError)
+
+
+def test_bounded_call_slots():
+    slots = threading.Semaphore(2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def _run():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.2)
+        with lock:
+            running.pop()
+
+    calls = [salt.utils.boundedcall.BoundedCall(_run) for _ in range(5)]
+    for call in calls:
+        call.start(slots)
+    for call in calls:
+        assert call.wait() is True
+    assert max(peak) == 2
+
+
+def test_bounded_call_timeout():
+    slots = threading.Semaphore(1)
+    release = threading.Event()
+    hung = salt.utils.boundedcall.BoundedCall(release.wait, 10)
+    after = salt.utils.boundedcall.BoundedCall(lambda: "done")
+    hung.start(slots)
+    after.start(slots)
+    try:
+        assert hung.wait(0.2) is False
+        # The slot of the call which timed out is given to the next call
+        assert after.wait(5) is True
+        assert after.ret == "done"
+        assert not hung.done.is_set()
+    finally:
+        release.set()
+    assert hung.wait() is True
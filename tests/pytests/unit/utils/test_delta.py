@@ -0,0 +1,232 @@
+"""
+Tests for salt.utils.delta
+"""
+
+import io
+import os
+import random
+
+import pytest
+import salt.config
+import salt.fileserver
+import salt.utils.delta
+
+
+def _apply(old_path, new_path, **kwargs):
+    """
+    Rebuild the file at ``new_path`` from the one at ``old_path`` and the delta
+    between them, return the rebuilt data and the size of the literals sent
+    """
+    sig = salt.utils.delta.signature(old_path)
+    out = io.BytesIO()
+    literal = loc = 0
+    with open(old_path, "rb") as old:
+        while True:
+            ops, next_loc, eof = salt.utils.delta.delta(new_path, sig, loc, **kwargs)
+            literal += sum(len(op) for op in ops if isinstance(op, bytes))
+            salt.utils.delta.patch(ops, old, sig["block_size"], out.write)
+            if eof:
+                break
+            assert next_loc > loc
+            loc = next_loc
+    return out.getvalue(), literal
+
+
+@pytest.mark.parametrize("size", [0, 100, 50000, 300000])
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda data: data,
+        lambda data: data[:1000] + b"inserted" + data[1000:],
+        lambda data: data[:2000] + data[9000:],
+        lambda data: b"head" + data[5:] + b"tail",
+        lambda data: data[::-1],
+    ],
+)
+def test_delta_roundtrip(tmp_path, size, change):
+    rand = random.Random(size)
+    old_data = bytes(rand.getrandbits(8) for _ in range(size))
+    new_data = change(old_data)
+    old_path = tmp_path / "old"
+    new_path = tmp_path / "new"
+    old_path.write_bytes(old_data)
+    new_path.write_bytes(new_data)
+    for kwargs in ({}, {"max_literal": 1000, "read_size": 7000}):
+        data, _ = _apply(str(old_path), str(new_path), **kwargs)
+        assert data == new_data
+
+
+def test_delta_sends_changed_blocks_only(tmp_path):
+    old_data = os.urandom(1000000)
+    new_data = old_data[:500000] + b"changed" + old_data[500007:]
+    (tmp_path / "old").write_bytes(old_data)
+    (tmp_path / "new").write_bytes(new_data)
+    data, literal = _apply(str(tmp_path / "old"), str(tmp_path / "new"))
+    assert data == new_data
+    # One changed block, and the tail of the file which is not a full block
+    block_size = salt.utils.delta.block_size(len(old_data))
+    assert literal <= block_size + len(old_data) % block_size
+
+
+def _master_opts(tmp_path, **extra):
+    file_root = tmp_path / "file_root"
+    file_root.mkdir()
+    opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+    opts.update(
+        {
+            "cachedir": str(tmp_path / "cache"),
+            "fileserver_backend": ["roots"],
+            "file_roots": {"base": [str(file_root)]},
+            "extension_modules": "",
+            "fileserver_delta_transfer": True,
+        }
+    )
+    opts.update(extra)
+    return opts
+
+
+def test_fileserver_serve_file_delta(tmp_path):
+    file_root = tmp_path / "file_root"
+    opts = _master_opts(tmp_path)
+    old_data = os.urandom(100000)
+    (tmp_path / "old").write_bytes(old_data)
+    (file_root / "foo.bin").write_bytes(old_data[:50000] + b"x" + old_data[50000:])
+    fileserver = salt.fileserver.Fileserver(opts)
+    load = {
+        "path": "foo.bin",
+        "saltenv": "base",
+        "loc": 0,
+        "delta": salt.utils.delta.signature(str(tmp_path / "old")),
+    }
+    ret = fileserver.serve_file(load)
+    assert ret["dest"] == "foo.bin"
+    assert ret["eof"] is True
+    out = io.BytesIO()
+    with open(str(tmp_path / "old"), "rb") as old:
+        salt.utils.delta.patch(
+            ret["delta"], old, load["delta"]["block_size"], out.write
+        )
+    assert out.getvalue() == (file_root / "foo.bin").read_bytes()
+
+    # Without a signature the file is served as usual
+    del load["delta"]
+    assert "delta" not in fileserver.serve_file(load)
+
+
+def test_fileserver_serve_file_delta_parts(tmp_path):
+    """
+    The signature is only sent with the first part of a delta
+    """
+    file_root = tmp_path / "file_root"
+    opts = _master_opts(tmp_path, file_buffer_size=10000)
+    old_data = os.urandom(100000)
+    new_data = old_data[:40000] + os.urandom(30000) + old_data[70000:]
+    (tmp_path / "old").write_bytes(old_data)
+    (file_root / "foo.bin").write_bytes(new_data)
+    fileserver = salt.fileserver.Fileserver(opts)
+    sig = salt.utils.delta.signature(str(tmp_path / "old"))
+    load = {"path": "foo.bin", "saltenv": "base", "loc": 0, "delta": sig}
+    out = io.BytesIO()
+    parts = 0
+    with open(str(tmp_path / "old"), "rb") as old:
+        while True:
+            ret = fileserver.serve_file(load)
+            parts += 1
+            salt.utils.delta.patch(ret["delta"], old, sig["block_size"], out.write)
+            if ret["eof"]:
+                break
+            assert ret["delta_id"]
+            load = {
+                "path": "foo.bin",
+                "saltenv": "base",
+                "loc": ret["loc"],
+                "delta_id": ret["delta_id"],
+            }
+    assert parts > 2
+    assert out.getvalue() == new_data
+    # The signature is removed once the last part is served
+    assert not os.listdir(str(tmp_path / "cache" / "file_delta"))
+    assert fileserver.serve_file(load) == {
+        "dest": "foo.bin",
+        "signature_expired": True,
+    }
+
+
+@pytest.mark.parametrize(
+    "sig,loc",
+    [
+        ({"block_size": 0, "weak": [1], "strong": [b""]}, 0),
+        ({"block_size": -2048, "weak": [], "strong": []}, 0),
+        ({"block_size": "2048", "weak": [], "strong": []}, 0),
+        ({"block_size": 2048, "weak": [1, 2], "strong": [b""]}, 0),
+        ({"block_size": 2048, "weak": [1], "strong": b"x"}, 0),
+        ({"block_size": 2048, "weak": [], "strong": []}, -1),
+        ({"block_size": 2048, "weak": [], "strong": []}, "0"),
+    ],
+)
+def test_fileserver_serve_file_delta_invalid(tmp_path, sig, loc):
+    """
+    A signature or offset the delta cannot be computed with is rejected
+    """
+    file_root = tmp_path / "file_root"
+    opts = _master_opts(tmp_path)
+    (file_root / "foo.bin").write_bytes(os.urandom(10000))
+    fileserver = salt.fileserver.Fileserver(opts)
+    load = {"path": "foo.bin", "saltenv": "base", "loc": loc, "delta": sig}
+    assert fileserver.serve_file(load) == {"data": "", "dest": ""}
+
+
+def test_fileserver_serve_file_delta_disabled(tmp_path):
+    """
+    The file is served as usual unless fileserver_delta_transfer is enabled
+    """
+    opts = _master_opts(tmp_path, fileserver_delta_transfer=False)
+    old_data = os.urandom(100000)
+    (tmp_path / "old").write_bytes(old_data)
+    (tmp_path / "file_root" / "foo.bin").write_bytes(old_data)
+    fileserver = salt.fileserver.Fileserver(opts)
+    load = {
+        "path": "foo.bin",
+        "saltenv": "base",
+        "loc": 0,
+        "delta": salt.utils.delta.signature(str(tmp_path / "old")),
+    }
+    ret = fileserver.serve_file(load)
+    assert "delta" not in ret
+    assert ret["data"]
+
+
+def test_fileserver_serve_file_delta_mostly_changed(tmp_path):
+    """
+    A file which shares few blocks with the copy of the client is served as
+    usual
+    """
+    opts = _master_opts(tmp_path, file_buffer_size=10000)
+    old_data = os.urandom(100000)
+    (tmp_path / "old").write_bytes(old_data)
+    (tmp_path / "file_root" / "foo.bin").write_bytes(
+        os.urandom(50000) + old_data[50000:]
+    )
+    fileserver = salt.fileserver.Fileserver(opts)
+    load = {
+        "path": "foo.bin",
+        "saltenv": "base",
+        "loc": 0,
+        "delta": salt.utils.delta.signature(str(tmp_path / "old")),
+    }
+    ret = fileserver.serve_file(load)
+    assert "delta" not in ret
+    assert ret["data"]
+    # The signature is not kept
+    assert not os.path.isdir(str(tmp_path / "cache" / "file_delta"))
+
+
+def test_fileserver_serve_file_delta_signature_too_large(tmp_path):
+    opts = _master_opts(tmp_path)
+    (tmp_path / "file_root" / "foo.bin").write_bytes(os.urandom(10000))
+    fileserver = salt.fileserver.Fileserver(opts)
+    count = salt.utils.delta.MAX_SIGNATURE_SIZE // 16
+    sig = {"block_size": 2048, "weak": [1] * count, "strong": [b"x" * 16] * count}
+    load = {"path": "foo.bin", "saltenv": "base", "loc": 0, "delta": sig}
+    assert fileserver.serve_file(load) == {"data": "", "dest": ""}
+    assert not os.path.isdir(str(tmp_path / "cache" / "file_delta"))
@@ -0,0 +1,108 @@
+"""
+Tests for salt.utils.hashcache
+"""
+
+import os
+
+import pytest
+import salt.config
+import salt.fileserver
+import salt.utils.hashcache
+import salt.utils.hashutils
+from tests.support.mock import patch
+
+
+@pytest.fixture
+def opts(tmp_path):
+    file_root = tmp_path / "file_root"
+    file_root.mkdir()
+    opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+    opts.update(
+        {
+            "cachedir": str(tmp_path / "cache"),
+            "hash_type": "sha256",
+            "fileserver_backend": ["roots"],
+            "fileserver_hash_cache": True,
+            "file_roots": {"base": [str(file_root)]},
+            "extension_modules": "",
+        }
+    )
+    return opts
+
+
+@pytest.fixture
+def file_root(opts):
+    return opts["file_roots"]["base"][0]
+
+
+def test_get_many_checks_mtime_and_size(opts, file_root):
+    path = os.path.join(file_root, "foo.txt")
+    with open(path, "w") as fp_:
+        fp_.write("foo")
+    key = salt.utils.hashcache.file_key("roots", path)
+    cache = salt.utils.hashcache.HashCache(opts)
+    assert cache.get_many([key]) == {}
+    cache.set_many({key: {"hsum": "abc", "hash_type": "sha256"}})
+
+    # Another process only has the database
+    other = salt.utils.hashcache.HashCache(opts)
+    assert other.get_many([key]) == {key: {"hsum": "abc", "hash_type": "sha256"}}
+
+    with open(path, "w") as fp_:
+        fp_.write("foobar")
+    new_key = salt.utils.hashcache.file_key("roots", path)
+    assert new_key != key
+    assert cache.get_many([new_key]) == {}
+    assert other.get_many([new_key]) == {}
+
+    # The hashes are kept per hash_type
+    opts["hash_type"] = "md5"
+    assert other.get_many([key]) == {}
+
+
+def test_clear(opts, file_root):
+    path = os.path.join(file_root, "foo.txt")
+    with open(path, "w") as fp_:
+        fp_.write("foo")
+    roots_key = salt.utils.hashcache.file_key("roots", path)
+    git_key = salt.utils.hashcache.file_key("git", path)
+    cache = salt.utils.hashcache.HashCache(opts)
+    hsum = {"hsum": "abc", "hash_type": "sha256"}
+    cache.set_many({roots_key: hsum, git_key: hsum})
+    cache.clear(["roots"])
+    assert cache.get_many([roots_key, git_key]) == {git_key: hsum}
+    cache.clear()
+    assert cache.get_many([roots_key, git_key]) == {}
+
+
+def test_fileserver_file_hash_many(opts, file_root):
+    for name in ("foo.txt", "bar.txt"):
+        with open(os.path.join(file_root, name), "w") as fp_:
+            fp_.write(name)
+    fileserver = salt.fileserver.Fileserver(opts)
+    load = {"paths": ["foo.txt", "missing.txt", "bar.txt"], "saltenv": "base"}
+    expected = [
+        {
+            "hsum": salt.utils.hashutils.get_hash(
+                os.path.join(file_root, "foo.txt"), "sha256"
+            ),
+            "hash_type": "sha256",
+        },
+        "",
+        {
+            "hsum": salt.utils.hashutils.get_hash(
+                os.path.join(file_root, "bar.txt"), "sha256"
+            ),
+            "hash_type": "sha256",
+        },
+    ]
+    assert fileserver.file_hash_many(dict(load)) == expected
+
+    # The second time around the hashes come from the hash cache
+    with patch.dict(fileserver.servers, {"roots.file_hash": pytest.fail}), patch.object(
+        fileserver.hash_cache, "_memory", {}
+    ):
+        assert fileserver.file_hash_many(dict(load)) == expected
+        assert (
+            fileserver.file_hash({"path": "foo.txt", "saltenv": "base"}) == expected[0]
+        )
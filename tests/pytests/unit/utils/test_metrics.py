@@ -0,0 +1,90 @@
+"""
+Tests for salt.utils.metrics
+"""
+
+import pytest
+import salt.utils.event
+import salt.utils.metrics
+import salt.utils.msgpack
+from tests.support.mock import MagicMock
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = salt.utils.metrics.Registry(str(tmp_path / "MWorker-0.p"))
+    monkeypatch.setattr(salt.utils.metrics, "_REGISTRY", registry)
+    return registry
+
+
+def test_disabled(tmp_path):
+    salt.utils.metrics.init({"master_metrics": False, "sock_dir": str(tmp_path)}, "x")
+    assert salt.utils.metrics._REGISTRY is None
+    # Recording metrics does nothing
+    salt.utils.metrics.observe("salt_test_seconds", 1)
+    salt.utils.metrics.inc("salt_test_total")
+    with salt.utils.metrics.timer("salt_test_seconds"):
+        pass
+    assert not list(tmp_path.iterdir())
+
+
+def test_collect_render(tmp_path, registry):
+    salt.utils.metrics.observe("salt_test_seconds", 0.003, cmd="_pillar")
+    salt.utils.metrics.observe("salt_test_seconds", 0.2, cmd="_pillar")
+    salt.utils.metrics.observe("salt_test_seconds", 100, cmd="_pillar")
+    salt.utils.metrics.inc("salt_test_total")
+    salt.utils.metrics.add_gauge("salt_test_in_progress", 2)
+    registry.flush()
+    assert not registry.changed
+
+    # Another process recorded metrics too
+    other = salt.utils.metrics.Registry(str(tmp_path / "MWorker-1.p"))
+    other.observe("salt_test_seconds", 0.003, {"cmd": "_pillar"})
+    other.inc("salt_test_total", 2, {})
+    other.add_gauge("salt_test_in_progress", -1, {})
+    other.flush()
+
+    metrics = salt.utils.metrics.collect(str(tmp_path))
+    key = ("salt_test_seconds", (("cmd", "_pillar"),))
+    hist = metrics["histograms"][key]
+    assert hist[salt.utils.metrics.BUCKETS.index(0.005)] == 2
+    assert hist[salt.utils.metrics.BUCKETS.index(0.25)] == 1
+    assert hist[-1] == 4
+    assert metrics["counters"][("salt_test_total", ())] == 3
+    assert metrics["gauges"][("salt_test_in_progress", ())] == 1
+
+    text = salt.utils.metrics.render(metrics)
+    lines = text.splitlines()
+    assert "# TYPE salt_test_seconds histogram" in lines
+    assert 'salt_test_seconds_bucket{cmd="_pillar",le="0.001"} 0' in lines
+    assert 'salt_test_seconds_bucket{cmd="_pillar",le="0.005"} 2' in lines
+    assert 'salt_test_seconds_bucket{cmd="_pillar",le="60.0"} 3' in lines
+    assert 'salt_test_seconds_bucket{cmd="_pillar",le="+Inf"} 4' in lines
+    assert 'salt_test_seconds_count{cmd="_pillar"} 4' in lines
+    assert "# TYPE salt_test_total counter" in lines
+    assert "salt_test_total 3" in lines
+    assert "salt_test_in_progress 1" in lines
+
+
+def test_render_escapes_labels():
+    metrics = {
+        "histograms": {},
+        "counters": {("salt_test_total", (("tag", 'a"b\\c\n'),)): 1},
+        "gauges": {},
+    }
+    assert (
+        'salt_test_total{tag="a\\"b\\\\c\\n"} 1'
+        in salt.utils.metrics.render(metrics).splitlines()
+    )
+
+
+def test_event_publisher(registry):
+    """
+    The events published on the master event bus are counted
+    """
+    publisher = salt.utils.event.EventPublisher({})
+    publisher.publisher = MagicMock()
+    package = b"salt/test\n\n" + salt.utils.msgpack.dumps({"foo": "bar"})
+    assert publisher.handle_publish(package, None) == package
+    publisher.publisher.publish.assert_called_once_with(package, tag="salt/test")
+    assert registry.counters[("salt_master_events_total", ())] == 1
+    assert registry.counters[("salt_master_event_bytes_total", ())] == len(package)
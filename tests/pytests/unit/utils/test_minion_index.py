@@ -0,0 +1,220 @@
+"""
+Tests for salt.utils.minion_index
+"""
+
+import pytest
+import salt.cache
+import salt.config
+import salt.utils.data
+import salt.utils.files
+import salt.utils.minion_index
+import salt.utils.minions
+from tests.support.mock import patch
+
+MINION_DATA = {
+    "web1": {
+        "grains": {
+            "os": "Ubuntu",
+            "osrelease": "20.04",
+            "roles": ["web", "lb"],
+            "ipv4": ["10.0.0.1", "127.0.0.1"],
+            "nested": {"a": {"b": "deep"}, "empty": {}},
+            "colon:key": "value",
+            "mem_total": 2048,
+            "virtual": None,
+        },
+        "pillar": {"env": "prod", "apps": [{"name": "nginx"}]},
+    },
+    "web2": {
+        "grains": {
+            "os": "Ubuntu",
+            "osrelease": "18.04",
+            "roles": ["web"],
+            "ipv4": ["10.0.0.2"],
+            "nested": {"a": {"b": "shallow"}},
+            "mem_total": 4096,
+        },
+        "pillar": {"env": "dev", "apps": [{"name": "apache"}]},
+    },
+    "db1": {
+        "grains": {"os": "CentOS", "roles": "db", 1: "int-key", "nested": "flat"},
+        "pillar": None,
+    },
+}
+
+EXPRESSIONS = [
+    "os:Ubuntu",
+    "os:ubuntu",
+    "os:Ub*",
+    "os:*",
+    "osrelease:20.*",
+    "roles:web",
+    "roles:db",
+    "roles:*b",
+    "ipv4:10.0.0.*",
+    "ipv4:0:10.0.0.1",
+    "nested:a:b:deep",
+    "nested:a:b",
+    "nested:a:*",
+    "nested:empty",
+    "nested:empty:*",
+    "nested:flat",
+    "colon:key:value",
+    "mem_total:2048",
+    "mem_total:20*",
+    "virtual:None",
+    "1:int-key",
+    "*:Ubuntu",
+    "nested:*:b:deep",
+    "missing:foo",
+    "os",
+    "env:prod",
+    "apps:name:nginx",
+]
+
+
+@pytest.fixture
+def opts(tmp_path):
+    opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+    opts["cachedir"] = str(tmp_path)
+    opts["minion_data_cache"] = True
+    opts["minion_data_cache_index"] = True
+    return opts
+
+
+@pytest.fixture
+def cache(opts):
+    cache = salt.cache.factory(opts)
+    for minion_id, data in MINION_DATA.items():
+        cache.store("minions/{}".format(minion_id), "data", data)
+    return cache
+
+
+def _expected(search_type, expr, **kwargs):
+    return {
+        minion_id
+        for minion_id, data in MINION_DATA.items()
+        if salt.utils.data.subdict_match(data[search_type], expr, **kwargs)
+    }
+
+
+@pytest.mark.parametrize("expr", EXPRESSIONS)
+@pytest.mark.parametrize(
+    "kwargs", [{}, {"regex_match": True}, {"exact_match": True}], ids=str
+)
+def test_match_agrees_with_subdict_match(opts, cache, expr, kwargs):
+    index = salt.utils.minion_index.MinionDataIndex(opts)
+    index.refresh()
+    for search_type in ("grains", "pillar"):
+        assert index.match(search_type, expr, **kwargs) == _expected(
+            search_type, expr, **kwargs
+        )
+
+
+def test_match_custom_delimiter(opts, cache):
+    index = salt.utils.minion_index.MinionDataIndex(opts)
+    index.refresh()
+    assert index.match("grains", "nested,a,b,deep", delimiter=",") == {"web1"}
+    assert index.match("grains", "colon:key,value", delimiter=",") == {"web1"}
+
+
+def test_updates_are_shared_through_the_journal(opts, cache):
+    writer = salt.utils.minion_index.MinionDataIndex(opts)
+    reader = salt.utils.minion_index.MinionDataIndex(opts)
+    reader.refresh()
+    assert reader.match("grains", "os:CentOS") == {"db1"}
+
+    writer.update("web2", {"grains": {"os": "CentOS"}, "pillar": {}})
+    writer.remove("db1")
+    reader.refresh()
+    assert reader.match("grains", "os:CentOS") == {"web2"}
+    assert reader.match("grains", "osrelease:18.04") == set()
+    assert reader.minions() == {"web1", "web2"}
+
+
+def test_update_before_build_is_ignored(opts, cache):
+    index = salt.utils.minion_index.MinionDataIndex(opts)
+    index.update("web1", {"grains": {"os": "Windows"}})
+    index.refresh()
+    assert index.match("grains", "os:Windows") == set()
+    assert index.match("grains", "os:Ubuntu") == {"web1", "web2"}
+
+
+def test_journal_compaction(opts, cache):
+    writer = salt.utils.minion_index.MinionDataIndex(opts)
+    reader = salt.utils.minion_index.MinionDataIndex(opts)
+    reader.refresh()
+    generation = reader._generation
+    with patch("salt.utils.minion_index._COMPACT_SLACK", 2):
+        for idx in range(10):
+            writer.update("web1", {"grains": {"counter": idx}})
+    assert writer._generation > generation
+    reader.refresh()
+    assert reader._generation == writer._generation
+    assert reader.match("grains", "counter:9") == {"web1"}
+    assert reader.match("grains", "counter:8") == set()
+
+
+def test_check_minions_uses_index(opts, cache, tmp_path):
+    opts["pki_dir"] = str(tmp_path / "pki")
+    (tmp_path / "pki" / "minions").mkdir(parents=True)
+    for minion_id in MINION_DATA:
+        (tmp_path / "pki" / "minions" / minion_id).write_text("key")
+    ckminions = salt.utils.minions.CkMinions(opts)
+    assert ckminions.index is not None
+    with patch.object(ckminions.cache, "fetch", wraps=ckminions.cache.fetch) as fetch:
+        ret = ckminions.check_minions("os:Ubuntu", "grain")
+        assert sorted(ret["minions"]) == ["web1", "web2"]
+        ret = ckminions.check_minions("G@os:Ubuntu and not I@env:prod", "compound")
+        assert ret["minions"] == ["web2"]
+        # Only the initial build of the index reads the cached minion data
+        calls = fetch.call_count
+        ckminions.check_minions("os:CentOS", "grain")
+        assert fetch.call_count == calls
+
+    ckminions.update_minion_data_index("db1", None)
+    ret = ckminions._check_cache_minions("os:CentOS", ":", False, "grains")
+    assert ret["minions"] == []
+
+
+def test_index_is_shared(opts, cache):
+    index = salt.utils.minion_index.get_index(opts)
+    assert salt.utils.minions.CkMinions(opts).index is index
+    assert salt.utils.minions.CkMinions(opts).index is index
+    other = dict(opts, cachedir=opts["cachedir"] + "-other")
+    assert salt.utils.minion_index.get_index(other) is not index
+
+
+def test_match_fetches_unresolved_minions_only(opts, cache):
+    index = salt.utils.minion_index.MinionDataIndex(opts)
+    index.refresh()
+    with patch.object(
+        index.cache, "fetch_many", wraps=index.cache.fetch_many
+    ) as fetch_many:
+        assert index.match("grains", "os:Ubuntu") == {"web1", "web2"}
+        # db1 has a key which is not a string, its grains are matched directly
+        assert [call[0][0] for call in fetch_many.call_args_list] == [
+            [("minions/db1", "data")]
+        ]
+        fetch_many.reset_mock()
+        assert index.match("pillar", "env:prod") == {"web1"}
+        fetch_many.assert_not_called()
+        assert index.match("pillar", "apps:name:nginx") == {"web1"}
+        assert fetch_many.call_count == 1
+
+
+def test_old_snapshot_is_rebuilt(opts, cache):
+    index = salt.utils.minion_index.MinionDataIndex(opts)
+    index.refresh()
+    generation = index._generation
+    # A snapshot holding the data of the minions instead of their entries
+    with salt.utils.files.fopen(index.snapshot_path, "wb") as fp_:
+        fp_.write(
+            index.serial.dumps(
+                {"generation": generation, "minions": MINION_DATA}, use_bin_type=True
+            )
+        )
+    reader = salt.utils.minion_index.MinionDataIndex(opts)
+    reader.refresh()
+    assert reader._generation == generation + 1
+    assert reader.match("grains", "os:Ubuntu") == {"web1", "web2"}
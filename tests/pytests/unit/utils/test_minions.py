@@ -15,8 +15,39 @@ def test_connected_ids():
     ckminions = salt.utils.minions.CkMinions({"minion_data_cache": True})
     patch_net = patch("salt.utils.network.local_port_tcp", return_value={"127.0.0.1"})
     patch_list = patch("salt.cache.Cache.list", return_value=[minion])
-    patch_fetch = patch("salt.cache.Cache.fetch", return_value=mdata)
+    patch_fetch = patch(
+        "salt.cache.Cache.fetch_many",
+        return_value={("minions/{}".format(minion), "data"): mdata},
+    )
     with patch.dict(ckminions.opts, opts):
         with patch_net, patch_list, patch_fetch:
             ret = ckminions.connected_ids()
             assert ret == {minion}
+
+
+def test_connected_ids_fetch_chunks():
+    """
+    test ckminion connected_ids fetches the cached minion data in bounded
+    chunks
+    """
+    opts = {"publish_port": 4505}
+    ip = salt.utils.network.ip_addrs()
+    minions = ["minion{}".format(idx) for idx in range(5)]
+    mdata = {"grains": {"ipv4": ip, "ipv6": []}}
+    chunks = []
+
+    def fetch_many(bank_keys):
+        bank_keys = list(bank_keys)
+        chunks.append(len(bank_keys))
+        return {bank_key: mdata for bank_key in bank_keys}
+
+    ckminions = salt.utils.minions.CkMinions({"minion_data_cache": True})
+    patch_net = patch("salt.utils.network.local_port_tcp", return_value={"127.0.0.1"})
+    patch_list = patch("salt.cache.Cache.list", return_value=minions)
+    patch_fetch = patch("salt.cache.Cache.fetch_many", side_effect=fetch_many)
+    patch_chunk = patch("salt.utils.minions._FETCH_CHUNK_SIZE", 2)
+    with patch.dict(ckminions.opts, opts):
+        with patch_net, patch_list, patch_fetch, patch_chunk:
+            ret = ckminions.connected_ids()
+    assert ret == set(minions)
+    assert chunks == [2, 2, 1]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Benchmark of the evaluation of large schedules
+
+Times ``salt.utils.schedule.Schedule.eval`` called once a second, as the
+minion does, over schedules of interval and cron jobs which are not due,
+with and without the index of the time each job needs to be evaluated at,
+which is what ``eval`` used to do.
+"""
+
+import argparse
+import datetime
+import time
+
+import salt.config
+import salt.utils.schedule
+
+
+def _schedule(size):
+    jobs = {}
+    for idx in range(size):
+        job = {"function": "test.ping", "dry_run": True}
+        if idx % 2 and salt.utils.schedule._CRON_SUPPORTED:
+            job["cron"] = "{} 3 * * *".format(idx % 60)
+        else:
+            job["hours"] = 1 + idx % 24
+            job["splay"] = 60
+        jobs["job{}".format(idx)] = job
+    return jobs
+
+
+def _eval(size, ticks, index):
+    opts = salt.config.minion_config(None)
+    opts.update({"schedule": _schedule(size), "pillar": {}, "grains": {}})
+    schedule = salt.utils.schedule.Schedule(
+        opts, {"test.ping": lambda: True}, standalone=True, new_instance=True, utils={}
+    )
+    now = datetime.datetime.now()
+    # The first evaluation computes the next fire time of every job
+    schedule.eval(now=now)
+    start = time.time()
+    for tick in range(1, ticks + 1):
+        if not index:
+            schedule._reset_eval_index()
+        schedule.eval(now=now + datetime.timedelta(seconds=tick))
+    return (time.time() - start) / ticks
+
+
+def run(sizes, ticks):
+    print(
+        "{:<8} {:>14} {:>14} {:>8}".format(
+            "jobs", "full (ms)", "indexed (ms)", "speedup"
+        )
+    )
+    for size in sizes:
+        full = _eval(size, ticks, False)
+        indexed = _eval(size, ticks, True)
+        print(
+            "{:<8} {:>14.3f} {:>14.3f} {:>7.1f}x".format(
+                size, 1000 * full, 1000 * indexed, full / indexed
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args()
+    run(args.sizes, args.ticks)
@@ -10,7 +10,7 @@ import salt.cache
 
 # Import Salt libs
 import salt.payload
-from tests.support.mock import patch
+from tests.support.mock import MagicMock, patch
 
 # Import Salt Testing libs
 # import integration
@@ -236,3 +236,105 @@ class MemCacheTest(TestCase):
         # Check debug data
         self.assertEqual(self.cache.call, 6)
         self.assertEqual(self.cache.hit, 3)
+
+    @patch("salt.cache.Cache.fetch", return_value="fake_data")
+    @patch("salt.loader.cache", return_value={})
+    def test_fetch_many_fallback(self, loader_mock, cache_fetch_mock):
+        # Without a native fetch_many, values are fetched and kept one by one
+        with patch("time.time", return_value=0):
+            ret = self.cache.fetch_many([("bank", "key1"), ("bank", "key2")])
+        self.assertEqual(
+            ret, {("bank", "key1"): "fake_data", ("bank", "key2"): "fake_data"}
+        )
+        self.assertEqual(cache_fetch_mock.call_count, 2)
+        self.assertDictEqual(
+            salt.cache.MemCache.data,
+            {
+                "fake_driver": {
+                    ("bank", "key1"): [0, "fake_data"],
+                    ("bank", "key2"): [0, "fake_data"],
+                }
+            },
+        )
+
+    def test_fetch_many_native(self):
+        fetch_many = MagicMock(return_value={("bank", "key2"): "fake_data2"})
+        modules = {
+            "fake_driver.fetch_many": fetch_many,
+            "fake_driver.store": MagicMock(),
+        }
+        with patch("salt.loader.cache", return_value=modules):
+            with patch("time.time", return_value=0):
+                self.cache.store("bank", "key1", "fake_data1")
+            with patch("time.time", return_value=1):
+                ret = self.cache.fetch_many(
+                    [("bank", "key1"), ("bank", "key2"), ("bank", "key3")]
+                )
+        self.assertEqual(
+            ret,
+            {
+                ("bank", "key1"): "fake_data1",
+                ("bank", "key2"): "fake_data2",
+                ("bank", "key3"): {},
+            },
+        )
+        # Only the keys missing from the memcache are requested
+        fetch_many.assert_called_once_with([("bank", "key2"), ("bank", "key3")])
+
+    def test_store_many(self):
+        store_many = MagicMock()
+        with patch(
+            "salt.loader.cache", return_value={"fake_driver.store_many": store_many}
+        ):
+            with patch("time.time", return_value=0):
+                self.cache.store_many(
+                    [("bank", "key1", "fake_data1"), ("bank", "key2", "fake_data2")]
+                )
+        store_many.assert_called_once_with(
+            [("bank", "key1", "fake_data1"), ("bank", "key2", "fake_data2")]
+        )
+        self.assertDictEqual(
+            salt.cache.MemCache.data,
+            {
+                "fake_driver": {
+                    ("bank", "key1"): [0, "fake_data1"],
+                    ("bank", "key2"): [0, "fake_data2"],
+                }
+            },
+        )
+
+
+class CacheBatchTest(TestCase):
+    """
+    Validate the batched Cache methods
+    """
+
+    def setUp(self):
+        self.opts = {"cache": "fake_driver"}
+        self.cache = salt.cache.factory(self.opts)
+
+    def test_fetch_many_fallback(self):
+        fetch = MagicMock(side_effect=lambda bank, key: key if key != "key3" else {})
+        with patch("salt.loader.cache", return_value={"fake_driver.fetch": fetch}):
+            ret = self.cache.fetch_many([("bank", "key1"), ("bank", "key3")])
+        self.assertEqual(ret, {("bank", "key1"): "key1", ("bank", "key3"): {}})
+
+    def test_list_many(self):
+        list_many = MagicMock(return_value={"bank1": ["key"]})
+        with patch(
+            "salt.loader.cache", return_value={"fake_driver.list_many": list_many}
+        ):
+            ret = self.cache.list_many(["bank1", "bank2"])
+        self.assertEqual(ret, {"bank1": ["key"], "bank2": []})
+
+    def test_list_many_fallback(self):
+        list_ = MagicMock(side_effect=lambda bank: [bank])
+        with patch("salt.loader.cache", return_value={"fake_driver.list": list_}):
+            ret = self.cache.list_many(["bank1", "bank2"])
+        self.assertEqual(ret, {"bank1": ["bank1"], "bank2": ["bank2"]})
+
+    def test_store_many_fallback(self):
+        store = MagicMock()
+        with patch("salt.loader.cache", return_value={"fake_driver.store": store}):
+            self.cache.store_many([("bank", "key1", 1), ("bank", "key2", 2)])
+        self.assertEqual(store.call_count, 2)
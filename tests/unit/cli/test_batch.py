@@ -2,7 +2,14 @@
     :codeauthor: Nicole Thomas <nicole@saltstack.com>
 """
 
-from salt.cli.batch import Batch
+import os
+import tempfile
+import time
+
+import salt.utils.files
+import salt.utils.metrics
+import salt.utils.msgpack
+from salt.cli.batch import AdaptiveBatchSize, Batch
 from tests.support.mock import MagicMock, patch
 from tests.support.unit import TestCase
 
@@ -129,3 +136,103 @@ class BatchTestCase(TestCase):
             verbose=False,
             gather_job_timeout=5,
         )
+
+    def test_adaptive_batch_size(self):
+        """
+        The number of minions grows by about one for each window of successful
+        returns and is halved once per window on overload
+        """
+        window = AdaptiveBatchSize(
+            {"batch_adaptive_max_size": 6, "batch_adaptive_latency": 10}, 2
+        )
+        self.assertEqual(window.window, 2)
+        for _ in range(3):
+            self.assertIsNone(window.update(time.time(), 1, False))
+        self.assertEqual(window.window, 3)
+        for _ in range(20):
+            window.update(time.time(), 1, False)
+        self.assertEqual(window.window, 6)
+
+        # A slow return halves the window, the other returns of the minions
+        # sent the job before it do not
+        sent = time.time() - 1
+        self.assertEqual(window.update(sent, 11, False), "latency")
+        self.assertEqual(window.window, 3)
+        self.assertIsNone(window.update(sent, 11, False))
+        self.assertEqual(window.window, 3)
+        self.assertEqual(window.update(time.time() + 1, 11, False), "latency")
+        self.assertEqual(window.window, 1)
+
+        # Failed returns raise the failure rate above the limit
+        window = AdaptiveBatchSize({"batch_adaptive_max_failure_rate": 0.3}, 8)
+        self.assertIsNone(window.update(time.time(), 1, True))
+        self.assertEqual(window.update(time.time(), 1, True), "failures")
+        self.assertEqual(window.window, 4)
+
+    def test_adaptive_batch_size_master_requests(self):
+        """
+        The number of requests in progress in the master workers is read from
+        the master metrics
+        """
+        with tempfile.TemporaryDirectory() as sock_dir:
+            opts = {
+                "sock_dir": sock_dir,
+                "master_metrics": True,
+                "batch_adaptive_max_requests": 10,
+            }
+            window = AdaptiveBatchSize(opts, 4)
+            self.assertIsNone(window.update(time.time(), 1, False))
+            self.assertEqual(window.requests, 0)
+
+            os.makedirs(salt.utils.metrics.metrics_dir(opts))
+            for name, value in (("MWorker-0", 7), ("MWorker-1", 5)):
+                path = os.path.join(
+                    salt.utils.metrics.metrics_dir(opts), "{}.p".format(name)
+                )
+                with salt.utils.files.fopen(path, "wb") as fp_:
+                    fp_.write(
+                        salt.utils.msgpack.dumps(
+                            {
+                                "gauges": [
+                                    ["salt_master_requests_in_progress", {}, value]
+                                ]
+                            }
+                        )
+                    )
+            window.requests_checked_at = 0
+            self.assertEqual(window.update(time.time(), 1, False), "master")
+            self.assertEqual(window.requests, 12)
+            self.assertEqual(window.window, 2)
+
+    def test_run_adaptive(self):
+        """
+        An adaptive batch run grows the number of minions it keeps running
+        and fires an event each time it changes
+        """
+        self.batch.opts = {
+            "batch": "1",
+            "batch_adaptive": True,
+            "timeout": 5,
+            "fun": "test.ping",
+            "arg": [],
+            "gather_job_timeout": 5,
+        }
+        self.batch.minions = ["foo", "bar", "baz", "qux"]
+        calls = []
+
+        def cmd_iter_no_block(minions, *args, **kwargs):
+            calls.append(list(minions))
+            return iter([{minion: {"ret": True, "retcode": 0}} for minion in minions])
+
+        self.batch.local.cmd_iter_no_block = cmd_iter_no_block
+        ret = {}
+        for part in Batch.run(self.batch):
+            ret.update(part)
+        self.assertEqual(ret, {"foo": True, "bar": True, "baz": True, "qux": True})
+        self.assertEqual([len(minions) for minions in calls], [1, 2, 1])
+
+        events = self.batch.local.event.fire_event.call_args_list
+        self.assertEqual([event[0][0]["size"] for event in events], [1, 2, 3])
+        for event in events:
+            self.assertTrue(event[0][1].startswith("salt/batch/"))
+            self.assertTrue(event[0][1].endswith("/size"))
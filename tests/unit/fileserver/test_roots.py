@@ -239,3 +239,80 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
             ]
         )
         assert lines_written == expected, lines_written
+
+    def test_roots_index(self):
+        tree = pathlib.Path(tempfile.mkdtemp(dir=RUNTIME_VARS.TMP))
+        self.addCleanup(salt.utils.files.rm_rf, str(tree))
+        (tree / "top.sls").write_text("")
+        (tree / "sub").mkdir()
+        (tree / "sub" / "init.sls").write_text("")
+        opts = {"file_roots": {"base": [str(tree)]}, "roots_index": True}
+        with patch.dict(roots.__opts__, opts):
+            index = roots._RootsIndex(roots.__opts__)
+            index.scan()
+            index.write()
+            (tree / "new.sls").write_text("")
+            # The file lists are served from the index, so the new file is
+            # not listed until the index is refreshed
+            self.assertEqual(
+                roots.file_list({"saltenv": "base"}), ["sub/init.sls", "top.sls"]
+            )
+            self.assertEqual(roots.dir_list({"saltenv": "base"}), ["sub"])
+
+            index.refresh(str(tree / "new.sls"))
+            (tree / "sub" / "init.sls").unlink()
+            index.refresh(str(tree / "sub" / "init.sls"))
+            index.write()
+            self.assertEqual(
+                roots.file_list({"saltenv": "base"}), ["new.sls", "top.sls"]
+            )
+            self.assertEqual(roots.file_list_emptydirs({"saltenv": "base"}), ["sub"])
+
+            shutil.rmtree(str(tree / "sub"))
+            index.refresh(str(tree / "sub"))
+            index.write()
+            self.assertEqual(roots.dir_list({"saltenv": "base"}), [])
+
+    def test_roots_index_file_hash(self):
+        """
+        The hash of a file changed since the index was written is not served
+        from the hash cache
+        """
+        tree = pathlib.Path(tempfile.mkdtemp(dir=RUNTIME_VARS.TMP))
+        self.addCleanup(salt.utils.files.rm_rf, str(tree))
+        (tree / "top.sls").write_text("old")
+        opts = {"file_roots": {"base": [str(tree)]}, "roots_index": True}
+        with patch.dict(roots.__opts__, opts):
+            index = roots._RootsIndex(roots.__opts__)
+            index.scan()
+            index.write()
+            load = {"path": "top.sls", "saltenv": "base"}
+            fnd = roots.find_file("top.sls")
+            old = roots.file_hash(load, fnd)["hsum"]
+            (tree / "top.sls").write_text("new")
+            mtime = os.path.getmtime(str(tree / "top.sls")) + 10
+            os.utime(str(tree / "top.sls"), (mtime, mtime))
+            new = roots.file_hash(load, fnd)["hsum"]
+            self.assertNotEqual(old, new)
+            self.assertEqual(
+                new,
+                salt.utils.hashutils.get_hash(
+                    str(tree / "top.sls"), roots.__opts__["hash_type"]
+                ),
+            )
+
+    def test_roots_index_stale(self):
+        tree = pathlib.Path(tempfile.mkdtemp(dir=RUNTIME_VARS.TMP))
+        self.addCleanup(salt.utils.files.rm_rf, str(tree))
+        (tree / "top.sls").write_text("")
+        opts = {"file_roots": {"base": [str(tree)]}, "roots_index": True}
+        with patch.dict(roots.__opts__, opts):
+            index = roots._RootsIndex(roots.__opts__)
+            index.scan()
+            index.write()
+            self.assertIsNotNone(roots._load_index("base"))
+            # Without a recent heartbeat from the watcher, the index is not used
+            os.utime(roots._heartbeat_path(), (0, 0))
+            self.assertIsNone(roots._load_index("base"))
+            (tree / "new.sls").write_text("")
+            self.assertIn("new.sls", roots.file_list({"saltenv": "base"}))
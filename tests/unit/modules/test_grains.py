@@ -789,3 +789,14 @@ class GrainsModuleTestCase(TestCase, LoaderModuleMockMixin):
             self.assertTrue(res["result"])
             self.assertEqual(res["changes"], {"b": None})
             self.assertEqual(grainsmod.__grains__, {"a": "aval", "c": 8})
+
+    def test_timings(self):
+        timings = {
+            "core.os_data": {"duration": 0.5},
+            "core.hostname": {"duration": 0.01},
+            "custom.slow": {"duration": 5.0, "timeout": True},
+        }
+        with patch("salt.loader.grains_timings", MagicMock(return_value=timings)):
+            res = grainsmod.timings()
+        self.assertEqual(list(res), ["custom.slow", "core.os_data", "core.hostname"])
+        self.assertTrue(res["custom.slow"]["timeout"])
@@ -5,6 +5,7 @@ tests.unit.returners.local_cache_test
 Unit tests for the Default Job Cache (local_cache).
 """
 
+import datetime
 import logging
 import os
 import shutil
@@ -378,3 +379,186 @@ class Local_CacheTest(
         self._check_dir_files(
             "new_jid_dir was not removed", self.EMPTY_JID_DIR, status="removed"
         )
+
+
+class LocalCacheIndexTestCase(TestCase, LoaderModuleMockMixin):
+    """
+    Tests for the local_cache job cache index
+    """
+
+    def setup_loader_modules(self):
+        self.cachedir = tempfile.mkdtemp(
+            prefix="salt_test_job_index", dir=RUNTIME_VARS.TMP
+        )
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        return {
+            local_cache: {
+                "__opts__": {
+                    "cachedir": self.cachedir,
+                    "keep_jobs": 24,
+                    "hash_type": "sha256",
+                    "job_cache_index": True,
+                }
+            }
+        }
+
+    def _save(self, jid, fun="test.ping"):
+        local_cache.prep_jid(passed_jid=jid)
+        local_cache.save_load(
+            jid,
+            {"jid": jid, "fun": fun, "arg": [], "tgt": "*", "user": "root"},
+            minions=["minion1", "minion2"],
+        )
+
+    def _import(self):
+        """
+        Import the jobs of the job cache into the index, like the maintenance
+        process of the master does, without expiring them
+        """
+        with patch.dict(local_cache.__opts__, {"keep_jobs": 0}):
+            local_cache.clean_old_jobs()
+
+    def test_import_existing_jobs(self):
+        with patch.dict(local_cache.__opts__, {"job_cache_index": False}):
+            self._save("20210101100000000000")
+            self._save("20210101110000000000", fun="test.echo")
+            expected = local_cache.get_jids()
+        self.assertEqual(len(expected), 2)
+
+        # The jobs are not imported when publishing, they are listed from the
+        # job cache until the maintenance process imported them
+        self._save("20210101120000000000")
+        index = local_cache._index()
+        self.assertFalse(index.imported())
+        expected = local_cache.get_jids()
+        self.assertEqual(len(expected), 3)
+
+        self._import()
+        self.assertTrue(index.imported())
+        self.assertEqual(local_cache.get_jids(), expected)
+        self.assertEqual(index.partitions(), ["2021010110", "2021010111", "2021010112"])
+        self.assertEqual(index.jobs()["20210101110000000000"]["minions"], 2)
+
+    def test_import_disabled_jobs(self):
+        self._import()
+        self._save("20210101100000000000")
+        index = local_cache._index()
+        self.assertTrue(index.imported())
+
+        # A job stored while the index is disabled has the index rebuilt
+        with patch.dict(local_cache.__opts__, {"job_cache_index": False}):
+            self._save("20210101110000000000")
+            shutil.rmtree(local_cache._jid_dir("20210101100000000000"))
+        self.assertFalse(index.imported())
+        self.assertEqual(list(local_cache.get_jids()), ["20210101110000000000"])
+
+        self._import()
+        self.assertTrue(index.imported())
+        self.assertEqual(list(index.jobs()), ["20210101110000000000"])
+        self.assertEqual(list(local_cache.get_jids()), ["20210101110000000000"])
+
+        with patch.dict(local_cache.__opts__, {"keep_jobs": 24}):
+            local_cache.clean_old_jobs()
+        self.assertEqual(local_cache.get_jids(), {})
+
+    def test_list_jobs(self):
+        self._import()
+        self._save("20210101100000000000")
+        self._save("20210101110000000000", fun="saltutil.find_job")
+        self._save("20210101110500000000", fun="test.echo")
+        self._save("20210101120000000000")
+        self.assertEqual(
+            [job["JID"] for job in local_cache.get_jids_filter(2)],
+            ["20210101110500000000", "20210101120000000000"],
+        )
+        self.assertEqual(
+            [job["JID"] for job in local_cache.get_jids_filter(3, False)],
+            ["20210101110000000000", "20210101110500000000", "20210101120000000000"],
+        )
+        jobs = local_cache.get_jids()
+        self.assertEqual(len(jobs), 4)
+        self.assertEqual(jobs["20210101110500000000"]["Function"], "test.echo")
+        self.assertEqual(
+            jobs["20210101110500000000"]["StartTime"], "2021, Jan 01 11:05:00.000000",
+        )
+
+        ret = local_cache.get_jids_range(
+            start_time=datetime.datetime(2021, 1, 1, 11, 1),
+            end_time=datetime.datetime(2021, 1, 1, 12),
+        )
+        self.assertEqual(sorted(ret), ["20210101110500000000", "20210101120000000000"])
+
+    def test_clean_old_jobs(self):
+        old_jid = "20000101000000000000"
+        new_jid = salt.utils.jid.gen_jid({})
+        self._import()
+        self._save(old_jid)
+        self._save(new_jid)
+        job_dir = os.path.join(self.cachedir, "jobs")
+
+        with patch("shutil.rmtree", MagicMock(wraps=shutil.rmtree)) as rmtree:
+            local_cache.clean_old_jobs()
+        rmtree.assert_called_once_with(
+            salt.utils.jid.jid_dir(old_jid, job_dir, "sha256")
+        )
+        self.assertEqual(list(local_cache.get_jids()), [new_jid])
+        self.assertEqual(local_cache.get_load(old_jid), {})
+        self.assertEqual(local_cache.get_load(new_jid)["fun"], "test.ping")
+
+
+class LocalCacheBucketsTestCase(TestCase, LoaderModuleMockMixin):
+    """
+    Tests for the local_cache jobs stored by hour
+    """
+
+    def setup_loader_modules(self):
+        self.cachedir = tempfile.mkdtemp(
+            prefix="salt_test_job_buckets", dir=RUNTIME_VARS.TMP
+        )
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        return {
+            local_cache: {
+                "__opts__": {
+                    "cachedir": self.cachedir,
+                    "keep_jobs": 24,
+                    "hash_type": "sha256",
+                    "job_cache_buckets": True,
+                }
+            }
+        }
+
+    def _save(self, jid):
+        self.assertEqual(local_cache.prep_jid(passed_jid=jid), jid)
+        local_cache.save_load(
+            jid, {"jid": jid, "fun": "test.ping", "tgt": "minion"}, minions=["minion"]
+        )
+        local_cache.returner({"jid": jid, "id": "minion", "return": True})
+
+    def test_buckets(self):
+        old_jid = "20000101000000000000"
+        new_jid = salt.utils.jid.gen_jid({})
+        legacy_jid = "20000101010000000000"
+        job_dir = os.path.join(self.cachedir, "jobs")
+        with patch.dict(local_cache.__opts__, {"job_cache_buckets": False}):
+            self._save(legacy_jid)
+        self._save(old_jid)
+        self._save(new_jid)
+
+        self.assertTrue(os.path.isdir(os.path.join(job_dir, "2000010100")))
+        self.assertTrue(os.path.isdir(os.path.join(job_dir, new_jid[:10])))
+        for jid in (old_jid, new_jid, legacy_jid):
+            self.assertEqual(local_cache.get_load(jid)["fun"], "test.ping")
+            self.assertEqual(local_cache.get_jid(jid), {"minion": {"return": True}})
+        self.assertEqual(
+            sorted(local_cache.get_jids()), sorted([old_jid, new_jid, legacy_jid])
+        )
+
+        local_cache.clean_old_jobs()
+        self.assertFalse(os.path.isdir(os.path.join(job_dir, "2000010100")))
+        self.assertEqual(local_cache.get_load(old_jid), {})
+        self.assertEqual(local_cache.get_load(new_jid)["fun"], "test.ping")
+        # The jobs stored before the buckets were enabled are expired as before
+        with patch.dict(local_cache.__opts__, {"keep_jobs": 0.0000000010}):
+            local_cache.clean_old_jobs()
+        self.assertEqual(local_cache.get_load(legacy_jid), {})
+        self.assertEqual(local_cache.get_load(new_jid)["fun"], "test.ping")
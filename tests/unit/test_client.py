@@ -53,6 +53,49 @@ class LocalClientTestCase(TestCase, SaltClientTestCaseMixin):
             with self.assertRaises(StopIteration):
                 next(ret)
 
+    def test_get_iter_returns_find_job(self):
+        """
+        The find_job checks only target the minions which did not return, and
+        not the ones which did not answer the previous check
+        """
+
+        def _events(*events):
+            yield from events
+            while True:
+                yield None
+
+        def _get_returns_no_block(tag, match_type=None):
+            return {
+                "salt/job/0815": _events({"data": {"id": "m1", "return": True}}),
+                "salt/job/find1": _events(
+                    {
+                        "data": {
+                            "id": "m2",
+                            "return": {"fun": "test.sleep"},
+                            "retcode": 0,
+                        }
+                    }
+                ),
+                "salt/job/find2": _events(),
+            }[tag]
+
+        with client.LocalClient(mopts=self.get_temp_config("master")) as local_client:
+            local_client.returners = MagicMock()
+            local_client.get_returns_no_block = _get_returns_no_block
+            local_client.gather_job_info = MagicMock(
+                side_effect=[{"jid": "find1"}, {"jid": "find2"}]
+            )
+            ret = list(
+                local_client.get_iter_returns(
+                    "0815", {"m1", "m2", "m3"}, timeout=0, gather_job_timeout=0
+                )
+            )
+        self.assertEqual(ret, [{"m1": {"ret": True}}])
+        calls = local_client.gather_job_info.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(sorted(calls[0][0][1]), ["m2", "m3"])
+        self.assertEqual(calls[1][0][1], ["m2"])
+
     def test_create_local_client(self):
         with client.LocalClient(mopts=self.get_temp_config("master")) as local_client:
             self.assertIsInstance(
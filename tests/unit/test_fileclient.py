@@ -352,6 +352,125 @@ class FileclientCacheTest(
                 log.debug("content = %s", content)
                 self.assertTrue(saltenv in content)
 
+    def test_hash_files(self):
+        """
+        Ensure the hashes of several files are returned in order
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            local_path = os.path.join(self.FS_ROOT, "base", "foo.txt")
+            paths = [
+                "salt://{}/bar.txt".format(SUBDIR),
+                "salt://missing.txt",
+                local_path,
+                "salt://foo.txt",
+            ]
+            with patch.object(
+                client, "hash_file", MagicMock(wraps=client.hash_file)
+            ) as hash_file:
+                ret = client.hash_files(paths, "dev")
+            # Only the local file is hashed on its own
+            hash_file.assert_called_once_with(local_path, "dev")
+            self.assertEqual(
+                ret, [client.hash_file(path, "dev") for path in paths],
+            )
+            self.assertEqual(ret[1], "")
+            self.assertNotEqual(ret[0]["hsum"], ret[3]["hsum"])
+
+    def test_cache_files(self):
+        """
+        Ensure several files are cached with a single _serve_files request, and
+        that up to date copies are not sent again
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            paths = [
+                "salt://foo.txt",
+                "salt://missing.txt",
+                "salt://{}/bar.txt".format(SUBDIR),
+            ]
+            cache_root = os.path.join(fileclient.__opts__["cachedir"], "files", "dev")
+            with patch.object(
+                client.channel, "send", MagicMock(wraps=client.channel.send)
+            ) as send:
+                ret = client.cache_files(paths, "dev")
+                self.assertEqual(send.call_count, 1)
+                self.assertEqual(
+                    ret,
+                    [
+                        os.path.join(cache_root, "foo.txt"),
+                        False,
+                        os.path.join(cache_root, SUBDIR, "bar.txt"),
+                    ],
+                )
+                with salt.utils.files.fopen(ret[0]) as fp_:
+                    self.assertIn("'dev' saltenv", fp_.read())
+
+                served = client.channel.fs.serve_files(
+                    {
+                        "files": [
+                            {"path": "foo.txt", "hsum": client.hash_file(ret[0])}
+                        ],
+                        "saltenv": "dev",
+                    }
+                )
+                self.assertEqual(served[0]["status"], "unchanged")
+                self.assertNotIn("data", served[0])
+
+    def test_cache_file_delta_transfer(self):
+        """
+        Ensure only the changed blocks of a large file are downloaded when
+        file_delta_transfer is enabled
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+        patched_opts["file_delta_transfer"] = True
+        patched_opts["fileserver_delta_transfer"] = True
+        data = os.urandom(2 * patched_opts["file_buffer_size"])
+        path = os.path.join(self.FS_ROOT, "base", "large.bin")
+        with salt.utils.files.fopen(path, "wb") as fp_:
+            fp_.write(data)
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            cache_loc = client.cache_file("salt://large.bin", "base")
+            # Enough changed data for the delta to be sent in several parts,
+            # after enough unchanged data for the master to send a delta
+            offset = len(data) * 3 // 4
+            data = (
+                data[:offset]
+                + os.urandom(patched_opts["file_buffer_size"])
+                + data[offset:]
+            )
+            with salt.utils.files.fopen(path, "wb") as fp_:
+                fp_.write(data)
+            serve_loads = []
+            send = client.channel.send
+
+            def _send(load, **kwargs):
+                if load["cmd"] == "_serve_file":
+                    serve_loads.append(dict(load))
+                return send(load, **kwargs)
+
+            with patch.object(client.channel, "send", _send):
+                self.assertEqual(
+                    client.cache_file("salt://large.bin", "base"), cache_loc
+                )
+            self.assertGreater(len(serve_loads), 1)
+            # The signature is only sent with the first part
+            self.assertIn("delta", serve_loads[0])
+            for load in serve_loads[1:]:
+                self.assertNotIn("delta", load)
+                self.assertIn("delta_id", load)
+            with salt.utils.files.fopen(cache_loc, "rb") as fp_:
+                self.assertEqual(fp_.read(), data)
+
     def test_cache_file_with_alternate_cachedir_and_absolute_path(self):
         """
         Ensure file is cached to correct location when an alternate cachedir is
@@ -16,11 +16,13 @@ import shutil
 import sys
 import tempfile
 import textwrap
+import time
 
 import pytest
 import salt.config
 import salt.loader
 import salt.loader_context
+import salt.utils.decorators
 import salt.utils.files
 import salt.utils.stringutils
 from tests.support.case import ModuleCase
@@ -1679,6 +1681,153 @@ class LoaderLoadCachedGrainsTest(TestCase):
         assert isinstance(osrelease_info, tuple), osrelease_info
 
 
+class LoaderGrainsPoolTest(TestCase):
+    """
+    Test running the grains functions on the grains pool
+    """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        self.opts = salt.config.minion_config(None)
+        self.opts["cachedir"] = self.cache_dir
+        self.opts["grains_pool_size"] = 4
+
+        def slow():
+            time.sleep(0.2)
+            return {"os": "slow", "slow": True}
+
+        def fast():
+            return {"os": "fast", "fast": True}
+
+        def hang():
+            time.sleep(5)
+            return {"hang": True}
+
+        def seen(grains):
+            return {"seen": sorted(grains)}
+
+        self.funcs = collections.OrderedDict(
+            [
+                ("core.slow", slow),
+                ("core.fast", fast),
+                ("custom.hang", hang),
+                ("custom.seen", seen),
+            ]
+        )
+
+    def _grains(self, opts):
+        with patch("salt.loader.grain_funcs", MagicMock(return_value=self.funcs)):
+            return salt.loader.grains(opts)
+
+    def test_grains_pool_same_as_sequential(self):
+        """
+        The grains are merged in the order of the grains functions, whichever
+        returns first, and the functions taking the grains see the grains of
+        the functions before them
+        """
+        self.funcs.pop("custom.hang")
+        pooled = self._grains(self.opts)
+        sequential = self._grains(dict(self.opts, grains_pool_size=0))
+        self.assertEqual(pooled, sequential)
+        self.assertEqual(pooled["os"], "fast")
+        self.assertEqual(pooled["seen"], ["fast", "os", "slow"])
+
+    def test_grains_timeout(self):
+        """
+        A grains function running for longer than grains_timeout is given up
+        and flagged in the timings
+        """
+        opts = dict(self.opts, grains_timeout=0.5)
+        start = time.time()
+        grains = self._grains(opts)
+        self.assertLess(time.time() - start, 4)
+        self.assertNotIn("hang", grains)
+        self.assertTrue(grains["slow"])
+        self.assertEqual(grains["seen"], ["fast", "os", "slow"])
+
+        timings = salt.loader.grains_timings(opts)
+        self.assertEqual(timings["custom.hang"], {"duration": 0.5, "timeout": True})
+        self.assertGreaterEqual(timings["core.slow"]["duration"], 0.2)
+        self.assertNotIn("timeout", timings["core.fast"])
+
+
+class LoaderIncrementalGrainsCacheTest(TestCase):
+    """
+    Test reusing the cached grains of the grains functions which did not
+    expire
+    """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        self.opts = salt.config.minion_config(None)
+        self.opts["cachedir"] = self.cache_dir
+        self.opts["grains_cache"] = True
+        self.calls = collections.Counter()
+        self.ip = "10.0.0.1"
+
+        def static():
+            self.calls["static"] += 1
+            return {"osrelease_info": (10, 2)}
+
+        @salt.utils.decorators.grains_ttl(0)
+        def dynamic():
+            self.calls["dynamic"] += 1
+            return {"ip": self.ip}
+
+        def seen(grains):
+            self.calls["seen"] += 1
+            return {"seen": grains["ip"]}
+
+        self.funcs = collections.OrderedDict(
+            [("core.static", static), ("core.dynamic", dynamic), ("custom.seen", seen)]
+        )
+
+    def _grains(self, **kwargs):
+        class GrainFuncs(collections.OrderedDict):
+            def clear(self):
+                # The loader reloads the grains modules
+                pass
+
+        grain_funcs = MagicMock(return_value=GrainFuncs(self.funcs))
+        with patch("salt.loader.grain_funcs", grain_funcs):
+            return salt.loader.grains(self.opts, **kwargs)
+
+    def test_refresh_expired(self):
+        """
+        Only the expired grains functions are run again, and the grains
+        functions taking the grains when the grains before them changed
+        """
+        self.assertEqual(
+            self._grains(),
+            {"osrelease_info": (10, 2), "ip": "10.0.0.1", "seen": "10.0.0.1"},
+        )
+        self.assertEqual(self.calls, {"static": 1, "dynamic": 1, "seen": 1})
+
+        grains = self._grains()
+        self.assertEqual(grains["osrelease_info"], (10, 2))
+        self.assertEqual(self.calls, {"static": 1, "dynamic": 2, "seen": 1})
+        self.assertTrue(salt.loader.grains_timings(self.opts)["core.static"]["cached"])
+
+        self.ip = "10.0.0.2"
+        grains = self._grains()
+        self.assertEqual(grains["seen"], "10.0.0.2")
+        self.assertEqual(self.calls, {"static": 1, "dynamic": 3, "seen": 2})
+
+        self._grains(force_refresh=True)
+        self.assertEqual(self.calls, {"static": 2, "dynamic": 4, "seen": 3})
+
+    def test_grains_ttl_option(self):
+        """
+        The grains_ttl option takes precedence over the grains_ttl decorator
+        """
+        self.opts["grains_ttl"] = {"core.dyn*": 300, "core.static": 0}
+        self._grains()
+        self._grains()
+        self.assertEqual(self.calls, {"static": 2, "dynamic": 1, "seen": 1})
+
+
 class LazyLoaderRefreshFileMappingTest(TestCase):
     """
     Test that _refresh_file_mapping is called using acquiring LazyLoader._lock
@@ -1,7 +1,10 @@
+import concurrent.futures
+import threading
 import time
 
 import pytest
 import salt.config
+import salt.ext.tornado.ioloop
 import salt.master
 from tests.support.mixins import AdaptedConfigurationTestCaseMixin
 from tests.support.mock import MagicMock, patch
@@ -744,6 +747,8 @@ class MaintenanceTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
         ), patch(
             "salt.utils.verify.check_max_open_files", mocked_check_max_open_files
         ):
+            self.main_class.schedule = MagicMock()
+            self.main_class.schedule.time_to_next_eval.return_value = None
             try:
                 self.main_class.run()
             except RuntimeError as exc:
@@ -759,3 +764,134 @@ class MaintenanceTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
             self.assertEqual(mocked_handle_presence.call_times, [0, 60, 120, 180])
             self.assertEqual(mocked_handle_key_rotate.call_times, [0, 60, 120, 180])
             self.assertEqual(mocked_check_max_open_files.call_times, [0, 60, 120, 180])
+
+    def test_run_func_schedule_due(self):
+        """
+        Test that the run function evaluates the schedule when a scheduled job
+        is due before the next loop
+        """
+
+        class MockTime:
+            def __init__(self, max_duration):
+                self._start_time = time.time()
+                self._current_duration = 0
+                self._max_duration = max_duration
+                self._calls = []
+
+            def time(self):
+                return self._start_time + self._current_duration
+
+            def sleep(self, secs):
+                self._calls += [secs]
+                self._current_duration += secs
+                if self._current_duration >= self._max_duration:
+                    raise RuntimeError("Time passes")
+
+        mocked_time = MockTime(60 * 2)
+        call_times = []
+
+        def handle_schedule(*args, **kwargs):
+            call_times.append(mocked_time._current_duration)
+
+        # A job is due 25 seconds after each evaluation
+        self.main_class.schedule = MagicMock()
+        self.main_class.schedule.time_to_next_eval.return_value = 25
+
+        with patch("salt.master.time", mocked_time), patch(
+            "salt.utils.process", autospec=True
+        ), patch("salt.master.Maintenance._post_fork_init"), patch(
+            "salt.daemons.masterapi.clean_old_jobs"
+        ), patch(
+            "salt.daemons.masterapi.clean_expired_tokens"
+        ), patch(
+            "salt.daemons.masterapi.clean_pub_auth"
+        ), patch(
+            "salt.master.Maintenance.handle_git_pillar"
+        ), patch(
+            "salt.master.Maintenance.handle_schedule", side_effect=handle_schedule
+        ), patch(
+            "salt.master.Maintenance.handle_key_cache"
+        ), patch(
+            "salt.master.Maintenance.handle_presence"
+        ), patch(
+            "salt.master.Maintenance.handle_key_rotate"
+        ), patch(
+            "salt.utils.verify.check_max_open_files"
+        ):
+            try:
+                self.main_class.run()
+            except RuntimeError as exc:
+                self.assertEqual(str(exc), "Time passes")
+            self.assertEqual(mocked_time._calls, [25, 25, 10, 25, 25, 10])
+            self.assertEqual(call_times, [0, 25, 50, 60, 85, 110])
+
+
+class MWorkerTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
+    """
+    TestCase for salt.master.MWorker class
+    """
+
+    def setUp(self):
+        opts = self.get_temp_config("master", worker_pool_threads=2)
+        self.worker = salt.master.MWorker(opts, {}, {}, [], "MWorker-0")
+        self.worker.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self.io_loop = salt.ext.tornado.ioloop.IOLoop()
+        self.threads = []
+
+        def run_func(func, load):
+            self.threads.append(threading.current_thread())
+            return {"cmd": func}, {"fun": "send"}
+
+        # The worker and each thread of its pool have their own AESFuncs
+        aes_funcs = MagicMock(run_func=MagicMock(side_effect=run_func))
+        expose_methods = salt.master.AESFuncs.expose_methods
+        aes_funcs.get_method.side_effect = lambda name: name in expose_methods
+        self.worker.aes_funcs = aes_funcs
+        patcher = patch("salt.master.AESFuncs", MagicMock(return_value=aes_funcs))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if self.worker.executor is not None:
+            self.worker.executor.shutdown()
+        self.io_loop.close()
+        del self.worker
+
+    def _run(self, load):
+        """
+        Handle ``load`` in the worker, return the result and the thread which
+        ran the AES function
+        """
+        ret = self.io_loop.run_sync(
+            lambda: self.worker._handle_payload({"enc": "aes", "load": load})
+        )
+        return ret, self.threads.pop()
+
+    def test_handle_aes_pool(self):
+        """
+        Test that the commands which can take a while run in the thread pool
+        """
+        ret, thread = self._run({"cmd": "_pillar", "id": "minion"})
+        self.assertEqual(ret, ({"cmd": "_pillar"}, {"fun": "send"}))
+        self.assertIsNot(thread, threading.current_thread())
+
+        ret, thread = self._run({"cmd": "_minion_event", "id": "minion"})
+        self.assertEqual(ret, ({"cmd": "_minion_event"}, {"fun": "send"}))
+        self.assertIs(thread, threading.current_thread())
+
+        # Returns only run in the pool when they go to an external job cache
+        ret, thread = self._run({"cmd": "_return", "id": "minion"})
+        self.assertIs(thread, threading.current_thread())
+        self.worker.opts["master_job_cache"] = "redis"
+        ret, thread = self._run({"cmd": "_return", "id": "minion"})
+        self.assertIsNot(thread, threading.current_thread())
+
+    def test_handle_aes_no_pool(self):
+        """
+        Test that every command runs on the IOLoop without a thread pool
+        """
+        self.worker.executor.shutdown()
+        self.worker.executor = None
+        ret, thread = self._run({"cmd": "_pillar", "id": "minion"})
+        self.assertEqual(ret, ({"cmd": "_pillar"}, {"fun": "send"}))
+        self.assertIs(thread, threading.current_thread())
@@ -16,6 +16,8 @@ import time
 import pytest
 import salt.exceptions
 import salt.payload
+import salt.transport.frame
+import salt.utils.msgpack
 import zmq
 from salt.utils import immutabletypes
 from salt.utils.odict import OrderedDict
@@ -319,6 +321,31 @@ class SREQTestCase(TestCase):
         odata = payload.loads(sdata, encoding=None)
         assert isinstance(odata[dtvalue], str)
 
+    def test_loads_matches_decode_embedded_strs(self):
+        """
+        Test that loads decodes the strings the way decode_embedded_strs does,
+        keeping the binary ones as bytes
+        """
+        payload = salt.payload.Serial("msgpack")
+        dtvalue = datetime.datetime(2001, 2, 3, 4, 5, 6, 7)
+        for idata in (
+            {"str": "strval", "bytes": b"bytesval", "list": ["a", b"b", 1, 2.5]},
+            {"nested": {"unicode": "\u00e9\u4e2d", "time": dtvalue}, b"k": None},
+            {"binary": b"\xff\xfe", b"\xff": ["ok", b"\xed\xa0\x80"]},
+        ):
+            sdata = payload.dumps(idata)
+            legacy = salt.transport.frame.decode_embedded_strs(
+                salt.utils.msgpack.loads(
+                    sdata,
+                    use_list=True,
+                    raw=True,
+                    ext_hook=salt.payload._ext_type_decoder,
+                )
+            )
+            odata = payload.loads(sdata)
+            self.assertEqual(odata, legacy)
+            self.assertEqual(repr(odata), repr(legacy))
+
     def test_raw_vs_encoding_utf8(self):
         """
         Test that we handle the new raw parameter in 5.0.2 correctly based on
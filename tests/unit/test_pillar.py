@@ -7,11 +7,14 @@
 """
 
 
+import copy
 import logging
 import os
 import shutil
 import tempfile
 import textwrap
+import threading
+import time
 
 import salt.config
 import salt.exceptions
@@ -327,6 +330,74 @@ class PillarTestCase(TestCase):
             "mocked-minion", "fake_pillar", "bar", extra_minion_data={"fake_key": "foo"}
         )
 
+    def _ext_pillar_pool(self, **extra_opts):
+        opts = {
+            "optimization_order": [0, 1, 2],
+            "renderer": "yaml",
+            "renderer_blacklist": [],
+            "renderer_whitelist": [],
+            "state_top": "",
+            "pillar_roots": {"base": []},
+            "file_roots": {"base": []},
+            "extension_modules": "",
+            "ext_pillar": [{"first": 0.5}, {"second": 0.5}, {"third": 0.5}],
+        }
+        opts.update(extra_opts)
+        seen = []
+
+        def _ext_pillar(data):
+            def _func(minion_id, pillar, delay):
+                seen.append(copy.deepcopy(pillar))
+                time.sleep(delay)
+                return data
+
+            return _func
+
+        ext_pillars = {
+            "first": _ext_pillar({"a": 1, "b": {"c": 1, "d": 1}}),
+            "second": _ext_pillar({"b": {"c": 2}}),
+            "third": _ext_pillar({"e": 3}),
+        }
+        with patch("salt.loader.pillars", MagicMock(return_value=ext_pillars)):
+            pillar = salt.pillar.Pillar(opts, {}, "mocked-minion", "base")
+        start = time.time()
+        ret = pillar.ext_pillar({"z": 0})
+        return ret, time.time() - start, seen
+
+    def test_ext_pillar_pool(self):
+        """
+        test that the ext_pillar sources called on the ext_pillar pool are
+        merged in the same order
+        """
+        expected = {"a": 1, "b": {"c": 2, "d": 1}, "e": 3, "z": 0}
+        ret, duration, seen = self._ext_pillar_pool()
+        self.assertEqual(ret, (expected, []))
+        self.assertGreaterEqual(duration, 1.5)
+        self.assertEqual(seen[2], {"a": 1, "b": {"c": 2, "d": 1}, "z": 0})
+
+        ret, duration, seen = self._ext_pillar_pool(ext_pillar_pool_size=3)
+        self.assertEqual(ret, (expected, []))
+        self.assertLess(duration, 1.5)
+        self.assertEqual(seen, [{"z": 0}] * 3)
+
+    def test_ext_pillar_timeout(self):
+        """
+        test that the ext_pillar sources which time out are left out
+        """
+        ret, duration, seen = self._ext_pillar_pool(
+            ext_pillar=[{"first": 0}, {"second": 5}, {"third": 0}],
+            ext_pillar_pool_size=2,
+            ext_pillar_timeout=0.5,
+        )
+        self.assertEqual(
+            ret,
+            (
+                {"a": 1, "b": {"c": 1, "d": 1}, "e": 3, "z": 0},
+                ["ext_pillar second timed out after 0.5 seconds"],
+            ),
+        )
+        self.assertLess(duration, 5)
+
     def test_ext_pillar_first(self):
         """
         test when using ext_pillar and ext_pillar_first
@@ -1225,6 +1296,82 @@ class RemotePillarTestCase(TestCase):
             dictkey="pillar",
         )
 
+    def _push_changes_pillar(self, channel):
+        opts = {
+            "pillarenv": None,
+            "grains_push_changes": True,
+            "master_uri": "tcp://127.0.0.1:4506",
+        }
+        with patch(
+            "salt.transport.client.ReqChannel.factory", MagicMock(return_value=channel)
+        ):
+            return salt.pillar.RemotePillar(opts, self.grains, "minion", "base")
+
+    @patch.dict(salt.pillar._SENT_GRAINS, clear=True)
+    @patch("salt.pillar._FULL_GRAINS", set())
+    def test_grains_push_changes(self):
+        """
+        Only the grains which changed since the last pillar request are sent
+        """
+        channel = MagicMock(
+            crypted_transfer_decode_dictentry=MagicMock(return_value={})
+        )
+        self.grains.update({"id": "minion", "os": "Debian", "ip": ["10.0.0.1"]})
+        self._push_changes_pillar(channel).compile_pillar()
+        load = channel.crypted_transfer_decode_dictentry.call_args[0][0]
+        self.assertEqual(load["grains"], self.grains)
+        self.assertNotIn("grains_changes", load)
+        cached = copy.deepcopy(self.grains)
+
+        self.grains["ip"] = ["10.0.0.2"]
+        self.grains["virtual"] = "kvm"
+        del self.grains["os"]
+        self._push_changes_pillar(channel).compile_pillar()
+        load = channel.crypted_transfer_decode_dictentry.call_args[0][0]
+        self.assertNotIn("grains", load)
+        changes = load["grains_changes"]
+        self.assertEqual(changes["changed"], {"ip": ["10.0.0.2"], "virtual": "kvm"})
+        self.assertEqual(changes["removed"], ["os"])
+        self.assertEqual(
+            salt.pillar.apply_grains_changes("minion", cached, changes), self.grains
+        )
+        # Grains which do not match the ones the changes apply to
+        cached["kernel"] = "Linux"
+        self.assertIsNone(salt.pillar.apply_grains_changes("minion", cached, changes))
+
+    @patch.dict(salt.pillar._SENT_GRAINS, clear=True)
+    @patch("salt.pillar._FULL_GRAINS", set())
+    def test_grains_push_changes_not_rebuilt(self):
+        """
+        All the grains are sent when the master cannot rebuild them from their
+        changes
+        """
+        channel = MagicMock(
+            crypted_transfer_decode_dictentry=MagicMock(return_value={})
+        )
+        self.grains.update({"id": "minion", "os": "Debian"})
+        self._push_changes_pillar(channel).compile_pillar()
+
+        loads = []
+        rets = [False, {"a": 1}, {}]
+
+        def transfer(load, dictkey):
+            loads.append(copy.deepcopy(load))
+            return rets.pop(0)
+
+        channel.crypted_transfer_decode_dictentry.side_effect = transfer
+        self.grains["os"] = "Ubuntu"
+        ret = self._push_changes_pillar(channel).compile_pillar()
+        self.assertEqual(ret, {"a": 1})
+        self.assertEqual(loads[0]["grains_changes"]["changed"], {"os": "Ubuntu"})
+        self.assertNotIn("grains", loads[0])
+        self.assertEqual(loads[1]["grains"], self.grains)
+        self.assertNotIn("grains_changes", loads[1])
+
+        self._push_changes_pillar(channel).compile_pillar()
+        self.assertEqual(loads[2]["grains"], self.grains)
+        self.assertNotIn("grains_changes", loads[2])
+
     def test_pillar_file_client_master_remote(self):
         """
         Test condition where local file_client and use_master_when_local option
@@ -1416,3 +1563,168 @@ class PillarCacheTestCase(TestCase):
             expected_cache = {"base": {"foo": "bar"}, "dev": {"foo": "baz"}}
             self.assertIn("mocked_minion", pillar.cache)
             self.assertEqual(pillar.cache["mocked_minion"], expected_cache)
+
+
+class PillarCacheDependenciesTestCase(TestCase):
+    """
+    Tests for the invalidation of the PillarCache by its dependencies
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.pillar_dir = os.path.join(self.tmpdir, "pillar")
+        os.makedirs(self.pillar_dir)
+        os.makedirs(os.path.join(self.tmpdir, "cache", "pillar_cache"))
+        self._write(
+            "top.sls",
+            """
+            base:
+              '*':
+                - common
+              'os:Debian':
+                - match: grain
+                - debian
+            """,
+        )
+        self._write("common.sls", "foo: {{ grains.get('role', 'none') }}")
+        self._write("debian.sls", "bar: baz")
+        self.opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        self.opts.update(
+            {
+                "cachedir": os.path.join(self.tmpdir, "cache"),
+                "pillar_roots": {"base": [self.pillar_dir]},
+                "file_roots": {"base": []},
+                "extension_modules": "",
+                "pillar_cache": True,
+                "pillar_cache_dependencies": True,
+            }
+        )
+
+    def _write(self, name, contents):
+        path = os.path.join(self.pillar_dir, name)
+        with fopen(path, "w") as fp_:
+            fp_.write(textwrap.dedent(contents))
+        # Make sure that the change is seen even on a coarse file system clock
+        mtime = os.stat(path).st_mtime - 10
+        os.utime(path, (mtime, mtime))
+
+    def _compile(self, grains):
+        pillar = salt.pillar.PillarCache(
+            self.opts, grains, "mocked_minion", "base", pillarenv="base"
+        )
+        with patch.object(
+            pillar, "fetch_pillar", wraps=pillar.fetch_pillar
+        ) as fetch_pillar:
+            ret = pillar.compile_pillar()
+        return ret, fetch_pillar.called
+
+    def test_record_dependencies_threads(self):
+        client = salt.fileclient.PillarClient(self.opts)
+        entered = threading.Event()
+        exited = threading.Event()
+        recorded = []
+
+        def _record():
+            with salt.pillar._record_dependencies() as (tops, lookups):
+                entered.set()
+                exited.wait(5)
+                client._find_file("debian.sls")
+            recorded.append(lookups)
+
+        thread = threading.Thread(target=_record)
+        thread.start()
+        entered.wait(5)
+        with salt.pillar._record_dependencies() as (tops, lookups):
+            client._find_file("common.sls")
+        exited.set()
+        thread.join(5)
+        roots = (self.pillar_dir,)
+        self.assertEqual(lookups["files"], {(roots, "common.sls")})
+        self.assertEqual(recorded, [{"files": {(roots, "debian.sls")}, "dirs": set()}])
+
+    def test_top_grains(self):
+        opts = {"nodegroups": {"web": "G@roles:web and L@a,b", "all": "*"}}
+        tops = [
+            {
+                "base": {
+                    "*": ["common"],
+                    "os:Debian": [{"match": "grain"}, "debian"],
+                    "N@web or S@10.0.0.0/8": ["web"],
+                    "all": [{"match": "nodegroup"}, "all"],
+                }
+            }
+        ]
+        self.assertEqual(
+            salt.pillar._top_grains(opts, tops), {"os", "roles", "ipv4", "ipv6"}
+        )
+        tops[0]["base"]["J@foo:bar"] = ["jinja"]
+        self.assertEqual(
+            salt.pillar._top_grains(opts, tops), {"os", "roles", "ipv4", "ipv6"}
+        )
+        tops[0]["base"]["X@foo"] = ["unknown"]
+        self.assertIsNone(salt.pillar._top_grains(opts, tops))
+
+    def test_file_changed(self):
+        grains = {"os": "Debian", "role": "web"}
+        self.assertEqual(self._compile(grains), ({"foo": "web", "bar": "baz"}, True))
+        self.assertEqual(self._compile(grains), ({"foo": "web", "bar": "baz"}, False))
+        self._write("debian.sls", "bar: quux")
+        self.assertEqual(self._compile(grains), ({"foo": "web", "bar": "quux"}, True))
+        self.assertEqual(self._compile(grains), ({"foo": "web", "bar": "quux"}, False))
+
+    def test_ext_pillar_pool_dependencies(self):
+        """
+        The dependencies recorded by the ext_pillar sources run on the
+        ext_pillar pool are recorded too
+        """
+        ext_dir = os.path.join(self.tmpdir, "ext")
+        os.makedirs(ext_dir)
+        with fopen(os.path.join(ext_dir, "top.sls"), "w") as fp_:
+            fp_.write("base:\n  'kernel:Linux':\n    - match: grain\n    - linux\n")
+        with fopen(os.path.join(ext_dir, "linux.sls"), "w") as fp_:
+            fp_.write("qux: quux")
+        grains = {"os": "Debian", "role": "web", "kernel": "Linux"}
+
+        def _ext_pillar(minion_id, pillar, *args):
+            # Compile the pillar of other pillar roots like git_pillar does
+            opts = dict(self.opts, pillar_roots={"base": [ext_dir]}, ext_pillar=[])
+            return salt.pillar.Pillar(opts, grains, minion_id, "base").compile_pillar(
+                ext=False
+            )
+
+        class _Loader(dict):
+            _dict = {}
+
+        self.opts.update(
+            {
+                "ext_pillar": [{"ext": None}],
+                "ext_pillar_pool_size": 2,
+                "pillar_cache_grains": [],
+            }
+        )
+        expected = {"foo": "web", "bar": "baz", "qux": "quux"}
+        with patch(
+            "salt.loader.pillars", MagicMock(return_value=_Loader(ext=_ext_pillar))
+        ):
+            self.assertEqual(self._compile(grains), (expected, True))
+            self.assertEqual(self._compile(grains), (expected, False))
+            grains["kernel"] = "Windows"
+            del expected["qux"]
+            self.assertEqual(self._compile(grains), (expected, True))
+
+    def test_grains_changed(self):
+        grains = {"os": "Debian", "role": "web"}
+        self.assertEqual(self._compile(grains), ({"foo": "web", "bar": "baz"}, True))
+        grains["os"] = "RedHat"
+        self.assertEqual(self._compile(grains), ({"foo": "web"}, True))
+        grains["role"] = "db"
+        self.assertEqual(self._compile(grains), ({"foo": "db"}, True))
+
+        # Only the grains the top file matches on and the selected ones count
+        self.opts["pillar_cache_grains"] = []
+        self.assertEqual(self._compile(grains), ({"foo": "db"}, True))
+        grains["role"] = "web"
+        self.assertEqual(self._compile(grains), ({"foo": "db"}, False))
+        grains["os"] = "Debian"
+        self.assertEqual(self._compile(grains), ({"foo": "web", "bar": "baz"}, True))
@@ -5,11 +5,15 @@
 import os
 import shutil
 import tempfile
+import threading
+import time
 
 import pytest  # pylint: disable=unused-import
 import salt.exceptions
 import salt.state
+import salt.utils.compile_cache
 import salt.utils.files
+import salt.utils.jinja
 import salt.utils.platform
 from salt.exceptions import CommandExecutionError
 from salt.utils.decorators import state as statedecorators
@@ -896,6 +900,120 @@ class HighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
         self.assertEqual(ret, [("somestuff", "cmd")])
 
 
+class HighStateCompileCacheTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
+    def setUp(self):
+        root_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.state_tree_dir = os.path.join(root_dir, "state_tree")
+        cache_dir = os.path.join(root_dir, "cachedir")
+        for dpath in (root_dir, self.state_tree_dir, cache_dir):
+            if not os.path.isdir(dpath):
+                os.makedirs(dpath)
+        files = {
+            "top.sls": "base:\n  '*':\n    - web\n",
+            "web.sls": "include:\n  - common\n\nweb:\n  test.succeed_without_changes\n",
+            "common.sls": (
+                '{% from "map.jinja" import name %}\n'
+                "{{ name }}:\n  test.succeed_without_changes\n"
+            ),
+            "map.jinja": '{% set name = "common" %}\n',
+        }
+        for name, content in files.items():
+            self._write(name, content)
+
+        overrides = {}
+        overrides["root_dir"] = root_dir
+        overrides["state_events"] = False
+        overrides["id"] = "match"
+        overrides["file_client"] = "local"
+        overrides["file_roots"] = dict(base=[self.state_tree_dir])
+        overrides["cachedir"] = cache_dir
+        overrides["test"] = False
+        overrides["state_compile_cache"] = True
+        self.config = self.get_temp_config("minion", **overrides)
+        self.addCleanup(delattr, self, "config")
+        # Jinja imports go through a file client shared by all the loaders
+        salt.utils.jinja.SaltCacheLoader.shutdown()
+        self.addCleanup(salt.utils.jinja.SaltCacheLoader.shutdown)
+
+    def _write(self, name, content):
+        path = os.path.join(self.state_tree_dir, name)
+        with salt.utils.files.fopen(path, "w") as fp_:
+            fp_.write(content)
+        # Make sure the fileserver does not reuse the hash of the old content
+        stamp = time.time() + len(content)
+        os.utime(path, (stamp, stamp))
+
+    def _compile(self):
+        """
+        Return the compiled high data and the SLS files rendered to get it
+        """
+        highstate = salt.state.HighState(self.config)
+        highstate.push_active()
+        try:
+            with patch.object(
+                salt.state.HighState,
+                "render_state",
+                autospec=True,
+                side_effect=salt.state.HighState.render_state,
+            ) as render_state:
+                high = highstate.compile_highstate()
+        finally:
+            highstate.pop_active()
+        return high, sorted(call[0][1] for call in render_state.call_args_list)
+
+    def _stats(self):
+        stats = salt.utils.compile_cache.CompileCache(self.config).stats()
+        return stats["hits"], stats["misses"], stats["stale"]
+
+    def test_compile_cache(self):
+        high, rendered = self._compile()
+        self.assertEqual(sorted(high), ["common", "web"])
+        self.assertEqual(rendered, ["common", "web"])
+        self.assertEqual(self._stats(), (0, 1, 0))
+
+        cached, rendered = self._compile()
+        self.assertEqual(cached, high)
+        self.assertEqual(rendered, [])
+        self.assertEqual(self._stats(), (1, 1, 0))
+
+        # A template imported by an included SLS file changed
+        self._write("map.jinja", '{% set name = "changed" %}\n')
+        high, rendered = self._compile()
+        self.assertEqual(sorted(high), ["changed", "web"])
+        self.assertEqual(rendered, ["common", "web"])
+        self.assertEqual(self._stats(), (1, 1, 1))
+        _, rendered = self._compile()
+        self.assertEqual(rendered, [])
+
+        # The grains changed
+        self.config["grains"]["role"] = "web"
+        _, rendered = self._compile()
+        self.assertEqual(rendered, ["common", "web"])
+        self.assertEqual(self._stats(), (2, 2, 1))
+
+    def test_compile_cache_errors(self):
+        self._write("common.sls", "{% from 'missing.jinja' import name %}\n")
+        for _ in range(2):
+            high, rendered = self._compile()
+            self.assertIsInstance(high, list)
+            self.assertEqual(rendered, ["common", "web"])
+        self.assertEqual(self._stats(), (0, 2, 0))
+
+    def test_compile_cache_count_concurrent(self):
+        compile_cache = salt.utils.compile_cache.CompileCache(self.config)
+
+        def count():
+            for _ in range(25):
+                compile_cache._count("hits")
+
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self._stats(), (200, 0, 0))
+
+
 class MultiEnvHighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
     def setUp(self):
         root_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
@@ -1486,3 +1604,155 @@ class StateFormatSlotsTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
         self.state_obj.jid = None
         [(_, data)] = res.items()
         self.assertEqual(data["comment"], "fun_return")
+
+
+@skipIf(
+    salt.utils.platform.is_windows(),
+    "Skipped until parallel states can be fixed on Windows",
+)
+class StateParallelSchedulerTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
+    """
+    TestCase for the parallel scheduler of state chunks
+    """
+
+    def setUp(self):
+        with patch("salt.state.State._gather_pillar"):
+            minion_opts = self.get_temp_config("minion")
+            self.state_obj = salt.state.State(minion_opts, jid="20210101000000000000")
+
+    def _high(self):
+        high = {}
+        for idx in range(4):
+            high["sleep_{}".format(idx)] = {
+                "module": [
+                    "run",
+                    {"name": "test.sleep"},
+                    {"length": 1},
+                    {"order": 10000 + idx},
+                ],
+                "__env__": "base",
+                "__sls__": "parallel",
+            }
+        high["fails"] = {
+            "test": ["fail_without_changes", {"order": 10004}],
+            "__env__": "base",
+            "__sls__": "parallel",
+        }
+        high["requires_sleep"] = {
+            "test": [
+                "succeed_with_changes",
+                {"require": [{"module": "sleep_3"}]},
+                {"order": 10005},
+            ],
+            "__env__": "base",
+            "__sls__": "parallel",
+        }
+        high["requires_fails"] = {
+            "test": [
+                "succeed_without_changes",
+                {"require": [{"test": "fails"}]},
+                {"order": 10006},
+            ],
+            "__env__": "base",
+            "__sls__": "parallel",
+        }
+        high["onchanges"] = {
+            "test": [
+                "succeed_with_changes",
+                {"onchanges": [{"test": "requires_sleep"}]},
+                {"order": 10007},
+            ],
+            "__env__": "base",
+            "__sls__": "parallel",
+        }
+        return high
+
+    def _run(self, workers):
+        self.state_obj.opts["state_parallel_workers"] = workers
+        self.state_obj.reset_run_num()
+        events = []
+        with patch.object(
+            self.state_obj,
+            "event",
+            side_effect=lambda ret, length, fire_event=False: events.append(dict(ret)),
+        ):
+            start = time.time()
+            ret = self.state_obj.call_high(self._high())
+            elapsed = time.time() - start
+        summary = {
+            tag: (
+                data["result"],
+                bool(data["changes"]),
+                data["__run_num__"],
+                data["comment"],
+            )
+            for tag, data in ret.items()
+        }
+        events = sorted(
+            (event["__run_num__"], event["result"], event["comment"])
+            for event in events
+        )
+        return summary, events, elapsed
+
+    @pytest.mark.slow_test
+    def test_call_high(self):
+        """
+        Test that independent chunks run concurrently and that the returns and
+        the events are the same as the ones of a sequential run
+        """
+        sequential, sequential_events, sequential_time = self._run(0)
+        parallel, parallel_events, parallel_time = self._run(4)
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(parallel_events, sequential_events)
+        self.assertEqual(len(parallel_events), len(parallel))
+        self.assertGreaterEqual(sequential_time, 4)
+        self.assertLess(parallel_time, 3)
+        self.assertEqual(self.state_obj.scheduled, {})
+
+    @pytest.mark.slow_test
+    def test_call_high_bounded(self):
+        """
+        Test that no more than state_parallel_workers chunks run at a time
+        """
+        parallel, _, parallel_time = self._run(2)
+        self.assertEqual(len(parallel), 8)
+        self.assertGreaterEqual(parallel_time, 2)
+
+    def test_schedule_parallel(self):
+        """
+        Test which chunks the parallel scheduler runs in a separate process
+        """
+        self.state_obj.opts["state_parallel_workers"] = 4
+        low = {"state": "file", "fun": "managed", "__id__": "a", "name": "a"}
+        self.assertTrue(self.state_obj._schedule_parallel(low, {}))
+        self.assertFalse(self.state_obj._schedule_parallel(low, None))
+        for extra in (
+            {"parallel": False},
+            {"failhard": True},
+            {"watch": [{"pkg": "b"}]},
+            {"prereq": [{"pkg": "b"}]},
+            {"prerequired": [{"pkg": "b"}]},
+            {"retry": True},
+            {"reload_modules": True},
+            {"state": "saltutil"},
+            {"state": "pkg", "fun": "installed"},
+            {"state": "pkgrepo", "fun": "managed"},
+        ):
+            self.assertFalse(
+                self.state_obj._schedule_parallel(dict(low, **extra), {}), extra
+            )
+        self.state_obj.opts["failhard"] = True
+        self.assertFalse(self.state_obj._schedule_parallel(low, {}))
+        self.state_obj.opts["failhard"] = False
+        self.state_obj.opts["state_parallel_workers"] = 0
+        self.assertFalse(self.state_obj._schedule_parallel(low, {}))
+
+    def test_order_band(self):
+        """
+        Test that orders set by state_auto_order share a band
+        """
+        band = salt.state.State._order_band
+        self.assertEqual(band({"order": 10000}), band({"order": 10042.0001}))
+        self.assertNotEqual(band({"order": 1}), band({"order": 2}))
+        self.assertNotEqual(band({"order": 10000}), band({"order": 1010100}))
+        self.assertEqual(band({"order": 1.0001}), band({"order": 1.0002}))
@@ -919,3 +919,76 @@ class SchedulerEvalTest(SchedulerTestsBase):
         ret = self.schedule.job_status(job_name)
         self.assertNotIn("_last_run", ret)
         self.assertEqual(ret["_next_fire_time"], None)
+
+    def test_eval_not_due(self):
+        """
+        verify that the jobs which are not due are not evaluated
+        """
+        job_name = "test_eval_not_due"
+        job = {
+            "schedule": {
+                job_name: {"function": "test.ping", "hours": 1, "dry_run": True}
+            }
+        }
+        run_time = dateutil.parser.parse("11/29/2017 4:00pm")
+
+        # Add the job to the scheduler
+        self.schedule.opts.update(job)
+
+        self.schedule.eval(now=run_time)
+        self.assertEqual(self.schedule.time_to_next_eval(now=run_time), 3600)
+
+        with patch.object(
+            self.schedule, "_next_eval_time", wraps=self.schedule._next_eval_time
+        ) as next_eval_time:
+            # Not due, not evaluated
+            self.schedule.eval(now=run_time + datetime.timedelta(minutes=30))
+            next_eval_time.assert_not_called()
+
+            # Due, evaluated and run
+            self.schedule.eval(now=run_time + datetime.timedelta(hours=1))
+            next_eval_time.assert_called_once()
+        ret = self.schedule.job_status(job_name)
+        self.assertEqual(ret["_last_run"], run_time + datetime.timedelta(hours=1))
+        self.assertEqual(
+            self.schedule.time_to_next_eval(
+                now=run_time + datetime.timedelta(hours=1, minutes=30)
+            ),
+            1800,
+        )
+
+    def test_eval_not_due_changed(self):
+        """
+        verify that the jobs which are not due are evaluated when they or the
+        schedule change
+        """
+        job_name = "test_eval_not_due_changed"
+        job = {
+            "schedule": {
+                job_name: {"function": "test.ping", "hours": 1, "dry_run": True}
+            }
+        }
+        run_time = dateutil.parser.parse("11/29/2017 4:00pm")
+
+        # Add the job to the scheduler
+        self.schedule.opts.update(job)
+        self.schedule.eval(now=run_time)
+
+        # A new definition of the job is evaluated
+        self.schedule.opts["schedule"][job_name] = {
+            "function": "test.ping",
+            "minutes": 10,
+            "dry_run": True,
+        }
+        self.schedule.eval(now=run_time + datetime.timedelta(minutes=5))
+        ret = self.schedule.job_status(job_name)
+        self.assertEqual(
+            ret["_next_fire_time"], run_time + datetime.timedelta(minutes=15)
+        )
+
+        # So are the jobs of a disabled schedule
+        self.schedule.opts["schedule"]["enabled"] = False
+        self.schedule.eval(now=run_time + datetime.timedelta(minutes=6))
+        ret = self.schedule.job_status(job_name)
+        self.assertEqual(ret["_skip_reason"], "disabled")
+        self.assertIsNone(self.schedule.time_to_next_eval())
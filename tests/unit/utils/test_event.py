@@ -21,6 +21,7 @@ import zmq.eventloop.ioloop
 from salt.ext.tornado.testing import AsyncTestCase
 from saltfactories.utils.processes import terminate_process
 from tests.support.events import eventpublisher_process, eventsender_process
+from tests.support.mock import patch
 from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase, expectedFailure, skipIf
 
@@ -215,6 +216,25 @@ class TestSaltEvent(TestCase):
                 self.assertGotEvent(evt2, {"data": "foo2"})
                 self.assertIsNone(evt1)
 
+    @pytest.mark.slow_test
+    def test_event_tag_filter(self):
+        """Test the publisher only sends the events matching the tag filter"""
+        with eventpublisher_process(self.sock_dir):
+            with salt.utils.event.MasterEvent(self.sock_dir, listen=True) as me:
+                me.set_tag_filter(["evt1", "salt/*/ret"], match_type="fnmatch")
+                # Wait for the filter to reach the publisher
+                me.fire_event({"data": "foo0"}, "evt1")
+                self.assertGotEvent(me.get_event(tag="evt1"), {"data": "foo0"})
+                time.sleep(0.5)
+                me.fire_event({"data": "foo2"}, "evt2")
+                me.fire_event({"data": "foo3"}, "salt/123/ret")
+                me.fire_event({"data": "foo1"}, "evt1")
+                self.assertGotEvent(me.get_event(tag=""), {"data": "foo3"})
+                self.assertGotEvent(me.get_event(tag=""), {"data": "foo1"})
+                self.assertIsNone(me.get_event(tag="", wait=0.1))
+                with self.assertRaises(ValueError):
+                    me.set_tag_filter(["evt1"], match_type="regex")
+
     @pytest.mark.slow_test
     def test_event_subscription_cache(self):
         """Test subscriptions cache a message until requested"""
@@ -381,3 +401,95 @@ class TestEventReturn(TestCase):
         finally:
             if evt is not None:
                 terminate_process(evt.pid, kill_children=True)
+
+
+class TestEventReturnDispatcher(TestCase):
+    def setUp(self):
+        self.cachedir = os.path.join(RUNTIME_VARS.TMP, "test-event-return")
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        self.opts.update(
+            {
+                "cachedir": self.cachedir,
+                "event_return_queue": 3,
+                "event_return_retry_max_wait": 0,
+            }
+        )
+        self.batches = []
+        self.failures = 0
+
+    def _returner(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise Exception("returner is down")
+        self.batches.append([event["tag"] for event in batch])
+
+    def _dispatch(self, count):
+        dispatcher = salt.utils.event.EventReturnDispatcher(
+            self.opts, "test", self._returner, poll_interval=0.01
+        )
+        dispatcher.start()
+        for idx in range(count):
+            self.assertTrue(dispatcher.put({"tag": str(idx), "data": {}}))
+        dispatcher.stop(timeout=30)
+        self.assertFalse(dispatcher.thread.is_alive())
+        return dispatcher
+
+    def test_batches(self):
+        self._dispatch(7)
+        self.assertEqual(self.batches, [["0", "1", "2"], ["3", "4", "5"], ["6"]])
+
+    def test_spill_and_replay(self):
+        self.failures = 2
+        dispatcher = self._dispatch(7)
+        self.assertEqual(
+            [tag for batch in self.batches for tag in batch],
+            [str(idx) for idx in range(7)],
+        )
+        self.assertEqual(dispatcher._spilled(), [])
+        self.assertEqual(dispatcher.spill_size, 0)
+
+    def test_max_attempts(self):
+        self.opts["event_return_retry_max_attempts"] = 2
+        self.failures = 2
+        self._dispatch(6)
+        # The spilled events are sent by the next dispatcher if they were not
+        # sent before it stopped
+        dispatcher = self._dispatch(0)
+        self.assertEqual(self.batches, [["3", "4", "5"]])
+        self.assertEqual(dispatcher._spilled(), [])
+
+    def test_spill_disabled(self):
+        self.opts["event_return_spill_max_size"] = 0
+        self.failures = 1
+        self._dispatch(6)
+        self.assertEqual(self.batches, [["3", "4", "5"]])
+
+    def test_retry_nothing_spilled(self):
+        """
+        The dispatcher waits for the next event once the retry is due and no
+        events were spilled
+        """
+        self.opts["event_return_spill_max_size"] = 0
+        self.failures = 1
+        dispatcher = salt.utils.event.EventReturnDispatcher(
+            self.opts, "test", self._returner, poll_interval=0.01
+        )
+        with patch.object(dispatcher, "_collect", wraps=dispatcher._collect) as collect:
+            dispatcher.start()
+            for idx in range(3):
+                self.assertTrue(dispatcher.put({"tag": str(idx), "data": {}}))
+            time.sleep(0.5)
+            self.assertLess(collect.call_count, 5)
+            dispatcher.stop(timeout=30)
+        self.assertFalse(dispatcher.thread.is_alive())
+        self.assertEqual(self.batches, [])
+
+    def test_queue_full(self):
+        self.opts["event_return_queue_max_size"] = 2
+        dispatcher = salt.utils.event.EventReturnDispatcher(
+            self.opts, "test", self._returner
+        )
+        self.assertTrue(dispatcher.put({"tag": "0", "data": {}}))
+        self.assertTrue(dispatcher.put({"tag": "1", "data": {}}))
+        self.assertFalse(dispatcher.put({"tag": "2", "data": {}}))
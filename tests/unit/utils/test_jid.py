@@ -28,6 +28,26 @@ class JidTestCase(TestCase):
             salt.utils.jid.is_jid("2013121911070012348911111")
         )  # Wrong length
 
+    def test_jid_dir(self):
+        jhash = "4f6a8f9f1aa7fee5d0c0aa8e8c53a4bba9ce2a3a26a2a7c5a2e4f6f0ff7d9c9b"
+        with patch("hashlib.sha256") as sha256:
+            sha256.return_value.hexdigest.return_value = jhash
+            self.assertEqual(
+                salt.utils.jid.jid_dir("20131219110700123489", "/jobs"),
+                os.path.join("/jobs", jhash[:2], jhash[2:]),
+            )
+            self.assertEqual(
+                salt.utils.jid.jid_dir("20131219110700123489", "/jobs", bucket=True),
+                os.path.join("/jobs", "2013121911", jhash),
+            )
+            # Job ids which do not hold a time are not stored by hour
+            self.assertEqual(
+                salt.utils.jid.jid_dir("myjob", "/jobs", bucket=True),
+                os.path.join("/jobs", jhash[:2], jhash[2:]),
+            )
+        self.assertTrue(salt.utils.jid.is_jid_bucket("2013121911"))
+        self.assertFalse(salt.utils.jid.is_jid_bucket("4f"))
+
     def test_gen_jid(self):
         now = datetime.datetime(2002, 12, 25, 12, 0, 0, 0)
         with patch("salt.utils.jid._utc_now", return_value=now):
@@ -422,6 +422,23 @@ class TestReactor(TestCase, AdaptedConfigurationTestCaseMixin):
                     self.reactor.list_reactors(tag), self.reaction_map[tag]
                 )
 
+    def test_set_tag_filter(self):
+        """
+        Ensure that the reactor only asks for the events of its reactors and
+        of the management of the reactor.
+        """
+        event = Mock()
+        self.reactor.set_tag_filter(event)
+        event.set_tag_filter.assert_called_once_with(
+            ["*salt/reactors/manage*"] + list(self.reaction_map), match_type="fnmatch",
+        )
+
+        # Reactors read from a file can change on each event
+        event = Mock()
+        with patch.dict(self.reactor.opts, {"reactor": "/etc/salt/reactor.conf"}):
+            self.reactor.set_tag_filter(event)
+        event.set_tag_filter.assert_not_called()
+
     def test_reactions(self):
         """
         Ensure that the correct reactions are built from the configured SLS